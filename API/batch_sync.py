@@ -0,0 +1,803 @@
+"""
+Batch upload of offline mobile records (the /api/sync/ endpoint).
+
+A device coming back into coverage posts everything it queued in one
+request instead of replaying one POST per form:
+
+    {"records": [
+        {"id": "local-1", "type": "daily_report", "data": {...}},
+        {"id": "local-2", "type": "feedback", "data": {...}},
+        ...
+    ]}
+
+`data` is the body the single-record view for that type accepts (see
+HANDLERS). The whole batch is handled in a few queries:
+
+1. Every related row the batch refers to (staff, farms, communities,
+   activities, sectors, ...) is fetched once per table.
+2. Records are built per type, in batch order. A record whose `uid` is
+   already stored, or appeared earlier in the batch, is a duplicate and
+   is not written again, so replaying a batch is safe.
+3. Each type is inserted with bulk_create in chunks. A chunk that fails
+   is retried record by record so only the bad records fail. Each chunk
+   sends one bulk_created signal, so the dashboard rollups and weekly
+   analytics pick up synced reports.
+
+The result maps each record's `id` (its index when it has none) to
+{"type", "status": "created" | "duplicate" | "failed", "ids", "error"}.
+"""
+import json
+import logging
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.gis.geos import MultiPolygon, Polygon
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from portal import id_allocation
+from portal.models import (
+    Activities, ActivityReportingModel, Community, ContractorCertificateModel,
+    ContractorCertificateVerificationModel, DailyReportingModel, FarmdetailsTbl, FarmValidation,
+    Feedback, IrrigationModel, OutbreakFarm, PersonnelAssignmentModel, PersonnelModel, Region,
+    SectorModel, bulk_created, cocoaDistrict, contractorsTbl, irrigationTypeModel, mappedFarms,
+    projectTbl, staffTbl,
+)
+
+logger = logging.getLogger(__name__)
+
+SYNC_MAX_RECORDS = getattr(settings, 'SYNC_MAX_RECORDS', 2000)
+BATCH_CHUNK_SIZE = 500
+
+
+class SyncBatchError(ValueError):
+    """The request body is not a usable batch"""
+
+
+class RecordError(Exception):
+    """Fails a single record; the message is returned to the client"""
+
+
+def _pk(value):
+    """Integer primary key of a request value, None if it is not numeric"""
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# ============== LOOKUPS ==============
+
+# kind -> (model, field, select_related)
+LOOKUPS = {
+    'staff': (staffTbl, 'id', ('projectTbl_foreignkey__district',)),
+    'farm': (FarmdetailsTbl, 'id', ('district', 'projectTbl_foreignkey')),
+    'farm_reference': (FarmdetailsTbl, 'farm_reference', ('district', 'projectTbl_foreignkey')),
+    'community': (Community, 'id', ()),
+    'community_name': (Community, 'name', ()),
+    'activity': (Activities, 'id', ()),
+    'sector': (SectorModel, 'id', ()),
+    'contractor': (contractorsTbl, 'id', ()),
+    'contractor_name': (contractorsTbl, 'contractor_name', ()),
+    'personnel': (PersonnelModel, 'id', ()),
+    'district': (cocoaDistrict, 'id', ('region',)),
+    'region': (Region, 'id', ()),
+    'project': (projectTbl, 'id', ()),
+    'irrigation_type': (irrigationTypeModel, 'id', ()),
+    'district_name': (cocoaDistrict, 'name', ('region',)),
+    'district_project': (projectTbl, 'district_id', ()),
+    'certificate': (ContractorCertificateModel, 'id', ('district', 'projectTbl_foreignkey')),
+    'certificate_uid': (ContractorCertificateModel, 'uid', ('district', 'projectTbl_foreignkey')),
+}
+
+
+def _keyed_by_pk(kind):
+    field = LOOKUPS[kind][1]
+    return field == 'id' or field.endswith('_id')
+
+
+class Lookups:
+    """Related rows for a whole batch. Handlers register what they need
+    with want(), resolve() runs one query per kind, get() reads the result."""
+    def __init__(self):
+        self.wanted = defaultdict(set)
+        self.rows = {}
+
+    def want(self, kind, value):
+        if value in (None, ''):
+            return
+        if _keyed_by_pk(kind):
+            value = _pk(value)
+            if value is None:
+                return
+        else:
+            value = str(value)
+        self.wanted[kind].add(value)
+
+    def resolve(self, kinds=None):
+        """Fetch the wanted rows of `kinds` (all kinds by default)"""
+        for kind, values in self.wanted.items():
+            if kinds is not None and kind not in kinds:
+                continue
+            model, field, related = LOOKUPS[kind]
+            queryset = model.objects.filter(**{f'{field}__in': values})
+            if related:
+                queryset = queryset.select_related(*related)
+            rows = self.rows[kind] = {}
+            for row in queryset.order_by('pk'):
+                rows.setdefault(getattr(row, field), row)
+
+    def get(self, kind, value):
+        if value in (None, ''):
+            return None
+        value = _pk(value) if _keyed_by_pk(kind) else str(value)
+        return self.rows.get(kind, {}).get(value)
+
+    def require(self, kind, value):
+        """Like get(), but a missing row fails the record, as .objects.get()
+        fails the single-record views"""
+        row = self.get(kind, value)
+        if row is None:
+            raise RecordError(f'{LOOKUPS[kind][0].__name__} matching query does not exist.')
+        return row
+
+
+# ============== HANDLERS ==============
+
+class Handler:
+    """Turns the `data` of one record into unsaved model instances"""
+    model = None
+    uid_field = 'uid'
+    # Lookup kinds registered by want_late() and fetched just before this
+    # type is built, after the first lookups and the earlier types are in
+    late_lookups = ()
+
+    def want(self, data, lookups):
+        """Register the related rows `data` needs"""
+
+    def want_late(self, data, lookups):
+        """Register late_lookups rows; may read rows resolved for want()"""
+
+    def build(self, data, lookups):
+        """List of unsaved instances for `data`; raise RecordError to fail it"""
+        raise NotImplementedError
+
+    def before_insert(self, instances):
+        """Fill fields that are allocated only for records that will be written"""
+
+    def after_insert(self, instances):
+        """Write whatever bulk_create does not (M2M rows)"""
+
+    def before_retry(self, instance):
+        """Reset an instance before it is saved on its own after a failed chunk"""
+
+    def existing(self, uids):
+        """{uid: id} of rows already stored, soft-deleted ones included"""
+        if not uids:
+            return {}
+        return dict(
+            self.model.default_objects.filter(**{f'{self.uid_field}__in': uids})
+            .values_list(self.uid_field, 'pk')
+        )
+
+
+def _created_by(data, lookups):
+    return lookups.require('staff', data.get('user_id')) if data.get('user_id') else None
+
+
+def _staff_district_project(farm, agent):
+    """District and project as the report views derive them"""
+    project = agent.projectTbl_foreignkey if agent and agent.projectTbl_foreignkey else None
+    if farm and farm.district:
+        return farm.district, project
+    if project and project.district:
+        return project.district, project
+    return None, project
+
+
+def report_uid(uid, index, count):
+    """uid of the index-th report of a multi-activity submission. Blank
+    uids stay blank, so the partial unique constraint ignores them."""
+    return f'{uid}_{index}' if uid and count > 1 else uid
+
+
+def _select_sub_activities(available, requested):
+    """Requested sub-activities by index or name; all of them when none match"""
+    selected = []
+    for sub in requested or []:
+        if isinstance(sub, (int, str)) and str(sub).isdigit():
+            idx = int(sub)
+            if idx < len(available):
+                selected.append(available[idx])
+        elif sub in available:
+            selected.append(sub)
+    return selected or available
+
+
+class ReportHandler(Handler):
+    """SaveActivityReportView / SaveDailyReportView. One report per main
+    activity; with several activities a non-blank uid becomes <uid>_<n>,
+    n being the activity's position in the submission (see report_uid)."""
+    def activities(self, data):
+        activities_list = data.get('activities', [])
+        if not activities_list and data.get('main_activity', ''):
+            activities_list = [{
+                'main_activity': data.get('main_activity', ''),
+                'activity': data.get('activity', ''),
+                'sub_activities': data.get('sub_activities', []),
+                'area_covered_ha': data.get('area_covered_ha', 0.0),
+                'no_rehab_assistants': data.get('no_rehab_assistants', 0),
+                'remark': data.get('remark', ''),
+            }]
+        return activities_list
+
+    def want(self, data, lookups):
+        for key in ('agent', 'user_id'):
+            lookups.want('staff', data.get(key))
+        lookups.want('farm_reference', data.get('farm_ref_number'))
+        lookups.want('community', data.get('community'))
+        lookups.want('community_name', data.get('community'))
+        lookups.want('sector', data.get('sector'))
+        lookups.want('contractor', data.get('contractor_name'))
+        lookups.want('contractor_name', data.get('contractor_name'))
+        for ra_id in data.get('ras', []) or []:
+            lookups.want('personnel', ra_id)
+        for item in self.activities(data):
+            lookups.want('activity', item.get('main_activity'))
+            lookups.want('activity', item.get('activity'))
+
+    def build(self, data, lookups):
+        uid = data.get('uid', '')
+        agent = lookups.get('staff', data.get('agent'))
+        farm_ref = data.get('farm_ref_number', '')
+        farm = lookups.get('farm_reference', farm_ref)
+        community = lookups.get('community', data.get('community')) or lookups.get('community_name', data.get('community'))
+        district, project = _staff_district_project(farm, agent)
+        sector = lookups.get('sector', data.get('sector'))
+        contractor = None
+        if data.get('contractor_name'):
+            contractor = (lookups.get('contractor', data['contractor_name'])
+                          or lookups.get('contractor_name', data['contractor_name']))
+        created_by = _created_by(data, lookups)
+
+        activities_list = self.activities(data)
+        reports = []
+        for index, item in enumerate(activities_list):
+            main_activity = lookups.get('activity', item.get('main_activity'))
+            if main_activity is None:
+                continue
+            activity = main_activity
+            if item.get('activity') and item['activity'] != item['main_activity']:
+                activity = lookups.get('activity', item['activity']) or main_activity
+            selected = _select_sub_activities(main_activity.get_sub_activities_list(), item.get('sub_activities', []))
+
+            reports.append(self.model(
+                uid=report_uid(uid, index, len(activities_list)),
+                agent=agent,
+                completion_date=data.get('completion_date'),
+                reporting_date=data.get('reporting_date'),
+                main_activity=main_activity,
+                activity=activity,
+                sub_activities=', '.join(selected) if selected else '',
+                no_rehab_assistants=item.get('no_rehab_assistants', 0),
+                area_covered_ha=item.get('area_covered_ha', 0.0),
+                remark=item.get('remark', ''),
+                status=data.get('status', 0),
+                farm=farm,
+                sector=sector,
+                farm_ref_number=farm_ref,
+                farm_size_ha=data.get('farm_size_ha', 0.0),
+                community=community,
+                number_of_people_in_group=data.get('number_of_people_in_group', 0),
+                group_work=data.get('group_work', ''),
+                projectTbl_foreignkey=project,
+                district=district,
+                is_done_by_contractor=data.get('is_done_by_contractor'),
+                contractor_name=contractor,
+                rounds_of_weeding=data.get('rounds_of_weeding'),
+                is_done_equally=data.get('is_done_equally'),
+                created_by=created_by,
+            ))
+        # Unknown RAs are skipped, as in the single-record views
+        ra_ids = [ra.pk for ra in (lookups.get('personnel', ra_id) for ra_id in data.get('ras', []) or []) if ra]
+        for report in reports:
+            report.sync_ras = list(dict.fromkeys(ra_ids))
+        return reports
+
+    def after_insert(self, instances):
+        field = self.model._meta.get_field('ras')
+        through = field.remote_field.through
+        source, target = f'{field.m2m_field_name()}_id', f'{field.m2m_reverse_field_name()}_id'
+        rows = [
+            through(**{source: report.pk, target: ra_id})
+            for report in instances for ra_id in report.sync_ras
+        ]
+        if rows:
+            through.objects.bulk_create(rows, batch_size=BATCH_CHUNK_SIZE, ignore_conflicts=True)
+
+
+class ActivityReportHandler(ReportHandler):
+    model = ActivityReportingModel
+
+
+class DailyReportHandler(ReportHandler):
+    model = DailyReportingModel
+
+
+def boundary_geometry(farmboundary):
+    """MultiPolygon (SRID 4326) from a JSON list of [lng, lat] pairs, or None
+    when there are fewer than three points or the polygon is invalid"""
+    if not farmboundary:
+        return None
+    try:
+        coords = json.loads(farmboundary) if isinstance(farmboundary, str) else farmboundary
+        if len(coords) < 3:
+            return None
+        polygon_coords = [(float(coord[0]), float(coord[1])) for coord in coords if len(coord) == 2]
+        if polygon_coords and polygon_coords[0] != polygon_coords[-1]:
+            polygon_coords.append(polygon_coords[0])
+        polygon = Polygon(polygon_coords)
+        if not polygon.valid:
+            return None
+        geom = MultiPolygon(polygon)
+        geom.srid = 4326
+        return geom
+    except Exception:
+        logger.warning('Could not build a farm boundary geometry', exc_info=True)
+        return None
+
+
+class MappedFarmHandler(Handler):
+    """SaveMappedFarmView"""
+    model = mappedFarms
+
+    def want(self, data, lookups):
+        lookups.want('staff', data.get('staffTbl_foreignkey'))
+
+    def build(self, data, lookups):
+        farmboundary = data.get('farmboundary', '')
+        return [mappedFarms(
+            uid=data.get('uid', ''),
+            farm_reference=data.get('farm_reference', ''),
+            farm_area=data.get('farm_area', 0.0),
+            farmer_name=data.get('farmer_name', ''),
+            location=data.get('location', ''),
+            contact=data.get('contact', ''),
+            staffTbl_foreignkey=lookups.get('staff', data.get('staffTbl_foreignkey')),
+            farmboundary=farmboundary,
+            geom=boundary_geometry(farmboundary),
+        )]
+
+
+class OutbreakFarmHandler(Handler):
+    """SaveOutbreakFarmView. The client uid is kept so replays are recognised."""
+    model = OutbreakFarm
+
+    def want(self, data, lookups):
+        lookups.want('district', data.get('district_id'))
+        lookups.want('region', data.get('region_id'))
+        lookups.want('project', data.get('project_id'))
+        for key in ('reported_by_id', 'user_id'):
+            lookups.want('staff', data.get(key))
+        lookups.want('community', data.get('community_id'))
+        lookups.want('farm', data.get('farm_id'))
+        lookups.want('sector', data.get('sector'))
+
+    def build(self, data, lookups):
+        district = lookups.get('district', data.get('district_id'))
+        region = lookups.get('region', data.get('region_id')) if data.get('region_id') else (
+            district.region if district else None
+        )
+        return [OutbreakFarm(
+            farm=lookups.get('farm', data.get('farm_id')),
+            sector=lookups.get('sector', data.get('sector')),
+            farm_location=data.get('farm_location'),
+            farmer_name=data.get('farmer_name'),
+            farmer_age=data.get('farmer_age'),
+            id_type=data.get('id_type'),
+            id_number=data.get('id_number'),
+            farmer_contact=data.get('farmer_contact'),
+            cocoa_type=data.get('cocoa_type'),
+            age_class=data.get('age_class'),
+            farm_area=data.get('farm_area', 0.0),
+            communitytbl=data.get('communitytbl'),
+            community=lookups.get('community', data.get('community_id')),
+            inspection_date=data.get('inspection_date'),
+            temp_code=data.get('temp_code'),
+            disease_type=data.get('disease_type'),
+            date_reported=data.get('date_reported', timezone.now().date()),
+            reported_by=lookups.get('staff', data.get('reported_by_id')),
+            status=data.get('status', 0),
+            coordinates=data.get('coordinates'),
+            severity=data.get('severity', 'Medium'),
+            treatment_applied=data.get('treatment_applied'),
+            treatment_date=data.get('treatment_date'),
+            projectTbl_foreignkey=lookups.get('project', data.get('project_id')),
+            district=district,
+            region=region,
+            uid=data.get('uid') or str(uuid.uuid4()),
+            created_by=_created_by(data, lookups),
+        )]
+
+    def before_insert(self, instances):
+        # One block of OB- numbers for the chunk instead of one per save()
+        for instance, outbreak_id in zip(instances, id_allocation.outbreak_ids(len(instances))):
+            instance.outbreak_id = outbreak_id
+
+    def before_retry(self, instance):
+        # The chunk's reserved numbers were rolled back with it; save() takes a new one
+        instance.outbreak_id = None
+
+
+class IrrigationHandler(Handler):
+    """SaveIrrigationView"""
+    model = IrrigationModel
+
+    def want(self, data, lookups):
+        lookups.want('farm', data.get('farm_id'))
+        lookups.want('farm_reference', data.get('farm_id'))
+        lookups.want('sector', data.get('sector'))
+        for key in ('agent', 'user_id'):
+            lookups.want('staff', data.get(key))
+        lookups.want('irrigation_type', data.get('irrigation_type'))
+
+    def build(self, data, lookups):
+        farm = lookups.get('farm', data.get('farm_id')) or lookups.get('farm_reference', data.get('farm_id'))
+        agent = lookups.get('staff', data.get('agent'))
+        district = project = None
+        if farm and farm.district:
+            district, project = farm.district, farm.projectTbl_foreignkey
+        elif agent and agent.projectTbl_foreignkey:
+            project = agent.projectTbl_foreignkey
+            district = project.district
+        irrigation_type = None
+        if data.get('irrigation_type'):
+            irrigation_type = lookups.require('irrigation_type', data['irrigation_type'])
+        return [IrrigationModel(
+            uid=data.get('uid', ''),
+            farm=farm,
+            sector=lookups.get('sector', data.get('sector')),
+            irrigation_type=irrigation_type,
+            water_volume=data.get('water_volume', 0.0),
+            date=data.get('date'),
+            agent=agent,
+            projectTbl_foreignkey=project,
+            district=district,
+            created_by=_created_by(data, lookups),
+        )]
+
+
+class FeedbackHandler(Handler):
+    """FeedbackView (v1/savefeedback/)"""
+    model = Feedback
+
+    def want(self, data, lookups):
+        for key in ('staff_id', 'user_id'):
+            lookups.want('staff', data.get(key))
+
+    def build(self, data, lookups):
+        now = timezone.now()
+        return [Feedback(
+            staffTbl_foreignkey=lookups.get('staff', data.get('staff_id', '') or data.get('user_id', '')),
+            title=data.get('title', ''),
+            feedback=data.get('feedback', '') or data.get('description', ''),
+            uid=data.get('uid', ''),
+            farm_reference=data.get('farm_reference', ''),
+            activity=data.get('activity', ''),
+            ra_id=data.get('ra_id', ''),
+            Status=data.get('status', 'Open') or data.get('Status', 'Open'),
+            week=data.get('week', str(now.isocalendar()[1])),
+            month=data.get('month', now.strftime('%B')),
+            year=data.get('year', str(now.year)),
+            created_by=_created_by(data, lookups),
+        )]
+
+
+class FarmValidationHandler(Handler):
+    """SaveFarmValidationView; field_uri is the primary key and plays the uid"""
+    model = FarmValidation
+    uid_field = 'field_uri'
+
+    def want(self, data, lookups):
+        lookups.want('farm_reference', data.get('farm_id'))
+        lookups.want('sector', data.get('sector'))
+        lookups.want('staff', data.get('user_id'))
+
+    def build(self, data, lookups):
+        if not data.get('field_uri'):
+            raise RecordError('field_uri is required')
+        fields = {
+            name: data.get(name, '') for name in (
+                'staff_id', 'staff_name', 'region', 'farmer_contact', 'farm_verified_by_ched',
+                'demarcated_to_boundary', 'treated_to_boundary', 'undesirable_shade_tree', 'farmer_name',
+                'maintained_to_boundary', 'point_lng', 'point_lat', 'point_acc', 'farms_in_mushy_field',
+                'rice_maize_cassava_farm', 'location', 'established_to_boundary', 'general_remarks',
+            )
+        }
+        return [FarmValidation(
+            field_uri=data['field_uri'],
+            field_submission_date=data.get('field_submission_date'),
+            reporting_date=data.get('reporting_date'),
+            sector_no=data.get('sector_no'),
+            farm=lookups.get('farm_reference', data.get('farm_id')),
+            sector=lookups.get('sector', data.get('sector')),
+            farm_size=data.get('farm_size', 0.0),
+            created_by=_created_by(data, lookups),
+            **fields,
+        )]
+
+
+class RehabAssignmentHandler(Handler):
+    """SaveRehabAssignmentView"""
+    model = PersonnelAssignmentModel
+    late_lookups = ('district_project',)
+
+    def want(self, data, lookups):
+        for key in ('po_id', 'user_id'):
+            lookups.want('staff', data.get(key))
+        lookups.want('personnel', data.get('ra_id'))
+        lookups.want('district', data.get('district_id'))
+        lookups.want('district_name', data.get('district_id'))
+        lookups.want('community', data.get('community_id'))
+        lookups.want('community_name', data.get('community_id'))
+
+    def district(self, data, lookups):
+        return lookups.get('district', data.get('district_id')) or lookups.get('district_name', data.get('district_id'))
+
+    def want_late(self, data, lookups):
+        district = self.district(data, lookups)
+        if district:
+            lookups.want('district_project', district.pk)
+
+    def build(self, data, lookups):
+        po = lookups.get('staff', data.get('po_id'))
+        district = self.district(data, lookups)
+        project = po.projectTbl_foreignkey if po and po.projectTbl_foreignkey else None
+        if project is None and district:
+            project = lookups.get('district_project', district.pk)
+        return [PersonnelAssignmentModel(
+            uid=data.get('uid', ''),
+            po=po,
+            ra=lookups.get('personnel', data.get('ra_id')),
+            projectTbl_foreignkey=project,
+            district=district,
+            community=lookups.get('community', data.get('community_id')) or lookups.get('community_name', data.get('community_id')),
+            date_assigned=data.get('date_assigned'),
+            status=data.get('status', 0),
+            created_by=_created_by(data, lookups),
+        )]
+
+
+class ContractorCertificateHandler(Handler):
+    """SaveContractorCertificateView"""
+    model = ContractorCertificateModel
+    late_lookups = ('district_project',)
+
+    def want(self, data, lookups):
+        lookups.want('contractor', data.get('contractor_id'))
+        lookups.want('contractor_name', data.get('contractor_id'))
+        lookups.want('staff', data.get('user_id'))
+
+    def contractor(self, data, lookups):
+        return (lookups.get('contractor', data.get('contractor_id'))
+                or lookups.get('contractor_name', data.get('contractor_id')))
+
+    def want_late(self, data, lookups):
+        contractor = self.contractor(data, lookups)
+        if contractor:
+            lookups.want('district_project', contractor.district_id)
+
+    def build(self, data, lookups):
+        contractor = self.contractor(data, lookups)
+        district = contractor.district if contractor else None
+        return [ContractorCertificateModel(
+            uid=data.get('uid', ''),
+            contractor=contractor,
+            work_type=data.get('work_type', ''),
+            start_date=data.get('start_date'),
+            end_date=data.get('end_date'),
+            status=data.get('status', 'Pending'),
+            remarks=data.get('remarks', ''),
+            projectTbl_foreignkey=lookups.get('district_project', district.pk) if district else None,
+            district=district,
+            created_by=_created_by(data, lookups),
+        )]
+
+
+class CertificateVerificationHandler(Handler):
+    """SaveVerificationFarmsView. Certificates are looked up again after the
+    batch's own certificates are written, so both can travel together."""
+    model = ContractorCertificateVerificationModel
+    late_lookups = ('certificate', 'certificate_uid')
+
+    def want(self, data, lookups):
+        for key in ('verified_by', 'user_id'):
+            lookups.want('staff', data.get(key))
+
+    def want_late(self, data, lookups):
+        lookups.want('certificate_uid', data.get('certificate_id'))
+        lookups.want('certificate', data.get('certificate_id'))
+
+    def build(self, data, lookups):
+        certificate = (lookups.get('certificate_uid', data.get('certificate_id'))
+                       or lookups.get('certificate', data.get('certificate_id')))
+        verified_by = lookups.get('staff', data.get('verified_by'))
+        district = project = None
+        if certificate and certificate.district:
+            district, project = certificate.district, certificate.projectTbl_foreignkey
+        elif verified_by and verified_by.projectTbl_foreignkey:
+            project = verified_by.projectTbl_foreignkey
+            district = project.district
+        return [ContractorCertificateVerificationModel(
+            uid=data.get('uid', ''),
+            certificate=certificate,
+            verified_by=verified_by,
+            verification_date=data.get('verification_date'),
+            is_verified=data.get('is_verified', False),
+            comments=data.get('comments', ''),
+            projectTbl_foreignkey=project,
+            district=district,
+            created_by=_created_by(data, lookups),
+        )]
+
+
+# Record type -> handler class, in the order types are written.
+# Not covered, they keep their own endpoints: personnel registration
+# (base64 ID images inline and communities created by name), calculated
+# areas and equipment (no client uid, so a replay cannot be recognised).
+HANDLERS = {
+    'activity_report': ActivityReportHandler,
+    'daily_report': DailyReportHandler,
+    'mapped_farm': MappedFarmHandler,
+    'outbreak_farm': OutbreakFarmHandler,
+    'irrigation': IrrigationHandler,
+    'feedback': FeedbackHandler,
+    'farm_validation': FarmValidationHandler,
+    'rehab_assignment': RehabAssignmentHandler,
+    'contractor_certificate': ContractorCertificateHandler,
+    'certificate_verification': CertificateVerificationHandler,
+}
+
+
+# ============== BATCH ==============
+
+def parse_batch(body):
+    """[(key, type, data)] from a request body, either {"records": [...]}
+    or a bare list"""
+    records = body.get('records') if isinstance(body, dict) else body
+    if not isinstance(records, list):
+        raise SyncBatchError('Expected a list of records')
+    if len(records) > SYNC_MAX_RECORDS:
+        raise SyncBatchError(f'At most {SYNC_MAX_RECORDS} records per batch')
+
+    parsed, seen = [], set()
+    for index, record in enumerate(records):
+        key = str(record.get('id', index)) if isinstance(record, dict) else str(index)
+        if key in seen:
+            parsed.append((f'{key}#{index}', None, f'Record id {key} is repeated in this batch'))
+        elif not isinstance(record, dict) or not isinstance(record.get('data'), dict):
+            parsed.append((key, None, 'Record must be an object with a "data" object'))
+        elif record.get('type') not in HANDLERS:
+            parsed.append((key, None, f"Unknown record type {record.get('type')!r}"))
+        else:
+            parsed.append((key, record['type'], record['data']))
+        seen.add(key)
+    return parsed
+
+
+def _outcome(record_type, status, ids=(), error=None):
+    outcome = {'type': record_type, 'status': status, 'ids': list(ids)}
+    if error:
+        outcome['error'] = error
+    return outcome
+
+
+def _insert(handler, items, results):
+    """bulk_create [(key, data, instances)] in chunks, record by record for a
+    chunk that fails"""
+    for start in range(0, len(items), BATCH_CHUNK_SIZE):
+        chunk = items[start:start + BATCH_CHUNK_SIZE]
+        instances = [instance for _, _, record_instances in chunk for instance in record_instances]
+        try:
+            with transaction.atomic():
+                handler.before_insert(instances)
+                handler.model.objects.bulk_create(instances)
+                handler.after_insert(instances)
+                # bulk_create sends no post_save; dashboard caches refresh
+                # from this once the chunk commits
+                bulk_created.send(sender=handler.model, pks=[instance.pk for instance in instances])
+            written = chunk
+        except Exception:
+            written = []
+            for key, data, instances in chunk:
+                try:
+                    with transaction.atomic():
+                        for instance in instances:
+                            if instance._meta.auto_field:
+                                instance.pk = None
+                            instance._state.adding = True
+                            handler.before_retry(instance)
+                            instance.save(force_insert=True)
+                        handler.after_insert(instances)
+                except Exception as e:
+                    # Lost a race with another submission of the same uid
+                    uids = [getattr(instance, handler.uid_field) for instance in instances]
+                    stored = handler.existing([uid for uid in uids if uid]) if isinstance(e, IntegrityError) else {}
+                    if stored:
+                        results[key] = _outcome(results[key]['type'], 'duplicate', stored.values())
+                    else:
+                        results[key] = _outcome(results[key]['type'], 'failed', error=str(e))
+                    continue
+                written.append((key, data, instances))
+        for key, _, instances in written:
+            results[key] = _outcome(results[key]['type'], 'created', [instance.pk for instance in instances])
+
+
+def sync_batch(records):
+    """Write parsed records; {key: outcome} in batch order"""
+    results = {}
+    handlers = {}
+    lookups = Lookups()
+    by_type = defaultdict(list)
+
+    for key, record_type, data in records:
+        if record_type is None:
+            # `data` is the reason parse_batch rejected it
+            results[key] = _outcome(None, 'failed', error=data)
+            continue
+        if record_type not in handlers:
+            handlers[record_type] = HANDLERS[record_type]()
+        handlers[record_type].want(data, lookups)
+        results[key] = _outcome(record_type, 'pending')
+        by_type[record_type].append((key, data))
+    lookups.resolve()
+
+    for record_type in HANDLERS:
+        if record_type not in by_type:
+            continue
+        handler = handlers[record_type]
+        if handler.late_lookups:
+            for _, data in by_type[record_type]:
+                handler.want_late(data, lookups)
+            lookups.resolve(handler.late_lookups)
+        built = []
+        for key, data in by_type[record_type]:
+            try:
+                built.append((key, data, handler.build(data, lookups)))
+            except Exception as e:
+                # RecordError, or data the model cannot take
+                results[key] = _outcome(record_type, 'failed', error=str(e))
+
+        uids = {getattr(instance, handler.uid_field) for _, _, instances in built for instance in instances}
+        existing = handler.existing({uid for uid in uids if uid})
+
+        pending, claimed = [], {}
+        for key, data, instances in built:
+            # A partly stored multi-activity report only writes what is missing
+            stored = [existing[getattr(instance, handler.uid_field)] for instance in instances
+                      if getattr(instance, handler.uid_field) in existing]
+            instances = [instance for instance in instances if getattr(instance, handler.uid_field) not in existing]
+            instance_uids = [getattr(instance, handler.uid_field) for instance in instances]
+            if stored and not instances:
+                results[key] = _outcome(record_type, 'duplicate', stored)
+            elif any(uid in claimed for uid in instance_uids if uid):
+                # Resolved to the first record's ids once it is written
+                claimed_by = next(claimed[uid] for uid in instance_uids if uid in claimed)
+                results[key] = _outcome(record_type, 'duplicate')
+                results[key]['duplicate_of'] = claimed_by
+            else:
+                claimed.update((uid, key) for uid in instance_uids if uid)
+                pending.append((key, data, instances))
+        _insert(handler, pending, results)
+
+        for key, outcome in results.items():
+            if outcome.get('duplicate_of') is not None:
+                first = results[outcome.pop('duplicate_of')]
+                if first['status'] == 'failed':
+                    results[key] = _outcome(record_type, 'failed', error=first.get('error'))
+                else:
+                    outcome['ids'] = first['ids']
+    return results
@@ -0,0 +1,377 @@
+"""
+Query-count and latency benchmarks for the mobile API (see the
+benchmark_mobile_api command).
+
+seed() builds a synthetic dataset, regions -> districts -> communities ->
+projects and staff -> farms, job orders, personnel and daily reports,
+sized by `scale`. run_endpoints() calls every endpoint in ENDPOINTS
+through the Django test client and records its SQL query count, latency
+and response size. grow() then doubles the leaf rows and the query counts
+are taken again: an endpoint whose query count grows with the data has an
+N+1. Query counts are deterministic, so they are compared exactly with a
+saved baseline; latency is only compared when a tolerance is given.
+
+The command runs all of this inside a transaction that is rolled back, so
+nothing is left behind.
+"""
+import json
+import statistics
+import time
+import uuid
+from datetime import date, timedelta
+
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from portal.models import (
+    Activities, Community, DailyReportingModel, FarmdetailsTbl, Joborder,
+    OutbreakFarmModel, PersonnelModel, Region, SectorModel, cocoaDistrict,
+    contractorsTbl, mappedFarms, projectTbl, staffTbl,
+)
+
+BULK_BATCH_SIZE = 1000
+
+# Rows per parent at scale 1; everything is multiplied by `scale` through
+# the number of regions.
+SHAPE = {
+    'districts_per_region': 3,
+    'communities_per_district': 4,
+    'staff_per_district': 2,
+    'farms_per_community': 10,
+    'personnel_per_community': 5,
+    'reports_per_staff': 10,
+    'ras_per_report': 3,
+    'mapped_farms_per_staff': 10,
+    'outbreaks_per_district': 2,
+    'contractors_per_district': 1,
+}
+ACTIVITIES = 5
+SECTORS = 5
+
+
+# ============== DATASET ==============
+
+def _bulk(model, rows):
+    return model.objects.bulk_create(rows, batch_size=BULK_BATCH_SIZE)
+
+
+def seed(scale=1):
+    """Create the reference hierarchy and one round of leaf rows.
+    Returns the dataset dict that endpoints and grow() work from."""
+    tag = f'BENCH{uuid.uuid4().hex[:6].upper()}'
+    today = date.today()
+
+    regions = _bulk(Region, [
+        Region(region=f'{tag} Region {r}', reg_code=f'{tag}-R{r}')
+        for r in range(2 * scale)
+    ])
+    districts = _bulk(cocoaDistrict, [
+        cocoaDistrict(
+            name=f'{tag} District {r}-{d}', district_code=f'{tag}-D{r}-{d}',
+            region=region, shape_area=1000.0,
+        )
+        for r, region in enumerate(regions)
+        for d in range(SHAPE['districts_per_region'])
+    ])
+    communities = _bulk(Community, [
+        Community(name=f'{tag} Community {district.pk}-{c}', district=district, operational_area='Benchmark')
+        for district in districts
+        for c in range(SHAPE['communities_per_district'])
+    ])
+    projects = _bulk(projectTbl, [
+        projectTbl(name=f'{tag} Project {district.pk}', district=district)
+        for district in districts
+    ])
+    staff = _bulk(staffTbl, [
+        staffTbl(
+            first_name=f'{tag} PO', last_name=f'{project.pk}-{s}', gender='Female',
+            dob=date(1990, 1, 1), contact=f'{tag}-{project.pk}-{s}',
+            staffid=f'{tag}-PO-{project.pk}-{s}', password='benchmark',
+            projectTbl_foreignkey=project,
+        )
+        for project in projects
+        for s in range(SHAPE['staff_per_district'])
+    ])
+    activities = _bulk(Activities, [
+        Activities(
+            main_activity=f'{tag} Activity {a}', sub_activity='Slashing, Pruning, Weeding',
+            activity_code=f'{tag}-A{a}',
+        )
+        for a in range(ACTIVITIES)
+    ])
+    _bulk(SectorModel, [
+        SectorModel(sector=f'{tag} Sector {s}', size_Ha=100.0, mean_pH=6.0, mean_OC=1.5, Texture_co=2.0)
+        for s in range(SECTORS)
+    ])
+
+    dataset = {
+        'tag': tag,
+        'today': today,
+        'districts': districts,
+        'communities': communities,
+        'projects': {project.district_id: project for project in projects},
+        'staff': staff,
+        'activities': activities,
+        'round': 0,
+        'user': staff[0],
+    }
+    grow(dataset)
+    return dataset
+
+
+def grow(dataset):
+    """Add one more round of farms, job orders, personnel, mapped farms,
+    outbreaks, contractors and daily reports under the existing hierarchy"""
+    tag, today = dataset['tag'], dataset['today']
+    n = dataset['round'] = dataset['round'] + 1
+    projects = dataset['projects']
+    activities = dataset['activities']
+
+    farms = _bulk(FarmdetailsTbl, [
+        FarmdetailsTbl(
+            farm_reference=f'{tag}-F{n}-{community.pk}-{f}', farmername=f'Farmer {f}',
+            location=community.name, region_id=community.district.region_id,
+            district_id=community.district_id, community=community, farm_size=2.5,
+            projectTbl_foreignkey=projects[community.district_id], sector=1,
+        )
+        for community in dataset['communities']
+        for f in range(SHAPE['farms_per_community'])
+    ])
+    _bulk(Joborder, [
+        Joborder(
+            farm_reference=farm.farm_reference, job_order_code=f'JO-{farm.farm_reference}',
+            farmername=farm.farmername, location=farm.location, region_id=farm.region_id,
+            district_id=farm.district_id, community_id=farm.community_id, farm_size=farm.farm_size,
+            projectTbl_foreignkey_id=farm.projectTbl_foreignkey_id, sector=1,
+        )
+        for farm in farms
+    ])
+    personnel = _bulk(PersonnelModel, [
+        PersonnelModel(
+            first_name=f'{tag} RA', surname=f'{n}-{community.pk}-{p}', gender='Male',
+            date_of_birth=date(1995, 1, 1), staff_id=f'{tag}-RA-{n}-{community.pk}-{p}',
+            primary_phone_number='0200000000', emergency_contact_person='Benchmark',
+            emergency_contact_number='0200000000', id_type='Ghana Card',
+            id_number=f'{tag}-{n}-{community.pk}-{p}', address='Benchmark',
+            community=community, district_id=community.district_id,
+            projectTbl_foreignkey=projects[community.district_id], education_level='JHS',
+            marital_status='Single', personnel_type='Rehab Assistant', date_joined=today,
+            bank_id='BNK', account_number='0000000000', momo_number='0240000000',
+        )
+        for community in dataset['communities']
+        for p in range(SHAPE['personnel_per_community'])
+    ])
+    _bulk(mappedFarms, [
+        mappedFarms(
+            farm_reference=f'{tag}-M{n}-{po.pk}-{m}', farm_area=1.2, farmer_name=f'Farmer {m}',
+            location='Benchmark', staffTbl_foreignkey=po, farmboundary='[]',
+        )
+        for po in dataset['staff']
+        for m in range(SHAPE['mapped_farms_per_staff'])
+    ])
+    _bulk(OutbreakFarmModel, [
+        OutbreakFarmModel(
+            uid=f'{tag}-OB{n}-{district.pk}-{o}', farmer_name=f'Farmer {o}', farm_location='Benchmark',
+            farm_size=3.0, disease_type='CSSVD', date_reported=today,
+            projectTbl_foreignkey=projects[district.pk], district=district, coordinates='6.7,-1.6',
+        )
+        for district in dataset['districts']
+        for o in range(SHAPE['outbreaks_per_district'])
+    ])
+    _bulk(contractorsTbl, [
+        contractorsTbl(
+            contractor_name=f'{tag} Contractor {n}-{district.pk}-{c}', contact_person='Benchmark',
+            address='Benchmark', contact_number='0200000000', interested_services='Weeding',
+            target='10', district=district,
+        )
+        for district in dataset['districts']
+        for c in range(SHAPE['contractors_per_district'])
+    ])
+
+    farms_by_project = {}
+    for farm in farms:
+        farms_by_project.setdefault(farm.projectTbl_foreignkey_id, []).append(farm)
+    personnel_by_project = {}
+    for person in personnel:
+        personnel_by_project.setdefault(person.projectTbl_foreignkey_id, []).append(person)
+
+    reports, report_ras = [], []
+    for po in dataset['staff']:
+        project_farms = farms_by_project[po.projectTbl_foreignkey_id]
+        for i in range(SHAPE['reports_per_staff']):
+            farm = project_farms[i % len(project_farms)]
+            activity = activities[i % len(activities)]
+            reports.append(DailyReportingModel(
+                uid=f'{tag}-DR{n}-{po.pk}-{i}', agent=po, reporting_date=today - timedelta(days=i),
+                completion_date=today - timedelta(days=i), main_activity=activity, activity=activity,
+                sub_activities='Slashing', no_rehab_assistants=SHAPE['ras_per_report'],
+                area_covered_ha=1.5, farm=farm, farm_ref_number=farm.farm_reference,
+                farm_size_ha=farm.farm_size, community_id=farm.community_id,
+                projectTbl_foreignkey_id=po.projectTbl_foreignkey_id, district_id=farm.district_id,
+            ))
+    reports = _bulk(DailyReportingModel, reports)
+    through = DailyReportingModel.ras.through
+    for report in reports:
+        team = personnel_by_project[report.projectTbl_foreignkey_id][:SHAPE['ras_per_report']]
+        report_ras.extend(
+            through(dailyreportingmodel_id=report.pk, personnelmodel_id=person.pk) for person in team
+        )
+    _bulk(through, report_ras)
+
+    dataset['farm'] = farms_by_project[dataset['user'].projectTbl_foreignkey_id][0]
+    dataset['team'] = personnel_by_project[dataset['user'].projectTbl_foreignkey_id][:SHAPE['ras_per_report']]
+    return dataset
+
+
+# ============== ENDPOINTS ==============
+
+def _user(dataset, run):
+    return {'user_id': dataset['user'].pk}
+
+
+def _daily_report(dataset, run):
+    activity = dataset['activities'][0]
+    return {
+        'uid': f"{dataset['tag']}-SAVE-DR-{dataset['round']}-{run}",
+        'agent': dataset['user'].pk,
+        'user_id': dataset['user'].pk,
+        'farm_ref_number': dataset['farm'].farm_reference,
+        'community': dataset['farm'].community_id,
+        'reporting_date': dataset['today'].isoformat(),
+        'completion_date': dataset['today'].isoformat(),
+        'activities': [{
+            'main_activity': activity.pk,
+            'activity': activity.pk,
+            'sub_activities': [0],
+            'area_covered_ha': 1.0,
+            'no_rehab_assistants': len(dataset['team']),
+        }],
+        'ras': [person.pk for person in dataset['team']],
+    }
+
+
+def _growth_batch(dataset, run, size=20):
+    return [{
+        'uid': f"{dataset['tag']}-SAVE-GM-{dataset['round']}-{run}-{i}",
+        'plant_uid': f"{dataset['tag']}-PLANT-{i}",
+        'number_of_leaves': 6,
+        'height': 30.0,
+        'stem_size': 1.2,
+        'leaf_color': 'Green',
+        'date': dataset['today'].isoformat(),
+        'lat': 6.7,
+        'lng': -1.6,
+        'agent': dataset['user'].pk,
+        'user_id': dataset['user'].pk,
+    } for i in range(size)]
+
+
+# (name, method, path, payload(dataset, run), send payload as a JSON body)
+ENDPOINTS = [
+    ('login', 'POST', '/api/v1/auth/login/',
+     lambda d, r: {'username': d['user'].contact, 'password': d['user'].password}, True),
+    ('region_districts', 'GET', '/api/v1/regiondistricts/', lambda d, r: {}, False),
+    ('contractors', 'GET', '/api/v1/fetchallcontractors/', lambda d, r: {}, False),
+    ('activities', 'GET', '/api/v1/activity/', lambda d, r: {}, False),
+    ('farms', 'GET', '/api/v1/farms/', _user, False),
+    ('sectors', 'GET', '/api/v1/fetchsectors/', lambda d, r: {}, False),
+    ('communities', 'GET', '/api/v1/fetchcommunity/',
+     lambda d, r: {'district_id': d['user'].projectTbl_foreignkey.district_id}, False),
+    ('job_orders', 'GET', '/api/v1/fetchjoborder/', _user, False),
+    ('rehab_assistants', 'GET', '/api/v1/fetchrehabassistants/',
+     lambda d, r: {'user_id': d['user'].pk, 'page_size': 100}, False),
+    ('po_assigned_farms', 'GET', '/api/v1/fetchpoassignedfarms/', _user, True),
+    ('outbreaks', 'GET', '/api/v1/fetchoutbreak/', _user, False),
+    ('payments', 'POST', '/api/v1/fetchpayments/',
+     lambda d, r: {'userid': d['user'].pk, 'month': 'January', 'week': '1', 'year': '2025'}, True),
+    ('save_daily_report', 'POST', '/api/v1/savedailyreport/', _daily_report, True),
+    ('growth_monitoring_batch', 'POST', '/api/v1/growth-monitoring/', _growth_batch, True),
+]
+
+
+def endpoint_names():
+    return [name for name, *_ in ENDPOINTS]
+
+
+def call(client, method, path, payload, as_json):
+    # The field app asks for gzip; report what actually goes over the wire
+    headers = {'accept-encoding': 'gzip'}
+    if as_json:
+        return client.generic(method, path, json.dumps(payload), content_type='application/json', headers=headers)
+    return client.generic(method, path, query_params=payload, headers=headers)
+
+
+def measure(client, dataset, endpoint, repeat=5):
+    """Status, query count, median latency and response size of one endpoint.
+    The first call is a warm-up; the query count is the most any timed call ran."""
+    name, method, path, payload, as_json = endpoint
+    queries, latencies, response = 0, [], None
+    for run in range(repeat + 1):
+        # Roll a failed call back so it cannot poison the surrounding transaction
+        savepoint = transaction.savepoint()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = call(client, method, path, payload(dataset, run), as_json)
+            elapsed = time.perf_counter() - started
+        if response.status_code >= 500:
+            transaction.savepoint_rollback(savepoint)
+        else:
+            transaction.savepoint_commit(savepoint)
+        if run:
+            queries = max(queries, len(captured))
+            latencies.append(elapsed * 1000)
+    return {
+        'status': response.status_code,
+        'queries': queries,
+        'latency_ms': round(statistics.median(latencies), 2),
+        'bytes': len(response.content),
+    }
+
+
+def run_endpoints(dataset, names=None, repeat=5):
+    client = Client(raise_request_exception=False)
+    return {
+        endpoint[0]: measure(client, dataset, endpoint, repeat)
+        for endpoint in ENDPOINTS
+        if names is None or endpoint[0] in names
+    }
+
+
+def benchmark(scale=1, names=None, repeat=5):
+    """Seed, measure, double the data and measure query counts again.
+    Always rolled back."""
+    with transaction.atomic():
+        dataset = seed(scale)
+        results = run_endpoints(dataset, names, repeat)
+        grow(dataset)
+        for name, scaled in run_endpoints(dataset, names, repeat=1).items():
+            results[name]['queries_doubled'] = scaled['queries']
+        transaction.set_rollback(True)
+    return results
+
+
+# ============== CHECKS ==============
+
+def problems(results, baseline=None, latency_tolerance=None):
+    """Human-readable list of failures: errors, N+1 queries and regressions
+    against `baseline` (the results of an earlier run)"""
+    found = []
+    for name, result in results.items():
+        if result['status'] >= 400:
+            found.append(f"{name}: HTTP {result['status']}")
+        if result.get('queries_doubled', result['queries']) > result['queries']:
+            found.append(
+                f"{name}: query count grows with the data ({result['queries']} -> "
+                f"{result['queries_doubled']} when rows double), likely an N+1"
+            )
+        before = (baseline or {}).get(name)
+        if not before:
+            continue
+        if result['queries'] > before['queries']:
+            found.append(f"{name}: {before['queries']} -> {result['queries']} queries")
+        if latency_tolerance is not None and before.get('latency_ms'):
+            limit = before['latency_ms'] * (1 + latency_tolerance)
+            if result['latency_ms'] > limit:
+                found.append(f"{name}: {before['latency_ms']}ms -> {result['latency_ms']}ms")
+    return found
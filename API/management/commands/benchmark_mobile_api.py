@@ -0,0 +1,77 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from API import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a synthetic dataset, call the mobile API endpoints and report SQL '
+        'query count, latency and response size per endpoint. Fails on errors, '
+        'on query counts that grow with the data (N+1) and on query counts above '
+        'the --baseline. Everything is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, default=1, help='Dataset size multiplier')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed calls per endpoint')
+        parser.add_argument(
+            '--endpoint', action='append', dest='endpoints',
+            help='Only run this endpoint (can be repeated)',
+        )
+        parser.add_argument('--list', action='store_true', help='List the endpoints and exit')
+        parser.add_argument('--baseline', help='Compare with this baseline JSON file')
+        parser.add_argument('--save-baseline', help='Write the results to this baseline JSON file')
+        parser.add_argument(
+            '--latency-tolerance', type=float,
+            help='Also fail when latency exceeds the baseline by this fraction (e.g. 0.5)',
+        )
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for name in benchmarks.endpoint_names():
+                self.stdout.write(name)
+            return
+
+        if options['scale'] <= 0 or options['repeat'] <= 0:
+            raise CommandError('--scale and --repeat must be positive')
+        unknown = set(options['endpoints'] or []) - set(benchmarks.endpoint_names())
+        if unknown:
+            raise CommandError(f"Unknown endpoint(s): {', '.join(sorted(unknown))}")
+
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as file:
+                    baseline = json.load(file)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Could not read baseline {options['baseline']}: {e}")
+            if baseline.get('scale') != options['scale']:
+                self.stdout.write(self.style.WARNING(
+                    f"Baseline was recorded at scale {baseline.get('scale')}; latency and size are not comparable"
+                ))
+
+        results = benchmarks.benchmark(options['scale'], options['endpoints'], options['repeat'])
+
+        self.stdout.write(f"{'endpoint':<26}{'status':>7}{'queries':>9}{'2x data':>9}{'median ms':>11}{'bytes':>10}")
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<26}{result['status']:>7}{result['queries']:>9}{result['queries_doubled']:>9}"
+                f"{result['latency_ms']:>11}{result['bytes']:>10}"
+            )
+
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w') as file:
+                json.dump({'scale': options['scale'], 'endpoints': results}, file, indent=2, sort_keys=True)
+                file.write('\n')
+            self.stdout.write(f"Baseline saved to {options['save_baseline']}")
+
+        found = benchmarks.problems(
+            results, (baseline or {}).get('endpoints'), options['latency_tolerance']
+        )
+        if found:
+            for problem in found:
+                self.stdout.write(self.style.ERROR(problem))
+            raise CommandError(f'{len(found)} problem(s) found')
+        self.stdout.write(self.style.SUCCESS('All endpoints within budget'))
@@ -0,0 +1,68 @@
+"""
+Delta sync for mobile reference data.
+
+Clients send back the `cursor` of their last sync as `?since=`, either the
+cursor string or any ISO-8601 timestamp, and receive only rows whose
+`created_date` (an auto_now column on timeStamp models) changed since then.
+Rows soft-deleted since then come back as `deleted` ids. Without `since`
+the full alive table is returned, as before.
+
+The next cursor is taken before the query runs and every request looks
+back SYNC_CURSOR_OVERLAP_SECONDS before it, so rows committed by a slow
+transaction are not missed. Clients upsert by id, so the overlap only
+costs a few repeated rows.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+SYNC_CURSOR_OVERLAP = timedelta(seconds=getattr(settings, 'SYNC_CURSOR_OVERLAP_SECONDS', 60))
+
+
+class SyncCursorError(ValueError):
+    pass
+
+
+def parse_since(value):
+    """Aware datetime of a `since` cursor or timestamp, None when absent"""
+    if not value:
+        return None
+    since = parse_datetime(value.strip().replace(' ', '+'))
+    if since is None:
+        raise SyncCursorError(f"Invalid since value: {value}")
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
+def new_cursor():
+    return timezone.now().isoformat()
+
+
+def delta(model, since, changed_field='created_date', base=None, soft_delete=True):
+    """(changed alive rows, deleted ids) of `model` since `since`.
+
+    `base` narrows the rows considered (e.g. to one project) and must be a
+    queryset of the model that still includes soft-deleted rows.
+    """
+    queryset = base if base is not None else model.default_objects.all() if soft_delete else model.objects.all()
+    if since is not None:
+        queryset = queryset.filter(**{f'{changed_field}__gte': since - SYNC_CURSOR_OVERLAP})
+
+    if not soft_delete:
+        return queryset, []
+
+    deleted = []
+    if since is not None:
+        deleted = list(queryset.filter(delete_field='yes').values_list('pk', flat=True))
+    return queryset.filter(delete_field='no'), deleted
+
+
+def sync_response_fields(since, cursor, deleted):
+    return {
+        "full_sync": since is None,
+        "cursor": cursor,
+        "deleted": deleted,
+    }
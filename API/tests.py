@@ -1,3 +1,71 @@
+import json
+
 from django.test import TestCase
+from django.urls import reverse
+
+from portal.models import Activities, ActivityReportingModel, DailyReportingModel
+
+REPORT_ENDPOINTS = (
+    ('save_activity_report', 'activity_report', ActivityReportingModel),
+    ('save_daily_report', 'daily_report', DailyReportingModel),
+)
+
+
+class MultiActivityReportUidTests(TestCase):
+    """A submission with several activities stores one report per activity,
+    uid <uid>_<position>; blank uids stay blank"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.activities = [
+            Activities.objects.create(main_activity=f'Activity {n}', activity_code=f'A{n}')
+            for n in range(3)
+        ]
+
+    def submission(self, uid):
+        return {
+            'uid': uid,
+            'reporting_date': '2026-10-01',
+            'completion_date': '2026-10-01',
+            'activities': [{'main_activity': activity.pk} for activity in self.activities],
+        }
+
+    def post(self, url_name, body):
+        return self.client.post(reverse(f'API:{url_name}'), json.dumps(body), content_type='application/json')
+
+    def post_sync(self, record_type, data):
+        return self.post('sync', {'records': [{'id': 'r1', 'type': record_type, 'data': data}]})
+
+    def assert_blank_uids_are_not_duplicates(self, model, send):
+        send(self.submission(''))
+        send(self.submission(''))
+        self.assertEqual(model.objects.filter(uid='').count(), 6)
+        self.assertFalse(model.objects.filter(uid__startswith='_').exists())
+
+    def assert_partial_replay_writes_missing_reports(self, model, send):
+        model.objects.create(uid='R1_1', main_activity=self.activities[1])
+        send(self.submission('R1'))
+        self.assertEqual(
+            sorted(model.objects.values_list('uid', flat=True)),
+            ['R1_0', 'R1_1', 'R1_2'],
+        )
+
+    def test_view_blank_uids_are_not_duplicates(self):
+        for url_name, _, model in REPORT_ENDPOINTS:
+            with self.subTest(url_name):
+                self.assert_blank_uids_are_not_duplicates(model, lambda data: self.post(url_name, data))
+
+    def test_view_partial_replay_writes_missing_reports(self):
+        for url_name, _, model in REPORT_ENDPOINTS:
+            with self.subTest(url_name):
+                self.assert_partial_replay_writes_missing_reports(model, lambda data: self.post(url_name, data))
+
+    def test_sync_blank_uids_are_not_duplicates(self):
+        for _, record_type, model in REPORT_ENDPOINTS:
+            with self.subTest(record_type):
+                self.assert_blank_uids_are_not_duplicates(model, lambda data: self.post_sync(record_type, data))
 
-# Create your tests here.
+    def test_sync_partial_replay_writes_missing_reports(self):
+        for _, record_type, model in REPORT_ENDPOINTS:
+            with self.subTest(record_type):
+                self.assert_partial_replay_writes_missing_reports(model, lambda data: self.post_sync(record_type, data))
@@ -80,6 +80,9 @@ urlpatterns = [
     # 18. save map farms
     path('v1/savemapfarms/', views.SaveMappedFarmView.as_view(), name='save_map_farms'),
 
+    # Offline batch upload for the save forms above (POST only)
+    path('sync/', views.SyncBatchView.as_view(), name='sync'),
+
      # POS Route Monitoring
     path('v1/pos-monitoring/', views.PosRouteMonitoringView.as_view(), name='pos_route_v1'),
     
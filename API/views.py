@@ -1,4 +1,5 @@
 # views.py
+import logging
 import traceback
 from django.shortcuts import render
 from django.http import JsonResponse, HttpResponse
@@ -7,13 +8,20 @@ from django.utils.decorators import method_decorator
 from django.views import View
 import json
 from datetime import datetime, date
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Q, Prefetch
+from django.views.decorators.gzip import gzip_page
 import base64
 import io
 from PIL import Image
 from django.core.files.uploadedfile import InMemoryUploadedFile
 from django.contrib.gis.geos import Point
 from portal.models import *
+from portal.models import bulk_created
+from .batch_sync import SyncBatchError, boundary_geometry, parse_batch, report_uid, sync_batch
+from .sync import SyncCursorError, delta, new_cursor, parse_since, sync_response_fields
+
+logger = logging.getLogger(__name__)
 
 # ============== HELPER FUNCTIONS ==============
 
@@ -463,7 +471,7 @@ class SaveActivityReportView(View):
             created_reports = []
             
             # Process each main activity with its sub-activities
-            for activity_item in activities_list:
+            for index, activity_item in enumerate(activities_list):
                 main_activity_id = activity_item.get("main_activity", "")
                 activity_id = activity_item.get("activity", "")  # Could be specific activity ID
                 sub_activities = activity_item.get("sub_activities", [])
@@ -507,9 +515,7 @@ class SaveActivityReportView(View):
                 sub_activities_string = ', '.join(selected_sub_activities) if selected_sub_activities else ""
                 
                 # Create a unique UID for this activity combination
-                activity_uid = uid
-                if len(activities_list) > 1:
-                    activity_uid = f"{uid}_{len(created_reports)}"
+                activity_uid = report_uid(uid, index, len(activities_list))
 
                 contractor_id = data.get("contractor_name")
                 if contractor_id:
@@ -528,7 +534,7 @@ class SaveActivityReportView(View):
                 created_by = staffTbl.objects.get(id=data.get("user_id")) if data.get("user_id") else None
                 
                 # Create the report
-                report = ActivityReportingModel.objects.create(
+                report, created = ActivityReportingModel.objects.create_once(
                     uid=activity_uid,
                     agent=agent,
                     completion_date=data.get("completion_date"),
@@ -556,6 +562,9 @@ class SaveActivityReportView(View):
                     is_done_equally=data.get("is_done_equally"),
                     created_by=created_by
                 )
+                if not created:
+                    # Already saved by an earlier submission of this report
+                    continue
                 
                 # Add RAS
                 if ras_ids:
@@ -693,7 +702,7 @@ class SaveDailyReportView(View):
             
             created_reports = []
             
-            for activity_item in activities_list:
+            for index, activity_item in enumerate(activities_list):
                 main_activity_id = activity_item.get("main_activity", "")
                 activity_id = activity_item.get("activity", "")
                 sub_activities = activity_item.get("sub_activities", [])
@@ -733,9 +742,7 @@ class SaveDailyReportView(View):
                 sub_activities_string = ', '.join(selected_sub_activities) if selected_sub_activities else ""
                 
                 # Create unique UID for each activity
-                activity_uid = uid
-                if len(activities_list) > 1:
-                    activity_uid = f"{uid}_{len(created_reports)}"
+                activity_uid = report_uid(uid, index, len(activities_list))
 
                 contractor_id = data.get("contractor_name")
                 if contractor_id:
@@ -755,7 +762,7 @@ class SaveDailyReportView(View):
                 
 
                 # Create report
-                report = DailyReportingModel.objects.create(
+                report, created = DailyReportingModel.objects.create_once(
                     uid=activity_uid,
                     agent=agent,
                     completion_date=data.get("completion_date"),
@@ -783,6 +790,9 @@ class SaveDailyReportView(View):
                     is_done_equally=data.get("is_done_equally"),
                     created_by=created_by
                 )
+                if not created:
+                    # Already saved by an earlier submission of this report
+                    continue
                 
                 # Add RAS
                 if ras_ids:
@@ -875,7 +885,6 @@ class SaveDailyReportView(View):
 
 
 # ============== 3. FARM BOUNDARY ==============
-from django.contrib.gis.geos import Polygon, MultiPolygon
 import json
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -888,12 +897,6 @@ class SaveMappedFarmView(View):
             
             uid = data.get("uid", "")
             
-            # Check if UID already exists
-            if uid and mappedFarms.objects.filter(uid=uid).exists():
-                status["message"] = "Farm boundary with this UID already exists"
-                status["data"] = {"uid": uid}
-                return JsonResponse(status)
-            
             # Get staff
             staff = None
             staff_id = data.get("staffTbl_foreignkey", "")
@@ -903,45 +906,12 @@ class SaveMappedFarmView(View):
                 except:
                     pass
             
-            # Get farmboundary string
+            # Get farmboundary string and convert it to GEOS geometry
             farmboundary = data.get("farmboundary", "")
+            geom = boundary_geometry(farmboundary)
             
-            # Convert string coordinates to GEOS geometry
-            geom = None
-            if farmboundary:
-                try:
-                    # Parse the JSON string
-                    coords = json.loads(farmboundary)
-                    
-                    # You need at least 3 points to form a polygon
-                    if len(coords) >= 3:
-                        # Convert to tuple format (lng, lat) - note the order: lng first, then lat
-                        polygon_coords = []
-                        for coord in coords:
-                            if len(coord) == 2:
-                                lng = float(coord[0])
-                                lat = float(coord[1])
-                                polygon_coords.append((lng, lat))
-                        
-                        # IMPORTANT: Close the polygon (add first point at the end)
-                        if polygon_coords and polygon_coords[0] != polygon_coords[-1]:
-                            polygon_coords.append(polygon_coords[0])
-                        
-                        # Create Polygon - note the extra parentheses
-                        # Polygon requires a sequence of coordinates: ((x1 y1, x2 y2, x3 y3, x1 y1),)
-                        polygon = Polygon(polygon_coords)
-                        
-                        # Ensure polygon is valid
-                        if polygon.valid:
-                            # Wrap in MultiPolygon
-                            geom = MultiPolygon(polygon)
-                            geom.srid = 4326  # Set coordinate system
-                            
-                except Exception as e:
-                    print(f"Error creating geometry: {e}")
-            
-            # Create the farm record
-            farm = mappedFarms.objects.create(
+            # Create the farm record (unless this UID was already saved)
+            farm, created = mappedFarms.objects.create_once(
                 uid=uid,
                 farm_reference=data.get("farm_reference", ""),
                 farm_area=data.get("farm_area", 0.0),
@@ -952,6 +922,10 @@ class SaveMappedFarmView(View):
                 farmboundary=farmboundary,
                 geom=geom
             )
+            if not created:
+                status["message"] = "Farm boundary with this UID already exists"
+                status["data"] = {"uid": uid}
+                return JsonResponse(status)
             
             status["status"] = True
             status["message"] = "Farm boundary saved successfully"
@@ -1210,6 +1184,9 @@ class SaveRehabAssignmentView(View):
 class GrowthMonitoringView(View):
     """Handle growth monitoring - supports single and batch POST"""
     
+    # Number of rows per INSERT when ingesting a batch upload
+    BATCH_CHUNK_SIZE = 500
+    
     def post(self, request):
         try:
             data = json.loads(request.body)
@@ -1241,12 +1218,6 @@ class GrowthMonitoringView(View):
         
         uid = data.get("uid", "")
         
-        # Check if UID already exists
-        if uid and GrowthMonitoringModel.objects.filter(uid=uid).exists():
-            status["message"] = "Growth monitoring record with this UID already exists"
-            status["data"] = {"uid": uid}
-            return JsonResponse(status)
-        
         # Get or create QR code based on plant_uid
         plant_uid = data.get("plant_uid", "")
         qr_code = None
@@ -1281,8 +1252,8 @@ class GrowthMonitoringView(View):
 
         created_by = staffTbl.objects.get(id=data.get("user_id")) if data.get("user_id") else None
         
-        # Create growth monitoring record
-        record = GrowthMonitoringModel.objects.create(
+        # Create growth monitoring record (unless this UID was already saved)
+        record, created = GrowthMonitoringModel.objects.create_once(
             uid=uid or None,
             plant_uid=plant_uid,
             number_of_leaves=data.get("number_of_leaves", 0),
@@ -1298,6 +1269,10 @@ class GrowthMonitoringView(View):
             district=district,
             created_by=created_by
         )
+        if not created:
+            status["message"] = "Growth monitoring record with this UID already exists"
+            status["data"] = {"uid": uid}
+            return JsonResponse(status)
         
         status["status"] = True
         status["message"] = "Growth monitoring record saved successfully"
@@ -1306,58 +1281,99 @@ class GrowthMonitoringView(View):
         return JsonResponse(status)
     
     def handle_batch_request(self, data_list):
-        """Handle multiple growth monitoring records"""
+        """Handle multiple growth monitoring records.
+
+        Lookups are resolved for the whole batch up front (existing UIDs,
+        plant QR codes, agents and creators) and the records are inserted
+        with bulk_create in chunks, so a sync costs a handful of queries
+        instead of several per record. The per-index successful/failed
+        response is unchanged.
+        """
         status = {"status": False, "message": "", "data": {}}
         
-        successful_records = []
-        failed_records = []
+        successful_records = {}
+        failed_records = {}
         
-        # Cache for QR codes and agents to avoid repeated DB queries
-        qr_code_cache = {}
-        agent_cache = {}
+        def fail(index, record_data, error):
+            failed_records[index] = {
+                "index": index,
+                "plant_uid": record_data.get("plant_uid", "") if isinstance(record_data, dict) else "",
+                "error": error
+            }
+        
+        # Dedupe every UID with a single query
+        uids = {
+            record_data.get("uid") for record_data in data_list
+            if isinstance(record_data, dict) and record_data.get("uid")
+        }
+        existing_uids = set(
+            GrowthMonitoringModel.objects.filter(uid__in=uids).values_list("uid", flat=True)
+        ) if uids else set()
+        
+        # Resolve every agent and creator in one query, with project and district
+        staff_ids = set()
+        for record_data in data_list:
+            if not isinstance(record_data, dict):
+                continue
+            for key in ("agent", "user_id"):
+                staff_id = self._parse_staff_id(record_data.get(key))
+                if staff_id is not None:
+                    staff_ids.add(staff_id)
+        staff_cache = {
+            staff.id: staff for staff in staffTbl.objects.filter(id__in=staff_ids).select_related(
+                "projectTbl_foreignkey", "projectTbl_foreignkey__district"
+            )
+        } if staff_ids else {}
+        
+        pending = []
+        plant_uids = set()
+        seen_uids = set()
         
         for index, record_data in enumerate(data_list):
-            try:
-                uid = record_data.get("uid", "")
-                
-                # Skip if UID already exists
-                if uid and GrowthMonitoringModel.objects.filter(uid=uid).exists():
-                    failed_records.append({
-                        "index": index,
-                        "plant_uid": record_data.get("plant_uid", ""),
-                        "error": f"Record with UID {uid} already exists"
-                    })
+            if not isinstance(record_data, dict):
+                fail(index, record_data, "Record must be a JSON object")
+                continue
+            
+            uid = record_data.get("uid", "")
+            
+            # Skip if UID already exists (in the database or earlier in this batch)
+            if uid and (uid in existing_uids or uid in seen_uids):
+                fail(index, record_data, f"Record with UID {uid} already exists")
+                continue
+            
+            # Get agent
+            agent = None
+            agent_id = record_data.get("agent", "")
+            if agent_id:
+                agent_pk = self._parse_staff_id(agent_id)
+                if agent_pk is None:
+                    fail(index, record_data, f"Field 'id' expected a number but got {agent_id!r}.")
                     continue
-                
-                # Get or create QR code based on plant_uid
+                agent = staff_cache.get(agent_pk)
+            
+            created_by = None
+            user_id = record_data.get("user_id")
+            if user_id:
+                created_by = staff_cache.get(self._parse_staff_id(user_id))
+                if created_by is None:
+                    fail(index, record_data, "staffTbl matching query does not exist.")
+                    continue
+            
+            if uid:
+                seen_uids.add(uid)
+            plant_uid = record_data.get("plant_uid", "")
+            if plant_uid:
+                plant_uids.add(plant_uid)
+            pending.append((index, record_data, agent, created_by))
+        
+        qr_code_cache = self._resolve_qr_codes(plant_uids)
+        
+        for start in range(0, len(pending), self.BATCH_CHUNK_SIZE):
+            chunk = pending[start:start + self.BATCH_CHUNK_SIZE]
+            records = []
+            for index, record_data, agent, created_by in chunk:
                 plant_uid = record_data.get("plant_uid", "")
-                qr_code = None
-                
-                if plant_uid:
-                    if plant_uid in qr_code_cache:
-                        qr_code = qr_code_cache[plant_uid]
-                    else:
-                        try:
-                            qr_code = QR_CodeModel.objects.get(uid=plant_uid)
-                        except QR_CodeModel.DoesNotExist:
-                            qr_code = QR_CodeModel.objects.create(
-                                uid=plant_uid,
-                                qr_code=None
-                            )
-                        qr_code_cache[plant_uid] = qr_code
-                
-                # Get agent
-                agent = None
-                agent_id = record_data.get("agent", "")
-                if agent_id:
-                    if agent_id in agent_cache:
-                        agent = agent_cache[agent_id]
-                    else:
-                        try:
-                            agent = staffTbl.objects.get(id=agent_id)
-                            agent_cache[agent_id] = agent
-                        except staffTbl.DoesNotExist:
-                            pass
+                qr_code = qr_code_cache.get(plant_uid) if plant_uid else None
                 
                 # Get district and project from agent
                 district = None
@@ -1367,11 +1383,8 @@ class GrowthMonitoringView(View):
                     if project.district:
                         district = project.district
                 
-                created_by = staffTbl.objects.get(id=record_data.get("user_id")) if record_data.get("user_id") else None
-
-                # Create growth monitoring record
-                record = GrowthMonitoringModel.objects.create(
-                    uid=uid or None,
+                records.append((index, record_data, GrowthMonitoringModel(
+                    uid=record_data.get("uid", "") or None,
                     plant_uid=plant_uid,
                     number_of_leaves=record_data.get("number_of_leaves", 0),
                     height=record_data.get("height", 0.0),
@@ -1385,18 +1398,34 @@ class GrowthMonitoringView(View):
                     projectTbl_foreignkey=project,
                     district=district,
                     created_by=created_by
-                )
-                
-                successful_records.append(self.format_record_response(
-                    record, agent, district, project, qr_code
-                ))
-                
-            except Exception as e:
-                failed_records.append({
-                    "index": index,
-                    "plant_uid": record_data.get("plant_uid", ""),
-                    "error": str(e)
-                })
+                ), agent, district, project, qr_code))
+            
+            try:
+                with transaction.atomic():
+                    GrowthMonitoringModel.objects.bulk_create([item[2] for item in records])
+                    # bulk_create sends no post_save; growth tiles and dashboard
+                    # rollups refresh from this once the chunk commits
+                    bulk_created.send(sender=GrowthMonitoringModel, pks=[item[2].pk for item in records])
+            except Exception:
+                # A bad value poisons the whole INSERT; retry this chunk row by
+                # row so only the offending records are reported as failed.
+                for item in records:
+                    item[2].pk = None
+                    item[2]._state.adding = True
+                    try:
+                        with transaction.atomic():
+                            item[2].save(force_insert=True)
+                    except Exception as e:
+                        fail(item[0], item[1], str(e))
+                        continue
+                    successful_records[item[0]] = self.format_record_response(*item[2:])
+                continue
+            
+            for item in records:
+                successful_records[item[0]] = self.format_record_response(*item[2:])
+        
+        successful_records = [successful_records[index] for index in sorted(successful_records)]
+        failed_records = [failed_records[index] for index in sorted(failed_records)]
         
         status["status"] = True
         status["message"] = f"Processed {len(successful_records)} records, {len(failed_records)} failed"
@@ -1410,6 +1439,33 @@ class GrowthMonitoringView(View):
         
         return JsonResponse(status)
     
+    def _parse_staff_id(self, value):
+        """Return a staffTbl primary key from a request value, or None if it is not numeric"""
+        if value in (None, ""):
+            return None
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+    
+    def _resolve_qr_codes(self, plant_uids):
+        """Fetch existing QR codes for plant_uids and bulk create the missing ones"""
+        qr_code_cache = {}
+        if not plant_uids:
+            return qr_code_cache
+        
+        for qr_code in QR_CodeModel.objects.filter(uid__in=plant_uids).order_by("id"):
+            qr_code_cache.setdefault(qr_code.uid, qr_code)
+        
+        missing = [
+            QR_CodeModel(uid=plant_uid, qr_code=None)
+            for plant_uid in plant_uids if plant_uid not in qr_code_cache
+        ]
+        if missing:
+            for qr_code in QR_CodeModel.objects.bulk_create(missing, batch_size=self.BATCH_CHUNK_SIZE):
+                qr_code_cache[qr_code.uid] = qr_code
+        return qr_code_cache
+    
     def format_record_response(self, record, agent, district, project, qr_code):
         """Format record data for response"""
         return {
@@ -1866,12 +1922,6 @@ class SaveIrrigationView(View):
             
             uid = data.get("uid", "")
             
-            # Check if UID already exists
-            if uid and IrrigationModel.objects.filter(uid=uid).exists():
-                status["message"] = "Irrigation record with this UID already exists"
-                status["data"] = {"uid": uid}
-                return JsonResponse(status)
-            
             # Get farm
             farm = None
             farm_id = data.get("farm_id", "")
@@ -1915,8 +1965,8 @@ class SaveIrrigationView(View):
 
             created_by = staffTbl.objects.get(id=data.get("user_id")) if data.get("user_id") else None
             irrigation_type = irrigationTypeModel.objects.get(id=data.get("irrigation_type")) if data.get("irrigation_type") else None
-            # Create irrigation record
-            irrigation = IrrigationModel.objects.create(
+            # Create irrigation record (unless this UID was already saved)
+            irrigation, created = IrrigationModel.objects.create_once(
                 uid=uid,
                 farm=farm,
                 sector=sector,
@@ -1928,6 +1978,10 @@ class SaveIrrigationView(View):
                 district=district,
                 created_by=created_by
             )
+            if not created:
+                status["message"] = "Irrigation record with this UID already exists"
+                status["data"] = {"uid": uid}
+                return JsonResponse(status)
             
             status["status"] = True
             status["message"] = "Irrigation record saved successfully"
@@ -1983,19 +2037,42 @@ class FetchIrrigationTypesView(View):
 
 # ============== 12. GENERAL DATA LOADING ==============
 
+def project_scoped(model, user_id):
+    """All rows of `model` (soft-deleted included) in the project of staff `user_id`,
+    or the whole table when the user or their project is unknown"""
+    queryset = model.default_objects.all()
+    if user_id:
+        staff = staffTbl.objects.filter(id=user_id).only('projectTbl_foreignkey').first() if str(user_id).isdigit() else None
+        if staff and staff.projectTbl_foreignkey_id:
+            queryset = queryset.filter(projectTbl_foreignkey_id=staff.projectTbl_foreignkey_id)
+    return queryset
+
+
 @method_decorator(csrf_exempt, name='dispatch')
+@method_decorator(gzip_page, name='dispatch')
 class FetchRegionDistrictsView(View):
-    """Load regions and districts (GET)"""
+    """Load regions and districts (GET).
+    With ?since=, returns regions that changed or have changed districts,
+    each with its full district list, and deleted region/district ids."""
     def get(self, request):
         try:
-            regions = Region.objects.all()
-            region_data = []
+            since = parse_since(request.GET.get('since'))
+            cursor = new_cursor()
+            
+            regions, deleted_regions = delta(Region, since)
+            districts, deleted_districts = delta(cocoaDistrict, since)
+            if since is not None:
+                regions = Region.objects.filter(
+                    Q(id__in=regions.values('id')) | Q(id__in=districts.values('region_id'))
+                )
+            regions = regions.prefetch_related(
+                Prefetch('cocoadistrict_set', queryset=cocoaDistrict.objects.order_by('id'))
+            )
             
+            region_data = []
             for region in regions:
-                districts = cocoaDistrict.objects.filter(region=region)
                 district_list = []
-                
-                for district in districts:
+                for district in region.cocoadistrict_set.all():
                     district_list.append({
                         "id": district.id,
                         "name": district.name,
@@ -2012,10 +2089,20 @@ class FetchRegionDistrictsView(View):
             
             return JsonResponse({
                 "status": True,
-                "message": f"Found {len(regions)} regions",
-                "data": region_data
+                "message": f"Found {len(region_data)} regions",
+                "data": region_data,
+                **sync_response_fields(since, cursor, {
+                    "regions": deleted_regions,
+                    "districts": deleted_districts
+                })
             })
             
+        except SyncCursorError as e:
+            return JsonResponse({
+                "status": False,
+                "message": str(e),
+                "data": []
+            }, status=400)
         except Exception as e:
             return JsonResponse({
                 "status": False,
@@ -2058,16 +2145,19 @@ class FetchAllContractorsView(View):
             }, status=500)
 
 @method_decorator(csrf_exempt, name='dispatch')
+@method_decorator(gzip_page, name='dispatch')
 class FetchActivitiesView(View):
-    """Load activities (GET)"""
+    """Load activities (GET); ?since=<cursor> returns only changes"""
     def get(self, request):
         try:
-            activities = Activities.objects.all()
+            since = parse_since(request.GET.get('since'))
+            cursor = new_cursor()
+            activities, deleted = delta(Activities, since)
             activity_data = []
             
             for activity in activities:
                 # Split sub_activity by comma and create a JSON object
-                sub_items = [s.strip() for s in activity.sub_activity.split(',') if s.strip()]
+                sub_items = activity.get_sub_activities_list()
                 
                 # Create a dictionary with sequential keys
                 sub_activity_dict = {}
@@ -2085,9 +2175,16 @@ class FetchActivitiesView(View):
             return JsonResponse({
                 "status": True,
                 "message": f"Found {len(activity_data)} activities",
-                "data": activity_data
+                "data": activity_data,
+                **sync_response_fields(since, cursor, deleted)
             })
             
+        except SyncCursorError as e:
+            return JsonResponse({
+                "status": False,
+                "message": str(e),
+                "data": []
+            }, status=400)
         except Exception as e:
             return JsonResponse({
                 "status": False,
@@ -2096,25 +2193,16 @@ class FetchActivitiesView(View):
             }, status=500)
 
 @method_decorator(csrf_exempt, name='dispatch')
+@method_decorator(gzip_page, name='dispatch')
 class FetchFarmsView(View):
-    """Load farms (GET)"""
+    """Load farms (GET); ?since=<cursor> returns only changes"""
     def get(self, request):
         try:
-            user_id = request.GET.get('user_id')
-            
-            # If user_id is provided, get their assigned farms
-            if user_id:
-                try:
-                    staff = staffTbl.objects.get(id=user_id)
-                    project = staff.projectTbl_foreignkey
-                    if project:
-                        farms = FarmdetailsTbl.objects.filter(projectTbl_foreignkey=project)
-                    else:
-                        farms = FarmdetailsTbl.objects.all()
-                except:
-                    farms = FarmdetailsTbl.objects.all()
-            else:
-                farms = FarmdetailsTbl.objects.all()
+            since = parse_since(request.GET.get('since'))
+            cursor = new_cursor()
+            farms = project_scoped(FarmdetailsTbl, request.GET.get('user_id'))
+            farms, deleted = delta(FarmdetailsTbl, since, base=farms)
+            farms = farms.select_related('region', 'district', 'community', 'projectTbl_foreignkey')
             
             farm_data = []
             for farm in farms:
@@ -2123,25 +2211,32 @@ class FetchFarmsView(View):
                     "farm_reference": farm.farm_reference,
                     "farmername": farm.farmername,
                     "location": farm.location,
-                    "region_id": farm.region.id if farm.region else None,
+                    "region_id": farm.region_id,
                     "region_name": farm.region.region if farm.region else None,
-                    "district_id": farm.district.id if farm.district else None,
+                    "district_id": farm.district_id,
                     "district_name": farm.district.name if farm.district else None,
-                    "community_id": farm.community.id if farm.community else None,
+                    "community_id": farm.community_id,
                     "community_name": farm.community.name if farm.community else None,
                     "farm_size": farm.farm_size,
                     "status": farm.status,
                     "sector": farm.sector,
-                    "project_id": farm.projectTbl_foreignkey.id if farm.projectTbl_foreignkey else None,
+                    "project_id": farm.projectTbl_foreignkey_id,
                     "project_name": farm.projectTbl_foreignkey.name if farm.projectTbl_foreignkey else None
                 })
             
             return JsonResponse({
                 "status": True,
                 "message": f"Found {len(farm_data)} farms",
-                "data": farm_data
+                "data": farm_data,
+                **sync_response_fields(since, cursor, deleted)
             })
             
+        except SyncCursorError as e:
+            return JsonResponse({
+                "status": False,
+                "message": str(e),
+                "data": []
+            }, status=400)
         except Exception as e:
             return JsonResponse({
                 "status": False,
@@ -2149,16 +2244,19 @@ class FetchFarmsView(View):
                 "data": []
             }, status=500)
 
-
 @method_decorator(csrf_exempt, name='dispatch')
+@method_decorator(gzip_page, name='dispatch')
 class FetchSectorsView(View):
-    """Load sectors (GET)"""
+    """Load sectors (GET); ?since=<cursor> returns only changes.
+    Sectors are hard-deleted, so no deleted ids are reported for them."""
     def get(self, request):
         try:
-            sectors = SectorModel.objects.all()
+            since = parse_since(request.GET.get('since'))
+            cursor = new_cursor()
+            sectors, deleted = delta(SectorModel, since, changed_field='update_at', soft_delete=False)
             sector_data = []
             
-            for sector in sectors:
+            for sector in sectors.defer('geom'):
                 sector_data.append({
                     "id": sector.id,
                     "sector": sector.sector,
@@ -2171,9 +2269,16 @@ class FetchSectorsView(View):
             return JsonResponse({
                 "status": True,
                 "message": f"Found {len(sector_data)} sectors",
-                "data": sector_data
+                "data": sector_data,
+                **sync_response_fields(since, cursor, deleted)
             })
             
+        except SyncCursorError as e:
+            return JsonResponse({
+                "status": False,
+                "message": str(e),
+                "data": []
+            }, status=400)
         except Exception as e:
             return JsonResponse({
                 "status": False,
@@ -2182,27 +2287,26 @@ class FetchSectorsView(View):
             }, status=500)
 
 @method_decorator(csrf_exempt, name='dispatch')
+@method_decorator(gzip_page, name='dispatch')
 class FetchCommunityView(View):
-    """Load communities (GET)"""
+    """Load communities (GET); ?since=<cursor> returns only changes"""
     def get(self, request):
         try:
+            since = parse_since(request.GET.get('since'))
+            cursor = new_cursor()
             district_id = request.GET.get('district_id')
             
-            if district_id:
-                try:
-                    district = cocoaDistrict.objects.get(id=district_id)
-                    communities = Community.objects.filter(district=district)
-                except:
-                    communities = Community.objects.all()
-            else:
-                communities = Community.objects.all()
+            communities = Community.default_objects.all()
+            if district_id and district_id.isdigit() and cocoaDistrict.objects.filter(id=district_id).exists():
+                communities = communities.filter(district_id=district_id)
+            communities, deleted = delta(Community, since, base=communities)
             
             community_data = []
-            for community in communities:
+            for community in communities.select_related('district'):
                 community_data.append({
                     "id": community.id,
                     "name": community.name,
-                    "district_id": community.district.id if community.district else None,
+                    "district_id": community.district_id,
                     "district_name": community.district.name if community.district else None,
                     "operational_area": community.operational_area
                 })
@@ -2210,9 +2314,16 @@ class FetchCommunityView(View):
             return JsonResponse({
                 "status": True,
                 "message": f"Found {len(community_data)} communities",
-                "data": community_data
+                "data": community_data,
+                **sync_response_fields(since, cursor, deleted)
             })
             
+        except SyncCursorError as e:
+            return JsonResponse({
+                "status": False,
+                "message": str(e),
+                "data": []
+            }, status=400)
         except Exception as e:
             return JsonResponse({
                 "status": False,
@@ -2221,25 +2332,16 @@ class FetchCommunityView(View):
             }, status=500)
 
 @method_decorator(csrf_exempt, name='dispatch')
+@method_decorator(gzip_page, name='dispatch')
 class FetchJobOrderView(View):
-    """Load job order farms (GET)"""
+    """Load job order farms (GET); ?since=<cursor> returns only changes"""
     def get(self, request):
         try:
-            user_id = request.GET.get('user_id')
-            
-            # If user_id is provided, get their assigned job orders
-            if user_id:
-                try:
-                    staff = staffTbl.objects.get(id=user_id)
-                    project = staff.projectTbl_foreignkey
-                    if project:
-                        job_orders = Joborder.objects.filter(projectTbl_foreignkey=project)
-                    else:
-                        job_orders = Joborder.objects.all()
-                except:
-                    job_orders = Joborder.objects.all()
-            else:
-                job_orders = Joborder.objects.all()
+            since = parse_since(request.GET.get('since'))
+            cursor = new_cursor()
+            job_orders = project_scoped(Joborder, request.GET.get('user_id'))
+            job_orders, deleted = delta(Joborder, since, base=job_orders)
+            job_orders = job_orders.select_related('region', 'district', 'community', 'projectTbl_foreignkey')
             
             job_order_data = []
             for job in job_orders:
@@ -2248,25 +2350,32 @@ class FetchJobOrderView(View):
                     "farm_reference": job.farm_reference,
                     "farmername": job.farmername,
                     "location": job.location,
-                    "region_id": job.region.id if job.region else None,
+                    "region_id": job.region_id,
                     "region_name": job.region.region if job.region else None,
-                    "district_id": job.district.id if job.district else None,
+                    "district_id": job.district_id,
                     "district_name": job.district.name if job.district else None,
-                    "community_id": job.community.id if job.community else None,
+                    "community_id": job.community_id,
                     "community_name": job.community.name if job.community else None,
                     "farm_size": job.farm_size,
                     "sector": job.sector,
                     "job_order_code": job.job_order_code,
-                    "project_id": job.projectTbl_foreignkey.id if job.projectTbl_foreignkey else None,
+                    "project_id": job.projectTbl_foreignkey_id,
                     "project_name": job.projectTbl_foreignkey.name if job.projectTbl_foreignkey else None
                 })
             
             return JsonResponse({
                 "status": True,
                 "message": f"Found {len(job_order_data)} job orders",
-                "data": job_order_data
+                "data": job_order_data,
+                **sync_response_fields(since, cursor, deleted)
             })
             
+        except SyncCursorError as e:
+            return JsonResponse({
+                "status": False,
+                "message": str(e),
+                "data": []
+            }, status=400)
         except Exception as e:
             return JsonResponse({
                 "status": False,
@@ -3430,8 +3539,8 @@ class SaveOutbreakFarmView(View):
 
             created_by = staffTbl.objects.get(id=data.get("user_id")) if data.get("user_id") else None
 
-            # Create outbreak farm
-            outbreak = OutbreakFarm.objects.create(
+            # Create outbreak farm; a client uid makes resubmissions idempotent
+            outbreak, created = OutbreakFarm.objects.create_once(
                 farm=farm,
                 sector=sector,
                 farm_location=data.get("farm_location"),
@@ -3458,9 +3567,15 @@ class SaveOutbreakFarmView(View):
                 projectTbl_foreignkey=project,
                 district=district,
                 region=region,
-                uid=str(uuid.uuid4()),
+                uid=data.get("uid") or str(uuid.uuid4()),
                 created_by=created_by
             )
+            if not created:
+                return JsonResponse({
+                    "status": False,
+                    "message": "Outbreak farm with this UID already exists",
+                    "data": {"uid": outbreak.uid, "outbreaks_id": outbreak.outbreak_id}
+                })
             
             return JsonResponse({
                 "status": True,
@@ -4233,12 +4348,6 @@ class FeedbackView(View):
             
             uid = data.get("uid", "")
             
-            # Check if UID exists (optional - remove if you want duplicates)
-            if uid and Feedback.objects.filter(uid=uid).exists():
-                status_response["message"] = "Feedback with this UID already exists"
-                status_response["data"] = {"uid": uid}
-                return JsonResponse(status_response)
-            
             # Get staff user
             staff = None
             staff_id = data.get("staff_id", "") or data.get("user_id", "")
@@ -4253,8 +4362,8 @@ class FeedbackView(View):
             
             created_by = staffTbl.objects.get(id=data.get("user_id")) if data.get("user_id") else None
 
-            # Create feedback with all fields
-            feedback = Feedback.objects.create(
+            # Create feedback with all fields (unless this UID was already saved)
+            feedback, created = Feedback.objects.create_once(
                 staffTbl_foreignkey=staff,
                 title=data.get("title", ""),
                 feedback=data.get("feedback", "") or data.get("description", ""),
@@ -4268,6 +4377,10 @@ class FeedbackView(View):
                 year=data.get("year", str(now.year)),
                 created_by=created_by
             )
+            if not created:
+                status_response["message"] = "Feedback with this UID already exists"
+                status_response["data"] = {"uid": uid}
+                return JsonResponse(status_response)
             
             status_response["status"] = True
             status_response["message"] = "Feedback submitted successfully"
@@ -4397,3 +4510,53 @@ class FeedbackView(View):
 
 
 # ==================== URLS CONFIGURATION ====================
+
+
+# ============== BATCH SYNC ==============
+
+@method_decorator(csrf_exempt, name='dispatch')
+class SyncBatchView(View):
+    """Save a mixed batch of offline records from the mobile forms (POST only).
+
+    Body: {"records": [{"id": ..., "type": ..., "data": {...}}, ...]}, where
+    `type` is one of batch_sync.HANDLERS and `data` is what that form's own
+    save endpoint takes. Records are idempotent on uid, so a batch can be
+    resent after a dropped connection.
+    """
+    def post(self, request):
+        try:
+            records = parse_batch(json.loads(request.body))
+            results = sync_batch(records)
+        except json.JSONDecodeError:
+            return JsonResponse({
+                "status": False,
+                "message": "Invalid JSON data",
+                "data": {}
+            }, status=400)
+        except SyncBatchError as e:
+            return JsonResponse({
+                "status": False,
+                "message": str(e),
+                "data": {}
+            }, status=400)
+        except Exception as e:
+            logger.exception('Sync batch failed')
+            return JsonResponse({
+                "status": False,
+                "message": f"Error occurred: {str(e)}",
+                "data": {}
+            }, status=500)
+        
+        counts = {"created": 0, "duplicate": 0, "failed": 0}
+        for outcome in results.values():
+            counts[outcome["status"]] += 1
+        
+        return JsonResponse({
+            "status": True,
+            "message": f"Synced {len(results)} records: {counts['created']} created, "
+                       f"{counts['duplicate']} duplicate, {counts['failed']} failed",
+            "data": {
+                "results": results,
+                **counts
+            }
+        })
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from core.context_processors import connect_sidebar_signals
+        connect_sidebar_signals()
@@ -1,6 +1,10 @@
 # context_processors.py
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed, post_save, post_delete
 # from backend.models import UserGroupPosition
+from portal.checks import cache_is_shared
 from utils import sidebar
 
 def user_has_any_group(user_group_names, allowed_groups):
@@ -14,34 +18,21 @@ def user_has_any_group(user_group_names, allowed_groups):
     
     return bool(user_groups_lower & allowed_groups_lower)
 
-def filter_sidebar_level(items, user_group_names, user):
+def filter_sidebar_level(items, user_group_names, user=None):
     filtered_items = {}
     
-    print(f"DEBUG: User groups: {user_group_names}")
-    print(f"DEBUG: Is admin: {'Admin' in user_group_names}")
-    
     # Admin users see everything
     is_admin = 'Admin' in user_group_names
     if is_admin:
-        print("DEBUG: Admin user - granting access to all items")
         return items
     
     for item_name, item_data in items.items():
         allowed_groups = item_data.get("groups", [])
         
-        # Check if user has required groups
-        has_group = user_has_any_group(user_group_names, allowed_groups)
-        
-        print(f"DEBUG: Item '{item_name}' - has_group: {has_group}")
-        print(f"DEBUG:   Allowed groups: {allowed_groups}")
-        
         # Only proceed if user has the required group access
-        if not has_group:
-            print(f"DEBUG:   SKIPPING '{item_name}' - access denied")
+        if not user_has_any_group(user_group_names, allowed_groups):
             continue
         
-        print(f"DEBUG:   INCLUDING '{item_name}' - access granted")
-        
         # Recursively filter nested sub-items if any
         sub_items = item_data.get("sub_items", {})
         filtered_sub_items = filter_sidebar_level(sub_items, user_group_names, user) if sub_items else {}
@@ -62,24 +53,103 @@ def filter_sidebar_level(items, user_group_names, user):
         if "url" in item_dict or filtered_sub_items:
             filtered_items[item_name] = item_dict
     
-    print(f"DEBUG: Filtered items: {list(filtered_items.keys())}")
     return filtered_items
 
+
+# ============== SIDEBAR CACHE ==============
+# The filtered sidebar only depends on the user's group names, so it is
+# compiled once per distinct group set and kept in process memory. The
+# group names of each user are kept in the Django cache together with a
+# version that is bumped whenever groups or GroupSidebar rows change, so a
+# render costs one cache lookup.
+# The version bump only reaches other workers through a shared cache
+# (settings.CACHES). With a per-process cache, entries expire after
+# SIDEBAR_LOCAL_CACHE_TIMEOUT instead, which bounds how long another
+# worker shows a stale sidebar.
+
+SIDEBAR_CACHE_TIMEOUT = getattr(settings, 'SIDEBAR_CACHE_TIMEOUT', 60 * 60)
+SIDEBAR_LOCAL_CACHE_TIMEOUT = getattr(settings, 'SIDEBAR_LOCAL_CACHE_TIMEOUT', 60)
+SIDEBAR_VERSION_KEY = 'sidebar:version'
+MAX_COMPILED_SIDEBARS = 256
+
+_compiled_sidebars = {}
+
+
+def _user_key(user_id):
+    return f'sidebar:user:{user_id}'
+
+
+def compiled_sidebar(user_group_names, version=0):
+    """Filtered sidebar for a set of group names, compiled once per process"""
+    key = (version, frozenset(user_group_names))
+    items = _compiled_sidebars.get(key)
+    if items is None:
+        if len(_compiled_sidebars) >= MAX_COMPILED_SIDEBARS:
+            _compiled_sidebars.clear()
+        items = filter_sidebar_level(sidebar.Sidebar.sidebar_items, key[1])
+        _compiled_sidebars[key] = items
+    return items
+
+
+def cached_user_group_names(user):
+    """(version, group names) of a user, read from the cache when still current"""
+    user_key = _user_key(user.pk)
+    cached = cache.get_many([SIDEBAR_VERSION_KEY, user_key])
+    version = cached.get(SIDEBAR_VERSION_KEY, 0)
+    entry = cached.get(user_key)
+    if entry is not None and entry[0] == version:
+        return entry
+
+    entry = (version, frozenset(user.groups.values_list('name', flat=True)))
+    cache.set(user_key, entry, SIDEBAR_CACHE_TIMEOUT if cache_is_shared() else SIDEBAR_LOCAL_CACHE_TIMEOUT)
+    return entry
+
+
+def invalidate_sidebar_cache(sender=None, **kwargs):
+    """Drop every cached group set and compiled sidebar"""
+    try:
+        cache.incr(SIDEBAR_VERSION_KEY)
+    except ValueError:
+        cache.set(SIDEBAR_VERSION_KEY, 1, None)
+    _compiled_sidebars.clear()
+
+
+def invalidate_user_sidebar(sender, instance, action, reverse, pk_set, **kwargs):
+    """User.groups changed: drop the cached group names of the affected users"""
+    if action not in ('post_add', 'post_remove', 'post_clear', 'pre_clear'):
+        return
+    if not reverse:
+        cache.delete(_user_key(instance.pk))
+    elif action == 'pre_clear':
+        # Group.user_set.clear(): pk_set is empty, so collect members first
+        cache.delete_many([_user_key(user_id) for user_id in instance.user_set.values_list('pk', flat=True)])
+    elif pk_set:
+        cache.delete_many([_user_key(user_id) for user_id in pk_set])
+
+
+def connect_sidebar_signals():
+    from django.contrib.auth.models import Group, User
+    from portal.models import GroupSidebar, Sidebar as SidebarModel
+
+    m2m_changed.connect(invalidate_user_sidebar, sender=User.groups.through, dispatch_uid='sidebar_user_groups')
+    for model in (Group, GroupSidebar, SidebarModel):
+        uid = f'sidebar_{model._meta.label_lower}'
+        post_save.connect(invalidate_sidebar_cache, sender=model, dispatch_uid=f'{uid}_post_save')
+        post_delete.connect(invalidate_sidebar_cache, sender=model, dispatch_uid=f'{uid}_post_delete')
+    m2m_changed.connect(
+        invalidate_sidebar_cache, sender=GroupSidebar.hidden_sidebars.through, dispatch_uid='sidebar_hidden_sidebars'
+    )
+
+
 def sidebar_context(request):
     if not request.user.is_authenticated:
         return {}
 
-    user_groups = request.user.groups.all()
-    user_group_names = set(user_groups.values_list('name', flat=True))
-
-    filtered_sidebar_items = filter_sidebar_level(
-        sidebar.Sidebar.sidebar_items,
-        user_group_names,
-        request.user
-    )
+    version, user_group_names = cached_user_group_names(request.user)
+    filtered_sidebar_items = compiled_sidebar(user_group_names, version)
 
     return {
         "sidebar_items": filtered_sidebar_items,
         "path": request.path,
         "current_user": request.user
-    }
\ No newline at end of file
+    }
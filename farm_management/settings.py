@@ -116,6 +116,7 @@ MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    "utils.query_stats.QueryStatsMiddleware",
     
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -376,4 +377,15 @@ CHANNEL_LAYERS = {
         "BACKEND": "channels_redis.core.RedisChannelLayer",
         "CONFIG": {"hosts": [("127.0.0.1", 6379)]},
     }
+}
+
+# Shared by every worker and management command. Vector tile generations,
+# the sidebar and weekly analytics versions and background export jobs are
+# invalidated through it, so a per-process LocMemCache would leave the
+# other processes serving stale data (see portal/checks.py).
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": config('REDIS_CACHE_URL', default='redis://127.0.0.1:6379/1'),
+    }
 }
\ No newline at end of file
@@ -1490,12 +1490,12 @@ class CalculatedAreaAdmin(ImportExportModelAdmin):
     actions = ['export_as_csv', 'soft_delete_selected', 'restore_selected']
     
     def soft_delete_selected(self, request, queryset):
-        count = queryset.update(delete_field="yes")
+        count = queryset.soft_delete()[1].get(self.model._meta.label, 0)
         self.message_user(request, f"Successfully soft-deleted {count} calculated areas.")
     soft_delete_selected.short_description = "Soft delete selected areas"
     
     def restore_selected(self, request, queryset):
-        count = queryset.update(delete_field="no")
+        count = queryset.restore()[1].get(self.model._meta.label, 0)
         self.message_user(request, f"Successfully restored {count} calculated areas.")
     restore_selected.short_description = "Restore selected areas"
     
@@ -1619,12 +1619,12 @@ class EquipmentModelAdmin(ImportExportModelAdmin):
     actions = ['soft_delete_selected', 'restore_selected', 'mark_as_good', 'mark_as_repair']
     
     def soft_delete_selected(self, request, queryset):
-        count = queryset.update(delete_field="yes")
+        count = queryset.soft_delete()[1].get(self.model._meta.label, 0)
         self.message_user(request, f"Successfully soft-deleted {count} equipment.")
     soft_delete_selected.short_description = "Soft delete selected equipment"
     
     def restore_selected(self, request, queryset):
-        count = queryset.update(delete_field="no")
+        count = queryset.restore()[1].get(self.model._meta.label, 0)
         self.message_user(request, f"Successfully restored {count} equipment.")
     restore_selected.short_description = "Restore selected equipment"
     
@@ -1751,12 +1751,12 @@ class EquipmentAssignmentAdmin(ImportExportModelAdmin):
     mark_as_returned.short_description = "Mark selected as Returned"
     
     def soft_delete_selected(self, request, queryset):
-        count = queryset.update(delete_field="yes")
+        count = queryset.soft_delete()[1].get(self.model._meta.label, 0)
         self.message_user(request, f"Successfully soft-deleted {count} assignments.")
     soft_delete_selected.short_description = "Soft delete selected assignments"
     
     def restore_selected(self, request, queryset):
-        count = queryset.update(delete_field="no")
+        count = queryset.restore()[1].get(self.model._meta.label, 0)
         self.message_user(request, f"Successfully restored {count} assignments.")
     restore_selected.short_description = "Restore selected assignments"
     
@@ -1945,12 +1945,12 @@ class OutbreakFarmAdmin(ImportExportModelAdmin):
     decrease_severity.short_description = "Decrease Severity"
     
     def soft_delete_selected(self, request, queryset):
-        count = queryset.update(delete_field="yes")
+        count = queryset.soft_delete()[1].get(self.model._meta.label, 0)
         self.message_user(request, f"Successfully soft-deleted {count} outbreaks.")
     soft_delete_selected.short_description = "Soft delete selected outbreaks"
     
     def restore_selected(self, request, queryset):
-        count = queryset.update(delete_field="no")
+        count = queryset.restore()[1].get(self.model._meta.label, 0)
         self.message_user(request, f"Successfully restored {count} outbreaks.")
     restore_selected.short_description = "Restore selected outbreaks"
     
@@ -2047,12 +2047,12 @@ class GrowthMonitoringAdmin(ImportExportModelAdmin):
     actions = ['soft_delete_selected', 'restore_selected']
     
     def soft_delete_selected(self, request, queryset):
-        count = queryset.update(delete_field="yes")
+        count = queryset.soft_delete()[1].get(self.model._meta.label, 0)
         self.message_user(request, f"Successfully soft-deleted {count} growth records.")
     soft_delete_selected.short_description = "Soft delete selected records"
     
     def restore_selected(self, request, queryset):
-        count = queryset.update(delete_field="no")
+        count = queryset.restore()[1].get(self.model._meta.label, 0)
         self.message_user(request, f"Successfully restored {count} growth records.")
     restore_selected.short_description = "Restore selected records"
     
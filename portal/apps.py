@@ -3,3 +3,12 @@ from django.apps import AppConfig
 
 class PortalConfig(AppConfig):
     name = 'portal'
+
+    def ready(self):
+        from portal import checks  # noqa: F401 (registers the system checks)
+        from portal.signals import (
+            connect_rollup_signals, connect_tile_signals, connect_weekly_analytics_signals,
+        )
+        connect_rollup_signals()
+        connect_tile_signals()
+        connect_weekly_analytics_signals()
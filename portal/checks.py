@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+# Backends whose entries are only visible to the process that wrote them
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def cache_is_shared(alias='default'):
+    """False when `alias` is a per-process (or no-op) cache"""
+    return settings.CACHES[alias]['BACKEND'] not in PROCESS_LOCAL_CACHES
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    if cache_is_shared():
+        return []
+    return [Warning(
+        'The default cache is local to each process.',
+        hint=(
+            'Vector tile and sidebar invalidation, the weekly analytics version and background '
+            'export jobs only reach the process that made the change. Configure a shared cache '
+            '(Redis) in CACHES.'
+        ),
+        id='portal.W001',
+    )]
@@ -0,0 +1,161 @@
+"""
+GeoJSON pipeline for the map window.
+
+PostGIS serializes each geometry (ST_AsGeoJSON, optionally simplified with
+ST_SimplifyPreserveTopology for the requested zoom level), Python only
+wraps the already-encoded geometry strings into Features and streams the
+FeatureCollection out. The encoded features are cached per variant and
+served with an ETag derived from the sector table, so any saved, added or
+deleted sector invalidates them.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.contrib.gis.db.models.functions import AsGeoJSON, GeoFunc
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Max, Value, Case, When, CharField
+from django.db.models.functions import Concat
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+
+from portal.models import SectorModel
+
+GEOJSON_CACHE_TIMEOUT = getattr(settings, 'GEOJSON_CACHE_TIMEOUT', 60 * 60)
+GEOJSON_CACHE_MAX_BYTES = getattr(settings, 'GEOJSON_CACHE_MAX_BYTES', 20 * 1024 * 1024)
+GEOJSON_CHUNK_SIZE = 500
+GEOJSON_PRECISION = 6
+
+# Zoom levels at or beyond this are served at full resolution
+MAX_SIMPLIFY_ZOOM = 18
+
+
+class SimplifyPreserveTopology(GeoFunc):
+    function = 'ST_SimplifyPreserveTopology'
+
+
+def zoom_tolerance(zoom):
+    """Simplification tolerance in degrees: roughly half a screen pixel at `zoom`"""
+    if zoom is None:
+        return None
+    try:
+        zoom = int(zoom)
+    except (TypeError, ValueError):
+        return None
+    if zoom < 0 or zoom >= MAX_SIMPLIFY_ZOOM:
+        return None
+    return 360.0 / (256 * 2 ** zoom) / 2
+
+
+def staff_name(prefix):
+    """'first last' of a staffTbl foreign key, or None when it is not set"""
+    return Case(
+        When(**{f'{prefix}__isnull': True}, then=Value(None)),
+        default=Concat(f'{prefix}__first_name', Value(' '), f'{prefix}__last_name'),
+        output_field=CharField(),
+    )
+
+
+def sector_feature_rows(queryset, fields, zoom=None, **annotations):
+    """Iterate value dicts carrying a pre-encoded `geojson` geometry string"""
+    geometry = 'geom'
+    tolerance = zoom_tolerance(zoom)
+    if tolerance:
+        geometry = SimplifyPreserveTopology('geom', Value(tolerance))
+    return (
+        queryset.exclude(geom__isnull=True)
+        .annotate(geojson=AsGeoJSON(geometry, precision=GEOJSON_PRECISION), **annotations)
+        .values('geojson', *fields, *annotations)
+        .order_by('id')
+        .iterator(chunk_size=GEOJSON_CHUNK_SIZE)
+    )
+
+
+def encode_features(rows, build_properties):
+    """Yield comma-separated Feature bytes; the geometry string is never parsed"""
+    separator = b''
+    for row in rows:
+        properties = json.dumps(build_properties(row), cls=DjangoJSONEncoder)
+        yield b''.join((
+            separator,
+            b'{"type": "Feature", "geometry": ',
+            row['geojson'].encode(),
+            b', "properties": ',
+            properties.encode(),
+            b'}',
+        ))
+        separator = b', '
+
+
+def sectors_fingerprint():
+    """Changes whenever a sector is saved (update_at), added or deleted"""
+    stats = SectorModel.objects.aggregate(total=Count('id'), last_update=Max('update_at'))
+    last_update = stats['last_update'].isoformat() if stats['last_update'] else ''
+    return f"{stats['total']}:{last_update}"
+
+
+def json_members(members):
+    """Encode extra top-level members as `, "key": value` bytes"""
+    return b''.join(
+        b', ' + json.dumps(key).encode() + b': ' + json.dumps(value, cls=DjangoJSONEncoder).encode()
+        for key, value in members.items()
+    )
+
+
+def _stream(head, features, tail, cache_key=None):
+    yield head
+    parts = []
+    size = 0
+    for chunk in features:
+        if cache_key is not None:
+            size += len(chunk)
+            if size > GEOJSON_CACHE_MAX_BYTES:
+                cache_key = None
+                parts = []
+            else:
+                parts.append(chunk)
+        yield chunk
+    if cache_key is not None:
+        cache.set(cache_key, b''.join(parts), GEOJSON_CACHE_TIMEOUT)
+    yield tail
+
+
+def geojson_response(request, features, head_members=None, tail_members=None,
+                     variant=None, fingerprint=None, use_etag=True,
+                     content_type='application/geo+json'):
+    """Stream `{head_members..., "features": [...], tail_members...}`.
+
+    When `variant` is given, the encoded features array is cached under
+    (variant, fingerprint) and the response carries an ETag, so unchanged
+    data is answered with 304 or served straight from the cache.
+    `features` is a zero-argument callable so no query runs on a cache hit.
+    """
+    head = b'{' + json_members(head_members or {})[2:]
+    head += (b', ' if head_members else b'') + b'"features": ['
+    tail = b']' + json_members(tail_members or {}) + b'}'
+
+    cache_key = None
+    etag = None
+    if variant is not None:
+        fingerprint = fingerprint or sectors_fingerprint()
+        digest = hashlib.md5(f'{variant}|{fingerprint}'.encode()).hexdigest()
+        cache_key = f'geojson:{digest}'
+        if use_etag:
+            head_digest = hashlib.md5(head + tail).hexdigest()[:8]
+            etag = f'"{digest}-{head_digest}"'
+            if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+                response = HttpResponseNotModified()
+                response['ETag'] = etag
+                return response
+
+        cached = cache.get(cache_key)
+        if cached is not None:
+            response = HttpResponse(head + cached + tail, content_type=content_type)
+            if etag:
+                response['ETag'] = etag
+            return response
+
+    response = StreamingHttpResponse(_stream(head, features(), tail, cache_key), content_type=content_type)
+    if etag:
+        response['ETag'] = etag
+    return response
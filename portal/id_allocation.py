@@ -0,0 +1,87 @@
+"""
+Business ID allocation (QR uids, outbreak IDs, equipment codes, staff IDs).
+
+Each numbered series is a row of the IdCounter table. reserve() takes a
+block of numbers with a single upsert:
+
+    INSERT ... ON CONFLICT (name) DO UPDATE SET value = value + n RETURNING value
+
+The counter row stays locked until the caller's transaction ends, so
+concurrent writers wait on one row instead of scanning the target table
+for its last ID. Numbers are only given back when reserve() runs in the
+same transaction as the insert that uses them and that insert rolls
+back: the model save() methods and the batch sync chunks do this. In
+autocommit a reserved number is spent at once, so bulk QR jobs (which
+reserve every uid before writing their files) and generate_plantation_uid
+previews can leave gaps; numbers are unique, not gap-free.
+
+Personnel staff IDs are derived from the primary key, which is taken
+from the table's own sequence before the INSERT, so the row is written
+once instead of being inserted and then updated.
+
+This module imports no models, so portal.models can use it.
+"""
+from django.db import connection
+from django.utils import timezone
+
+COUNTER_TABLE = 'portal_idcounter'
+
+QR_CODE_SERIES = 'qr_code_uid'
+OUTBREAK_SERIES = 'outbreak_farm'
+EQUIPMENT_SERIES = 'equipment'
+
+STAFF_ID_PREFIXES = {
+    'Rehab Assistant': 'RA',
+    'Rehab Technician': 'RT',
+}
+
+
+def reserve(series, count=1):
+    """`count` consecutive unused numbers of `series`, as a range"""
+    if count < 1:
+        return range(0)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {COUNTER_TABLE} (name, value) VALUES (%s, %s) "
+            f"ON CONFLICT (name) DO UPDATE SET value = {COUNTER_TABLE}.value + EXCLUDED.value "
+            f"RETURNING value",
+            [series, count],
+        )
+        last = cursor.fetchone()[0]
+    return range(last - count + 1, last + 1)
+
+
+def next_pks(model, count=1):
+    """Primary keys for `count` new rows of `model`, taken from its id sequence"""
+    table, column = model._meta.db_table, model._meta.pk.column
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)",
+            [connection.ops.quote_name(table), column, count],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+# ============== FORMATS ==============
+
+def qr_uids(count=1, at=None):
+    """ACL-PLT-<year>-<HHMM>-<n> plant label uids"""
+    at = at or timezone.now()
+    return [f"ACL-PLT-{at:%Y}-{at:%H%M}-{number:05d}" for number in reserve(QR_CODE_SERIES, count)]
+
+
+def outbreak_ids(count=1, at=None):
+    """OB-<year>-<n> outbreak IDs"""
+    year = (at or timezone.now()).year
+    return [f"OB-{year}-{number:04d}" for number in reserve(OUTBREAK_SERIES, count)]
+
+
+def equipment_codes(count=1, at=None):
+    """EQ-<year>-<n> equipment codes"""
+    year = (at or timezone.now()).year
+    return [f"EQ-{year}-{number:04d}" for number in reserve(EQUIPMENT_SERIES, count)]
+
+
+def staff_id(personnel_type, pk):
+    """RA-/RT-/ST-<pk> staff ID of a personnel row"""
+    return f"{STAFF_ID_PREFIXES.get(personnel_type, 'ST')}-{pk:06d}"
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from portal import qr_generation
+from portal.models import staffTbl
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate plant label QR codes in bulk. UIDs come from one sequence '
+        'reservation, larger jobs render images in a process pool and rows '
+        'are inserted a chunk at a time.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('quantity', type=int, help='Number of QR codes to generate')
+        parser.add_argument('--workers', type=int, help='Render processes (default: one per CPU)')
+        parser.add_argument(
+            '--chunk-size', type=int, default=qr_generation.CHUNK_SIZE,
+            help='Codes written per bulk INSERT',
+        )
+        parser.add_argument('--created-by', type=int, help='staffTbl id recorded as creator')
+
+    def handle(self, *args, **options):
+        if options['quantity'] <= 0 or options['chunk_size'] <= 0:
+            raise CommandError('quantity and --chunk-size must be positive')
+        created_by = None
+        if options['created_by']:
+            created_by = staffTbl.objects.filter(id=options['created_by']).first()
+            if created_by is None:
+                raise CommandError(f"No staff with id {options['created_by']}")
+
+        done = 0
+        first = last = None
+        pool = qr_generation.render_pool(
+            options['quantity'], workers=options['workers'] or qr_generation.RENDER_WORKERS,
+        )
+        try:
+            for qr_models, _ in qr_generation.generate(
+                options['quantity'],
+                created_by=created_by,
+                pool=pool,
+                chunk_size=options['chunk_size'],
+            ):
+                done += len(qr_models)
+                first = first or qr_models[0].uid
+                last = qr_models[-1].uid
+                self.stdout.write(f"  {done}/{options['quantity']} written")
+        finally:
+            if pool:
+                pool.shutdown(cancel_futures=True)
+
+        self.stdout.write(self.style.SUCCESS(f'Generated {done} QR codes ({first} .. {last})'))
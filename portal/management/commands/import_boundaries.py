@@ -0,0 +1,75 @@
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from portal.spatial_import import DEFAULT_BATCH_SIZE, TARGETS, BoundaryImportError, import_boundaries
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk-load sector or region boundaries from a table in this database or '
+        'from a GeoJSON, Shapefile or GeoPackage file. Geometries are reprojected '
+        'and repaired in SQL and rows are upserted in batches.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('target', choices=sorted(TARGETS), help='What to load')
+        source = parser.add_mutually_exclusive_group(required=True)
+        source.add_argument('--table', help='Source table in this database, e.g. "Sector Boundary"')
+        source.add_argument('--file', help='GeoJSON, Shapefile or GeoPackage to read')
+        parser.add_argument('--layer', default='0', help='Layer index or name in --file (default: first)')
+        parser.add_argument(
+            '--field', action='append', default=[], metavar='TARGET=SOURCE',
+            help='Read a target field from a differently named source field (can be repeated)',
+        )
+        parser.add_argument('--srid', type=int, help='SRID of source geometries that carry none')
+        parser.add_argument(
+            '--update', action='store_true',
+            help='Overwrite existing rows with the same key (default: leave them alone)',
+        )
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Rows per upsert statement')
+        parser.add_argument('--dry-run', action='store_true', help='Run everything, then roll back')
+
+    def handle(self, *args, **options):
+        mapping = {}
+        for item in options['field']:
+            field, sep, name = item.partition('=')
+            if not sep or not name:
+                raise CommandError(f'Invalid --field {item!r}, expected TARGET=SOURCE')
+            if field not in TARGETS[options['target']]['fields'] and field != 'geom':
+                raise CommandError(f"{options['target']} has no field {field}")
+            mapping[field] = name
+        if options['batch_size'] <= 0:
+            raise CommandError('--batch-size must be positive')
+        layer = int(options['layer']) if options['layer'].isdigit() else options['layer']
+
+        def progress(done, total):
+            self.stdout.write(f'  {done}/{total} staged rows upserted')
+
+        # Without --dry-run every batch commits on its own; re-running is safe
+        atomic = transaction.atomic() if options['dry_run'] else nullcontext()
+        try:
+            with atomic:
+                stats = import_boundaries(
+                    options['target'],
+                    table=options['table'],
+                    path=options['file'],
+                    layer=layer,
+                    mapping=mapping,
+                    source_srid=options['srid'],
+                    update=options['update'],
+                    batch_size=options['batch_size'],
+                    progress=progress,
+                )
+                if options['dry_run']:
+                    transaction.set_rollback(True)
+        except BoundaryImportError as e:
+            raise CommandError(str(e))
+
+        for name in ('staged', 'reprojected', 'repaired', 'dropped', 'inserted', 'updated', 'skipped'):
+            self.stdout.write(f'{name}: {stats[name]}')
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Dry run - nothing was saved'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{options['target'].capitalize()} imported"))
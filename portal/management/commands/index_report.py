@@ -0,0 +1,105 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+# Non-unique indexes scanned at most --max-scans times since the statistics
+# were last reset; unique and primary key indexes enforce constraints and
+# are never reported
+UNUSED_INDEXES_SQL = """
+    SELECT s.relname, s.indexrelname, s.idx_scan,
+           pg_size_pretty(pg_relation_size(s.indexrelid))
+    FROM pg_stat_user_indexes s
+    JOIN pg_index i ON i.indexrelid = s.indexrelid
+    WHERE s.schemaname = current_schema()
+      AND NOT i.indisunique AND NOT i.indisprimary
+      AND s.idx_scan <= %s
+    ORDER BY pg_relation_size(s.indexrelid) DESC
+"""
+
+# Tables of at least --min-rows rows read by sequential scan more often
+# than through an index
+SEQ_SCANNED_TABLES_SQL = """
+    SELECT relname, n_live_tup, seq_scan, seq_tup_read / GREATEST(seq_scan, 1), COALESCE(idx_scan, 0)
+    FROM pg_stat_user_tables
+    WHERE schemaname = current_schema()
+      AND n_live_tup >= %s
+      AND seq_scan > COALESCE(idx_scan, 0)
+    ORDER BY seq_tup_read DESC
+"""
+
+EXISTING_INDEXES_SQL = "SELECT indexname FROM pg_indexes WHERE schemaname = current_schema()"
+
+STATS_RESET_SQL = "SELECT stats_reset FROM pg_stat_database WHERE datname = current_database()"
+
+
+class Command(BaseCommand):
+    help = (
+        'Report unused indexes and tables that look like they are missing one, from the PostgreSQL '
+        'pg_stat views, plus model indexes that have not been created yet.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-scans',
+            type=int,
+            default=0,
+            help='Report indexes scanned at most this many times (default 0)',
+        )
+        parser.add_argument(
+            '--min-rows',
+            type=int,
+            default=10000,
+            help='Only report sequentially scanned tables with at least this many live rows (default 10000)',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('index_report reads the PostgreSQL statistics views')
+
+        with connection.cursor() as cursor:
+            cursor.execute(STATS_RESET_SQL)
+            row = cursor.fetchone()
+            stats_reset = row[0] if row else None
+            cursor.execute(UNUSED_INDEXES_SQL, [options['max_scans']])
+            unused = cursor.fetchall()
+            cursor.execute(SEQ_SCANNED_TABLES_SQL, [options['min_rows']])
+            seq_scanned = cursor.fetchall()
+            cursor.execute(EXISTING_INDEXES_SQL)
+            existing = {name for (name,) in cursor.fetchall()}
+
+        self.stdout.write(f"Statistics collected since {stats_reset or 'the server started'}")
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\nUnused indexes (scanned <= {options['max_scans']} times)"))
+        for table, index, scans, size in unused:
+            self.stdout.write(f'  {table}.{index}: {scans} scans, {size}')
+        if not unused:
+            self.stdout.write('  none')
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"\nTables scanned sequentially more than by index (>= {options['min_rows']} rows)"
+        ))
+        for table, rows, seq_scans, rows_per_scan, index_scans in seq_scanned:
+            self.stdout.write(
+                f'  {table}: {rows} rows, {seq_scans} seq scans reading {rows_per_scan} rows each, '
+                f'{index_scans} index scans'
+            )
+        if not seq_scanned:
+            self.stdout.write('  none')
+
+        missing = [
+            (model._meta.db_table, index.name)
+            for model in apps.get_models()
+            if model._meta.managed and not model._meta.proxy
+            for index in model._meta.indexes
+            if index.name not in existing
+        ]
+        self.stdout.write(self.style.MIGRATE_HEADING('\nModel indexes missing from the database (run migrate)'))
+        for table, index in missing:
+            self.stdout.write(f'  {table}.{index}')
+        if not missing:
+            self.stdout.write('  none')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(unused)} unused index(es), {len(seq_scanned)} sequentially scanned table(s), '
+            f'{len(missing)} missing model index(es)'
+        ))
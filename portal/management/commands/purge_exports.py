@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from utils.exports import EXPORT_JOB_TIMEOUT, purge_expired_exports
+
+
+class Command(BaseCommand):
+    help = (
+        'Remove background export files under MEDIA_ROOT/exports/ whose jobs have expired. '
+        'Starting an export also does this at most hourly; schedule it for quiet servers.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-age',
+            type=int,
+            default=EXPORT_JOB_TIMEOUT,
+            help=f'Age in seconds after which an export is removed (default {EXPORT_JOB_TIMEOUT})',
+        )
+
+    def handle(self, *args, **options):
+        if options['max_age'] < 0:
+            raise CommandError('--max-age must be >= 0')
+        removed = purge_expired_exports(options['max_age'])
+        self.stdout.write(self.style.SUCCESS(f'Removed {removed} expired export(s)'))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Remove cached QR label sheets (MEDIA_ROOT/qr_labels/) older than QR_LABEL_TTL. '
+        'Downloading labels also does this at most hourly; schedule it for quiet servers.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-age',
+            type=int,
+            help='Age in seconds after which a sheet is removed (default settings.QR_LABEL_TTL, one day)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            from portal import qr_labels
+        except ImportError as e:
+            raise CommandError(f'QR label sheets need ReportLab and qrcode: {e}')
+
+        max_age = options['max_age']
+        if max_age is None:
+            max_age = qr_labels.LABEL_TTL
+        if max_age < 0:
+            raise CommandError('--max-age must be >= 0')
+        removed = qr_labels.purge_label_sheets(max_age)
+        self.stdout.write(self.style.SUCCESS(f'Removed {removed} label sheet(s)'))
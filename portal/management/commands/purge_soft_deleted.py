@@ -0,0 +1,73 @@
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from portal.models import PURGE_BATCH_SIZE, timeStamp
+
+RETENTION_DAYS = getattr(settings, 'SOFT_DELETE_RETENTION_DAYS', 90)
+
+
+def soft_delete_models():
+    return {model._meta.label_lower: model for model in apps.get_models() if issubclass(model, timeStamp)}
+
+
+class Command(BaseCommand):
+    help = (
+        'Permanently remove rows that have been soft-deleted for longer than the retention period. '
+        'Rows still referenced by live rows are kept. Scheduled nightly in deploy/crontab.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=RETENTION_DAYS,
+            help=f'Retention period in days (default {RETENTION_DAYS}, settings.SOFT_DELETE_RETENTION_DAYS)',
+        )
+        parser.add_argument(
+            '--model',
+            action='append',
+            dest='models',
+            help='Only purge this model, as app_label.model (can be repeated). Defaults to all soft-delete models.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=PURGE_BATCH_SIZE,
+            help=f'Rows deleted per transaction (default {PURGE_BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count the rows that would be purged',
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < 0 or options['batch_size'] < 1:
+            raise CommandError('--days must be >= 0 and --batch-size >= 1')
+
+        available = soft_delete_models()
+        labels = [label.lower() for label in options['models'] or available]
+        unknown = [label for label in labels if label not in available]
+        if unknown:
+            raise CommandError(f"Unknown model(s): {', '.join(unknown)}")
+
+        before = timezone.now() - timedelta(days=options['days'])
+        total = 0
+        for label in labels:
+            rows = available[label].default_objects.all()
+            if options['dry_run']:
+                purged = rows.purgeable().filter(created_date__lt=before).count()
+            else:
+                purged = rows.purge(before, batch_size=options['batch_size'])
+            if purged:
+                self.stdout.write(f'{label}: {purged}')
+            total += purged
+
+        verb = 'Would purge' if options['dry_run'] else 'Purged'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {total} row(s) soft-deleted before {before:%Y-%m-%d %H:%M}"
+        ))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from portal.rollups import ROLLUP_METRICS, rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the dashboard rollup tables from the source tables. '
+        'Run periodically to pick up bulk writes that bypass save/delete signals.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--metric',
+            action='append',
+            dest='metrics',
+            help='Only rebuild this metric (can be repeated). Defaults to all metrics.',
+        )
+        parser.add_argument(
+            '--list',
+            action='store_true',
+            help='List the available metrics and exit',
+        )
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for metric, spec in ROLLUP_METRICS.items():
+                self.stdout.write(f"{metric}: {spec['model'].__name__}")
+            return
+
+        metrics = options['metrics']
+        unknown = [metric for metric in metrics or [] if metric not in ROLLUP_METRICS]
+        if unknown:
+            raise CommandError(f"Unknown metric(s): {', '.join(unknown)}")
+
+        created = rebuild_rollups(metrics)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {len(metrics or ROLLUP_METRICS)} metric(s), {created} rollup rows written'
+        ))
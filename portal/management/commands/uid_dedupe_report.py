@@ -0,0 +1,29 @@
+from importlib import import_module
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+dedupe = import_module('portal.migrations.0024_uid_unique_constraints')
+
+
+class Command(BaseCommand):
+    help = (
+        'Count the rows migration 0024 (uid unique constraints) would change: synthetic _<n> uids it '
+        'blanks and replayed duplicates it soft-deletes. Run before migrating.'
+    )
+
+    def handle(self, *args, **options):
+        tables = [
+            (model_name, connection.ops.quote_name(apps.get_model('portal', model_name)._meta.db_table))
+            for model_name in dedupe.UID_MODELS
+        ]
+        with connection.cursor() as cursor:
+            counts = dedupe.dedupe_counts(cursor, tables)
+
+        for model_name, (synthetic, duplicates) in counts.items():
+            self.stdout.write(f'{model_name}: {synthetic} synthetic uid(s) to blank, {duplicates} duplicate(s) to retire')
+        self.stdout.write(self.style.SUCCESS(
+            f'{sum(synthetic for synthetic, _ in counts.values())} uid(s) to blank, '
+            f'{sum(duplicates for _, duplicates in counts.values())} row(s) to soft-delete'
+        ))
@@ -0,0 +1,32 @@
+# Generated by Django 6.0 on 2026-10-18 09:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0021_alter_dailyreportingmodel_sector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(max_length=100)),
+                ('day', models.DateField(blank=True, null=True)),
+                ('bucket', models.TextField(blank=True, null=True)),
+                ('count', models.IntegerField(default=0)),
+                ('value_sum', models.FloatField(default=0)),
+                ('value_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('district', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='dashboard_rollups', to='portal.cocoadistrict')),
+                ('project', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='dashboard_rollups', to='portal.projecttbl')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['metric', 'day'], name='portal_rollup_metric_day_idx'), models.Index(fields=['metric', 'district', 'project'], name='portal_rollup_metric_area_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 6.0 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0022_dashboardrollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='personnelmodel',
+            index=models.Index(fields=['delete_field', 'created_date', 'id'], name='personnel_alive_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dailyreportingmodel',
+            index=models.Index(fields=['delete_field', 'reporting_date', 'id'], name='daily_report_alive_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='activityreportingmodel',
+            index=models.Index(fields=['delete_field', 'reporting_date', 'id'], name='activity_report_alive_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='outbreakfarmmodel',
+            index=models.Index(fields=['delete_field', 'date_reported', 'id'], name='outbreak_model_alive_rep_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='irrigationmodel',
+            index=models.Index(fields=['delete_field', 'date', 'id'], name='irrigation_alive_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipmentmodel',
+            index=models.Index(fields=['delete_field', 'created_date', 'id'], name='equipment_alive_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipmentassignmentmodel',
+            index=models.Index(fields=['delete_field', 'assignment_date', 'id'], name='assignment_alive_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='outbreakfarm',
+            index=models.Index(fields=['delete_field', 'inspection_date', 'id'], name='outbreak_alive_inspection_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paymentreport',
+            index=models.Index(fields=['delete_field', 'created_date', 'id'], name='payment_alive_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='detailedpaymentreport',
+            index=models.Index(fields=['delete_field', 'created_date', 'id'], name='detailed_pay_alive_created_idx'),
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 6.0 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+UID_MODELS = {
+    'feedback': 'feedback_uid_uniq',
+    'mappedfarms': 'mapped_farm_uid_uniq',
+    'dailyreportingmodel': 'daily_report_uid_uniq',
+    'activityreportingmodel': 'activity_report_uid_uniq',
+    'growthmonitoringmodel': 'growth_monitoring_uid_uniq',
+    'outbreakfarmmodel': 'outbreak_model_uid_uniq',
+    'irrigationmodel': 'irrigation_uid_uniq',
+    'verifyrecord': 'verify_record_uid_uniq',
+    'outbreakfarm': 'outbreak_farm_uid_uniq',
+}
+
+
+# Multi-activity reports submitted without a uid were stored as _0, _1, ...
+# Those rows are distinct reports, not replays; their uid is blanked.
+SYNTHETIC_UID = r'^_[0-9]+$'
+
+
+def _tables(apps, schema_editor):
+    for model_name in UID_MODELS:
+        yield model_name, schema_editor.quote_name(apps.get_model('portal', model_name)._meta.db_table)
+
+
+def _duplicates(table):
+    return f"""
+        SELECT id, row_number() OVER (
+            PARTITION BY uid ORDER BY delete_field = 'yes', id
+        ) AS copy
+        FROM {table}
+        WHERE uid > '' AND uid !~ '{SYNTHETIC_UID}'
+    """
+
+
+def dedupe_counts(cursor, tables):
+    """{model: (synthetic uids to blank, duplicate rows to retire)}"""
+    counts = {}
+    for model_name, table in tables:
+        cursor.execute(f"SELECT count(*) FROM {table} WHERE uid ~ '{SYNTHETIC_UID}'")
+        synthetic = cursor.fetchone()[0]
+        cursor.execute(f"SELECT count(*) FROM ({_duplicates(table)}) d WHERE d.copy > 1")
+        counts[model_name] = (synthetic, cursor.fetchone()[0])
+    return counts
+
+
+def dedupe_uids(apps, schema_editor):
+    """Keep one row per uid, preferring alive rows and then the oldest.
+    Replayed copies are soft-deleted and their uid gets a '#dup-<id>'
+    suffix, so nothing is lost and the unique constraint can be added.
+    `manage.py uid_dedupe_report` shows the counts beforehand."""
+    tables = list(_tables(apps, schema_editor))
+    with schema_editor.connection.cursor() as cursor:
+        for model_name, (synthetic, duplicates) in dedupe_counts(cursor, tables).items():
+            if synthetic or duplicates:
+                print(f"\n  {model_name}: {synthetic} synthetic uid(s) blanked, {duplicates} duplicate(s) retired", end='')
+    for _, table in tables:
+        schema_editor.execute(f"UPDATE {table} SET uid = '' WHERE uid ~ '{SYNTHETIC_UID}'")
+        schema_editor.execute(f"""
+            UPDATE {table} t
+            SET uid = t.uid || '#dup-' || t.id, delete_field = 'yes'
+            FROM ({_duplicates(table)}) d
+            WHERE t.id = d.id AND d.copy > 1
+        """)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0023_list_api_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_uids, migrations.RunPython.noop),
+    ] + [
+        migrations.AddConstraint(
+            model_name=model_name,
+            constraint=models.UniqueConstraint(condition=models.Q(('uid__gt', '')), fields=('uid',), name=name),
+        )
+        for model_name, name in UID_MODELS.items()
+    ]
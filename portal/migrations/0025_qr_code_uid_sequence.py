@@ -0,0 +1,27 @@
+# Generated by Django 6.0 on 2026-10-18 12:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0024_uid_unique_constraints'),
+    ]
+
+    # Numbers continue after the highest one already issued, so new UIDs
+    # never repeat an existing ACL-PLT-<year>-<HHMM>-<n>
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                "CREATE SEQUENCE IF NOT EXISTS qr_code_uid_seq",
+                """
+                SELECT setval('qr_code_uid_seq', COALESCE(max(
+                    substring(uid from '^ACL-PLT-[0-9]{4}-[0-9]{4}-([0-9]{1,18})$')::bigint
+                ), 0) + 1, false)
+                FROM portal_qr_codemodel
+                """,
+            ],
+            reverse_sql="DROP SEQUENCE IF EXISTS qr_code_uid_seq",
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 6.0 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+# series -> (table, column, pattern capturing the number)
+SERIES = {
+    'qr_code_uid': ('portal_qr_codemodel', 'uid', '^ACL-PLT-[0-9]{4}-[0-9]{4}-([0-9]{1,18})$'),
+    'outbreak_farm': ('portal_outbreakfarm', 'outbreak_id', '^OB-[0-9]{4}-([0-9]{1,18})$'),
+    'equipment': ('portal_equipmentmodel', 'equipment_code', '^EQ-[0-9]{4}-([0-9]{1,18})$'),
+}
+
+# Each counter starts at the highest number already issued
+SEED_SQL = [
+    f"""
+    INSERT INTO portal_idcounter (name, value)
+    SELECT '{name}', COALESCE(max(substring({column} from '{pattern}')::bigint), 0) FROM {table}
+    """
+    for name, (table, column, pattern) in SERIES.items()
+] + ["DROP SEQUENCE IF EXISTS qr_code_uid_seq"]
+
+RESTORE_SQL = [
+    "CREATE SEQUENCE IF NOT EXISTS qr_code_uid_seq",
+    "SELECT setval('qr_code_uid_seq', value + 1, false) FROM portal_idcounter WHERE name = 'qr_code_uid'",
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0025_qr_code_uid_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdCounter',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'portal_idcounter',
+            },
+        ),
+        migrations.RunSQL(sql=SEED_SQL, reverse_sql=RESTORE_SQL),
+    ]
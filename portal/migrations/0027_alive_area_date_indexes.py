@@ -0,0 +1,37 @@
+# Generated by Django 6.0 on 2026-10-18 12:00
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+# model -> (date column, district index, project index)
+AREA_DATE_INDEXES = {
+    'dailyreportingmodel': ('reporting_date', 'daily_report_district_date_idx', 'daily_report_project_date_idx'),
+    'activityreportingmodel': ('reporting_date', 'activity_rep_district_date_idx', 'activity_rep_project_date_idx'),
+    'growthmonitoringmodel': ('date', 'growth_district_date_idx', 'growth_project_date_idx'),
+    'irrigationmodel': ('date', 'irrigation_district_date_idx', 'irrigation_project_date_idx'),
+    'detailedpaymentreport': ('created_date', 'detailed_pay_district_crt_idx', 'detailed_pay_project_crt_idx'),
+}
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run in a transaction; building the
+    # indexes this way does not block writes to the report tables
+    atomic = False
+
+    dependencies = [
+        ('portal', '0026_idcounter'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name=model_name,
+            index=models.Index(
+                fields=[area, date_field, 'id'],
+                condition=models.Q(('delete_field', 'no')),
+                name=name,
+            ),
+        )
+        for model_name, (date_field, *names) in AREA_DATE_INDEXES.items()
+        for area, name in zip(('district', 'projectTbl_foreignkey'), names)
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 6.0 on 2026-10-18 12:00
+
+from django.db import migrations
+
+
+def clear_rollups(apps, schema_editor):
+    """Several metrics gained day/district/project keys. Rows stored with the
+    old layout would be counted twice next to the new slices, so all rows
+    are dropped; the dashboard rebuilds them on its next load."""
+    apps.get_model('portal', 'DashboardRollup').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0027_alive_area_date_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 6.0 on 2026-10-18 12:00
+
+import django.contrib.gis.db.models.fields
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run in a transaction
+    atomic = False
+
+    dependencies = [
+        ('portal', '0028_rekey_dashboard_rollups'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='growthmonitoringmodel',
+            index=django.contrib.postgres.indexes.GistIndex(
+                models.Func(
+                    models.Func(models.F('lng'), models.F('lat'), function='ST_MakePoint'),
+                    models.Value(4326),
+                    function='ST_SetSRID',
+                    output_field=django.contrib.gis.db.models.fields.GeometryField(srid=4326),
+                ),
+                condition=models.Q(('delete_field', 'no')),
+                name='growth_point_gist_idx',
+            ),
+        ),
+    ]
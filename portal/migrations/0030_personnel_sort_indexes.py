@@ -0,0 +1,29 @@
+# Generated by Django 6.0 on 2026-10-18 12:00
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+# Sortable columns of the staff list (get_staff_list_api)
+SORT_INDEXES = {
+    'staff_id': 'personnel_alive_staff_id_idx',
+    'first_name': 'personnel_alive_first_name_idx',
+    'date_joined': 'personnel_alive_joined_idx',
+}
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run in a transaction
+    atomic = False
+
+    dependencies = [
+        ('portal', '0029_growth_point_gist_index'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='personnelmodel',
+            index=models.Index(fields=['delete_field', field, 'id'], name=name),
+        )
+        for field, name in SORT_INDEXES.items()
+    ]
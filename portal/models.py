@@ -1,9 +1,12 @@
 # models.py
 import uuid
-from django.db import models
+from functools import partial
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Q
 from django.contrib.gis.db.models import GeometryField
 from django.utils import timezone
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GistIndex
 from django.contrib.gis.geos import GEOSGeometry
 from django.contrib.auth import get_user_model 
 from django.contrib.auth.models import AbstractUser
@@ -12,13 +15,15 @@ from datetime import date
 from django.contrib.gis.db import models
 
 from django.db.models.signals import post_save
-from django.dispatch import receiver
+from django.dispatch import Signal, receiver
 
 from django.utils.text import slugify 
 from django.contrib.gis.geos import GEOSGeometry, Point
 
 from django.utils.html import mark_safe
 
+from portal import id_allocation
+
 class protectedValueError(Exception):
     def __init__(self, msg):
         super(protectedValueError, self).__init__(msg)
@@ -36,14 +41,119 @@ class timeStampManager(models.Manager):
     def hard_delete(self):
         return self.get_queryset().hard_delete()
 
+    def create_once(self, uid_field='uid', **fields):
+        """Insert a row unless one with the same uid is already stored.
+
+        Returns (row, created). The insert runs in a savepoint and relies on
+        the model's unique uid constraint, so a replayed submission costs no
+        extra query up front and two concurrent ones cannot both get in.
+        """
+        try:
+            with transaction.atomic(using=self.db):
+                return self.create(**fields), True
+        except IntegrityError:
+            uid = fields.get(uid_field)
+            existing = self.model.default_objects.filter(**{uid_field: uid}).first() if uid else None
+            if existing is None:
+                raise
+            return existing, False
+
+# Sent once per soft_delete()/restore() batch and model, with the pks of
+# every row whose delete_field changed, instead of a post_save per row.
+soft_deleted = Signal()
+restored = Signal()
+# Sent by bulk inserts (batch sync) with the pks of the new rows, which
+# bulk_create writes without post_save
+bulk_created = Signal()
+
+PURGE_BATCH_SIZE = 500
+
+
+def _delete_files(files):
+    for storage, name in files:
+        storage.delete(name)
+
+
 class timeStampQuerySet(models.QuerySet):
     def delete(self):
-        for item in self:
-            item.delete()
-        return super(timeStampQuerySet, self)
+        """Soft delete the rows; hard_delete() removes them"""
+        return self.soft_delete()
 
     def hard_delete(self):
         return super(timeStampQuerySet, self).delete()
+
+    def soft_delete(self):
+        """Mark the rows and their soft_delete_cascade dependents deleted,
+        with one UPDATE per model. Returns (total, {model label: rows})
+        like QuerySet.delete()."""
+        return self._set_deleted('yes', timezone.now())
+
+    def restore(self):
+        """Bring back soft-deleted rows (use default_objects). Dependents
+        are restored only if they went down in the same batch as their
+        parent, so rows deleted on their own stay deleted."""
+        return self._set_deleted('no', timezone.now())
+
+    def _set_deleted(self, value, changed_at):
+        model = self.model
+        counts = {}
+        with transaction.atomic(using=self.db):
+            pks = list(self.exclude(delete_field=value).values_list('pk', flat=True))
+            if not pks:
+                return 0, counts
+            # Dependents go first: restore() matches them on the parent's
+            # created_date, which the UPDATE below overwrites
+            for related_name, field in model.soft_delete_cascade:
+                related = model._meta.apps.get_model(model._meta.app_label, related_name)
+                dependents = timeStampQuerySet(related, using=self.db).filter(**{f'{field}__in': pks})
+                if value == 'no':
+                    dependents = dependents.filter(created_date=F(f'{field}__created_date'))
+                for label, count in dependents._set_deleted(value, changed_at)[1].items():
+                    counts[label] = counts.get(label, 0) + count
+            # created_date is auto_now, which update() skips; set it so sync
+            # deltas see the change and purge() can tell when a row died
+            counts[model._meta.label] = model._base_manager.using(self.db).filter(pk__in=pks).update(
+                delete_field=value, created_date=changed_at,
+            )
+            (soft_deleted if value == 'yes' else restored).send(sender=model, pks=pks)
+        return sum(counts.values()), counts
+
+    def purgeable(self):
+        """Soft-deleted rows that no live row still points at, so a hard
+        delete cannot cascade into data that is in use"""
+        queryset = self.dead()
+        for relation in self.model._meta.related_objects:
+            if relation.many_to_many:
+                continue
+            referencing = relation.related_model._base_manager.filter(**{f'{relation.field.name}__isnull': False})
+            if any(field.name == 'delete_field' for field in relation.related_model._meta.concrete_fields):
+                referencing = referencing.filter(delete_field='no')
+            queryset = queryset.exclude(pk__in=referencing.values(relation.field.attname))
+        return queryset
+
+    def purge(self, before, batch_size=PURGE_BATCH_SIZE):
+        """Hard delete purgeable rows soft-deleted before `before`, in
+        batches of `batch_size` rows per transaction. Stored files of the
+        purged rows are removed once each batch commits. Returns the
+        number of rows purged."""
+        file_fields = [field for field in self.model._meta.concrete_fields if isinstance(field, models.FileField)]
+        candidates = self.purgeable().filter(created_date__lt=before)
+        purged = 0
+        while True:
+            pks = list(candidates.values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                return purged
+            batch = self.model._base_manager.using(self.db).filter(pk__in=pks)
+            with transaction.atomic(using=self.db):
+                files = [
+                    (field.storage, name)
+                    for field in file_fields
+                    for name in batch.values_list(field.name, flat=True)
+                    if name
+                ]
+                batch.delete()
+                transaction.on_commit(partial(_delete_files, files), using=self.db)
+            purged += len(pks)
     
     def alive(self):
         return self.filter(delete_field="no")
@@ -59,7 +169,11 @@ class timeStamp(models.Model):
     delete_field = models.CharField(max_length=10, default="no")
     
     objects = timeStampManager()
-    default_objects = models.Manager()
+    default_objects = timeStampManager(alive_only=False)
+
+    # (model name, foreign key) pairs soft-deleted and restored with a row
+    soft_delete_cascade = ()
+
     class Meta:
         abstract = True
 
@@ -238,6 +352,11 @@ class contractorsTbl(timeStamp):
     created_by = models.ForeignKey(staffTbl, on_delete=models.CASCADE, blank=True, null=True, related_name="contractors_created_by")
     modified_by = models.ForeignKey(staffTbl, on_delete=models.CASCADE, blank=True, null=True, related_name="contractors_modified_by")
 
+    soft_delete_cascade = (
+        ('contratorDistrictAssignment', 'contractor'),
+        ('ContractorCertificateModel', 'contractor'),
+    )
+
     def __str__(self):
         return str(self.contractor_name)
 
@@ -271,6 +390,11 @@ class Feedback(timeStamp):
     created_by = models.ForeignKey(staffTbl, on_delete=models.CASCADE, blank=True, null=True, related_name="feedback_created_by")
     modified_by = models.ForeignKey(staffTbl, on_delete=models.CASCADE, blank=True, null=True, related_name="feedback_modified_by")
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['uid'], condition=Q(uid__gt=''), name='feedback_uid_uniq'),
+        ]
+
     def __str__(self):
         return str(self.title)
 
@@ -303,6 +427,9 @@ class mappedFarms(timeStamp):
     
     class Meta:
         verbose_name_plural = "Farm Mapping Exercise"
+        constraints = [
+            models.UniqueConstraint(fields=['uid'], condition=Q(uid__gt=''), name='mapped_farm_uid_uniq'),
+        ]
 
 class FarmValidation(timeStamp):
     field_uri = models.CharField(primary_key=True, unique=True, max_length=1000)
@@ -405,35 +532,27 @@ class PersonnelModel(timeStamp):
     uid = models.CharField(max_length=2500, blank=True, null=True)
     created_by = models.ForeignKey(staffTbl, on_delete=models.CASCADE, blank=True, null=True, related_name="personnel_created_by")
     modified_by = models.ForeignKey(staffTbl, on_delete=models.CASCADE, blank=True, null=True, related_name="personnel_modified_by")
-    
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['delete_field', 'created_date', 'id'], name='personnel_alive_created_idx'),
+            models.Index(fields=['delete_field', 'staff_id', 'id'], name='personnel_alive_staff_id_idx'),
+            models.Index(fields=['delete_field', 'first_name', 'id'], name='personnel_alive_first_name_idx'),
+            models.Index(fields=['delete_field', 'date_joined', 'id'], name='personnel_alive_joined_idx'),
+        ]
+
     def __str__(self):
         return f"{self.first_name} {self.surname}"
     
     def save(self, *args, **kwargs):
         """Generate staff_id based on personnel_type"""
-        # Handle staff_id generation
-        if not self.staff_id:  # Only generate if staff_id doesn't exist
-            if self.pk is None:
-                # New instance - save first to get an ID
-                super().save(*args, **kwargs)
-                
-                # Generate staff_id using the new ID
-                if self.personnel_type == "Rehab Assistant":
-                    self.staff_id = f"RA-{self.pk:06d}"
-                elif self.personnel_type == "Rehab Technician":
-                    self.staff_id = f"RT-{self.pk:06d}"
-                else:
-                    self.staff_id = f"ST-{self.pk:06d}"
-                
-                # Save again with staff_id - use update_fields to avoid recursion
-                kwargs.pop('force_insert', None)  # Remove force_insert if present
-                super().save(update_fields=['staff_id'])
-            else:
-                # Existing instance - just save normally
-                super().save(*args, **kwargs)
-        else:
-            # Staff_id already exists - just save normally
-            super().save(*args, **kwargs)
+        if not self.staff_id and self.pk is None:
+            # staff_id is derived from the id, so take the id from the
+            # sequence first and write the row with a single INSERT
+            self.pk = id_allocation.next_pks(PersonnelModel)[0]
+            self.staff_id = id_allocation.staff_id(self.personnel_type, self.pk)
+            kwargs['force_insert'] = True
+        super().save(*args, **kwargs)
 
 
 class posRoutemonitoring(timeStamp):
@@ -576,6 +695,16 @@ class DailyReportingModel(timeStamp):
     created_by = models.ForeignKey(staffTbl, on_delete=models.CASCADE, blank=True, null=True, related_name="daily_reporting_created_by")
     modified_by = models.ForeignKey(staffTbl, on_delete=models.CASCADE, blank=True, null=True, related_name="daily_reporting_modified_by")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['delete_field', 'reporting_date', 'id'], name='daily_report_alive_date_idx'),
+            models.Index(fields=['district', 'reporting_date', 'id'], condition=Q(delete_field='no'), name='daily_report_district_date_idx'),
+            models.Index(fields=['projectTbl_foreignkey', 'reporting_date', 'id'], condition=Q(delete_field='no'), name='daily_report_project_date_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['uid'], condition=Q(uid__gt=''), name='daily_report_uid_uniq'),
+        ]
+
     def __str__(self):
         return f"{self.agent} - {self.reporting_date}"
     
@@ -617,7 +746,17 @@ class ActivityReportingModel(timeStamp):
     # done_by_a_group = models.BooleanField(default=False)
     created_by = models.ForeignKey(staffTbl, on_delete=models.CASCADE, blank=True, null=True, related_name="activity_reporting_created_by")
     modified_by = models.ForeignKey(staffTbl, on_delete=models.CASCADE, blank=True, null=True, related_name="activity_reporting_modified_by")
-    
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['delete_field', 'reporting_date', 'id'], name='activity_report_alive_date_idx'),
+            models.Index(fields=['district', 'reporting_date', 'id'], condition=Q(delete_field='no'), name='activity_rep_district_date_idx'),
+            models.Index(fields=['projectTbl_foreignkey', 'reporting_date', 'id'], condition=Q(delete_field='no'), name='activity_rep_project_date_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['uid'], condition=Q(uid__gt=''), name='activity_report_uid_uniq'),
+        ]
+
     def __str__(self):
         return f"{self.agent} - {self.reporting_date}"
     
@@ -649,9 +788,6 @@ class QR_CodeModel(timeStamp):
     created_by = models.ForeignKey(staffTbl, on_delete=models.CASCADE, blank=True, null=True, related_name="qr_code_created_by")
     modified_by = models.ForeignKey(staffTbl, on_delete=models.CASCADE, blank=True, null=True, related_name="qr_code_modified_by")
 
-    # Add default_objects manager to bypass soft delete
-    default_objects = models.Manager()  
-    
     def __str__(self):
         return self.uid or f"QR Code {self.id}"
     
@@ -663,45 +799,17 @@ class QR_CodeModel(timeStamp):
     
     def generate_uid(self):
         """Generate UID in format: ACL-PLT-YEAR-TIME-00001"""
-        # This matches the plantation format
-        prefix = "ACL"
-        plantation = "PLT"
-        year = timezone.now().strftime('%Y')
-        time_part = timezone.now().strftime('%H%M')
-        
-        # Get the last QR code with similar pattern
-        try:
-            last_qr = QR_CodeModel.default_objects.filter(
-                uid__startswith=f"{prefix}-{plantation}-{year}-{time_part}"
-            ).order_by('-id').first()
-        except:
-            last_qr = QR_CodeModel.objects.filter(
-                uid__startswith=f"{prefix}-{plantation}-{year}-{time_part}"
-            ).order_by('-id').first()
-        
-        if last_qr and last_qr.uid:
-            try:
-                parts = last_qr.uid.split('-')
-                if len(parts) >= 5:
-                    last_num = int(parts[4])
-                    new_num = last_num + 1
-                else:
-                    new_num = 1
-            except (ValueError, IndexError):
-                new_num = 1
-        else:
-            new_num = 1
-        
-        sequential = f"{new_num:05d}"
-        uid = f"{prefix}-{plantation}-{year}-{time_part}-{sequential}"
-        return uid
+        return id_allocation.qr_uids(1)[0]
     
     def save(self, *args, **kwargs):
         # ONLY generate UID if it's not set - never overwrite
-        if not self.uid:
+        if self.uid:
+            # Don't convert to uppercase automatically
+            return super().save(*args, **kwargs)
+        # The counter row stays locked until the INSERT commits, so a failed save returns its number
+        with transaction.atomic(using=kwargs.get('using')):
             self.uid = self.generate_uid()
-        # Don't convert to uppercase automatically
-        super().save(*args, **kwargs)
+            super().save(*args, **kwargs)
     
     def delete(self, *args, **kwargs):
         # Delete the image file when model is deleted
@@ -713,6 +821,18 @@ class QR_CodeModel(timeStamp):
 
 
         
+def lng_lat_point(lng='lng', lat='lat'):
+    """ST_SetSRID(ST_MakePoint(lng, lat), 4326) over two float columns. The
+    growth tile layer (portal.tiles) filters on this exact expression so
+    PostgreSQL can use growth_point_gist_idx."""
+    return models.Func(
+        models.Func(F(lng), F(lat), function='ST_MakePoint'),
+        models.Value(4326),
+        function='ST_SetSRID',
+        output_field=GeometryField(srid=4326),
+    )
+
+
 class GrowthMonitoringModel(timeStamp):
     """Model for Growth Monitoring module"""
     uid = models.CharField(max_length=2500, blank=True, null=True)
@@ -731,6 +851,16 @@ class GrowthMonitoringModel(timeStamp):
     created_by = models.ForeignKey(staffTbl, on_delete=models.CASCADE, blank=True, null=True, related_name="growth_monitoring_created_by")
     modified_by = models.ForeignKey(staffTbl, on_delete=models.CASCADE, blank=True, null=True, related_name="growth_monitoring_modified_by")
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['uid'], condition=Q(uid__gt=''), name='growth_monitoring_uid_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['district', 'date', 'id'], condition=Q(delete_field='no'), name='growth_district_date_idx'),
+            models.Index(fields=['projectTbl_foreignkey', 'date', 'id'], condition=Q(delete_field='no'), name='growth_project_date_idx'),
+            GistIndex(lng_lat_point(), condition=Q(delete_field='no'), name='growth_point_gist_idx'),
+        ]
+
     def __str__(self):
         return f"{self.plant_uid} - {self.date}"
     
@@ -755,7 +885,15 @@ class OutbreakFarmModel(timeStamp):
     region = models.ForeignKey(Region, on_delete=models.CASCADE, blank=True, null=True)
     created_by = models.ForeignKey(staffTbl, on_delete=models.CASCADE, blank=True, null=True, related_name="outbreak_farm_model_created_by")
     modified_by = models.ForeignKey(staffTbl, on_delete=models.CASCADE, blank=True, null=True, related_name="outbreak_farm_model_modified_by")
-    
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['delete_field', 'date_reported', 'id'], name='outbreak_model_alive_rep_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['uid'], condition=Q(uid__gt=''), name='outbreak_model_uid_uniq'),
+        ]
+
     def __str__(self):
         return f"{self.farmer_name} - {self.disease_type}"
 
@@ -772,6 +910,8 @@ class ContractorCertificateModel(timeStamp):
     district = models.ForeignKey(cocoaDistrict, on_delete=models.CASCADE, blank=True, null=True)
     created_by = models.ForeignKey(staffTbl, on_delete=models.CASCADE, blank=True, null=True, related_name="contractor_certificate_created_by")
     modified_by = models.ForeignKey(staffTbl, on_delete=models.CASCADE, blank=True, null=True, related_name="contractor_certificate_modified_by")
+
+    soft_delete_cascade = (('ContractorCertificateVerificationModel', 'certificate'),)
     
     def __str__(self):
         return f"{self.contractor} - {self.work_type}"
@@ -833,7 +973,17 @@ class IrrigationModel(timeStamp):
     district = models.ForeignKey(cocoaDistrict, on_delete=models.CASCADE, blank=True, null=True)
     created_by = models.ForeignKey(staffTbl, on_delete=models.CASCADE, blank=True, null=True, related_name="irrigation_created_by")
     modified_by = models.ForeignKey(staffTbl, on_delete=models.CASCADE, blank=True, null=True, related_name="irrigation_modified_by")
-    
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['delete_field', 'date', 'id'], name='irrigation_alive_date_idx'),
+            models.Index(fields=['district', 'date', 'id'], condition=Q(delete_field='no'), name='irrigation_district_date_idx'),
+            models.Index(fields=['projectTbl_foreignkey', 'date', 'id'], condition=Q(delete_field='no'), name='irrigation_project_date_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['uid'], condition=Q(uid__gt=''), name='irrigation_uid_uniq'),
+        ]
+
     def __str__(self):
         return f"{self.farm} - {self.irrigation_type}"
 
@@ -851,6 +1001,11 @@ class VerifyRecord(timeStamp):
     created_by = models.ForeignKey(staffTbl, on_delete=models.CASCADE, blank=True, null=True, related_name="verify_created_by")
     modified_by = models.ForeignKey(staffTbl, on_delete=models.CASCADE, blank=True, null=True, related_name="verify_modified_by")
     
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['uid'], condition=Q(uid__gt=''), name='verify_record_uid_uniq'),
+        ]
+
     def __str__(self):
         return f"{self.farmRef} - {self.timestamp}"
 
@@ -889,7 +1044,12 @@ class PaymentReport(timeStamp):
     projectTbl_foreignkey = models.ForeignKey(projectTbl, on_delete=models.CASCADE, blank=True, null=True)
     created_by = models.ForeignKey(staffTbl, on_delete=models.CASCADE, blank=True, null=True, related_name="payment_report_created_by")
     modified_by = models.ForeignKey(staffTbl, on_delete=models.CASCADE, blank=True, null=True, related_name="payment_report_modified_by")
-    
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['delete_field', 'created_date', 'id'], name='payment_alive_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.ra_name} - {self.month} {self.year}"
 
@@ -923,7 +1083,14 @@ class DetailedPaymentReport(timeStamp):
     act_code = models.CharField(max_length=250, blank=True, null=True)
     created_by = models.ForeignKey(staffTbl, on_delete=models.CASCADE, blank=True, null=True, related_name="detailed_payment_report_created_by")
     modified_by = models.ForeignKey(staffTbl, on_delete=models.CASCADE, blank=True, null=True, related_name="detailed_payment_report_modified_by")
-    
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['delete_field', 'created_date', 'id'], name='detailed_pay_alive_created_idx'),
+            models.Index(fields=['district', 'created_date', 'id'], condition=Q(delete_field='no'), name='detailed_pay_district_crt_idx'),
+            models.Index(fields=['projectTbl_foreignkey', 'created_date', 'id'], condition=Q(delete_field='no'), name='detailed_pay_project_crt_idx'),
+        ]
+
     def __str__(self):
         return f"{self.ra_name} - {self.activity} - {self.month}/{self.year}"
 
@@ -1066,24 +1233,24 @@ class EquipmentModel(timeStamp):
     uid = models.CharField(max_length=2500, blank=True, null=True)
     created_by = models.ForeignKey(staffTbl, on_delete=models.CASCADE, blank=True, null=True, related_name="equipment_created_by")
     modified_by = models.ForeignKey(staffTbl, on_delete=models.CASCADE, blank=True, null=True, related_name="equipment_modified_by")
-    
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['delete_field', 'created_date', 'id'], name='equipment_alive_created_idx'),
+        ]
+
+    soft_delete_cascade = (('EquipmentAssignmentModel', 'equipment'),)
+
     def __str__(self):
         return f"{self.equipment_code} - {self.equipment}"
     
     def save(self, *args, **kwargs):
-        if not self.equipment_code:
-            # Generate equipment code (e.g., EQ-2024-0001)
-            last_equip = EquipmentModel.objects.order_by('-id').first()
-            if last_equip and last_equip.equipment_code:
-                try:
-                    last_num = int(last_equip.equipment_code.split('-')[-1])
-                    new_num = last_num + 1
-                except:
-                    new_num = 1
-            else:
-                new_num = 1
-            self.equipment_code = f"EQ-{timezone.now().year}-{new_num:04d}"
-        super().save(*args, **kwargs)
+        if self.equipment_code:
+            return super().save(*args, **kwargs)
+        # Generate equipment code (e.g., EQ-2024-0001) in the INSERT's transaction
+        with transaction.atomic(using=kwargs.get('using')):
+            self.equipment_code = id_allocation.equipment_codes(1)[0]
+            super().save(*args, **kwargs)
 
 class EquipmentAssignmentModel(timeStamp):
     """Model for Equipment Assignment to staff/projects"""
@@ -1100,7 +1267,12 @@ class EquipmentAssignmentModel(timeStamp):
     uid = models.CharField(max_length=2500, blank=True, null=True)
     created_by = models.ForeignKey(staffTbl, on_delete=models.CASCADE, blank=True, null=True, related_name="equipment_assignment_created_by")
     modified_by = models.ForeignKey(staffTbl, on_delete=models.CASCADE, blank=True, null=True, related_name="equipment_assignment_modified_by")
-    
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['delete_field', 'assignment_date', 'id'], name='assignment_alive_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.equipment} assigned to {self.assigned_to}"
 
@@ -1144,21 +1316,60 @@ class OutbreakFarm(timeStamp):
     uid = models.CharField(max_length=2500, blank=True, null=True)
     created_by = models.ForeignKey(staffTbl, on_delete=models.CASCADE, blank=True, null=True, related_name="outbreak_farm_created_by")
     modified_by = models.ForeignKey(staffTbl, on_delete=models.CASCADE, blank=True, null=True, related_name="outbreak_farm_modified_by")
-    
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['delete_field', 'inspection_date', 'id'], name='outbreak_alive_inspection_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['uid'], condition=Q(uid__gt=''), name='outbreak_farm_uid_uniq'),
+        ]
+
     def __str__(self):
         return f"{self.outbreak_id} - {self.farmer_name} - {self.disease_type}"
     
     def save(self, *args, **kwargs):
-        if not self.outbreak_id:
-            # Generate outbreak ID (e.g., OB-2024-0001)
-            last_outbreak = OutbreakFarm.objects.order_by('-id').first()
-            if last_outbreak and last_outbreak.outbreak_id:
-                try:
-                    last_num = int(last_outbreak.outbreak_id.split('-')[-1])
-                    new_num = last_num + 1
-                except:
-                    new_num = 1
-            else:
-                new_num = 1
-            self.outbreak_id = f"OB-{timezone.now().year}-{new_num:04d}"
-        super().save(*args, **kwargs)
\ No newline at end of file
+        if self.outbreak_id:
+            return super().save(*args, **kwargs)
+        # Generate outbreak ID (e.g., OB-2024-0001) in the INSERT's transaction
+        with transaction.atomic(using=kwargs.get('using')):
+            self.outbreak_id = id_allocation.outbreak_ids(1)[0]
+            super().save(*args, **kwargs)
+
+# ============== DASHBOARD ROLLUPS ==============
+
+class DashboardRollup(models.Model):
+    """Pre-aggregated dashboard counters, one row per metric/day/district/project/bucket.
+    Maintained by portal.rollups from save/delete signals and the
+    rebuild_dashboard_rollups management command."""
+    metric = models.CharField(max_length=100)
+    day = models.DateField(blank=True, null=True)
+    district = models.ForeignKey(cocoaDistrict, on_delete=models.CASCADE, blank=True, null=True, related_name="dashboard_rollups")
+    project = models.ForeignKey(projectTbl, on_delete=models.CASCADE, blank=True, null=True, related_name="dashboard_rollups")
+    bucket = models.TextField(blank=True, null=True)
+    count = models.IntegerField(default=0)
+    value_sum = models.FloatField(default=0)
+    value_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['metric', 'day'], name='portal_rollup_metric_day_idx'),
+            models.Index(fields=['metric', 'district', 'project'], name='portal_rollup_metric_area_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.metric} - {self.day} - {self.bucket}: {self.count}"
+
+# ============== ID COUNTERS ==============
+
+class IdCounter(models.Model):
+    """Last number handed out per business ID series; see portal.id_allocation"""
+    name = models.CharField(max_length=100, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'portal_idcounter'
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
@@ -0,0 +1,83 @@
+"""
+Bulk QR code generation (the generate_qr_codes view and command).
+
+UIDs keep the ACL-PLT-<year>-<HHMM>-<n> format. A job reserves all of
+its numbers in one statement (portal.id_allocation) instead of scanning
+for the last code, so concurrent jobs never hand out the same number.
+PNGs are rendered in-process; the generate_qr_codes command passes a
+process pool (render_pool) for large jobs. Each chunk's files are then
+written and its rows inserted with a single bulk INSERT.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from portal import id_allocation
+from portal.models import QR_CodeModel
+from portal.qr_render import qr_payload, render_png
+
+CHUNK_SIZE = 1000
+# Below this many codes rendering in-process beats starting workers
+POOL_THRESHOLD = getattr(settings, 'QR_RENDER_POOL_THRESHOLD', 200)
+RENDER_WORKERS = getattr(settings, 'QR_RENDER_WORKERS', None)  # None: one per CPU
+# Workers import only portal.qr_render, so spawn works wherever the
+# command runs and no forked copy of the parent's DB connections exists
+RENDER_START_METHOD = getattr(settings, 'QR_RENDER_START_METHOD', 'spawn')
+
+
+def render_pool(quantity, workers=RENDER_WORKERS):
+    """Process pool for rendering `quantity` codes, or None when the job
+    is too small to be worth starting workers. For the management command
+    only; web requests render in-process."""
+    if quantity < POOL_THRESHOLD:
+        return None
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context(RENDER_START_METHOD),
+    )
+
+
+def _write_chunk(codes, images, created_by):
+    """Store the images and insert the rows; files written before a failed
+    INSERT are removed again"""
+    names = []
+    try:
+        for code, image in zip(codes, images):
+            filename = f"{code['uid']}_{code['generated_at']:%Y%m%d_%H%M%S}.png"
+            names.append(default_storage.save(f"qr_codes/{filename}", ContentFile(image)))
+        with transaction.atomic():
+            return QR_CodeModel.objects.bulk_create([
+                QR_CodeModel(uid=code['uid'], qr_code=name, created_by=created_by)
+                for code, name in zip(codes, names)
+            ])
+    except Exception:
+        for name in names:
+            default_storage.delete(name)
+        raise
+
+
+def generate(quantity, created_by=None, pool=None, chunk_size=CHUNK_SIZE):
+    """Create `quantity` QR codes. Yields ([QR_CodeModel], [png bytes])
+    per chunk as it is written, so callers can report progress or keep
+    previews without holding the whole job in memory. Images are rendered
+    in `pool` if given (see render_pool), otherwise in-process; the caller
+    owns the pool and shuts it down."""
+    generated_at = timezone.now()
+    codes = [
+        {'uid': uid, 'generated_at': generated_at}
+        for uid in id_allocation.qr_uids(quantity, generated_at)
+    ]
+
+    for start in range(0, quantity, chunk_size):
+        chunk = codes[start:start + chunk_size]
+        payloads = [qr_payload(code['uid'], generated_at) for code in chunk]
+        if pool:
+            images = list(pool.map(render_png, payloads, chunksize=max(1, len(payloads) // 32)))
+        else:
+            images = [render_png(payload) for payload in payloads]
+        yield _write_chunk(chunk, images, created_by), images
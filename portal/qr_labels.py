@@ -0,0 +1,177 @@
+"""
+Printable QR label sheets (download_bulk_qr_codes).
+
+Labels are drawn straight onto a ReportLab canvas, 3 x 3 per A4 page, with
+no platypus flowables or tables. Each QR symbol is drawn as vector
+rectangles rebuilt from its payload (see qr_render.qr_payload), so no
+PNG is read from disk and a page is a few kilobytes. A code whose payload
+cannot be rebuilt (its image was not made by qr_generation) falls back to
+the stored PNG.
+
+ReportLab writes the file only on save(). Sheets are therefore rendered
+into a temporary file and kept in storage under QR_LABEL_DIR, named by a
+hash of the codes on them. Later downloads of the same selection are
+streamed straight from storage. A cached sheet is served again later, so it
+carries no render timestamp. Sheets older than QR_LABEL_TTL are removed by
+purge_label_sheets(), which label_sheet() runs at most once per
+QR_LABEL_PURGE_INTERVAL and the purge_qr_labels command runs nightly.
+"""
+import hashlib
+import re
+import tempfile
+from datetime import datetime, timedelta
+
+import qrcode
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+from portal.qr_render import qr_payload
+
+# Bump when the layout changes so cached sheets are not reused
+LAYOUT_VERSION = 2
+LABEL_DIR = getattr(settings, 'QR_LABEL_DIR', 'qr_labels')
+LABEL_TTL = getattr(settings, 'QR_LABEL_TTL', 24 * 60 * 60)
+LABEL_PURGE_INTERVAL = getattr(settings, 'QR_LABEL_PURGE_INTERVAL', 60 * 60)
+
+COLS = 3
+ROWS_PER_PAGE = 3
+MARGIN = 10 * mm
+PADDING = 4 * mm
+QR_SIZE = 55 * mm
+LABEL_HEIGHT = 12 * mm
+CELL_WIDTH = QR_SIZE + 2 * PADDING
+CELL_HEIGHT = QR_SIZE + LABEL_HEIGHT + 2 * PADDING
+HEADER_HEIGHT = 20 * mm
+
+# qr_codes/<uid>_<YYYYmmdd_HHMMSS>[_<storage suffix>].png
+_GENERATED_AT = re.compile(r'_(\d{8}_\d{6})(?:_[A-Za-z0-9]+)?\.png$')
+
+
+def _payload(uid, image_name):
+    """The text encoded when the image was generated, or None"""
+    match = _GENERATED_AT.search(image_name or '')
+    if not uid or not match:
+        return None
+    return qr_payload(uid, datetime.strptime(match.group(1), '%Y%m%d_%H%M%S'))
+
+
+def draw_qr(c, payload, x, y, size):
+    """QR symbol for `payload` as one filled path, lower left corner at x, y"""
+    qr = qrcode.QRCode(version=1, error_correction=qrcode.constants.ERROR_CORRECT_L, border=4)
+    qr.add_data(payload)
+    qr.make(fit=True)
+    matrix = qr.get_matrix()
+    module = size / len(matrix)
+
+    path = c.beginPath()
+    for row_index, row in enumerate(matrix):
+        bottom = y + size - (row_index + 1) * module
+        start = None
+        # One rectangle per horizontal run of dark modules
+        for col_index, dark in enumerate([*row, False]):
+            if dark and start is None:
+                start = col_index
+            elif not dark and start is not None:
+                path.rect(x + start * module, bottom, (col_index - start) * module, module)
+                start = None
+    c.drawPath(path, stroke=0, fill=1)
+
+
+def _draw_png(c, image_name, x, y, size):
+    try:
+        with default_storage.open(image_name, 'rb') as file:
+            c.drawImage(ImageReader(file), x, y, width=size, height=size)
+        return True
+    except Exception:
+        # Unreadable file: leave the cell without a symbol
+        return False
+
+
+def _draw_label(c, pk, uid, image_name, x, y):
+    c.setStrokeColor(colors.HexColor('#cccccc'))
+    c.setFillColor(colors.HexColor('#fafafa'))
+    c.setLineWidth(0.5)
+    c.rect(x, y, CELL_WIDTH, CELL_HEIGHT, stroke=1, fill=1)
+
+    qr_x, qr_y = x + PADDING, y + PADDING + LABEL_HEIGHT
+    c.setFillColor(colors.black)
+    payload = _payload(uid, image_name)
+    if payload:
+        draw_qr(c, payload, qr_x, qr_y, QR_SIZE)
+    else:
+        _draw_png(c, image_name, qr_x, qr_y, QR_SIZE)
+
+    c.setFont('Helvetica-Bold', 10)
+    c.drawCentredString(x + CELL_WIDTH / 2, y + PADDING + LABEL_HEIGHT / 2 - 2, uid or f'ID-{pk}')
+
+
+def render(codes, out):
+    """Write the label sheet PDF for [(pk, uid, image name)] to `out`"""
+    c = canvas.Canvas(out, pagesize=A4, pageCompression=1)
+    c.setTitle('QR Codes Report')
+    width, height = A4
+    left = (width - COLS * CELL_WIDTH) / 2
+    per_page = COLS * ROWS_PER_PAGE
+
+    for page_start in range(0, len(codes), per_page):
+        top = height - MARGIN
+        if page_start == 0:
+            c.setFillColor(colors.black)
+            c.setFont('Helvetica-Bold', 14)
+            c.drawCentredString(width / 2, top - 6 * mm, 'QR Codes Report')
+            c.setFillColor(colors.HexColor('#666666'))
+            c.setFont('Helvetica', 9)
+            c.drawCentredString(width / 2, top - 12 * mm, f"Total: {len(codes)}")
+            top -= HEADER_HEIGHT
+        for index, (pk, uid, image_name) in enumerate(codes[page_start:page_start + per_page]):
+            row, col = divmod(index, COLS)
+            _draw_label(c, pk, uid, image_name, left + col * CELL_WIDTH, top - (row + 1) * CELL_HEIGHT)
+        c.showPage()
+    c.save()
+
+
+def sheet_name(codes):
+    digest = hashlib.sha1(repr((LAYOUT_VERSION, codes)).encode()).hexdigest()
+    return f'{LABEL_DIR}/{digest}.pdf'
+
+
+def label_sheet(codes):
+    """Storage name of the label sheet for [(pk, uid, image name)],
+    rendered on first request and reused afterwards"""
+    if cache.add('qr_labels:purged', True, LABEL_PURGE_INTERVAL):
+        purge_label_sheets()
+    name = sheet_name(codes)
+    if default_storage.exists(name):
+        return name
+    with tempfile.TemporaryFile() as tmp:
+        render(codes, tmp)
+        tmp.seek(0)
+        return default_storage.save(name, File(tmp, name=name))
+
+
+def purge_label_sheets(max_age=LABEL_TTL):
+    """Remove label sheets under LABEL_DIR written more than `max_age`
+    seconds ago. Returns the number removed."""
+    try:
+        _, names = default_storage.listdir(LABEL_DIR)
+    except FileNotFoundError:
+        return 0
+    cutoff = timezone.now() - timedelta(seconds=max_age)
+    removed = 0
+    for name in names:
+        path = f'{LABEL_DIR}/{name}'
+        try:
+            if default_storage.get_modified_time(path) < cutoff:
+                default_storage.delete(path)
+                removed += 1
+        except (OSError, NotImplementedError):
+            continue
+    return removed
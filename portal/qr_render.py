@@ -0,0 +1,30 @@
+"""
+QR payload text and PNG rendering.
+
+Kept free of Django imports: render pool workers import only this module,
+so they start under any multiprocessing start method (spawn and
+forkserver re-import the target module without the app registry).
+"""
+import io
+
+import qrcode
+
+
+def qr_payload(uid, generated_at):
+    """Text encoded in the QR image"""
+    return f"{uid}\nGenerated: {generated_at:%Y-%m-%d %H:%M:%S}\nPlantation ID"
+
+
+def render_png(payload):
+    """PNG bytes of the QR code for `payload`; runs in pool workers"""
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(payload)
+    qr.make(fit=True)
+    buffer = io.BytesIO()
+    qr.make_image(fill_color="black", back_color="white").save(buffer, format='PNG')
+    return buffer.getvalue()
@@ -0,0 +1,441 @@
+"""
+Dashboard rollups.
+
+The general dashboard used to run one COUNT/SUM/AVG per statistic over the
+raw tables on every page load. Instead, every statistic is declared here as
+a metric over a source model, pre-aggregated into DashboardRollup rows keyed
+by (metric, day, district, project, bucket), and read back with a single
+grouped query.
+
+Rows are kept current from save/delete signals (see portal/signals.py),
+which recompute only the slices an instance belongs to; a soft_delete() or
+restore() batch sends one signal covering all its rows. Metrics without a
+day/district/project key (region, activity_type) are not refreshed from
+signals, and other bulk writes (bulk_create, queryset.update) bypass them,
+so the rebuild_dashboard_rollups command must also run periodically (see
+deploy/crontab); it is the way to force a full rebuild.
+
+Each slice is aggregated and replaced inside one transaction that holds a
+Postgres advisory lock on the slice, so two workers refreshing the same
+slice cannot interleave their delete and insert and leave it double counted
+or stale. A full rebuild takes the metric's lock exclusively, slice
+refreshes take it shared.
+"""
+import logging
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Q, F, Value, Case, When, Count, Sum, CharField, DateField
+from django.db.models.functions import TruncDate
+
+from portal.models import (
+    DashboardRollup,
+    PersonnelModel, staffTbl, SectorModel, GrowthMonitoringModel, QR_CodeModel,
+    PersonnelAssignmentModel, contractorsTbl, contratorDistrictAssignment,
+    ContractorCertificateModel, DailyReportingModel, ActivityReportingModel,
+    IrrigationModel, Region, cocoaDistrict, Community, projectTbl, Activities,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# Each metric aggregates `model` (alive rows only) grouped by the optional
+# day/district/project/bucket expressions. `value` is summed and counted
+# (non-null) so both totals and averages can be derived from the rollup.
+ROLLUP_METRICS = {
+    'personnel': {
+        'model': PersonnelModel,
+        'bucket': 'personnel_type',
+        'district': 'district',
+        'project': 'projectTbl_foreignkey',
+    },
+    'personnel.gender': {
+        'model': PersonnelModel,
+        'bucket': 'gender',
+        'district': 'district',
+        'project': 'projectTbl_foreignkey',
+    },
+    'staff': {
+        'model': staffTbl,
+        'bucket': Case(
+            When(Q(staffid__icontains='PO-') | Q(staffid__icontains='PC-'), then=Value('po')),
+            default=Value('other'),
+            output_field=CharField(),
+        ),
+        'district': 'projectTbl_foreignkey__district',
+        'project': 'projectTbl_foreignkey',
+    },
+    'sector.area': {
+        'model': SectorModel,
+        'value': 'size_Ha',
+        'district': 'created_by__projectTbl_foreignkey__district',
+        'project': 'created_by__projectTbl_foreignkey',
+    },
+    'sector.ph': {
+        'model': SectorModel,
+        'value': 'mean_pH',
+        'district': 'created_by__projectTbl_foreignkey__district',
+        'project': 'created_by__projectTbl_foreignkey',
+    },
+    'sector.oc': {
+        'model': SectorModel,
+        'value': 'mean_OC',
+        'district': 'created_by__projectTbl_foreignkey__district',
+        'project': 'created_by__projectTbl_foreignkey',
+    },
+    'growth.height': {
+        'model': GrowthMonitoringModel,
+        'bucket': 'leaf_color',
+        'value': 'height',
+        'day': 'date',
+        'district': 'district',
+        'project': 'projectTbl_foreignkey',
+    },
+    'growth.leaves': {
+        'model': GrowthMonitoringModel,
+        'value': 'number_of_leaves',
+        'day': 'date',
+        'district': 'district',
+        'project': 'projectTbl_foreignkey',
+    },
+    'qr.used': {
+        'model': QR_CodeModel,
+        'bucket': 'is_used',
+        'day': TruncDate('created_date'),
+    },
+    'qr.active': {
+        'model': QR_CodeModel,
+        'bucket': 'is_active',
+        'day': TruncDate('created_date'),
+    },
+    'assignment': {
+        'model': PersonnelAssignmentModel,
+        'bucket': 'status',
+        'day': TruncDate('created_date'),
+        'district': 'district',
+        'project': 'projectTbl_foreignkey',
+    },
+    'contractor': {
+        'model': contractorsTbl,
+        'bucket': 'interested_services',
+        'district': 'district',
+    },
+    # One row per (district, contractor) so distinct contractors per district
+    # can be counted from the rollup.
+    'contractor.district': {
+        'model': contratorDistrictAssignment,
+        'bucket': 'contractor_id',
+        'district': 'district',
+        'filter': Q(contractor__isnull=False),
+    },
+    'certificate': {
+        'model': ContractorCertificateModel,
+        'bucket': 'status',
+        'district': 'district',
+        'project': 'projectTbl_foreignkey',
+    },
+    'certificate.verified': {
+        'model': ContractorCertificateModel,
+        'bucket': 'contractor_id',
+        'district': 'district',
+        'project': 'projectTbl_foreignkey',
+        'filter': Q(status='Verified'),
+    },
+    'daily': {
+        'model': DailyReportingModel,
+        'bucket': 'activity__sub_activity',
+        'value': 'area_covered_ha',
+        'day': 'reporting_date',
+        'district': 'district',
+        'project': 'projectTbl_foreignkey',
+    },
+    'activity': {
+        'model': ActivityReportingModel,
+        'bucket': 'activity__sub_activity',
+        'value': 'area_covered_ha',
+        'day': 'reporting_date',
+        'district': 'district',
+        'project': 'projectTbl_foreignkey',
+    },
+    'irrigation': {
+        'model': IrrigationModel,
+        'bucket': 'irrigation_type__irrigation_type',
+        'value': 'water_volume',
+        'day': 'date',
+        'district': 'district',
+        'project': 'projectTbl_foreignkey',
+    },
+    'region': {
+        'model': Region,
+    },
+    'district': {
+        'model': cocoaDistrict,
+        'district': 'id',
+    },
+    'community': {
+        'model': Community,
+        'district': 'district',
+    },
+    'project': {
+        'model': projectTbl,
+        'district': 'district',
+    },
+    'activity_type': {
+        'model': Activities,
+        'bucket': 'main_activity',
+    },
+}
+
+KEY_FIELDS = ('day', 'district', 'project')
+
+
+def is_keyed(spec):
+    """Whether a metric is split into (day, district, project) slices.
+    An unkeyed metric is one whole-table aggregate, too costly to redo on
+    every save; it is refreshed by rebuild_rollups only."""
+    return any(spec.get(field) is not None for field in KEY_FIELDS)
+
+
+def metrics_for_model(model):
+    """Names of the metrics aggregated from `model`"""
+    return [name for name, spec in ROLLUP_METRICS.items() if spec['model'] is model]
+
+
+def signal_models():
+    """Models whose saves refresh rollup slices"""
+    return {spec['model'] for spec in ROLLUP_METRICS.values() if is_keyed(spec)}
+
+
+def _expression(value):
+    return F(value) if isinstance(value, str) else value
+
+
+def _annotated(spec, include_deleted=False):
+    """Source queryset annotated with the rollup_* key expressions of a metric"""
+    model = spec['model']
+    queryset = model._base_manager.all() if include_deleted else model.objects.all()
+    if spec.get('filter') is not None:
+        queryset = queryset.filter(spec['filter'])
+    annotations = {
+        f'rollup_{key}': _expression(spec[key])
+        for key in KEY_FIELDS + ('bucket',) if spec.get(key) is not None
+    }
+    return queryset.annotate(**annotations)
+
+
+def _key_filter(spec, key):
+    """Q restricting an annotated source queryset to one (day, district, project) slice"""
+    query = Q()
+    for field, value in zip(KEY_FIELDS, key):
+        if spec.get(field) is None:
+            continue
+        if value is None:
+            query &= Q(**{f'rollup_{field}__isnull': True})
+        else:
+            query &= Q(**{f'rollup_{field}': value})
+    return query
+
+
+def _rollup_filter(metric, spec, key):
+    """Q selecting the DashboardRollup rows of one slice"""
+    query = Q(metric=metric)
+    for field, value in zip(KEY_FIELDS, key):
+        if spec.get(field) is None:
+            continue
+        lookup = 'day' if field == 'day' else f'{field}_id'
+        if value is None:
+            query &= Q(**{f'{lookup}__isnull': True})
+        else:
+            query &= Q(**{lookup: value})
+    return query
+
+
+def _aggregate(metric, spec, key=None):
+    """Aggregate a metric's source rows into unsaved DashboardRollup objects"""
+    queryset = _annotated(spec)
+    if key is not None:
+        queryset = queryset.filter(_key_filter(spec, key))
+
+    group_by = [f'rollup_{field}' for field in KEY_FIELDS + ('bucket',) if spec.get(field) is not None]
+    aggregates = {'rollup_count': Count('pk')}
+    if spec.get('value'):
+        aggregates['rollup_value_sum'] = Sum(spec['value'])
+        aggregates['rollup_value_count'] = Count(spec['value'])
+
+    if group_by:
+        rows = queryset.values(*group_by).annotate(**aggregates).order_by()
+    else:
+        rows = [queryset.aggregate(**aggregates)]
+
+    rollups = []
+    for row in rows:
+        if not row['rollup_count']:
+            continue
+        bucket = row.get('rollup_bucket')
+        rollups.append(DashboardRollup(
+            metric=metric,
+            day=row.get('rollup_day'),
+            district_id=row.get('rollup_district'),
+            project_id=row.get('rollup_project'),
+            bucket=str(bucket) if bucket is not None else None,
+            count=row['rollup_count'],
+            value_sum=float(row.get('rollup_value_sum') or 0),
+            value_count=row.get('rollup_value_count') or 0,
+        ))
+    return rollups
+
+
+def _lock(name, shared=False):
+    """Transaction-level advisory lock on `name`, released at commit/rollback"""
+    function = 'pg_advisory_xact_lock_shared' if shared else 'pg_advisory_xact_lock'
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT {function}(hashtext(%s))", [name])
+
+
+def rebuild_rollups(metrics=None):
+    """Recompute every slice of the given metrics (all metrics by default)"""
+    metrics = metrics or list(ROLLUP_METRICS)
+    created = 0
+    for metric in metrics:
+        spec = ROLLUP_METRICS[metric]
+        with transaction.atomic():
+            _lock(f'rollup:{metric}')
+            rollups = _aggregate(metric, spec)
+            DashboardRollup.objects.filter(metric=metric).delete()
+            DashboardRollup.objects.bulk_create(rollups, batch_size=1000)
+        created += len(rollups)
+    return created
+
+
+def slice_keys(model, pks, include_deleted=False):
+    """Map each metric of `model` to the (day, district, project) slices the
+    given rows fall into; `include_deleted` also finds soft-deleted rows"""
+    keys = {}
+    for metric in metrics_for_model(model):
+        spec = ROLLUP_METRICS[metric]
+        if not is_keyed(spec):
+            continue
+        fields = [f'rollup_{field}' for field in KEY_FIELDS if spec.get(field) is not None]
+        keys[metric] = {
+            tuple(row.get(f'rollup_{field}') for field in KEY_FIELDS)
+            for row in _annotated(spec, include_deleted).filter(pk__in=pks).values(*fields)
+        }
+    return keys
+
+
+def refresh_slices(keys):
+    """Recompute the rollup rows for {metric: {(day, district, project), ...}}"""
+    for metric, metric_keys in keys.items():
+        spec = ROLLUP_METRICS[metric]
+        for key in metric_keys:
+            with transaction.atomic():
+                _lock(f'rollup:{metric}', shared=True)
+                _lock(f'rollup:{metric}:' + ':'.join(str(part) for part in key))
+                rollups = _aggregate(metric, spec, key)
+                DashboardRollup.objects.filter(_rollup_filter(metric, spec, key)).delete()
+                DashboardRollup.objects.bulk_create(rollups)
+
+
+class RollupSnapshot:
+    """All dashboard rollups read in one grouped query.
+
+    Per-day rows older than `window_start` are folded together, so the
+    result size depends on the number of metrics, buckets and districts,
+    not on how much history the source tables hold.
+    """
+
+    def __init__(self, window_start):
+        self.window_start = window_start
+        window_day = Case(
+            When(day__gte=window_start, then=F('day')),
+            default=Value(None),
+            output_field=DateField(),
+        )
+        self.rows = list(
+            DashboardRollup.objects
+            .annotate(window_day=window_day)
+            .values('metric', 'bucket', 'window_day', 'district__name', 'project__name')
+            .annotate(
+                total_count=Sum('count'),
+                total_value=Sum('value_sum'),
+                total_value_count=Sum('value_count'),
+            )
+            .order_by()
+        )
+        self.by_metric = defaultdict(list)
+        for row in self.rows:
+            self.by_metric[row['metric']].append(row)
+
+    def _rows(self, metric, buckets=None):
+        rows = self.by_metric.get(metric, [])
+        if buckets is not None:
+            buckets = {str(bucket) for bucket in buckets}
+            rows = [row for row in rows if row['bucket'] in buckets]
+        return rows
+
+    def count(self, metric, buckets=None, day=None, since=None):
+        """Row count of a metric, optionally for one day or from a day onwards (within the window)"""
+        rows = self._rows(metric, buckets)
+        if day is not None:
+            rows = [row for row in rows if row['window_day'] == day]
+        if since is not None:
+            rows = [row for row in rows if row['window_day'] and row['window_day'] >= since]
+        return sum(row['total_count'] for row in rows)
+
+    def total(self, metric):
+        return sum(row['total_value'] or 0 for row in self._rows(metric))
+
+    def average(self, metric):
+        rows = self._rows(metric)
+        value_count = sum(row['total_value_count'] or 0 for row in rows)
+        return self.total(metric) / value_count if value_count else 0
+
+    def group(self, metric, field, buckets=None, distinct=False):
+        """Counts and value totals per bucket, district__name or project__name, largest first.
+        With distinct=True the count is the number of distinct buckets in each group."""
+        counts = defaultdict(int)
+        values = defaultdict(float)
+        members = defaultdict(set)
+        for row in self._rows(metric, buckets):
+            key = row[field]
+            if key is None:
+                continue
+            counts[key] += row['total_count']
+            values[key] += row['total_value'] or 0
+            members[key].add(row['bucket'])
+        result = [
+            {'key': key, 'count': len(members[key]) if distinct else counts[key], 'value': values[key]}
+            for key in counts
+        ]
+        result.sort(key=lambda item: item['count'], reverse=True)
+        return result
+
+    def distinct_buckets(self, metric):
+        return len({row['bucket'] for row in self._rows(metric) if row['total_count']})
+
+    def trend(self, metric):
+        """Per-day counts and value totals within the window"""
+        days = defaultdict(lambda: [0, 0.0])
+        for row in self._rows(metric):
+            if row['window_day'] is None:
+                continue
+            days[row['window_day']][0] += row['total_count']
+            days[row['window_day']][1] += row['total_value'] or 0
+        return [
+            {'day': day, 'count': values[0], 'value': values[1]}
+            for day, values in sorted(days.items())
+        ]
+
+    @property
+    def is_empty(self):
+        return not self.rows
+
+
+def load_snapshot(window_start):
+    """Read the rollups, building them first if they have never been populated"""
+    snapshot = RollupSnapshot(window_start)
+    if snapshot.is_empty:
+        logger.info("Dashboard rollups are empty, rebuilding")
+        rebuild_rollups()
+        snapshot = RollupSnapshot(window_start)
+    return snapshot
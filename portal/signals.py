@@ -0,0 +1,155 @@
+import threading
+
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+
+from portal import rollups, tiles, weekly_analytics
+from portal.models import bulk_created, restored, soft_deleted
+
+
+# ============== DASHBOARD ROLLUPS ==============
+
+def _merge_keys(*key_maps):
+    merged = {}
+    for key_map in key_maps:
+        for metric, keys in (key_map or {}).items():
+            merged.setdefault(metric, set()).update(keys)
+    return merged
+
+
+_pending = threading.local()
+
+
+def _flush_pending_slices():
+    # Every save in a transaction schedules this; the first call refreshes
+    # all slices touched so far and the rest find nothing left to do.
+    keys = getattr(_pending, 'keys', None)
+    _pending.keys = None
+    if keys:
+        rollups.refresh_slices(keys)
+
+
+def _schedule_refresh(keys):
+    if not keys:
+        return
+    _pending.keys = _merge_keys(getattr(_pending, 'keys', None), keys)
+    transaction.on_commit(_flush_pending_slices, robust=True)
+
+
+def capture_rollup_slices(sender, instance, raw=False, **kwargs):
+    """Remember which slices an existing row belonged to before it changes"""
+    if raw or instance.pk is None:
+        return
+    instance._rollup_previous_slices = rollups.slice_keys(sender, [instance.pk])
+
+
+def refresh_rollup_slices_on_save(sender, instance, raw=False, **kwargs):
+    """Recompute the old and new slices of a saved row once the transaction commits"""
+    if raw:
+        return
+    keys = _merge_keys(
+        getattr(instance, '_rollup_previous_slices', None),
+        rollups.slice_keys(sender, [instance.pk]),
+    )
+    instance._rollup_previous_slices = None
+    _schedule_refresh(keys)
+
+
+def refresh_rollup_slices_on_delete(sender, instance, **kwargs):
+    """Recompute the slices a hard-deleted row belonged to"""
+    _schedule_refresh(getattr(instance, '_rollup_previous_slices', None))
+    instance._rollup_previous_slices = None
+
+
+def refresh_rollup_slices_on_batch(sender, pks, **kwargs):
+    """Recompute every slice touched by a soft_delete()/restore() batch or a bulk insert"""
+    _schedule_refresh(rollups.slice_keys(sender, pks, include_deleted=True))
+
+
+def connect_rollup_signals():
+    for model in rollups.signal_models():
+        uid = f'dashboard_rollup_{model._meta.label_lower}'
+        pre_save.connect(capture_rollup_slices, sender=model, dispatch_uid=f'{uid}_pre_save')
+        post_save.connect(refresh_rollup_slices_on_save, sender=model, dispatch_uid=f'{uid}_post_save')
+        pre_delete.connect(capture_rollup_slices, sender=model, dispatch_uid=f'{uid}_pre_delete')
+        post_delete.connect(refresh_rollup_slices_on_delete, sender=model, dispatch_uid=f'{uid}_post_delete')
+        soft_deleted.connect(refresh_rollup_slices_on_batch, sender=model, dispatch_uid=f'{uid}_soft_deleted')
+        restored.connect(refresh_rollup_slices_on_batch, sender=model, dispatch_uid=f'{uid}_restored')
+        bulk_created.connect(refresh_rollup_slices_on_batch, sender=model, dispatch_uid=f'{uid}_bulk_created')
+
+
+# ============== VECTOR TILE CACHE ==============
+
+def capture_tile_bbox(sender, instance, raw=False, **kwargs):
+    """Remember where an existing row was drawn before it moves or disappears"""
+    if raw or instance.pk is None:
+        return
+    instance._tile_previous_bbox = tiles.stored_bbox(tiles.LAYER_MODELS[sender], sender, instance.pk)
+
+
+def _invalidate_tiles(layer, *bboxes):
+    bboxes = [bbox for bbox in bboxes if bbox]
+    if not bboxes:
+        return
+
+    def invalidate():
+        for bbox in bboxes:
+            tiles.invalidate_bbox(layer, bbox)
+
+    transaction.on_commit(invalidate, robust=True)
+
+
+def invalidate_tiles_on_save(sender, instance, raw=False, **kwargs):
+    """Drop cached tiles under the old and new position of a saved row"""
+    if raw:
+        return
+    layer = tiles.LAYER_MODELS[sender]
+    _invalidate_tiles(
+        layer,
+        getattr(instance, '_tile_previous_bbox', None),
+        tiles.geometry_bbox(layer, instance),
+    )
+    instance._tile_previous_bbox = None
+
+
+def invalidate_tiles_on_delete(sender, instance, **kwargs):
+    """Drop cached tiles under a hard-deleted row"""
+    _invalidate_tiles(tiles.LAYER_MODELS[sender], getattr(instance, '_tile_previous_bbox', None))
+    instance._tile_previous_bbox = None
+
+
+def invalidate_tiles_on_batch(sender, pks, **kwargs):
+    """Drop cached tiles under all rows of a soft_delete()/restore() batch or a bulk insert"""
+    layer = tiles.LAYER_MODELS[sender]
+    _invalidate_tiles(layer, tiles.stored_extent(layer, sender, pks))
+
+
+def connect_tile_signals():
+    for model in tiles.LAYER_MODELS:
+        uid = f'vector_tiles_{model._meta.label_lower}'
+        pre_save.connect(capture_tile_bbox, sender=model, dispatch_uid=f'{uid}_pre_save')
+        post_save.connect(invalidate_tiles_on_save, sender=model, dispatch_uid=f'{uid}_post_save')
+        pre_delete.connect(capture_tile_bbox, sender=model, dispatch_uid=f'{uid}_pre_delete')
+        post_delete.connect(invalidate_tiles_on_delete, sender=model, dispatch_uid=f'{uid}_post_delete')
+        soft_deleted.connect(invalidate_tiles_on_batch, sender=model, dispatch_uid=f'{uid}_soft_deleted')
+        restored.connect(invalidate_tiles_on_batch, sender=model, dispatch_uid=f'{uid}_restored')
+        bulk_created.connect(invalidate_tiles_on_batch, sender=model, dispatch_uid=f'{uid}_bulk_created')
+
+
+# ============== WEEKLY ANALYTICS CACHE ==============
+
+def invalidate_weekly_analytics(sender, raw=False, **kwargs):
+    """Retire cached weekly figures once a report change commits"""
+    if raw:
+        return
+    transaction.on_commit(weekly_analytics.invalidate, robust=True)
+
+
+def connect_weekly_analytics_signals():
+    from portal.models import DailyReportingModel
+    uid = 'weekly_analytics_dailyreportingmodel'
+    post_save.connect(invalidate_weekly_analytics, sender=DailyReportingModel, dispatch_uid=f'{uid}_post_save')
+    post_delete.connect(invalidate_weekly_analytics, sender=DailyReportingModel, dispatch_uid=f'{uid}_post_delete')
+    soft_deleted.connect(invalidate_weekly_analytics, sender=DailyReportingModel, dispatch_uid=f'{uid}_soft_deleted')
+    restored.connect(invalidate_weekly_analytics, sender=DailyReportingModel, dispatch_uid=f'{uid}_restored')
+    bulk_created.connect(invalidate_weekly_analytics, sender=DailyReportingModel, dispatch_uid=f'{uid}_bulk_created')
@@ -0,0 +1,357 @@
+"""
+Bulk loader for sector and region boundaries (see the import_boundaries
+command).
+
+Rows never go through the ORM one at a time:
+
+1. Source rows are loaded into a temporary staging table. A table that is
+   already in the database is copied server-side with INSERT ... SELECT.
+   A GeoJSON, Shapefile or GeoPackage file is read feature by feature
+   with GDAL and streamed in with COPY.
+2. Geometries are fixed in SQL. A missing SRID is set to the one given,
+   geometries are reprojected to the target SRID, invalid ones are
+   repaired with ST_MakeValid, and any left empty are set to NULL.
+3. Staging rows are upserted into the target in batches with
+   INSERT ... ON CONFLICT (<key>), which either updates existing rows or
+   leaves them alone.
+
+Nothing here sends save signals, so once rows are written the target's
+cached vector tiles are dropped and its dashboard rollups rebuilt.
+"""
+import csv
+import io
+
+from django.contrib.gis.gdal import DataSource, GDALException
+from django.db import connection, transaction
+
+from portal import rollups, tiles
+from portal.models import Region, SectorModel
+
+DEFAULT_BATCH_SIZE = 5000
+COPY_CHUNK_ROWS = 1000
+
+# Target table description. `fields` maps model fields to the staging
+# column type; `insert` and `update` are extra column expressions written
+# on insert and on conflict; `computed` fills a field the source left empty.
+TARGETS = {
+    'sectors': {
+        'model': SectorModel,
+        'key': 'sector',
+        'fields': {
+            'sector': 'text',
+            'size_Ha': 'double precision',
+            'mean_pH': 'double precision',
+            'mean_OC': 'double precision',
+            'Texture_co': 'double precision',
+        },
+        'insert': {'create_at': 'now()', 'update_at': 'now()'},
+        'update': {'update_at': 'now()'},
+        'computed': {},
+    },
+    'regions': {
+        'model': Region,
+        'key': 'region',
+        'fields': {
+            'region': 'text',
+            'reg_code': 'text',
+        },
+        'insert': {'created_date': 'now()', 'delete_field': "'no'"},
+        'update': {'created_date': 'now()'},
+        # Initials of a multi-word name, else its first two letters (as the admin import does)
+        'computed': {
+            'reg_code': (
+                "CASE WHEN position(' ' in trim(s.region)) > 0 "
+                "THEN upper(regexp_replace(initcap(trim(s.region)), '[^A-Z]', '', 'g')) "
+                "ELSE upper(left(trim(s.region), 2)) END"
+            ),
+        },
+    },
+}
+
+
+class BoundaryImportError(Exception):
+    pass
+
+
+def _q(name):
+    return connection.ops.quote_name(name)
+
+
+def _geometry_field(model):
+    field = model._meta.get_field('geom')
+    return field.srid, field.dim
+
+
+# ============== STAGING ==============
+
+def create_staging(cursor, target):
+    columns = ', '.join(f'{_q(field)} {kind}' for field, kind in target['fields'].items())
+    cursor.execute('DROP TABLE IF EXISTS boundary_staging')
+    cursor.execute(f"""
+        CREATE TEMPORARY TABLE boundary_staging (
+            staging_id bigserial PRIMARY KEY,
+            {columns},
+            geom geometry
+        )
+    """)
+
+
+def resolve_mapping(target, available, explicit=None):
+    """{target field or 'geom': source field or None}. Explicit names must
+    exist; other fields are matched to a source field of the same name,
+    ignoring case."""
+    by_lower = {name.lower(): name for name in available}
+    explicit = explicit or {}
+    unknown = [name for name in explicit.values() if name not in available]
+    if unknown:
+        raise BoundaryImportError(
+            f"Source has no field(s) {', '.join(unknown)}; available: {', '.join(sorted(available))}"
+        )
+    mapping = {}
+    for field in [*target['fields'], 'geom']:
+        mapping[field] = explicit.get(field) or by_lower.get(field.lower())
+    if not mapping[target['key']]:
+        raise BoundaryImportError(f"No source field for {target['key']}; map one with --field {target['key']}=<name>")
+    return mapping
+
+
+def stage_table(cursor, target, table, explicit=None):
+    """Copy `table` (already in this database) into staging without
+    sending rows through Python"""
+    try:
+        columns = [column.name for column in connection.introspection.get_table_description(cursor, table)]
+    except Exception as e:
+        raise BoundaryImportError(f'Could not read table {table}: {e}')
+    mapping = resolve_mapping(target, columns, explicit)
+    if not mapping['geom']:
+        raise BoundaryImportError(f'Table {table} has no geometry column; map one with --field geom=<name>')
+
+    fields = list(target['fields'])
+    source = ', '.join(
+        f"{_q(mapping[field])}::{target['fields'][field]}" if mapping[field] else 'NULL'
+        for field in fields
+    )
+    geom = _q(mapping['geom'])
+    cursor.execute(f"""
+        INSERT INTO boundary_staging ({', '.join(_q(field) for field in fields)}, geom)
+        SELECT {source}, {geom}::geometry FROM {_q(table)}
+    """)
+    return cursor.rowcount
+
+
+def _cell(value):
+    return '' if value is None else value
+
+
+def _feature_rows(layer, fields, mapping, counts):
+    """CSV lines (one per feature) for COPY; geometry as EWKT"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for i, feature in enumerate(layer, 1):
+        values = []
+        for field in fields:
+            name = mapping.get(field)
+            values.append(_cell(feature.get(name)) if name else '')
+        try:
+            values.append(feature.geom.ewkt)
+        except GDALException:
+            # Feature without a geometry
+            values.append('')
+        writer.writerow(values)
+        counts['read'] += 1
+        if i % COPY_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+class _ChunkReader:
+    """Minimal file object over an iterator of strings, for psycopg2's copy_expert"""
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.pending = ''
+
+    def read(self, size=-1):
+        while size < 0 or len(self.pending) < size:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                break
+            self.pending += chunk
+        if size < 0:
+            data, self.pending = self.pending, ''
+        else:
+            data, self.pending = self.pending[:size], self.pending[size:]
+        return data
+
+    readline = read
+
+
+def _copy(cursor, sql, chunks):
+    raw = cursor.cursor
+    if hasattr(raw, 'copy_expert'):
+        raw.copy_expert(sql, _ChunkReader(chunks))
+    else:
+        # psycopg 3
+        with raw.copy(sql) as copy:
+            for chunk in chunks:
+                copy.write(chunk)
+
+
+def stage_file(cursor, target, path, explicit=None, layer=0):
+    """Stream every feature of a GeoJSON/Shapefile/GeoPackage layer into staging"""
+    try:
+        source = DataSource(path)
+        source_layer = source[layer]
+    except (GDALException, IndexError) as e:
+        raise BoundaryImportError(f'Could not open layer {layer} of {path}: {e}')
+
+    # The feature geometry is used whatever it is called in the file
+    explicit = {field: name for field, name in (explicit or {}).items() if field != 'geom'}
+    mapping = resolve_mapping(target, source_layer.fields, explicit)
+    fields = list(target['fields'])
+    counts = {'read': 0}
+    columns = ', '.join(_q(field) for field in fields)
+    _copy(
+        cursor,
+        f'COPY boundary_staging ({columns}, geom) FROM STDIN WITH (FORMAT csv)',
+        _feature_rows(source_layer, fields, mapping, counts),
+    )
+    return counts['read']
+
+
+# ============== REPAIR ==============
+
+def repair_geometries(cursor, target, source_srid=None):
+    """Set missing SRIDs, reproject, repair invalid and clear empty geometries.
+    Returns {'reprojected', 'repaired', 'dropped'}."""
+    srid, _ = _geometry_field(target['model'])
+    if source_srid:
+        cursor.execute(
+            'UPDATE boundary_staging SET geom = ST_SetSRID(geom, %s) WHERE geom IS NOT NULL AND ST_SRID(geom) = 0',
+            [source_srid],
+        )
+    cursor.execute(
+        'SELECT count(*) FROM boundary_staging WHERE geom IS NOT NULL AND ST_SRID(geom) = 0'
+    )
+    if cursor.fetchone()[0]:
+        raise BoundaryImportError('Some geometries have no SRID; pass the source SRID')
+
+    cursor.execute(
+        'UPDATE boundary_staging SET geom = ST_Transform(geom, %s) WHERE geom IS NOT NULL AND ST_SRID(geom) <> %s',
+        [srid, srid],
+    )
+    reprojected = cursor.rowcount
+    cursor.execute(
+        'UPDATE boundary_staging SET geom = ST_MakeValid(geom) '
+        'WHERE geom IS NOT NULL AND NOT ST_IsValid(geom)'
+    )
+    repaired = cursor.rowcount
+    cursor.execute('UPDATE boundary_staging SET geom = NULL WHERE geom IS NOT NULL AND ST_IsEmpty(geom)')
+    dropped = cursor.rowcount
+    return {'reprojected': reprojected, 'repaired': repaired, 'dropped': dropped}
+
+
+# ============== UPSERT ==============
+
+def _upsert_sql(target, update):
+    model = target['model']
+    table = _q(model._meta.db_table)
+    key = target['key']
+    _, dim = _geometry_field(model)
+    force = 'ST_Force3D' if dim == 3 else 'ST_Force2D'
+
+    columns, values = [], []
+    for field in target['fields']:
+        column = model._meta.get_field(field).column
+        columns.append(_q(column))
+        computed = target['computed'].get(field)
+        values.append(f"COALESCE(NULLIF(s.{_q(field)}, ''), {computed})" if computed else f's.{_q(field)}')
+    columns.append('geom')
+    values.append(f'{force}(s.geom)')
+    for column, expression in target['insert'].items():
+        columns.append(_q(column))
+        values.append(expression)
+
+    if update:
+        assignments = [
+            f'{column} = EXCLUDED.{column}'
+            for column in columns
+            if column not in [_q(c) for c in target['insert']] and column != _q(key)
+        ] + [f'{_q(column)} = {expression}' for column, expression in target['update'].items()]
+        conflict = f"DO UPDATE SET {', '.join(assignments)}"
+    else:
+        conflict = 'DO NOTHING'
+
+    # DISTINCT ON keeps the last staged row per key; one statement
+    # may not touch the same target row twice
+    return f"""
+        INSERT INTO {table} ({', '.join(columns)})
+        SELECT {', '.join(values)} FROM (
+            SELECT DISTINCT ON ({_q(key)}) * FROM boundary_staging
+            WHERE staging_id > %s AND staging_id <= %s AND {_q(key)} IS NOT NULL AND {_q(key)} <> ''
+            ORDER BY {_q(key)}, staging_id DESC
+        ) s
+        ON CONFLICT ({_q(model._meta.get_field(key).column)}) {conflict}
+        RETURNING (xmax = 0)
+    """
+
+
+def upsert(cursor, target, update=False, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """Move staging into the target table, `batch_size` staging rows per
+    statement. Returns {'inserted', 'updated', 'skipped'}."""
+    cursor.execute('SELECT count(*), coalesce(max(staging_id), 0) FROM boundary_staging')
+    total, last_id = cursor.fetchone()
+    sql = _upsert_sql(target, update)
+
+    counts = {'inserted': 0, 'updated': 0, 'skipped': 0}
+    start = 0
+    while start < last_id:
+        end = start + batch_size
+        with transaction.atomic():
+            cursor.execute(sql, [start, end])
+            written = [row[0] for row in cursor.fetchall()]
+        counts['inserted'] += sum(1 for inserted in written if inserted)
+        counts['updated'] += sum(1 for inserted in written if not inserted)
+        if progress:
+            progress(min(end, last_id), last_id)
+        start = end
+    counts['skipped'] = total - counts['inserted'] - counts['updated']
+    return counts
+
+
+def refresh_derived(target):
+    """Redo what the save signals would have for the rows just written:
+    drop the model's cached tiles and rebuild its dashboard rollups"""
+    model = target['model']
+    layer = tiles.LAYER_MODELS.get(model)
+    if layer:
+        tiles.invalidate_layer(layer)
+    metrics = rollups.metrics_for_model(model)
+    if metrics:
+        rollups.rebuild_rollups(metrics)
+
+
+def import_boundaries(target_name, table=None, path=None, layer=0, mapping=None, source_srid=None,
+                      update=False, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """Load `table` (in this database) or the file at `path` into the sectors
+    or regions table. `mapping` maps target fields (and 'geom') to source
+    field names; unmapped fields are matched by name."""
+    target = TARGETS[target_name]
+    with connection.cursor() as cursor:
+        create_staging(cursor, target)
+        try:
+            if table:
+                staged = stage_table(cursor, target, table, mapping)
+            else:
+                staged = stage_file(cursor, target, path, mapping, layer)
+            stats = {'staged': staged}
+            stats.update(repair_geometries(cursor, target, source_srid))
+            stats.update(upsert(cursor, target, update, batch_size, progress))
+        finally:
+            cursor.execute('DROP TABLE IF EXISTS boundary_staging')
+    if stats['inserted'] or stats['updated']:
+        # Runs now outside a transaction; a --dry-run rollback discards it
+        transaction.on_commit(lambda: refresh_derived(target), robust=True)
+    return stats
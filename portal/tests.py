@@ -1,3 +1,36 @@
+import os
+import subprocess
+import sys
+from unittest import skipUnless
+
+from django.conf import settings
 from django.test import TestCase
 
-# Create your tests here.
+from portal import spatial_import, tiles
+from portal.checks import cache_is_shared
+
+
+def generation_in_new_process(layer, z):
+    """Tile generation as a separate Python process sees it"""
+    code = (
+        'import django; django.setup(); '
+        'from portal import tiles; '
+        f'print(tiles._generation({layer!r}, {z}))'
+    )
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'farm_management.settings'))
+    result = subprocess.run(
+        [sys.executable, '-c', code], cwd=settings.BASE_DIR, env=env,
+        capture_output=True, text=True, check=True,
+    )
+    return int(result.stdout.strip().splitlines()[-1])
+
+
+@skipUnless(cache_is_shared(), 'needs the shared cache configured in settings.CACHES')
+class BoundaryImportInvalidationTests(TestCase):
+    """A boundary import in one process retires sector tiles for every process"""
+
+    def test_refresh_derived_bumps_sector_generation_for_other_processes(self):
+        before = [generation_in_new_process('sectors', z) for z in (0, tiles.MAX_TILE_ZOOM)]
+        spatial_import.refresh_derived(spatial_import.TARGETS['sectors'])
+        after = [generation_in_new_process('sectors', z) for z in (0, tiles.MAX_TILE_ZOOM)]
+        self.assertEqual(after, [generation + 1 for generation in before])
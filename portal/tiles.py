@@ -0,0 +1,292 @@
+"""
+Mapbox vector tiles (MVT) for the map window.
+
+Tiles are built by PostGIS with ST_AsMVT over SectorModel.geom, Farms.geom
+and GrowthMonitoringModel lat/lng, so the browser only receives what is
+visible in each tile instead of every feature at once.
+
+Rendered tiles are cached, in the Django cache by default or on disk when
+settings.VECTOR_TILE_CACHE_DIR is set. The generations always live in the
+Django cache, which must be shared (Redis, see settings.CACHES) so a save
+in one worker or management command reaches every other process. When a geometry is saved or deleted
+(see portal/signals.py) only the cached tiles that intersect its old and new
+bounding boxes are dropped, and a soft-delete batch drops those under the
+extent of all its rows; zoom levels where that would touch too many
+tiles are invalidated wholesale by bumping a per-layer/zoom generation.
+"""
+import math
+import os
+
+from django.conf import settings
+from django.contrib.gis.db.models import Extent
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Max, Min
+
+from portal.models import SectorModel, Farms, GrowthMonitoringModel
+
+MAX_TILE_ZOOM = 22
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+TILE_CACHE_TIMEOUT = getattr(settings, 'VECTOR_TILE_CACHE_TIMEOUT', 60 * 60 * 24)
+TILE_CACHE_DIR = getattr(settings, 'VECTOR_TILE_CACHE_DIR', None)
+# Beyond this many tiles per zoom level, invalidate the whole level instead
+MAX_INVALIDATED_TILES_PER_ZOOM = 64
+
+
+def _table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def _column(model, field):
+    return connection.ops.quote_name(model._meta.get_field(field).column)
+
+
+def _polygon_layer(model, properties, where=''):
+    return {
+        'model': model,
+        'geometry': f't.{_column(model, "geom")}',
+        'properties': properties,
+        'where': where,
+    }
+
+
+def _layers():
+    growth_lng = f't.{_column(GrowthMonitoringModel, "lng")}'
+    growth_lat = f't.{_column(GrowthMonitoringModel, "lat")}'
+    return {
+        'sectors': _polygon_layer(SectorModel, {
+            'id': 'id', 'sector': 'sector', 'size_Ha': 'size_Ha',
+            'mean_pH': 'mean_pH', 'mean_OC': 'mean_OC', 'texture': 'Texture_co',
+        }),
+        'farms': _polygon_layer(Farms, {'id': 'id', 'farm_id': 'farm_id'}),
+        'growth': {
+            'model': GrowthMonitoringModel,
+            # Same expression as growth_point_gist_idx (models.lng_lat_point),
+            # so the && bounding box test below is an index scan
+            'geometry': f'ST_SetSRID(ST_MakePoint({growth_lng}, {growth_lat}), 4326)',
+            'properties': {
+                'id': 'id', 'plant_uid': 'plant_uid', 'height': 'height',
+                'leaves': 'number_of_leaves', 'leaf_color': 'leaf_color',
+                'date': ('date', 'text'), 'district_id': 'district',
+            },
+            'where': (
+                f"AND t.{_column(GrowthMonitoringModel, 'delete_field')} = 'no' "
+                f"AND {growth_lat} IS NOT NULL AND {growth_lng} IS NOT NULL "
+                f"AND NOT ({growth_lat} = 0 AND {growth_lng} = 0)"
+            ),
+        },
+    }
+
+
+TILE_LAYERS = ('sectors', 'farms', 'growth')
+
+
+def valid_tile(z, x, y):
+    return 0 <= z <= MAX_TILE_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+def render_tile(layer, z, x, y, filters=None):
+    """Build one MVT tile in PostGIS. `filters` are extra growth-layer filters
+    (district_id, start_date, end_date)."""
+    spec = _layers()[layer]
+    model = spec['model']
+    filters = filters or {}
+
+    select = ', '.join(
+        f't.{_column(model, field)}{cast} AS {connection.ops.quote_name(name)}'
+        for name, field, cast in (
+            (name, field, '') if isinstance(field, str) else (name, field[0], f'::{field[1]}')
+            for name, field in spec['properties'].items()
+        )
+    )
+    params = [z, x, y]
+    where = spec['where'] + f" AND {spec['geometry']} && bounds.geom4326"
+
+    if layer == 'growth':
+        if filters.get('district_id'):
+            where += f" AND t.{_column(model, 'district')} = %s"
+            params.append(filters['district_id'])
+        if filters.get('start_date'):
+            where += f" AND t.{_column(model, 'date')} >= %s"
+            params.append(filters['start_date'])
+        if filters.get('end_date'):
+            where += f" AND t.{_column(model, 'date')} <= %s"
+            params.append(filters['end_date'])
+
+    params.append(layer)
+    sql = f"""
+        WITH bounds AS (
+            SELECT ST_TileEnvelope(%s, %s, %s) AS geom,
+                   ST_Transform(ST_TileEnvelope(%s, %s, %s), 4326) AS geom4326
+        ),
+        mvtgeom AS (
+            SELECT ST_AsMVTGeom(
+                       ST_Transform(ST_Force2D({spec['geometry']}), 3857),
+                       bounds.geom, {TILE_EXTENT}, {TILE_BUFFER}, true
+                   ) AS geom,
+                   {select}
+            FROM {_table(model)} t, bounds
+            WHERE {spec['geometry']} IS NOT NULL {where}
+        )
+        SELECT ST_AsMVT(mvtgeom.*, %s, {TILE_EXTENT}, 'geom')
+        FROM mvtgeom
+        WHERE mvtgeom.geom IS NOT NULL
+    """
+    params = [z, x, y] + params
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    return bytes(row[0]) if row and row[0] else b''
+
+
+# ============== TILE CACHE ==============
+
+def _generation(layer, z):
+    return cache.get(f'mvt:gen:{layer}:{z}', 0)
+
+
+def _bump_generation(layer, z):
+    # incr is atomic in a shared cache, so concurrent bumps are not lost
+    key = f'mvt:gen:{layer}:{z}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def _cache_key(layer, z, x, y, generation=None):
+    if generation is None:
+        generation = _generation(layer, z)
+    return f'mvt:{layer}:{generation}:{z}:{x}:{y}'
+
+
+def _cache_path(key):
+    return os.path.join(TILE_CACHE_DIR, *key.split(':')[1:]) + '.pbf'
+
+
+def get_cached_tile(layer, z, x, y):
+    key = _cache_key(layer, z, x, y)
+    if TILE_CACHE_DIR:
+        try:
+            with open(_cache_path(key), 'rb') as tile_file:
+                return tile_file.read()
+        except OSError:
+            return None
+    return cache.get(key)
+
+
+def set_cached_tile(layer, z, x, y, tile):
+    key = _cache_key(layer, z, x, y)
+    if TILE_CACHE_DIR:
+        path = _cache_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as tile_file:
+            tile_file.write(tile)
+        os.replace(tmp_path, path)
+    else:
+        cache.set(key, tile, TILE_CACHE_TIMEOUT)
+
+
+def get_tile(layer, z, x, y, filters=None):
+    """Cached tile for the unfiltered layer, freshly rendered otherwise"""
+    if filters and any(filters.values()):
+        return render_tile(layer, z, x, y, filters)
+    tile = get_cached_tile(layer, z, x, y)
+    if tile is None:
+        tile = render_tile(layer, z, x, y)
+        set_cached_tile(layer, z, x, y, tile)
+    return tile
+
+
+def _lng_to_tile_x(lng, z):
+    return int((lng + 180.0) / 360.0 * 2 ** z)
+
+
+def _lat_to_tile_y(lat, z):
+    lat = max(min(lat, 85.0511), -85.0511)
+    lat_rad = math.radians(lat)
+    return int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * 2 ** z)
+
+
+def invalidate_bbox(layer, bbox):
+    """Drop cached tiles of `layer` that intersect bbox = (xmin, ymin, xmax, ymax) in EPSG:4326"""
+    xmin, ymin, xmax, ymax = bbox
+    for z in range(MAX_TILE_ZOOM + 1):
+        last = 2 ** z - 1
+        # One extra tile on each side covers features drawn into the tile buffer
+        x0 = max(_lng_to_tile_x(xmin, z) - 1, 0)
+        x1 = min(_lng_to_tile_x(xmax, z) + 1, last)
+        y0 = max(_lat_to_tile_y(ymax, z) - 1, 0)
+        y1 = min(_lat_to_tile_y(ymin, z) + 1, last)
+
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > MAX_INVALIDATED_TILES_PER_ZOOM:
+            _bump_generation(layer, z)
+            continue
+
+        generation = _generation(layer, z)
+
+        keys = [
+            _cache_key(layer, z, x, y, generation)
+            for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)
+        ]
+        if TILE_CACHE_DIR:
+            for key in keys:
+                try:
+                    os.remove(_cache_path(key))
+                except OSError:
+                    pass
+        else:
+            cache.delete_many(keys)
+
+
+def invalidate_layer(layer):
+    """Drop every cached tile of `layer`, e.g. after a bulk load that
+    bypassed the save signals"""
+    for z in range(MAX_TILE_ZOOM + 1):
+        _bump_generation(layer, z)
+
+
+def geometry_bbox(layer, instance):
+    """EPSG:4326 bounding box of an instance's tile geometry, or None"""
+    if layer == 'growth':
+        if instance.lat is None or instance.lng is None:
+            return None
+        try:
+            lng, lat = float(instance.lng), float(instance.lat)
+        except (TypeError, ValueError):
+            return None
+        return (lng, lat, lng, lat)
+    if not instance.geom:
+        return None
+    return instance.geom.extent
+
+
+def stored_bbox(layer, model, pk):
+    """Bounding box of the row as currently stored, before a save or delete changes it"""
+    if layer == 'growth':
+        stored = model._default_manager.filter(pk=pk).values('lat', 'lng').first()
+        if not stored or stored['lat'] is None or stored['lng'] is None:
+            return None
+        return (stored['lng'], stored['lat'], stored['lng'], stored['lat'])
+    geom = model._default_manager.filter(pk=pk).values_list('geom', flat=True).first()
+    return geom.extent if geom else None
+
+
+def stored_extent(layer, model, pks):
+    """Bounding box around all the given rows as stored, or None"""
+    rows = model._base_manager.filter(pk__in=pks)
+    if layer == 'growth':
+        box = rows.exclude(lat__isnull=True).exclude(lng__isnull=True).aggregate(
+            xmin=Min('lng'), ymin=Min('lat'), xmax=Max('lng'), ymax=Max('lat'),
+        )
+        return None if box['xmin'] is None else (box['xmin'], box['ymin'], box['xmax'], box['ymax'])
+    return rows.aggregate(extent=Extent('geom'))['extent']
+
+
+LAYER_MODELS = {
+    SectorModel: 'sectors',
+    Farms: 'farms',
+    GrowthMonitoringModel: 'growth',
+}
@@ -3,6 +3,7 @@ from django.contrib.auth import views as auth_views
 from . import views
 from portal.view.farms import *
 from portal.view.map import *
+from portal.view.tiles import *
 from portal.view.sector import *
 from portal.view.qr_code import *
 from portal.view.activities import *
@@ -21,6 +22,8 @@ from portal.view.payments import *
 from portal.view.irrigation import *
 # from portal.view.equipment import *
 from portal.view.outbreakfarms import *
+from portal.view.exports import *
+from portal.view.query_stats import *
 # from portal.view.verification import *
 # from portal.view.contractor import *
 
@@ -58,6 +61,10 @@ urlpatterns = [
     # path('api/district-boundaries/', get_district_boundaries, name='get_district_boundaries'),
     path('api/farm-stats/', get_farm_stats, name='get_farm_stats'),
     path('api/search-farms/', search_farms, name='search_farms'),
+    path('api/farm-geojson/export/', export_farms_geojson, name='export_farms_geojson'),
+    path('api/farm-geojson/project/<str:project_id>/', get_farms_by_project, name='get_farms_by_project'),
+    path('api/farm-geojson/status/<str:status>/', get_farms_by_status, name='get_farms_by_status'),
+    path('tiles/<str:layer>/<int:z>/<int:x>/<int:y>.pbf', vector_tile, name='vector_tile'),
     path('api/farm/<int:farm_id>/', get_farm_by_id, name='get_farm_by_id'),
 
     path('farm-management/farm-assignment/', farm_assignment_page, name='farm_assignment_page'),
@@ -329,4 +336,11 @@ urlpatterns = [
     # Export endpoints
     path('api/sectors/export/csv/', export_sectors_csv, name='export_sectors_csv'),
     path('api/sectors/export/pdf/', export_sectors_pdf, name='export_sectors_pdf'),
+
+    # Background exports
+    path('api/exports/<str:job_id>/', export_job_status, name='export_job_status'),
+    path('api/exports/<str:job_id>/download/', export_job_download, name='export_job_download'),
+
+    # SQL instrumentation
+    path('api/query-stats/', query_stats, name='query_stats'),
 ]
\ No newline at end of file
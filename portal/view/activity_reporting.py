@@ -2,10 +2,10 @@ from django.shortcuts import render
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
-from django.db.models import Q
 from django.utils import timezone
 from django.contrib.auth.decorators import login_required
 import json
+from utils.datatables import paginate
 from portal.models import (
     ActivityReportingModel, Activities, staffTbl, 
     PersonnelModel, FarmdetailsTbl, Community, 
@@ -31,16 +31,18 @@ def activity_reporting(request):
     }
     return render(request, 'portal/activity_reporting/activity_reporting.html', context)
 
+# DataTables columns that can be sorted on
+REPORT_SORTABLE_COLUMNS = {0: 'uid', 1: 'reporting_date'}
+REPORT_SEARCH_FIELDS = (
+    'agent__first_name', 'agent__last_name', 'farm_ref_number',
+    'main_activity__main_activity', 'activity__sub_activity', 'community__name',
+)
+
 @csrf_exempt
 @require_http_methods(["GET"])
 def activity_report_list_api(request):
     """API endpoint for DataTables to get activity reports"""
     try:
-        draw = int(request.GET.get('draw', 1))
-        start = int(request.GET.get('start', 0))
-        length = int(request.GET.get('length', 10))
-        search_value = request.GET.get('search[value]', '')
-        
         # Base queryset
         queryset = ActivityReportingModel.objects.select_related(
             'agent', 'main_activity', 'activity', 'farm', 
@@ -63,17 +65,6 @@ def activity_report_list_api(request):
             except staffTbl.DoesNotExist:
                 pass
         
-        # Apply search
-        if search_value:
-            queryset = queryset.filter(
-                Q(agent__first_name__icontains=search_value) |
-                Q(agent__last_name__icontains=search_value) |
-                Q(farm_ref_number__icontains=search_value) |
-                Q(main_activity__main_activity__icontains=search_value) |
-                Q(activity__sub_activity__icontains=search_value) |
-                Q(community__name__icontains=search_value)
-            )
-        
         # Apply filters from request
         status_filter = request.GET.get('status')
         if status_filter and status_filter.strip():
@@ -87,11 +78,13 @@ def activity_report_list_api(request):
         if po_filter and po_filter.strip():
             queryset = queryset.filter(agent_id=po_filter)
         
-        # Get total count
-        total_records = queryset.count()
-        
-        # Apply pagination
-        reports = queryset.order_by('-reporting_date')[start:start + length]
+        # Search, sort and paginate in one query
+        reports = paginate(
+            request, queryset,
+            sortable=REPORT_SORTABLE_COLUMNS,
+            search_fields=REPORT_SEARCH_FIELDS,
+            default_order=('-reporting_date',),
+        )
         
         # Prepare data for DataTables
         data = []
@@ -141,14 +134,7 @@ def activity_report_list_api(request):
                 'created_date': report.created_date.strftime('%Y-%m-%d %H:%M:%S') if report.created_date else '',
             })
         
-        response = {
-            'draw': draw,
-            'recordsTotal': total_records,
-            'recordsFiltered': total_records,
-            'data': data,
-            'success': True
-        }
-        return JsonResponse(response)
+        return reports.response(data)
         
     except Exception as e:
         return JsonResponse({
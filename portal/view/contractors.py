@@ -340,10 +340,7 @@ def update_contractor(request, contractor_id):
         # Update assigned districts if provided
         if data.get('assigned_districts') and isinstance(data['assigned_districts'], list):
             # Remove existing assignments
-            contratorDistrictAssignment.objects.filter(
-                contractor=contractor,
-                delete_field='no'
-            ).update(delete_field='yes')
+            contratorDistrictAssignment.objects.filter(contractor=contractor).soft_delete()
             
             # Create new assignments
             for district_id in data['assigned_districts']:
@@ -393,25 +390,9 @@ def delete_contractor(request, contractor_id):
     try:
         contractor = contractorsTbl.objects.get(id=contractor_id, delete_field='no')
         
-        data = json.loads(request.body)
-        reason = data.get('reason', 'No reason provided')
-        
-        # Soft delete contractor
-        contractor.delete_field = 'yes'
-        contractor.reason4expunge = reason
-        contractor.save()
-        
-        # Soft delete all district assignments
-        contratorDistrictAssignment.objects.filter(
-            contractor=contractor,
-            delete_field='no'
-        ).update(delete_field='yes')
-        
-        # Soft delete all certificates
-        ContractorCertificateModel.objects.filter(
-            contractor=contractor,
-            delete_field='no'
-        ).update(delete_field='yes')
+        # Soft delete the contractor with its district assignments and
+        # certificates (contractorsTbl.soft_delete_cascade)
+        contractorsTbl.objects.filter(pk=contractor.pk).soft_delete()
         
         return JsonResponse({
             'success': True,
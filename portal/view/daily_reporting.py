@@ -3,9 +3,10 @@ from django.shortcuts import render
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
-from django.db.models import Q, Sum, Count
+from django.db.models import Sum, Count
 from django.utils import timezone
 from django.contrib.auth.decorators import login_required
+from utils.datatables import paginate
 from portal.models import (
     DailyReportingModel, Activities, staffTbl, 
     PersonnelModel, PersonnelAssignmentModel, FarmdetailsTbl,
@@ -31,16 +32,18 @@ def daily_reports(request):
     }
     return render(request, 'portal/activity_reporting/daily_reports.html', context)
 
+# DataTables columns that can be sorted on
+REPORT_SORTABLE_COLUMNS = {0: 'id', 1: 'reporting_date'}
+REPORT_SEARCH_FIELDS = (
+    'agent__first_name', 'agent__last_name', 'farm_ref_number',
+    'main_activity__main_activity', 'activity__sub_activity', 'community__name',
+)
+
 @csrf_exempt
 @require_http_methods(["GET"])
 def daily_report_list_api(request):
     """API endpoint for DataTables to get daily reports"""
     try:
-        draw = int(request.GET.get('draw', 1))
-        start = int(request.GET.get('start', 0))
-        length = int(request.GET.get('length', 10))
-        search_value = request.GET.get('search[value]', '')
-        
         # Base queryset
         queryset = DailyReportingModel.objects.select_related(
             'agent', 'main_activity', 'activity', 'farm', 
@@ -65,22 +68,13 @@ def daily_report_list_api(request):
             except staffTbl.DoesNotExist:
                 pass
         
-        # Apply search
-        if search_value:
-            queryset = queryset.filter(
-                Q(agent__first_name__icontains=search_value) |
-                Q(agent__last_name__icontains=search_value) |
-                Q(farm_ref_number__icontains=search_value) |
-                Q(main_activity__main_activity__icontains=search_value) |
-                Q(activity__sub_activity__icontains=search_value) |
-                Q(community__name__icontains=search_value)
-            )
-        
-        # Get total count
-        total_records = queryset.count()
-        
-        # Apply pagination
-        reports = queryset.order_by('-reporting_date')[start:start + length]
+        # Search, sort and paginate in one query
+        reports = paginate(
+            request, queryset,
+            sortable=REPORT_SORTABLE_COLUMNS,
+            search_fields=REPORT_SEARCH_FIELDS,
+            default_order=('-reporting_date',),
+        )
         
         # Prepare data for DataTables
         data = []
@@ -127,14 +121,7 @@ def daily_report_list_api(request):
                 'created_date': report.created_date.strftime('%Y-%m-%d %H:%M:%S') if report.created_date else '',
             })
         
-        response = {
-            'draw': draw,
-            'recordsTotal': total_records,
-            'recordsFiltered': total_records,
-            'data': data,
-            'success': True
-        }
-        return JsonResponse(response)
+        return reports.response(data)
         
     except Exception as e:
         print(f'Error in daily_report_list_api: {str(e)}')
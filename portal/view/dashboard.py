@@ -5,7 +5,7 @@ from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q, Count, Sum, Avg, Max, Min, F, FloatField, IntegerField, DateField, DateTimeField
+from django.db.models import Count, Sum, Avg, Max, Min, FloatField, IntegerField, DateField, DateTimeField
 from django.db.models.functions import TruncMonth, TruncWeek, TruncDay
 from django.core.paginator import Paginator
 from django.utils import timezone
@@ -14,158 +14,109 @@ from collections import defaultdict
 
 from portal.models import (
     # Personnel & Staff
-    IrrigationModel, PersonnelModel, SectorModel, staffTbl, PersonnelAssignmentModel,
+    IrrigationModel, PersonnelModel, SectorModel, PersonnelAssignmentModel,
     
     # Contractors
-    contractorsTbl, contratorDistrictAssignment, ContractorCertificateModel, ContractorCertificateVerificationModel,
+    contractorsTbl, ContractorCertificateModel, ContractorCertificateVerificationModel,
     
     # Farms & Activities
-    FarmdetailsTbl, Activities, DailyReportingModel, ActivityReportingModel,
+    FarmdetailsTbl, DailyReportingModel, ActivityReportingModel,
     
-    # Districts & Regions
-    cocoaDistrict, Region, Community, projectTbl,
     QR_CodeModel, GrowthMonitoringModel
 )
+from portal.rollups import load_snapshot, rebuild_rollups
 
 # ============== DASHBOARD VIEWS ==============
+
+def _rollup_list(groups, name, limit=None, value_name=None, cast=None):
+    """Shape RollupSnapshot.group() output like the old values().annotate() lists"""
+    rows = []
+    for group in groups[:limit] if limit else groups:
+        row = {name: cast(group['key']) if cast else group['key'], 'count': group['count']}
+        if value_name:
+            row[value_name] = group['value']
+        rows.append(row)
+    return rows
+
+
+def _rollup_trend(trend, value_name=None):
+    rows = []
+    for point in trend:
+        row = {'day': point['day'], 'count': point['count']}
+        if value_name:
+            row[value_name] = point['value']
+        rows.append(row)
+    return rows
+
+
 @login_required
 def general_dashboard(request):
-    """Render the main dashboard with all system statistics - Using only provided models"""
+    """Render the main dashboard with all system statistics - read from the dashboard rollups"""
+    today = date.today()
+    rollup = load_snapshot(today)
     
     # Get counts for different personnel types
-    ra_count = PersonnelModel.objects.filter(
-         
-        personnel_type='Rehab Assistant'
-    ).count()
-    
-    rt_count = PersonnelModel.objects.filter(
-         
-        personnel_type='Rehab Technician'
-    ).count()
+    ra_count = rollup.count('personnel', buckets=['Rehab Assistant'])
+    rt_count = rollup.count('personnel', buckets=['Rehab Technician'])
     
     # Staff counts (Project Officers, Coordinators, etc from staffTbl)
-    po_count = staffTbl.objects.filter(
-        delete_field='no'
-    ).filter(
-        Q(staffid__icontains='PO-') | Q(staffid__icontains='PC-')
-    ).count()
+    po_count = rollup.count('staff', buckets=['po'])
     
     # Total staff (excluding those who might be in PersonnelModel)
-    staff_count = staffTbl.objects.all().count()
-    total_personnel = PersonnelModel.objects.all().count()
+    staff_count = rollup.count('staff')
+    total_personnel = rollup.count('personnel')
     
     # Sector Statistics (instead of Farms)
-    total_sectors = SectorModel.objects.all().count()
-    
-    # Get total area from sectors
-    total_sector_area = SectorModel.objects.filter(
-         
-        size_Ha__isnull=False
-    ).aggregate(
-        total=Sum('size_Ha')
-    )['total'] or 0
+    total_sectors = rollup.count('sector.area')
+    total_sector_area = rollup.total('sector.area')
     
     # Average soil metrics
-    avg_ph = SectorModel.objects.filter(
-         
-        mean_pH__isnull=False
-    ).aggregate(
-        avg=Avg('mean_pH')
-    )['avg'] or 0
-    
-    avg_oc = SectorModel.objects.filter(
-         
-        mean_OC__isnull=False
-    ).aggregate(
-        avg=Avg('mean_OC')
-    )['avg'] or 0
+    avg_ph = rollup.average('sector.ph')
+    avg_oc = rollup.average('sector.oc')
     
     # Growth Monitoring Statistics
-    total_growth_records = GrowthMonitoringModel.objects.all().count()
-    avg_plant_height = GrowthMonitoringModel.objects.filter(
-         
-        height__isnull=False
-    ).aggregate(
-        avg=Avg('height')
-    )['avg'] or 0
-    
-    avg_leaves = GrowthMonitoringModel.objects.filter(
-         
-        number_of_leaves__isnull=False
-    ).aggregate(
-        avg=Avg('number_of_leaves')
-    )['avg'] or 0
+    total_growth_records = rollup.count('growth.height')
+    avg_plant_height = rollup.average('growth.height')
+    avg_leaves = rollup.average('growth.leaves')
     
     # QR Code Statistics
-    total_qr_codes = QR_CodeModel.objects.all().count()
-    used_qr_codes = QR_CodeModel.objects.filter( is_used=True).count()
-    active_qr_codes = QR_CodeModel.objects.filter( is_active=True).count()
+    total_qr_codes = rollup.count('qr.used')
+    used_qr_codes = rollup.count('qr.used', buckets=[True])
+    active_qr_codes = rollup.count('qr.active', buckets=[True])
     
     # Assignment statistics
-    active_assignments = PersonnelAssignmentModel.objects.filter(
-         
-        status__in=[1, 2]  # Submitted or Approved
-    ).count()
-    
-    pending_assignments = PersonnelAssignmentModel.objects.filter(
-         
-        status=0  # Pending
-    ).count()
-    
-    total_assignments = PersonnelAssignmentModel.objects.all().count()
+    active_assignments = rollup.count('assignment', buckets=[1, 2])  # Submitted or Approved
+    pending_assignments = rollup.count('assignment', buckets=[0])  # Pending
+    total_assignments = rollup.count('assignment')
     
     # Contractor statistics
-    total_contractors = contractorsTbl.objects.all().count()
+    total_contractors = rollup.count('contractor')
     
     # Get certified contractors through certificate model
-    certified_contractors = ContractorCertificateModel.objects.filter(
-        
-        status='Verified'
-    ).values('contractor').distinct().count()
+    certified_contractors = rollup.distinct_buckets('certificate.verified')
     
     # Activity statistics (Daily and Activity Reporting)
-    total_daily_reports = DailyReportingModel.objects.all().count()
-    total_activity_reports = ActivityReportingModel.objects.all().count()
-    
-    daily_reports_today = DailyReportingModel.objects.filter(
-        
-        reporting_date=date.today()
-    ).count()
-    
-    activity_reports_today = ActivityReportingModel.objects.filter(
-        
-        reporting_date=date.today()
-    ).count()
+    total_daily_reports = rollup.count('daily')
+    total_activity_reports = rollup.count('activity')
+    daily_reports_today = rollup.count('daily', day=today)
+    activity_reports_today = rollup.count('activity', day=today)
     
     # Total area covered in reports
-    total_area_covered_daily = DailyReportingModel.objects.filter(
-        delete_field='no'
-    ).aggregate(
-        total=Sum('area_covered_ha')
-    )['total'] or 0
-    
-    total_area_covered_activity = ActivityReportingModel.objects.filter(
-        delete_field='no'
-    ).aggregate(
-        total=Sum('area_covered_ha')
-    )['total'] or 0
+    total_area_covered_daily = rollup.total('daily')
+    total_area_covered_activity = rollup.total('activity')
     
     # Irrigation statistics
-    total_irrigation_records = IrrigationModel.objects.all().count()
-    total_water_volume = IrrigationModel.objects.filter(
-        delete_field='no'
-    ).aggregate(
-        total=Sum('water_volume')
-    )['total'] or 0
+    total_irrigation_records = rollup.count('irrigation')
+    total_water_volume = rollup.total('irrigation')
     
     # District and community statistics
-    total_districts = cocoaDistrict.objects.all().count()
-    total_regions = Region.objects.all().count()
-    total_communities = Community.objects.all().count()
-    total_projects = projectTbl.objects.all().count()
+    total_districts = rollup.count('district')
+    total_regions = rollup.count('region')
+    total_communities = rollup.count('community')
+    total_projects = rollup.count('project')
     
     # Activity types
-    total_activities = Activities.objects.all().count()
+    total_activities = rollup.count('activity_type')
     
     context = {
         # Personnel Stats
@@ -229,71 +180,49 @@ def general_dashboard(request):
 
 @require_http_methods(["GET"])
 def get_dashboard_stats(request):
-    """API endpoint to get real-time dashboard statistics - Using only provided models"""
+    """API endpoint to get real-time dashboard statistics - read from the dashboard rollups.
+    Superusers can pass ?rebuild=1 to force a full rollup rebuild first."""
     try:
         # Get date range from request (default to last 30 days)
         days = int(request.GET.get('days', 30))
         end_date = date.today()
         start_date = end_date - timedelta(days=days)
         
+        if request.GET.get('rebuild') and request.user.is_superuser:
+            rebuild_rollups()
+        rollup = load_snapshot(start_date)
+        
         # Personnel Statistics
         personnel_stats = {
-            'total': PersonnelModel.objects.all().count(),
-            'by_type': list(PersonnelModel.objects.all()
-                           .values('personnel_type')
-                           .annotate(count=Count('id'))
-                           .order_by('-count')),
-            'by_gender': list(PersonnelModel.objects.all()
-                            .values('gender')
-                            .annotate(count=Count('id'))),
-            'by_district': list(PersonnelModel.objects.filter( district__isnull=False)
-                               .values('district__name')
-                               .annotate(count=Count('id'))
-                               .order_by('-count')[:10]),
+            'total': rollup.count('personnel'),
+            'by_type': _rollup_list(rollup.group('personnel', 'bucket'), 'personnel_type'),
+            'by_gender': _rollup_list(rollup.group('personnel.gender', 'bucket'), 'gender'),
+            'by_district': _rollup_list(rollup.group('personnel', 'district__name'), 'district__name', limit=10),
         }
         
         # Staff Statistics
         staff_stats = {
-            'total': staffTbl.objects.all().count(),
-            'by_project': list(staffTbl.objects.filter( projectTbl_foreignkey__isnull=False)
-                              .values('projectTbl_foreignkey__name')
-                              .annotate(count=Count('id'))
-                              .order_by('-count')[:10]),
+            'total': rollup.count('staff'),
+            'by_project': _rollup_list(rollup.group('staff', 'project__name'), 'projectTbl_foreignkey__name', limit=10),
         }
         
         # Sector Statistics
         sector_stats = {
-            'total': SectorModel.objects.all().count(),
-            'total_area': float(SectorModel.objects.filter( size_Ha__isnull=False)
-                               .aggregate(total=Sum('size_Ha'))['total'] or 0),
-            'avg_ph': float(SectorModel.objects.filter( mean_pH__isnull=False)
-                           .aggregate(avg=Avg('mean_pH'))['avg'] or 0),
-            'avg_oc': float(SectorModel.objects.filter( mean_OC__isnull=False)
-                           .aggregate(avg=Avg('mean_OC'))['avg'] or 0),
-            'by_district': list(SectorModel.objects.all()
-                               .annotate(district_name=F('created_by__staffTbl__district__name'))
-                               .values('district_name')
-                               .annotate(
-                                   count=Count('id'),
-                                   total_area=Sum('size_Ha')
-                               )
-                               .order_by('-count')[:10]),
+            'total': rollup.count('sector.area'),
+            'total_area': float(rollup.total('sector.area')),
+            'avg_ph': float(rollup.average('sector.ph')),
+            'avg_oc': float(rollup.average('sector.oc')),
+            'by_district': _rollup_list(rollup.group('sector.area', 'district__name'), 'district_name',
+                                        limit=10, value_name='total_area'),
         }
         
         # Growth Monitoring Statistics
         growth_stats = {
-            'total': GrowthMonitoringModel.objects.all().count(),
-            'avg_height': float(GrowthMonitoringModel.objects.filter( height__isnull=False)
-                               .aggregate(avg=Avg('height'))['avg'] or 0),
-            'avg_leaves': float(GrowthMonitoringModel.objects.filter( number_of_leaves__isnull=False)
-                               .aggregate(avg=Avg('number_of_leaves'))['avg'] or 0),
-            'by_leaf_color': list(GrowthMonitoringModel.objects.all()
-                                 .values('leaf_color')
-                                 .annotate(count=Count('id'))),
-            'by_district': list(GrowthMonitoringModel.objects.filter( district__isnull=False)
-                               .values('district__name')
-                               .annotate(count=Count('id'))
-                               .order_by('-count')[:10]),
+            'total': rollup.count('growth.height'),
+            'avg_height': float(rollup.average('growth.height')),
+            'avg_leaves': float(rollup.average('growth.leaves')),
+            'by_leaf_color': _rollup_list(rollup.group('growth.height', 'bucket'), 'leaf_color'),
+            'by_district': _rollup_list(rollup.group('growth.height', 'district__name'), 'district__name', limit=10),
             'recent': list(GrowthMonitoringModel.objects.all()
                           .order_by('-date')[:10]
                           .values('plant_uid', 'height', 'number_of_leaves', 'date')),
@@ -301,9 +230,9 @@ def get_dashboard_stats(request):
         
         # QR Code Statistics
         qr_stats = {
-            'total': QR_CodeModel.objects.all().count(),
-            'used': QR_CodeModel.objects.filter( is_used=True).count(),
-            'active': QR_CodeModel.objects.filter( is_active=True).count(),
+            'total': rollup.count('qr.used'),
+            'used': rollup.count('qr.used', buckets=[True]),
+            'active': rollup.count('qr.active', buckets=[True]),
             'usage_percentage': 0,
         }
         if qr_stats['total'] > 0:
@@ -311,185 +240,80 @@ def get_dashboard_stats(request):
         
         # Assignment Statistics
         assignment_stats = {
-            'total': PersonnelAssignmentModel.objects.all().count(),
-            'by_status': list(PersonnelAssignmentModel.objects.all()
-                             .values('status')
-                             .annotate(count=Count('id'))),
-            'by_district': list(PersonnelAssignmentModel.objects.filter( district__isnull=False)
-                               .values('district__name')
-                               .annotate(count=Count('id'))
-                               .order_by('-count')[:10]),
-            'active': PersonnelAssignmentModel.objects.filter( status__in=[1, 2]).count(),
-            'pending': PersonnelAssignmentModel.objects.filter( status=0).count(),
+            'total': rollup.count('assignment'),
+            'by_status': _rollup_list(rollup.group('assignment', 'bucket'), 'status', cast=int),
+            'by_district': _rollup_list(rollup.group('assignment', 'district__name'), 'district__name', limit=10),
+            'active': rollup.count('assignment', buckets=[1, 2]),
+            'pending': rollup.count('assignment', buckets=[0]),
         }
         
         # Contractor Statistics
         contractor_stats = {
-            'total': contractorsTbl.objects.all().count(),
-            'by_service': list(contractorsTbl.objects.all()
-                              .values('interested_services')
-                              .annotate(count=Count('id'))
-                              .order_by('-count')),
-            'by_district': list(contratorDistrictAssignment.objects.filter(
-                                    
-                                   contractor__isnull=False
-                               )
-                               .values('district__name')
-                               .annotate(count=Count('contractor', distinct=True))
-                               .order_by('-count')[:10]),
-            'certified': ContractorCertificateModel.objects.filter( status='Verified')
-                        .values('contractor').distinct().count(),
-            'pending_certificates': ContractorCertificateModel.objects.filter( status='Pending').count(),
-            'verified_certificates': ContractorCertificateModel.objects.filter( status='Verified').count(),
+            'total': rollup.count('contractor'),
+            'by_service': _rollup_list(rollup.group('contractor', 'bucket'), 'interested_services'),
+            'by_district': _rollup_list(rollup.group('contractor.district', 'district__name', distinct=True),
+                                        'district__name', limit=10),
+            'certified': rollup.distinct_buckets('certificate.verified'),
+            'pending_certificates': rollup.count('certificate', buckets=['Pending']),
+            'verified_certificates': rollup.count('certificate', buckets=['Verified']),
         }
         
         # Daily Reporting Statistics
         daily_report_stats = {
-            'total': DailyReportingModel.objects.all().count(),
-            'today': DailyReportingModel.objects.filter( reporting_date=date.today()).count(),
-            'this_week': DailyReportingModel.objects.filter(
-                
-                reporting_date__gte=start_date
-            ).count(),
-            'total_area': float(DailyReportingModel.objects.all()
-                               .aggregate(total=Sum('area_covered_ha'))['total'] or 0),
-            'by_activity': list(DailyReportingModel.objects.filter( activity__isnull=False)
-                               .values('activity__sub_activity')
-                               .annotate(count=Count('id'))
-                               .order_by('-count')[:10]),
-            'by_district': list(DailyReportingModel.objects.filter( district__isnull=False)
-                               .values('district__name')
-                               .annotate(
-                                   count=Count('id'),
-                                   total_area=Sum('area_covered_ha')
-                               )
-                               .order_by('-count')[:10]),
+            'total': rollup.count('daily'),
+            'today': rollup.count('daily', day=end_date),
+            'this_week': rollup.count('daily', since=start_date),
+            'total_area': float(rollup.total('daily')),
+            'by_activity': _rollup_list(rollup.group('daily', 'bucket'), 'activity__sub_activity', limit=10),
+            'by_district': _rollup_list(rollup.group('daily', 'district__name'), 'district__name',
+                                        limit=10, value_name='total_area'),
         }
         
         # Activity Reporting Statistics
         activity_report_stats = {
-            'total': ActivityReportingModel.objects.all().count(),
-            'today': ActivityReportingModel.objects.filter( reporting_date=date.today()).count(),
-            'this_week': ActivityReportingModel.objects.filter(
-                
-                reporting_date__gte=start_date
-            ).count(),
-            'total_area': float(ActivityReportingModel.objects.all()
-                               .aggregate(total=Sum('area_covered_ha'))['total'] or 0),
-            'by_activity': list(ActivityReportingModel.objects.filter( activity__isnull=False)
-                               .values('activity__sub_activity')
-                               .annotate(count=Count('id'))
-                               .order_by('-count')[:10]),
+            'total': rollup.count('activity'),
+            'today': rollup.count('activity', day=end_date),
+            'this_week': rollup.count('activity', since=start_date),
+            'total_area': float(rollup.total('activity')),
+            'by_activity': _rollup_list(rollup.group('activity', 'bucket'), 'activity__sub_activity', limit=10),
         }
         
         # Irrigation Statistics
         irrigation_stats = {
-            'total': IrrigationModel.objects.all().count(),
-            'total_volume': float(IrrigationModel.objects.all()
-                                 .aggregate(total=Sum('water_volume'))['total'] or 0),
-            'by_type': list(IrrigationModel.objects.filter( irrigation_type__isnull=False)
-                           .values('irrigation_type__irrigation_type')
-                           .annotate(
-                               count=Count('id'),
-                               total_volume=Sum('water_volume')
-                           )
-                           .order_by('-count')),
-            'by_district': list(IrrigationModel.objects.filter( district__isnull=False)
-                               .values('district__name')
-                               .annotate(
-                                   count=Count('id'),
-                                   total_volume=Sum('water_volume')
-                               )
-                               .order_by('-count')[:10]),
+            'total': rollup.count('irrigation'),
+            'total_volume': float(rollup.total('irrigation')),
+            'by_type': _rollup_list(rollup.group('irrigation', 'bucket'), 'irrigation_type__irrigation_type',
+                                    value_name='total_volume'),
+            'by_district': _rollup_list(rollup.group('irrigation', 'district__name'), 'district__name',
+                                        limit=10, value_name='total_volume'),
         }
         
         # Geographic Statistics
         geo_stats = {
-            'regions': Region.objects.all().count(),
-            'districts': cocoaDistrict.objects.all().count(),
-            'communities': Community.objects.all().count(),
-            'projects': projectTbl.objects.all().count(),
-            'sectors': SectorModel.objects.all().count(),
-            'top_districts_sectors': list(SectorModel.objects.all()
-                                         .annotate(district_name=F('created_by__staffTbl__district__name'))
-                                         .values('district_name')
-                                         .annotate(count=Count('id'))
-                                         .order_by('-count')[:10]),
-            'top_districts_ras': list(PersonnelModel.objects.filter(
-                                         
-                                        district__isnull=False,
-                                        personnel_type='Rehab Assistant'
-                                    )
-                                    .values('district__name')
-                                    .annotate(count=Count('id'))
-                                    .order_by('-count')[:10]),
-            'top_districts_reports': list(DailyReportingModel.objects.filter(
-                                             
-                                            district__isnull=False
-                                        )
-                                        .values('district__name')
-                                        .annotate(count=Count('id'))
-                                        .order_by('-count')[:10]),
+            'regions': rollup.count('region'),
+            'districts': rollup.count('district'),
+            'communities': rollup.count('community'),
+            'projects': rollup.count('project'),
+            'sectors': rollup.count('sector.area'),
+            'top_districts_sectors': _rollup_list(rollup.group('sector.area', 'district__name'), 'district_name', limit=10),
+            'top_districts_ras': _rollup_list(rollup.group('personnel', 'district__name', buckets=['Rehab Assistant']),
+                                              'district__name', limit=10),
+            'top_districts_reports': _rollup_list(rollup.group('daily', 'district__name'), 'district__name', limit=10),
         }
         
         # Activity Types
         activity_types = {
-            'total': Activities.objects.all().count(),
-            'by_main': list(Activities.objects.all()
-                           .values('main_activity')
-                           .annotate(count=Count('id'))
-                           .order_by('-count')),
+            'total': rollup.count('activity_type'),
+            'by_main': _rollup_list(rollup.group('activity_type', 'bucket'), 'main_activity'),
         }
         
         # Trend data for charts
         trend_data = {
-            'growth_records': list(GrowthMonitoringModel.objects.filter(
-                                    
-                                    date__gte=start_date
-                                )
-                                .annotate(day=TruncDay('date'))
-                                .values('day')
-                                .annotate(count=Count('id'))
-                                .order_by('day')),
-            
-            'daily_reports': list(DailyReportingModel.objects.filter(
-                                    
-                                    reporting_date__gte=start_date
-                                )
-                                .annotate(day=TruncDay('reporting_date'))
-                                .values('day')
-                                .annotate(count=Count('id'))
-                                .order_by('day')),
-            
-            'activity_reports': list(ActivityReportingModel.objects.filter(
-                                        
-                                        reporting_date__gte=start_date
-                                    )
-                                    .annotate(day=TruncDay('reporting_date'))
-                                    .values('day')
-                                    .annotate(count=Count('id'))
-                                    .order_by('day')),
-            
-            'assignments': list(PersonnelAssignmentModel.objects.filter(
-                                    
-                                    created_date__gte=start_date
-                                )
-                                .annotate(day=TruncDay('created_date'))
-                                .values('day')
-                                .annotate(count=Count('id'))
-                                .order_by('day')),
-            
-            'irrigation': list(IrrigationModel.objects.filter(
-                                    
-                                    date__gte=start_date
-                                )
-                                .annotate(day=TruncDay('date'))
-                                .values('day')
-                                .annotate(
-                                    count=Count('id'),
-                                    volume=Sum('water_volume')
-                                )
-                                .order_by('day')),
+            'growth_records': _rollup_trend(rollup.trend('growth.height')),
+            'daily_reports': _rollup_trend(rollup.trend('daily')),
+            'activity_reports': _rollup_trend(rollup.trend('activity')),
+            'assignments': _rollup_trend(rollup.trend('assignment')),
+            'irrigation': _rollup_trend(rollup.trend('irrigation'), value_name='volume'),
         }
         
         response = {
@@ -2,20 +2,20 @@
 
 import json
 import uuid
-import csv
 from datetime import datetime
 from django.shortcuts import render
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.utils import timezone
-from django.db.models import Q, Count, Sum
-from django.core.paginator import Paginator
+from django.db.models import Q, Count, Sum, Prefetch
 from django.contrib.auth.decorators import login_required
 from portal.models import (
     EquipmentModel, EquipmentAssignmentModel,
     staffTbl, projectTbl, cocoaDistrict
 )
+from utils.datatables import paginate
+from utils.exports import export_response
 import logging
 
 logger = logging.getLogger(__name__)
@@ -37,16 +37,18 @@ def equipment_overview_page(request):
 
 # ============== EQUIPMENT API VIEWS ==============
 
+# DataTables column index -> sort field
+EQUIPMENT_SORTABLE_COLUMNS = {0: 'equipment_code', 8: 'date_of_capturing'}
+EQUIPMENT_SEARCH_FIELDS = (
+    'equipment_code', 'equipment', 'serial_number', 'manufacturer',
+    'staff_name__first_name', 'staff_name__last_name',
+)
+
 @login_required
 @require_http_methods(["GET"])
 def equipment_list(request):
     """Get paginated list of equipment"""
     try:
-        draw = int(request.GET.get('draw', 1))
-        start = int(request.GET.get('start', 0))
-        length = int(request.GET.get('length', 10))
-        search_value = request.GET.get('search[value]', '')
-        
         # Filter parameters
         status = request.GET.get('status')
         district_id = request.GET.get('district_id')
@@ -56,7 +58,13 @@ def equipment_list(request):
         # Base queryset
         queryset = EquipmentModel.objects.filter(delete_field='no').select_related(
             'staff_name', 'projectTbl_foreignkey', 'district'
-        ).order_by('-created_date')
+        ).prefetch_related(Prefetch(
+            'equipmentassignmentmodel_set',
+            queryset=EquipmentAssignmentModel.objects.filter(
+                status='Assigned', delete_field='no'
+            ).select_related('assigned_to').order_by('pk'),
+            to_attr='current_assignments',
+        ))
         
         # Apply filters
         if status:
@@ -72,34 +80,19 @@ def equipment_list(request):
         elif assigned == 'no':
             queryset = queryset.filter(staff_name__isnull=True)
         
-        # Apply search
-        if search_value:
-            queryset = queryset.filter(
-                Q(equipment_code__icontains=search_value) |
-                Q(equipment__icontains=search_value) |
-                Q(serial_number__icontains=search_value) |
-                Q(manufacturer__icontains=search_value) |
-                Q(staff_name__first_name__icontains=search_value) |
-                Q(staff_name__last_name__icontains=search_value)
-            )
-        
-        # Get total counts
-        total_records = queryset.count()
-        
-        # Apply pagination
-        paginator = Paginator(queryset, length)
-        page_number = (start // length) + 1
-        page_obj = paginator.get_page(page_number)
+        # Search, sort and paginate in one query
+        page_obj = paginate(
+            request, queryset,
+            sortable=EQUIPMENT_SORTABLE_COLUMNS,
+            search_fields=EQUIPMENT_SEARCH_FIELDS,
+            default_order=('-created_date',),
+        )
         
         # Prepare data
         data = []
         for equipment in page_obj:
-            # Get current assignment
-            current_assignment = EquipmentAssignmentModel.objects.filter(
-                equipment=equipment,
-                status='Assigned',
-                delete_field='no'
-            ).select_related('assigned_to').first()
+            # Current assignment (prefetched)
+            current_assignment = equipment.current_assignments[0] if equipment.current_assignments else None
             
             data.append({
                 'id': equipment.id,
@@ -124,14 +117,7 @@ def equipment_list(request):
                 'is_assigned': equipment.staff_name is not None,
             })
         
-        response = {
-            'draw': draw,
-            'recordsTotal': total_records,
-            'recordsFiltered': total_records,
-            'data': data,
-            'success': True
-        }
-        return JsonResponse(response)
+        return page_obj.response(data)
         
     except Exception as e:
         logger.error(f"Error in equipment_list: {str(e)}")
@@ -451,16 +437,16 @@ def equipment_delete(request, pk):
 
 # ============== EQUIPMENT ASSIGNMENT API VIEWS ==============
 
+ASSIGNMENT_SEARCH_FIELDS = (
+    'equipment__equipment', 'equipment__equipment_code',
+    'assigned_to__first_name', 'assigned_to__last_name', 'notes',
+)
+
 @login_required
 @require_http_methods(["GET"])
 def equipment_assignment_list(request):
     """Get paginated list of equipment assignments"""
     try:
-        draw = int(request.GET.get('draw', 1))
-        start = int(request.GET.get('start', 0))
-        length = int(request.GET.get('length', 10))
-        search_value = request.GET.get('search[value]', '')
-        
         # Filter parameters
         status = request.GET.get('status', 'Assigned')
         equipment_id = request.GET.get('equipment_id')
@@ -472,7 +458,7 @@ def equipment_assignment_list(request):
         ).select_related(
             'equipment', 'assigned_to', 'assigned_by',
             'projectTbl_foreignkey', 'district'
-        ).order_by('-assignment_date')
+        )
         
         # Apply filters
         if status:
@@ -482,23 +468,12 @@ def equipment_assignment_list(request):
         if assigned_to_id:
             queryset = queryset.filter(assigned_to_id=assigned_to_id)
         
-        # Apply search
-        if search_value:
-            queryset = queryset.filter(
-                Q(equipment__equipment__icontains=search_value) |
-                Q(equipment__equipment_code__icontains=search_value) |
-                Q(assigned_to__first_name__icontains=search_value) |
-                Q(assigned_to__last_name__icontains=search_value) |
-                Q(notes__icontains=search_value)
-            )
-        
-        # Get total counts
-        total_records = queryset.count()
-        
-        # Apply pagination
-        paginator = Paginator(queryset, length)
-        page_number = (start // length) + 1
-        page_obj = paginator.get_page(page_number)
+        # Search and paginate in one query
+        page_obj = paginate(
+            request, queryset,
+            search_fields=ASSIGNMENT_SEARCH_FIELDS,
+            default_order=('-assignment_date',),
+        )
         
         # Prepare data
         data = []
@@ -524,14 +499,7 @@ def equipment_assignment_list(request):
                 'district_name': a.district.name if a.district else 'N/A',
             })
         
-        response = {
-            'draw': draw,
-            'recordsTotal': total_records,
-            'recordsFiltered': total_records,
-            'data': data,
-            'success': True
-        }
-        return JsonResponse(response)
+        return page_obj.response(data)
         
     except Exception as e:
         logger.error(f"Error in equipment_assignment_list: {str(e)}")
@@ -731,20 +699,33 @@ def equipment_assignment_detail(request, pk):
 
 # ============== EXPORT FUNCTION ==============
 
+EQUIPMENT_EXPORT_COLUMNS = [
+    ('Equipment Code', 'equipment_code', lambda code: code or ''),
+    ('Equipment Name', 'equipment', None),
+    ('Serial Number', 'serial_number', None),
+    ('Manufacturer', 'manufacturer', None),
+    ('Status', 'status', None),
+    ('Assigned To', ('staff_name_id', 'staff_name__first_name', 'staff_name__last_name'),
+     lambda staff_id, first_name, last_name: f"{first_name} {last_name}" if staff_id else 'Unassigned'),
+    ('District', 'district__name', None),
+    ('Project', 'projectTbl_foreignkey__name', None),
+    ('Date Added', 'created_date', lambda value: value.strftime('%Y-%m-%d') if value else ''),
+]
+
+
 @login_required
 @require_http_methods(["GET"])
 def export_equipment(request):
-    """Export equipment inventory to CSV"""
+    """Export equipment inventory to CSV (or XLSX with file_format=xlsx)"""
     try:
         # Get filter parameters
         status = request.GET.get('status')
         district_id = request.GET.get('district_id')
         assigned = request.GET.get('assigned')
+        file_format = request.GET.get('file_format', 'csv')
         
         # Base queryset
-        queryset = EquipmentModel.objects.filter(delete_field='no').select_related(
-            'staff_name', 'district'
-        ).order_by('-created_date')
+        queryset = EquipmentModel.objects.filter(delete_field='no').order_by('-created_date')
         
         # Apply filters
         if status:
@@ -756,34 +737,11 @@ def export_equipment(request):
         elif assigned == 'no':
             queryset = queryset.filter(staff_name__isnull=True)
         
-        # Create CSV response
-        response = HttpResponse(content_type='text/csv')
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        response['Content-Disposition'] = f'attachment; filename="equipment_inventory_{timestamp}.csv"'
-        
-        writer = csv.writer(response)
-        
-        # Write headers
-        writer.writerow([
-            'Equipment Code', 'Equipment Name', 'Serial Number', 'Manufacturer',
-            'Status', 'Assigned To', 'District', 'Project', 'Date Added'
-        ])
-        
-        # Write data
-        for eq in queryset:
-            writer.writerow([
-                eq.equipment_code or '',
-                eq.equipment,
-                eq.serial_number,
-                eq.manufacturer,
-                eq.status,
-                f"{eq.staff_name.first_name} {eq.staff_name.last_name}" if eq.staff_name else 'Unassigned',
-                eq.district.name if eq.district else '',
-                eq.projectTbl_foreignkey.name if eq.projectTbl_foreignkey else '',
-                eq.created_date.strftime('%Y-%m-%d') if eq.created_date else ''
-            ])
-        
-        return response
+        return export_response(
+            request, queryset, EQUIPMENT_EXPORT_COLUMNS,
+            f'equipment_inventory_{timestamp}', file_format, sheet_title='Equipment'
+        )
         
     except Exception as e:
         logger.error(f"Error in export_equipment: {str(e)}")
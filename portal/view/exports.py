@@ -0,0 +1,48 @@
+import os
+
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.urls import reverse
+from django.views.decorators.http import require_http_methods
+
+from utils.exports import XLSX_CONTENT_TYPE, file_response, get_export_job
+
+
+def _user_job(request, job_id):
+    job = get_export_job(job_id)
+    if not job or job.get('user_id') != request.user.pk:
+        return None
+    return job
+
+
+@login_required
+@require_http_methods(["GET"])
+def export_job_status(request, job_id):
+    """Status of a background export started with ?background=1"""
+    job = _user_job(request, job_id)
+    if job is None:
+        return JsonResponse({'success': False, 'message': 'Export not found'}, status=404)
+
+    data = {
+        'success': True,
+        'job_id': job_id,
+        'status': job['status'],
+        'filename': job['filename'],
+    }
+    if job['status'] == 'done':
+        data['download_url'] = reverse('export_job_download', args=[job_id])
+    elif job['status'] == 'failed':
+        data['message'] = job.get('message', '')
+    return JsonResponse(data)
+
+
+@login_required
+@require_http_methods(["GET"])
+def export_job_download(request, job_id):
+    """Download the file written by a finished background export"""
+    job = _user_job(request, job_id)
+    if job is None or job['status'] != 'done' or not os.path.exists(job['path']):
+        return JsonResponse({'success': False, 'message': 'Export not found'}, status=404)
+
+    content_type = XLSX_CONTENT_TYPE if job['file_format'] == 'xlsx' else 'text/csv'
+    return file_response(open(job['path'], 'rb'), job['filename'], content_type)
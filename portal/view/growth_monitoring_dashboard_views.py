@@ -5,7 +5,8 @@ from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.decorators import login_required
 from django.db.models import Q, Count, Sum, Avg, Min, Max, F, Value, FloatField, IntegerField, Case, When, CharField
-from django.db.models.functions import Coalesce, TruncDate
+from django.db.models.functions import Cast, Coalesce, Floor, Least, Round, TruncDate
+from django.contrib.gis.geos import Polygon
 from django.utils import timezone
 from datetime import datetime, timedelta
 from django.contrib.auth.models import User
@@ -16,13 +17,19 @@ from ..models import (
     GrowthMonitoringModel, 
     staffTbl, 
     cocoaDistrict,
-    Region
+    Region,
+    lng_lat_point
 )
 
+# Heatmap cells along one tile edge at the requested zoom
+HEAT_CELLS_PER_TILE = 16
+
 @login_required
 def growth_monitoring_dashboard(request):
     """Render the Growth Monitoring Dashboard"""
-    return render(request, 'portal/qr_code/dashboard.html')
+    return render(request, 'portal/qr_code/dashboard.html', {
+        'leaf_color_scores': LEAF_COLOR_SCORES,
+    })
 
 @csrf_exempt
 @require_http_methods(["GET"])
@@ -116,7 +123,7 @@ def get_dashboard_data(request):
         trends = get_growth_trends(current_data)
         
         # Health distribution
-        health_distribution = get_health_distribution(current_data)
+        health_distribution = get_health_distribution(current_data, health_stats)
         
         # Growth stages
         growth_stages = get_growth_stages(current_data)
@@ -170,7 +177,9 @@ def get_dashboard_data(request):
 @csrf_exempt
 @require_http_methods(["GET"])
 def get_map_data(request):
-    """Get geographic data for map visualization - FIXED"""
+    """Extent and count of the filtered growth points, plus heatmap density
+    cells when ?zoom= and ?bbox=xmin,ymin,xmax,ymax are given. The points
+    themselves are drawn from the growth vector tiles (portal.view.tiles)."""
     try:
         # Date filters
         start_date = request.GET.get('start_date')
@@ -193,36 +202,40 @@ def get_map_data(request):
         if district_id and district_id != '':
             queryset = queryset.filter(district_id=district_id)
         
-        # Select related for better performance
-        queryset = queryset.select_related('agent', 'district').order_by('-date')[:500]
-        
-        points = []
-        for record in queryset:
-            health_score = calculate_plant_health_score(
-                record.height, 
-                record.number_of_leaves, 
-                record.leaf_color
+        bounds = queryset.aggregate(
+            xmin=Min('lng'), ymin=Min('lat'), xmax=Max('lng'), ymax=Max('lat'), total=Count('id')
+        )
+        extent = None
+        if bounds['total']:
+            extent = [bounds['xmin'], bounds['ymin'], bounds['xmax'], bounds['ymax']]
+        
+        cells = []
+        zoom = request.GET.get('zoom')
+        bbox = request.GET.get('bbox')
+        if zoom and bbox:
+            # Points are averaged into a grid that stays ~HEAT_CELLS_PER_TILE
+            # cells per tile edge whatever the zoom, so the payload is
+            # bounded by the viewport rather than the number of plants
+            cell = 360.0 / (2 ** min(max(int(zoom), 0), 22)) / HEAT_CELLS_PER_TILE
+            cells = list(
+                queryset.annotate(point=lng_lat_point())
+                .filter(point__bboverlaps=Polygon.from_bbox([float(v) for v in bbox.split(',')]))
+                .annotate(cell_x=Floor(F('lng') / cell), cell_y=Floor(F('lat') / cell))
+                .values('cell_x', 'cell_y')
+                .annotate(
+                    cell_lat=Avg('lat'),
+                    cell_lng=Avg('lng'),
+                    count=Count('id'),
+                    health_score=Avg(plant_health_score_expression()),
+                )
             )
-            
-            points.append({
-                'id': record.id,
-                'lat': float(record.lat) if record.lat else 0,
-                'lng': float(record.lng) if record.lng else 0,
-                'plant_uid': record.plant_uid[:15] + '...' if len(record.plant_uid) > 15 else record.plant_uid,
-                'height': float(record.height) if record.height else 0,
-                'leaves': record.number_of_leaves or 0,
-                'health_score': health_score,
-                'date': record.date.strftime('%Y-%m-%d') if record.date else '',
-                'officer': f"{record.agent.first_name} {record.agent.last_name}"[:20] if record.agent else 'N/A',
-                'district': record.district.name[:20] if record.district else 'N/A',
-                'leaf_color': record.leaf_color or 'Unknown'
-            })
         
         return JsonResponse({
             'success': True,
             'data': {
-                'points': points,
-                'total': len(points)
+                'extent': extent,
+                'total': bounds['total'],
+                'cells': cells
             }
         })
         
@@ -305,10 +318,10 @@ def get_district_stats_api(request):
         if end_date:
             queryset = queryset.filter(date__lte=end_date)
         
-        # Group by district
-        from django.db.models.functions import Coalesce
-        
-        districts = queryset.values(
+        # Group by district; the health score is averaged over every row in SQL
+        districts = queryset.annotate(
+            health_score=plant_health_score_expression()
+        ).values(
             'district_id', 
             'district__name'
         ).annotate(
@@ -316,26 +329,13 @@ def get_district_stats_api(request):
             total_measurements=Count('id'),
             avg_height=Coalesce(Avg('height'), 0.0),
             avg_leaves=Coalesce(Avg('number_of_leaves'), 0.0),
+            avg_health_score=Coalesce(Avg('health_score'), 0.0),
             officer_count=Count('agent', distinct=True)
         ).order_by('-total_plants')
         
         stats = []
         for district in districts:
             if district['district_id']:
-                # Calculate health score separately
-                district_queryset = queryset.filter(district_id=district['district_id'])
-                health_score = 0
-                if district_queryset.exists():
-                    scores = []
-                    for record in district_queryset[:100]:  # Sample for performance
-                        score = calculate_plant_health_score(
-                            record.height, 
-                            record.number_of_leaves, 
-                            record.leaf_color
-                        )
-                        scores.append(score)
-                    health_score = sum(scores) / len(scores) if scores else 0
-                
                 stats.append({
                     'id': district['district_id'],
                     'name': district['district__name'] or 'Unknown',
@@ -343,7 +343,7 @@ def get_district_stats_api(request):
                     'total_measurements': district['total_measurements'],
                     'avg_height': round(district['avg_height'] or 0, 1),
                     'avg_leaves': round(district['avg_leaves'] or 0, 1),
-                    'health_score': round(health_score, 1),
+                    'health_score': round(district['avg_health_score'], 1),
                     'officer_count': district['officer_count'],
                     'growth_rate': random.randint(5, 25),  # Placeholder
                     'trend': 1 if random.random() > 0.5 else -1  # Placeholder
@@ -370,8 +370,43 @@ def calculate_trend(current, previous):
         return 100 if current > 0 else 0
     return round(((current - previous) / previous) * 100, 1)
 
+# Leaf color score (max 30 points); any other color scores 10
+LEAF_COLOR_SCORES = {
+    'Green': 30,
+    'Dark Green': 30,
+    'Light Green': 25,
+    'Yellowish': 15,
+    'Spotted': 10,
+    'Brown': 5
+}
+
+# Score bands used by the health stats and distribution
+HEALTH_BANDS = (
+    ('excellent', Q(health_score__gte=80)),
+    ('good', Q(health_score__gte=60, health_score__lt=80)),
+    ('fair', Q(health_score__gte=40, health_score__lt=60)),
+    ('poor', Q(health_score__lt=40)),
+)
+
+
+def plant_health_score_expression():
+    """SQL version of calculate_plant_health_score, for annotating querysets as
+    `health_score` so scores are aggregated in the database"""
+    # LEAST() skips NULLs in PostgreSQL, so missing values are zeroed first
+    height_score = Least(Value(40.0), Coalesce('height', Value(0.0)) * Value(0.4))
+    leaves_score = Least(
+        Value(30.0), Coalesce(Cast('number_of_leaves', FloatField()), Value(0.0)) * Value(0.6)
+    )
+    color_score = Case(
+        *[When(leaf_color=color, then=Value(float(score))) for color, score in LEAF_COLOR_SCORES.items()],
+        default=Value(10.0),
+        output_field=FloatField()
+    )
+    return Round(height_score + leaves_score + color_score, output_field=FloatField())
+
 def calculate_plant_health_score(height, leaves, leaf_color):
-    """Calculate health score for a plant (0-100)"""
+    """Calculate health score for a plant (0-100).
+    Keep in step with plant_health_score_expression."""
     # Height score (max 40 points)
     height_score = min(40, (height / 100) * 40) if height else 0
     
@@ -379,88 +414,44 @@ def calculate_plant_health_score(height, leaves, leaf_color):
     leaves_score = min(30, (leaves / 50) * 30) if leaves else 0
     
     # Leaf color score (max 30 points)
-    color_scores = {
-        'Green': 30,
-        'Dark Green': 30,
-        'Light Green': 25,
-        'Yellowish': 15,
-        'Spotted': 10,
-        'Brown': 5
-    }
-    color_score = color_scores.get(leaf_color, 10)
+    color_score = LEAF_COLOR_SCORES.get(leaf_color, 10)
     
     return round(height_score + leaves_score + color_score)
 
 def calculate_health_stats(queryset):
-    """Calculate comprehensive health statistics"""
-    total_records = queryset.count()
-    if total_records == 0:
-        return {
-            'excellent': {'count': 0, 'percent': 0},
-            'good': {'count': 0, 'percent': 0},
-            'fair': {'count': 0, 'percent': 0},
-            'poor': {'count': 0, 'percent': 0},
-            'overall_score': 0,
-            'avg_height_healthy': 0,
-            'avg_leaves_healthy': 0
+    """Calculate comprehensive health statistics in a single aggregate query"""
+    healthy = Q(health_score__gte=60)
+    stats = queryset.annotate(
+        health_score=plant_health_score_expression()
+    ).aggregate(
+        total=Count('id'),
+        overall_score=Avg('health_score'),
+        avg_height_healthy=Avg('height', filter=healthy),
+        avg_leaves_healthy=Avg('number_of_leaves', filter=healthy),
+        **{band: Count('id', filter=band_filter) for band, band_filter in HEALTH_BANDS}
+    )
+    
+    total_records = stats['total']
+    result = {}
+    for band, _ in HEALTH_BANDS:
+        result[band] = {
+            'count': stats[band],
+            'percent': round((stats[band] / total_records) * 100, 1) if total_records else 0
         }
-    
-    # Calculate health scores
-    health_data = []
-    for record in queryset:
-        score = calculate_plant_health_score(
-            record.height, 
-            record.number_of_leaves, 
-            record.leaf_color
-        )
-        health_data.append({
-            'score': score,
-            'height': record.height,
-            'leaves': record.number_of_leaves
-        })
-    
-    # Categorize
-    excellent = [h for h in health_data if h['score'] >= 80]
-    good = [h for h in health_data if 60 <= h['score'] < 80]
-    fair = [h for h in health_data if 40 <= h['score'] < 60]
-    poor = [h for h in health_data if h['score'] < 40]
-    
-    # Healthy plants (excellent + good)
-    healthy = excellent + good
-    avg_height_healthy = sum(h['height'] for h in healthy) / len(healthy) if healthy else 0
-    avg_leaves_healthy = sum(h['leaves'] for h in healthy) / len(healthy) if healthy else 0
-    
-    overall_score = sum(h['score'] for h in health_data) / len(health_data) if health_data else 0
-    
-    return {
-        'excellent': {
-            'count': len(excellent),
-            'percent': round((len(excellent) / total_records) * 100, 1) if total_records else 0
-        },
-        'good': {
-            'count': len(good),
-            'percent': round((len(good) / total_records) * 100, 1) if total_records else 0
-        },
-        'fair': {
-            'count': len(fair),
-            'percent': round((len(fair) / total_records) * 100, 1) if total_records else 0
-        },
-        'poor': {
-            'count': len(poor),
-            'percent': round((len(poor) / total_records) * 100, 1) if total_records else 0
-        },
-        'overall_score': round(overall_score, 1),
-        'avg_height_healthy': round(avg_height_healthy, 1),
-        'avg_leaves_healthy': round(avg_leaves_healthy, 1)
-    }
+    result['overall_score'] = round(stats['overall_score'] or 0, 1)
+    result['avg_height_healthy'] = round(stats['avg_height_healthy'] or 0, 1)
+    result['avg_leaves_healthy'] = round(stats['avg_leaves_healthy'] or 0, 1)
+    return result
 
 def get_district_stats(queryset):
     """Get district performance statistics - FIXED"""
     stats = []
     
-    # Get districts with data
+    # Get districts with data, sorted by health score
     district_data = queryset.exclude(
         district__isnull=True
+    ).annotate(
+        health_score=plant_health_score_expression()
     ).values(
         'district_id', 
         'district__name'
@@ -469,28 +460,14 @@ def get_district_stats(queryset):
         officer_count=Count('agent_id', distinct=True),
         avg_height=Avg('height'),
         avg_leaves=Avg('number_of_leaves'),
+        avg_health_score=Coalesce(Avg('health_score'), 0.0),
         measurement_count=Count('id')
-    ).order_by('-total_plants')
+    ).order_by('-avg_health_score', '-total_plants')
     
     for district in district_data:
         if not district['district_id']:
             continue
         
-        # Get all records for this district to calculate health scores
-        district_queryset = queryset.filter(district_id=district['district_id'])
-        
-        # Calculate health scores
-        health_scores = []
-        for record in district_queryset.only('height', 'number_of_leaves', 'leaf_color'):
-            score = calculate_plant_health_score(
-                record.height, 
-                record.number_of_leaves, 
-                record.leaf_color
-            )
-            health_scores.append(score)
-        
-        avg_health_score = sum(health_scores) / len(health_scores) if health_scores else 0
-        
         # Calculate growth rate (compare to previous period)
         growth_rate = 0
         trend = 0
@@ -506,15 +483,12 @@ def get_district_stats(queryset):
             'officer_count': district['officer_count'],
             'avg_height': round(district['avg_height'] or 0, 1),
             'avg_leaves': round(district['avg_leaves'] or 0, 1),
-            'health_score': round(avg_health_score, 1),
+            'health_score': round(district['avg_health_score'], 1),
             'growth_rate': growth_rate,
             'trend': trend,
             'measurement_count': district['measurement_count']
         })
     
-    # Sort by health score
-    stats.sort(key=lambda x: x['health_score'], reverse=True)
-    
     return stats
 
 
@@ -522,16 +496,12 @@ def get_recent_activity(queryset):
     """Get recent measurement activities - FIXED"""
     recent = queryset.select_related(
         'agent', 'district'
+    ).annotate(
+        health_score=plant_health_score_expression()
     ).order_by('-date', '-created_date')[:2]
     
     activities = []
     for record in recent:
-        health_score = calculate_plant_health_score(
-            record.height, 
-            record.number_of_leaves, 
-            record.leaf_color
-        )
-        
         # Truncate plant UID for display
         plant_uid = record.plant_uid
         if plant_uid and len(plant_uid) > 20:
@@ -554,7 +524,7 @@ def get_recent_activity(queryset):
             'plant_uid': plant_uid,
             'height': round(record.height or 0, 1),
             'leaves': record.number_of_leaves or 0,
-            'health_score': health_score,
+            'health_score': record.health_score,
             'date': record.date.strftime('%Y-%m-%d') if record.date else '',
             'officer': officer_name[:30],
             'district': district_name,
@@ -572,6 +542,8 @@ def get_officer_stats(queryset):
     # Get officers with data
     officer_data = queryset.exclude(
         agent__isnull=True
+    ).annotate(
+        health_score=plant_health_score_expression()
     ).values(
         'agent_id',
         'agent__first_name',
@@ -581,37 +553,18 @@ def get_officer_stats(queryset):
         total_plants=Count('plant_uid', distinct=True),
         total_measurements=Count('id'),
         avg_height=Avg('height'),
-        avg_leaves=Avg('number_of_leaves')
-    ).order_by('-total_plants')
+        avg_leaves=Avg('number_of_leaves'),
+        avg_health=Coalesce(Avg('health_score'), 0.0),
+        # One of the officer's districts
+        district_name=Min('district__name')
+    ).order_by('-avg_health', '-total_plants')
     
     for officer in officer_data:
         if not officer['agent_id']:
             continue
         
         officer_id = officer['agent_id']
-        officer_queryset = queryset.filter(agent_id=officer_id)
-        
-        # Calculate health scores
-        health_scores = []
-        for record in officer_queryset.only('height', 'number_of_leaves', 'leaf_color')[:100]:  # Limit for performance
-            score = calculate_plant_health_score(
-                record.height, 
-                record.number_of_leaves, 
-                record.leaf_color
-            )
-            health_scores.append(score)
-        
-        avg_health = sum(health_scores) / len(health_scores) if health_scores else 0
-        
-        # Get officer's district
-        district_name = 'N/A'
-        try:
-            # Try to get district from the queryset
-            sample_record = officer_queryset.filter(district__isnull=False).first()
-            if sample_record and sample_record.district:
-                district_name = sample_record.district.name
-        except:
-            pass
+        district_name = officer['district_name'] or 'N/A'
         
         # Format officer name
         first_name = officer.get('agent__first_name', '')
@@ -631,12 +584,9 @@ def get_officer_stats(queryset):
             'total_measurements': officer['total_measurements'],
             'avg_height': round(officer['avg_height'] or 0, 1),
             'avg_leaves': round(officer['avg_leaves'] or 0, 1),
-            'avg_health': round(avg_health, 1)
+            'avg_health': round(officer['avg_health'], 1)
         })
     
-    # Sort by health score
-    stats.sort(key=lambda x: x['avg_health'], reverse=True)
-    
     return stats
 
 
@@ -690,26 +640,20 @@ def get_growth_trends(queryset):
     }
 
 
-def get_health_distribution(queryset):
-    """Get health distribution data for pie chart - FIXED"""
+def get_health_distribution(queryset, health_stats=None):
+    """Get health distribution data for pie chart.
+    Reuses the band counts of calculate_health_stats when they are passed in."""
     categories = ['Excellent', 'Good', 'Fair', 'Poor']
-    values = [0, 0, 0, 0]
     
-    # Process records efficiently
-    for record in queryset.only('height', 'number_of_leaves', 'leaf_color'):
-        score = calculate_plant_health_score(
-            record.height, 
-            record.number_of_leaves, 
-            record.leaf_color
+    if health_stats is None:
+        counts = queryset.annotate(
+            health_score=plant_health_score_expression()
+        ).aggregate(
+            **{band: Count('id', filter=band_filter) for band, band_filter in HEALTH_BANDS}
         )
-        if score >= 80:
-            values[0] += 1
-        elif score >= 60:
-            values[1] += 1
-        elif score >= 40:
-            values[2] += 1
-        else:
-            values[3] += 1
+    else:
+        counts = {band: health_stats[band]['count'] for band, _ in HEALTH_BANDS}
+    values = [counts[band] for band, _ in HEALTH_BANDS]
     
     return {
         'labels': categories,
@@ -721,18 +665,15 @@ def get_health_distribution(queryset):
 def get_growth_stages(queryset):
     """Get growth stage distribution - FIXED"""
     stages = ['Seedling', 'Young', 'Mature', 'Old']
-    values = [0, 0, 0, 0]
     
-    for record in queryset.only('height'):
-        height = record.height or 0
-        if height < 30:
-            values[0] += 1
-        elif height < 60:
-            values[1] += 1
-        elif height < 100:
-            values[2] += 1
-        else:
-            values[3] += 1
+    height = Coalesce('height', 0.0)
+    counts = queryset.annotate(stage_height=height).aggregate(
+        seedling=Count('id', filter=Q(stage_height__lt=30)),
+        young=Count('id', filter=Q(stage_height__gte=30, stage_height__lt=60)),
+        mature=Count('id', filter=Q(stage_height__gte=60, stage_height__lt=100)),
+        old=Count('id', filter=Q(stage_height__gte=100)),
+    )
+    values = [counts['seedling'], counts['young'], counts['mature'], counts['old']]
     
     return {
         'labels': stages,
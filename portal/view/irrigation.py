@@ -3,13 +3,14 @@
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
-from django.core.paginator import Paginator
-from django.db.models import Q, Count, Sum, Avg
+from django.db.models import Count, Sum, Avg
 from django.utils import timezone
 import json
 from datetime import datetime, timedelta
 from django.shortcuts import render
 
+from utils.datatables import paginate
+
 from portal.models import FarmdetailsTbl, IrrigationModel, cocoaDistrict, irrigationTypeModel, projectTbl, staffTbl
 
 # Irrigation Overview page
@@ -22,28 +23,23 @@ def irrigation_overview(request):
 
 # ============== API ENDPOINTS FOR IrrigationModel ==============
 
+# DataTables column index -> sort field. Columns from joined tables
+# (sector, type, agent, district) are not sortable: ORDER BY across a
+# join cannot walk an index and sorts every matching row.
+IRRIGATION_SORTABLE_COLUMNS = {0: 'id', 1: 'uid', 4: 'water_volume', 5: 'date'}
+IRRIGATION_SEARCH_FIELDS = (
+    'uid', 'irrigation_type__irrigation_type', 'farm__farm_reference',
+    'farm__farmername', 'agent__first_name', 'agent__last_name',
+)
+
 @require_http_methods(["GET"])
 def irrigation_list_api(request):
     """API endpoint for Irrigation list with server-side processing"""
     try:
-        draw = int(request.GET.get('draw', 1))
-        start = int(request.GET.get('start', 0))
-        length = int(request.GET.get('length', 10))
-        search_value = request.GET.get('search[value]', '')
-        
         # Base queryset
-        queryset = IrrigationModel.objects.filter(delete_field='no')
-        
-        # Apply search
-        if search_value:
-            queryset = queryset.filter(
-                Q(uid__icontains=search_value) |
-                Q(irrigation_type__icontains=search_value) |
-                Q(farm__farm_reference__icontains=search_value) |
-                Q(farm__farmername__icontains=search_value) |
-                Q(agent__first_name__icontains=search_value) |
-                Q(agent__last_name__icontains=search_value)
-            )
+        queryset = IrrigationModel.objects.filter(delete_field='no').select_related(
+            'farm', 'sector', 'irrigation_type', 'agent', 'projectTbl_foreignkey', 'district'
+        )
         
         # Apply filters from request
         district_id = request.GET.get('district_id')
@@ -66,28 +62,13 @@ def irrigation_list_api(request):
         if end_date:
             queryset = queryset.filter(date__lte=end_date)
         
-        # Get total counts
-        total_records = queryset.count()
-        
-        # Apply sorting
-        order_column = request.GET.get('order[0][column]', 0)
-        order_dir = request.GET.get('order[0][dir]', 'asc')
-        
-        columns = ['id', 'uid', 'farm__farm_reference', 'farm__farmername', 'irrigation_type', 
-                  'water_volume', 'date', 'agent__first_name', 'district__name']
-        
-        if int(order_column) < len(columns):
-            order_field = columns[int(order_column)]
-            if order_dir == 'desc':
-                order_field = f'-{order_field}'
-            queryset = queryset.order_by(order_field)
-        else:
-            queryset = queryset.order_by('-date')
-        
-        # Paginate
-        paginator = Paginator(queryset, length)
-        page_number = (start // length) + 1
-        page_obj = paginator.get_page(page_number)
+        # Search, sort and paginate in one query
+        page_obj = paginate(
+            request, queryset,
+            sortable=IRRIGATION_SORTABLE_COLUMNS,
+            search_fields=IRRIGATION_SEARCH_FIELDS,
+            default_order=('-date',),
+        )
         
         # Prepare data
         data = []
@@ -113,19 +94,11 @@ def irrigation_list_api(request):
                 'irrigation_type_badge': get_irrigation_type_badge(irrigation.irrigation_type),
             })
         
-        response = {
-            'draw': draw,
-            'recordsTotal': total_records,
-            'recordsFiltered': total_records,
-            'data': data,
-            'success': True
-        }
-        
-        return JsonResponse(response)
+        return page_obj.response(data)
         
     except Exception as e:
         return JsonResponse({
-            'draw': draw,
+            'draw': request.GET.get('draw', 1),
             'recordsTotal': 0,
             'recordsFiltered': 0,
             'data': [],
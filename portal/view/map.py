@@ -6,6 +6,9 @@ from django.contrib.auth.decorators import login_required
 from django.db.models import Q, Count, Avg, Sum, F, FloatField, Min, Max
 import json
 from portal.models import SectorModel, projectTbl, FarmdetailsTbl
+from portal.geojson import (
+    encode_features, geojson_response, sector_feature_rows, staff_name, zoom_tolerance
+)
 from django.db import models
 from django.utils import timezone
 # lets import require_math_methods
@@ -43,82 +46,97 @@ def farm_mapping_page(request):
     }
     return render(request, 'portal/Farms/map.html', context)
 
-@login_required
-@require_http_methods(["GET"])
-def get_farm_geojson(request):
-    """Get all sectors as GeoJSON (maintaining function name)"""
-    try:
-        sectors = SectorModel.objects.all()
-        
-        # Create GeoJSON FeatureCollection
-        features = []
-        for sector in sectors:
-            if sector.geom:
-                # Create properties
-                properties = {
-                    'id': sector.id,
-                    'sector_name': sector.sector,
-                    'type': 'sector',
-                    'popup_content': f'''
+SECTOR_GEOJSON_FIELDS = ('id', 'sector', 'size_Ha', 'mean_pH', 'mean_OC', 'Texture_co', 'create_at', 'update_at')
+# Values accepted by get_farms_by_status; 'All' returns every sector
+SECTOR_STATUSES = ('Treatment', 'Establishment', 'Maintenance', 'All')
+
+
+def _sector_name_annotations():
+    return {
+        'created_by_name': staff_name('created_by'),
+        'modified_by_name': staff_name('modified_by'),
+    }
+
+
+def _sector_popup_properties(sector):
+    """Properties (including popup HTML) for the map window features"""
+    properties = {
+        'id': sector['id'],
+        'sector_name': sector['sector'],
+        'type': 'sector',
+        'popup_content': f'''
                         <div class="sector-popup">
-                            <h5>Sector: {sector.sector}</h5>
+                            <h5>Sector: {sector['sector']}</h5>
                             <table class="table table-sm table-borderless">
                                 <tr>
                                     <th>Size:</th>
-                                    <td>{sector.size_Ha or 'N/A'} Ha</td>
+                                    <td>{sector['size_Ha'] or 'N/A'} Ha</td>
                                 </tr>
                                 <tr>
                                     <th>Mean pH:</th>
-                                    <td>{sector.mean_pH or 'N/A'}</td>
+                                    <td>{sector['mean_pH'] or 'N/A'}</td>
                                 </tr>
                                 <tr>
                                     <th>Mean OC:</th>
-                                    <td>{sector.mean_OC or 'N/A'}%</td>
+                                    <td>{sector['mean_OC'] or 'N/A'}%</td>
                                 </tr>
                                 <tr>
                                     <th>Texture:</th>
-                                    <td>{sector.Texture_co or 'N/A'}</td>
+                                    <td>{sector['Texture_co'] or 'N/A'}</td>
                                 </tr>
                                 <tr>
                                     <th>Created:</th>
-                                    <td>{sector.create_at.strftime('%Y-%m-%d') if sector.create_at else 'N/A'}</td>
+                                    <td>{sector['create_at'].strftime('%Y-%m-%d') if sector['create_at'] else 'N/A'}</td>
                                 </tr>
                             </table>
                             <div class="text-center mt-2">
-                                <button class="btn btn-sm btn-primary view-sector-btn" data-id="{sector.id}">
+                                <button class="btn btn-sm btn-primary view-sector-btn" data-id="{sector['id']}">
                                     <i class="fas fa-eye"></i> View Details
                                 </button>
                             </div>
                         </div>
                     '''
-                }
-                
-                # Add all sector data to properties
-                properties.update({
-                    'size_Ha': sector.size_Ha,
-                    'mean_pH': sector.mean_pH,
-                    'mean_OC': sector.mean_OC,
-                    'texture': sector.Texture_co,
-                    'created_at': sector.create_at.strftime('%Y-%m-%d %H:%M') if sector.create_at else None,
-                    'updated_at': sector.update_at.strftime('%Y-%m-%d %H:%M') if sector.update_at else None,
-                    'created_by': sector.created_by.full_name if sector.created_by else None,
-                    'modified_by': sector.modified_by.full_name if sector.modified_by else None,
-                })
-                
-                # Create feature
-                feature = {
-                    'type': 'Feature',
-                    'geometry': json.loads(sector.geom.geojson),
-                    'properties': properties
-                }
-                features.append(feature)
+    }
+    properties.update(_sector_export_properties(sector))
+    return properties
+
+
+def _sector_export_properties(sector):
+    return {
+        'id': sector['id'],
+        'sector_name': sector['sector'],
+        'size_Ha': sector['size_Ha'],
+        'mean_pH': sector['mean_pH'],
+        'mean_OC': sector['mean_OC'],
+        'texture': sector['Texture_co'],
+        'created_at': sector['create_at'].strftime('%Y-%m-%d %H:%M') if sector['create_at'] else None,
+        'updated_at': sector['update_at'].strftime('%Y-%m-%d %H:%M') if sector['update_at'] else None,
+        'created_by': sector['created_by_name'],
+        'modified_by': sector['modified_by_name'],
+    }
+
+
+@login_required
+@require_http_methods(["GET"])
+def get_farm_geojson(request):
+    """Get all sectors as GeoJSON (maintaining function name).
+    Pass ?zoom=<level> to get geometries simplified for that zoom level."""
+    try:
+        zoom = request.GET.get('zoom')
+        tolerance = zoom_tolerance(zoom)
         
-        geojson = {
-            'type': 'FeatureCollection',
-            'features': features
-        }
+        def features():
+            rows = sector_feature_rows(
+                SectorModel.objects.all(), SECTOR_GEOJSON_FIELDS, zoom=zoom, **_sector_name_annotations()
+            )
+            return encode_features(rows, _sector_popup_properties)
         
-        return JsonResponse(geojson)
+        return geojson_response(
+            request,
+            features,
+            head_members={'type': 'FeatureCollection'},
+            variant=f'map:all:{tolerance}',
+        )
         
     except Exception as e:
         print(f'Error in get_farm_geojson: {str(e)}')
@@ -359,31 +377,28 @@ def search_farms(request):
                 Q(mean_OC__icontains=query)
             )
         
-        # Convert to GeoJSON
-        features = []
-        for sector in sectors:
-            if sector.geom:
-                feature = {
-                    'type': 'Feature',
-                    'geometry': json.loads(sector.geom.geojson),
-                    'properties': {
-                        'id': sector.id,
-                        'sector_name': sector.sector,
-                        'size_Ha': sector.size_Ha,
-                        'mean_pH': sector.mean_pH,
-                        'mean_OC': sector.mean_OC,
-                        'texture': sector.Texture_co,
-                        'created_at': sector.create_at.strftime('%Y-%m-%d') if sector.create_at else None,
-                        'has_geometry': True
-                    }
-                }
-                features.append(feature)
+        # Stream as GeoJSON features
+        def search_properties(sector):
+            return {
+                'id': sector['id'],
+                'sector_name': sector['sector'],
+                'size_Ha': sector['size_Ha'],
+                'mean_pH': sector['mean_pH'],
+                'mean_OC': sector['mean_OC'],
+                'texture': sector['Texture_co'],
+                'created_at': sector['create_at'].strftime('%Y-%m-%d') if sector['create_at'] else None,
+                'has_geometry': True
+            }
         
-        return JsonResponse({
-            'success': True,
-            'count': len(features),
-            'features': features
-        })
+        count = sectors.exclude(geom__isnull=True).count()
+        rows = sector_feature_rows(sectors, SECTOR_GEOJSON_FIELDS, zoom=data.get('zoom'))
+        
+        return geojson_response(
+            request,
+            lambda: encode_features(rows, search_properties),
+            head_members={'success': True, 'count': count},
+            content_type='application/json',
+        )
         
     except Exception as e:
         import traceback
@@ -434,6 +449,22 @@ def get_farm_by_id(request, farm_id):
         traceback.print_exc()
         return JsonResponse({'success': False, 'error': str(e)})
 
+def _feature_stats(sectors):
+    """count/total_area/avg_ph/avg_oc over the sectors that have a geometry, in one query"""
+    totals = sectors.exclude(geom__isnull=True).aggregate(
+        count=Count('id'),
+        total_area=Sum('size_Ha'),
+        total_ph=Sum('mean_pH'),
+        total_oc=Sum('mean_OC'),
+    )
+    return {
+        'count': totals['count'],
+        'total_area': totals['total_area'] or 0,
+        'total_ph': totals['total_ph'] or 0,
+        'total_oc': totals['total_oc'] or 0,
+    }
+
+
 @login_required
 @require_http_methods(["GET"])
 def get_farms_by_project(request, project_id):
@@ -441,64 +472,53 @@ def get_farms_by_project(request, project_id):
     try:
         # project_id here is actually texture value
         texture = project_id if isinstance(project_id, str) else str(project_id)
+        zoom = request.GET.get('zoom')
         
         sectors = SectorModel.objects.filter(
             Texture_co__iexact=texture
         )
         
-        # Create GeoJSON
-        features = []
+        totals = _feature_stats(sectors)
         texture_stats = {
-            'count': 0,
-            'total_area': 0,
+            'count': totals['count'],
+            'total_area': totals['total_area'],
             'avg_ph': 0,
             'avg_oc': 0
         }
-        
-        total_ph = 0
-        total_oc = 0
-        
-        for sector in sectors:
-            if sector and sector.geom:
-                feature = {
-                    'type': 'Feature',
-                    'geometry': json.loads(sector.geom.geojson),
-                    'properties': {
-                        'id': sector.id,
-                        'farm_id': sector.sector,
-                        'farm_reference': sector.sector,
-                        'farmer_name': sector.Texture_co,
-                        'region': f"{sector.size_Ha or 'N/A'} Ha",
-                        'location': f"pH: {sector.mean_pH or 'N/A'}",
-                        'farm_size': sector.size_Ha,
-                        'status': 'Active',
-                        'sector': sector.sector,
-                        'year_established': sector.create_at.strftime('%Y') if sector.create_at else None,
-                        'mean_pH': sector.mean_pH,
-                        'mean_OC': sector.mean_OC
-                    }
-                }
-                features.append(feature)
-                
-                # Update stats
-                texture_stats['count'] += 1
-                texture_stats['total_area'] += sector.size_Ha or 0
-                if sector.mean_pH:
-                    total_ph += sector.mean_pH
-                if sector.mean_OC:
-                    total_oc += sector.mean_OC
-        
         if texture_stats['count'] > 0:
-            texture_stats['avg_ph'] = round(total_ph / texture_stats['count'], 2)
-            texture_stats['avg_oc'] = round(total_oc / texture_stats['count'], 2)
+            texture_stats['avg_ph'] = round(totals['total_ph'] / texture_stats['count'], 2)
+            texture_stats['avg_oc'] = round(totals['total_oc'] / texture_stats['count'], 2)
+        
+        def project_properties(sector):
+            return {
+                'id': sector['id'],
+                'farm_id': sector['sector'],
+                'farm_reference': sector['sector'],
+                'farmer_name': sector['Texture_co'],
+                'region': f"{sector['size_Ha'] or 'N/A'} Ha",
+                'location': f"pH: {sector['mean_pH'] or 'N/A'}",
+                'farm_size': sector['size_Ha'],
+                'status': 'Active',
+                'sector': sector['sector'],
+                'year_established': sector['create_at'].strftime('%Y') if sector['create_at'] else None,
+                'mean_pH': sector['mean_pH'],
+                'mean_OC': sector['mean_OC']
+            }
         
-        return JsonResponse({
-            'success': True,
-            'project': f"Texture: {texture}",
-            'count': len(features),
-            'stats': texture_stats,
-            'features': features
-        })
+        return geojson_response(
+            request,
+            lambda: encode_features(
+                sector_feature_rows(sectors, SECTOR_GEOJSON_FIELDS, zoom=zoom), project_properties
+            ),
+            head_members={
+                'success': True,
+                'project': f"Texture: {texture}",
+                'count': texture_stats['count'],
+                'stats': texture_stats,
+            },
+            variant=f'map:texture:{texture.lower()}:{zoom_tolerance(zoom)}',
+            content_type='application/json',
+        )
         
     except Exception as e:
         import traceback
@@ -509,7 +529,14 @@ def get_farms_by_project(request, project_id):
 @require_http_methods(["GET"])
 def get_farms_by_status(request, status):
     """Get sectors by size range or pH range (maintaining function name)"""
+    if status not in SECTOR_STATUSES:
+        return JsonResponse(
+            {'success': False, 'error': f"Unknown status, expected one of: {', '.join(SECTOR_STATUSES)}"},
+            status=400,
+        )
     try:
+        zoom = request.GET.get('zoom')
+        
         # Parse status to determine what to filter
         if status == 'Treatment':
             # Sectors with pH < 5.5 (acidic)
@@ -534,73 +561,61 @@ def get_farms_by_status(request, status):
             )
             filter_type = 'optimal_conditions'
         else:
-            # Default - all sectors
+            # All
             sectors = SectorModel.objects.all()
             filter_type = 'all_sectors'
         
-        # Create GeoJSON
-        features = []
+        totals = _feature_stats(sectors)
         status_stats = {
-            'count': 0,
-            'total_area': 0,
+            'count': totals['count'],
+            'total_area': totals['total_area'],
             'avg_ph': 0,
             'avg_oc': 0,
             'textures': {}
         }
         
-        total_ph = 0
-        total_oc = 0
-        
-        for sector in sectors:
-            if sector.geom:
-                feature = {
-                    'type': 'Feature',
-                    'geometry': json.loads(sector.geom.geojson),
-                    'properties': {
-                        'id': sector.id,
-                        'farm_id': sector.sector,
-                        'farm_reference': sector.sector,
-                        'farmer_name': sector.Texture_co or 'Unknown',
-                        'project': f"pH: {sector.mean_pH or 'N/A'}",
-                        'region': f"{sector.size_Ha or 'N/A'} Ha",
-                        'location': f"OC: {sector.mean_OC or 'N/A'}%",
-                        'farm_size': sector.size_Ha,
-                        'status': status,
-                        'sector': sector.sector,
-                        'mean_pH': sector.mean_pH,
-                        'mean_OC': sector.mean_OC,
-                        'texture': sector.Texture_co
-                    }
-                }
-                features.append(feature)
-                
-                # Update stats
-                status_stats['count'] += 1
-                status_stats['total_area'] += sector.size_Ha or 0
-                if sector.mean_pH:
-                    total_ph += sector.mean_pH
-                if sector.mean_OC:
-                    total_oc += sector.mean_OC
-                
-                # Update texture stats
-                texture = sector.Texture_co or 'Unknown'
-                if texture not in status_stats['textures']:
-                    status_stats['textures'][texture] = 1
-                else:
-                    status_stats['textures'][texture] += 1
+        # Texture stats
+        texture_counts = sectors.exclude(geom__isnull=True).values('Texture_co').annotate(count=Count('id'))
+        for group in texture_counts:
+            texture = str(group['Texture_co'] or 'Unknown')
+            status_stats['textures'][texture] = status_stats['textures'].get(texture, 0) + group['count']
         
         if status_stats['count'] > 0:
-            status_stats['avg_ph'] = round(total_ph / status_stats['count'], 2) if total_ph > 0 else 0
-            status_stats['avg_oc'] = round(total_oc / status_stats['count'], 2) if total_oc > 0 else 0
+            status_stats['avg_ph'] = round(totals['total_ph'] / status_stats['count'], 2) if totals['total_ph'] > 0 else 0
+            status_stats['avg_oc'] = round(totals['total_oc'] / status_stats['count'], 2) if totals['total_oc'] > 0 else 0
+        
+        def status_properties(sector):
+            return {
+                'id': sector['id'],
+                'farm_id': sector['sector'],
+                'farm_reference': sector['sector'],
+                'farmer_name': sector['Texture_co'] or 'Unknown',
+                'project': f"pH: {sector['mean_pH'] or 'N/A'}",
+                'region': f"{sector['size_Ha'] or 'N/A'} Ha",
+                'location': f"OC: {sector['mean_OC'] or 'N/A'}%",
+                'farm_size': sector['size_Ha'],
+                'status': status,
+                'sector': sector['sector'],
+                'mean_pH': sector['mean_pH'],
+                'mean_OC': sector['mean_OC'],
+                'texture': sector['Texture_co']
+            }
         
-        return JsonResponse({
-            'success': True,
-            'status': status,
-            'filter_type': filter_type,
-            'count': len(features),
-            'stats': status_stats,
-            'features': features
-        })
+        return geojson_response(
+            request,
+            lambda: encode_features(
+                sector_feature_rows(sectors, SECTOR_GEOJSON_FIELDS, zoom=zoom), status_properties
+            ),
+            head_members={
+                'success': True,
+                'status': status,
+                'filter_type': filter_type,
+                'count': status_stats['count'],
+                'stats': status_stats,
+            },
+            variant=f'map:status:{status}:{zoom_tolerance(zoom)}',
+            content_type='application/json',
+        )
         
     except Exception as e:
         import traceback
@@ -612,45 +627,30 @@ def get_farms_by_status(request, status):
 def export_farms_geojson(request):
     """Export all sectors as GeoJSON file (maintaining function name)"""
     try:
-        sectors = SectorModel.objects.all()
+        totals = _feature_stats(SectorModel.objects.all())
         
-        features = []
-        for sector in sectors:
-            if sector.geom:
-                properties = {
-                    'id': sector.id,
-                    'sector_name': sector.sector,
-                    'size_Ha': sector.size_Ha,
-                    'mean_pH': sector.mean_pH,
-                    'mean_OC': sector.mean_OC,
-                    'texture': sector.Texture_co,
-                    'created_at': sector.create_at.strftime('%Y-%m-%d %H:%M') if sector.create_at else None,
-                    'updated_at': sector.update_at.strftime('%Y-%m-%d %H:%M') if sector.update_at else None,
-                    'created_by': sector.created_by.full_name if sector.created_by else None,
-                    'modified_by': sector.modified_by.full_name if sector.modified_by else None,
-                }
-                
-                feature = {
-                    'type': 'Feature',
-                    'geometry': json.loads(sector.geom.geojson),
-                    'properties': properties
-                }
-                features.append(feature)
-        
-        geojson = {
-            'type': 'FeatureCollection',
-            'features': features,
-            'metadata': {
-                'export_date': timezone.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'total_sectors': len(features),
-                'total_area': round(sum(f['properties'].get('size_Ha') or 0 for f in features), 2)
-            }
-        }
+        def features():
+            rows = sector_feature_rows(
+                SectorModel.objects.all(), SECTOR_GEOJSON_FIELDS, **_sector_name_annotations()
+            )
+            return encode_features(rows, _sector_export_properties)
         
         # Create response with download header
-        response = JsonResponse(geojson)
+        response = geojson_response(
+            request,
+            features,
+            head_members={'type': 'FeatureCollection'},
+            tail_members={
+                'metadata': {
+                    'export_date': timezone.now().strftime('%Y-%m-%d %H:%M:%S'),
+                    'total_sectors': totals['count'],
+                    'total_area': round(totals['total_area'], 2)
+                }
+            },
+            variant='map:export',
+            use_etag=False,
+        )
         response['Content-Disposition'] = f'attachment; filename="sectors_export_{timezone.now().strftime("%Y%m%d_%H%M%S")}.geojson"'
-        response['Content-Type'] = 'application/geo+json'
         
         return response
         
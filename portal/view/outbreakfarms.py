@@ -3,13 +3,14 @@
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
-from django.core.paginator import Paginator
-from django.db.models import Q, Count, Sum, Avg
+from django.db.models import Count, Sum, Avg
 from django.utils import timezone
 import json
 from datetime import datetime, timedelta
 from django.shortcuts import render, get_object_or_404
 
+from utils.datatables import paginate
+
 from portal.models import (
     Community, FarmdetailsTbl, OutbreakFarm, OutbreakFarmModel, Region, projectTbl,
     staffTbl, cocoaDistrict
@@ -28,28 +29,22 @@ def outbreakfarms_overview(request):
 
 # ============== API ENDPOINTS FOR OutbreakFarm MODEL ==============
 
+# DataTables column index -> sort field
+# District and region come from joined tables and are not sortable
+OUTBREAK_SORTABLE_COLUMNS = {
+    0: 'id', 1: 'outbreak_id', 2: 'farmer_name', 3: 'farm_location', 4: 'disease_type',
+    5: 'severity', 6: 'status', 7: 'inspection_date',
+}
+OUTBREAK_SEARCH_FIELDS = ('outbreak_id', 'farmer_name', 'farm_location', 'disease_type', 'status', 'severity')
+
 @require_http_methods(["GET"])
 def outbreakfarm_list_api(request):
     """API endpoint for OutbreakFarm list with server-side processing"""
     try:
-        draw = int(request.GET.get('draw', 1))
-        start = int(request.GET.get('start', 0))
-        length = int(request.GET.get('length', 10))
-        search_value = request.GET.get('search[value]', '')
-        
         # Base queryset
-        queryset = OutbreakFarm.objects.filter(delete_field='no')
-        
-        # Apply search
-        if search_value:
-            queryset = queryset.filter(
-                Q(outbreak_id__icontains=search_value) |
-                Q(farmer_name__icontains=search_value) |
-                Q(farm_location__icontains=search_value) |
-                Q(disease_type__icontains=search_value) |
-                Q(status__icontains=search_value) |
-                Q(severity__icontains=search_value)
-            )
+        queryset = OutbreakFarm.objects.filter(delete_field='no').select_related(
+            'community', 'district', 'region', 'reported_by'
+        )
         
         # Apply filters from request
         district_id = request.GET.get('district_id')
@@ -72,28 +67,13 @@ def outbreakfarm_list_api(request):
         if disease_type:
             queryset = queryset.filter(disease_type=disease_type)
         
-        # Get total counts
-        total_records = queryset.count()
-        
-        # Apply sorting
-        order_column = request.GET.get('order[0][column]', 0)
-        order_dir = request.GET.get('order[0][dir]', 'asc')
-        
-        columns = ['id', 'outbreak_id', 'farmer_name', 'farm_location', 'disease_type', 
-                  'severity', 'status', 'inspection_date', 'district__name', 'region__name']
-        
-        if int(order_column) < len(columns):
-            order_field = columns[int(order_column)]
-            if order_dir == 'desc':
-                order_field = f'-{order_field}'
-            queryset = queryset.order_by(order_field)
-        else:
-            queryset = queryset.order_by('-inspection_date')
-        
-        # Paginate
-        paginator = Paginator(queryset, length)
-        page_number = (start // length) + 1
-        page_obj = paginator.get_page(page_number)
+        # Search, sort and paginate in one query
+        page_obj = paginate(
+            request, queryset,
+            sortable=OUTBREAK_SORTABLE_COLUMNS,
+            search_fields=OUTBREAK_SEARCH_FIELDS,
+            default_order=('-inspection_date',),
+        )
         
         # Prepare data
         data = []
@@ -125,19 +105,11 @@ def outbreakfarm_list_api(request):
                 'status_badge': get_status_badge(outbreak.status),
             })
         
-        response = {
-            'draw': draw,
-            'recordsTotal': total_records,
-            'recordsFiltered': total_records,
-            'data': data,
-            'success': True
-        }
-        
-        return JsonResponse(response)
+        return page_obj.response(data)
         
     except Exception as e:
         return JsonResponse({
-            'draw': draw,
+            'draw': request.GET.get('draw', 1),
             'recordsTotal': 0,
             'recordsFiltered': 0,
             'data': [],
@@ -438,26 +410,21 @@ def outbreakfarm_stats_api(request):
 
 # ============== API ENDPOINTS FOR OutbreakFarmModel MODEL ==============
 
+# DataTables column index -> sort field
+OUTBREAK_MODEL_SORTABLE_COLUMNS = {
+    0: 'id', 1: 'uid', 2: 'farmer_name', 3: 'farm_location', 5: 'disease_type',
+    6: 'status', 7: 'date_reported',
+}
+OUTBREAK_MODEL_SEARCH_FIELDS = ('uid', 'farmer_name', 'farm_location', 'disease_type')
+
 @require_http_methods(["GET"])
 def outbreakfarmmodel_list_api(request):
     """API endpoint for OutbreakFarmModel list with server-side processing"""
     try:
-        draw = int(request.GET.get('draw', 1))
-        start = int(request.GET.get('start', 0))
-        length = int(request.GET.get('length', 10))
-        search_value = request.GET.get('search[value]', '')
-        
         # Base queryset
-        queryset = OutbreakFarmModel.objects.filter(delete_field='no')
-        
-        # Apply search
-        if search_value:
-            queryset = queryset.filter(
-                Q(uid__icontains=search_value) |
-                Q(farmer_name__icontains=search_value) |
-                Q(farm_location__icontains=search_value) |
-                Q(disease_type__icontains=search_value)
-            )
+        queryset = OutbreakFarmModel.objects.filter(delete_field='no').select_related(
+            'community', 'district', 'region', 'reported_by'
+        )
         
         # Apply filters from request
         district_id = request.GET.get('district_id')
@@ -476,28 +443,13 @@ def outbreakfarmmodel_list_api(request):
         if status is not None:
             queryset = queryset.filter(status=status)
         
-        # Get total counts
-        total_records = queryset.count()
-        
-        # Apply sorting
-        order_column = request.GET.get('order[0][column]', 0)
-        order_dir = request.GET.get('order[0][dir]', 'asc')
-        
-        columns = ['id', 'uid', 'farmer_name', 'farm_location', 'disease_type', 
-                  'status', 'date_reported', 'district__name', 'region__name']
-        
-        if int(order_column) < len(columns):
-            order_field = columns[int(order_column)]
-            if order_dir == 'desc':
-                order_field = f'-{order_field}'
-            queryset = queryset.order_by(order_field)
-        else:
-            queryset = queryset.order_by('-date_reported')
-        
-        # Paginate
-        paginator = Paginator(queryset, length)
-        page_number = (start // length) + 1
-        page_obj = paginator.get_page(page_number)
+        # Search, sort and paginate in one query
+        page_obj = paginate(
+            request, queryset,
+            sortable=OUTBREAK_MODEL_SORTABLE_COLUMNS,
+            search_fields=OUTBREAK_MODEL_SEARCH_FIELDS,
+            default_order=('-date_reported',),
+        )
         
         # Prepare data
         data = []
@@ -523,19 +475,11 @@ def outbreakfarmmodel_list_api(request):
                 'created_date': outbreak.created_date.strftime('%Y-%m-%d %H:%M:%S') if outbreak.created_date else '',
             })
         
-        response = {
-            'draw': draw,
-            'recordsTotal': total_records,
-            'recordsFiltered': total_records,
-            'data': data,
-            'success': True
-        }
-        
-        return JsonResponse(response)
+        return page_obj.response(data)
         
     except Exception as e:
         return JsonResponse({
-            'draw': draw,
+            'draw': request.GET.get('draw', 1),
             'recordsTotal': 0,
             'recordsFiltered': 0,
             'data': [],
@@ -2,21 +2,24 @@
 
 import json
 import uuid
-import csv
 from datetime import datetime, date
+from decimal import Decimal
 from django.shortcuts import render
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.utils import timezone
-from django.db.models import Q, Sum, Count, Avg
-from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Q, Sum, Count, Avg, Min, Value, DecimalField, StringAgg
+from django.db.models.functions import Coalesce
 from django.contrib.auth.decorators import login_required
 from portal.models import (
     PaymentReport, DetailedPaymentReport,
     PersonnelModel, staffTbl, FarmdetailsTbl,
     Activities, cocoaDistrict, projectTbl
 )
+from utils.datatables import paginate
+from utils.exports import export_response
 import logging
 
 logger = logging.getLogger(__name__)
@@ -59,16 +62,15 @@ def payment_reports_page(request):
 
 # ============== PAYMENT REPORT API VIEWS ==============
 
+# DataTables column index -> sort field
+PAYMENT_SORTABLE_COLUMNS = {0: 'id', 9: 'created_date'}
+PAYMENT_SEARCH_FIELDS = ('ra_name', 'po_number', 'month', 'district__name')
+
 @login_required
 @require_http_methods(["GET"])
 def payment_report_list(request):
     """Get paginated list of payment reports"""
     try:
-        draw = int(request.GET.get('draw', 1))
-        start = int(request.GET.get('start', 0))
-        length = int(request.GET.get('length', 10))
-        search_value = request.GET.get('search[value]', '')
-        
         # Filter parameters
         year = request.GET.get('year')
         month = request.GET.get('month')
@@ -80,7 +82,7 @@ def payment_report_list(request):
         # Base queryset
         queryset = PaymentReport.objects.filter(delete_field='no').select_related(
             'ra', 'district', 'projectTbl_foreignkey'
-        ).order_by('-created_date')
+        )
         
         # Apply filters
         if year:
@@ -96,22 +98,13 @@ def payment_report_list(request):
         if payment_option:
             queryset = queryset.filter(payment_option=payment_option)
         
-        # Apply search
-        if search_value:
-            queryset = queryset.filter(
-                Q(ra_name__icontains=search_value) |
-                Q(po_number__icontains=search_value) |
-                Q(month__icontains=search_value) |
-                Q(district__name__icontains=search_value)
-            )
-        
-        # Get total counts
-        total_records = queryset.count()
-        
-        # Apply pagination
-        paginator = Paginator(queryset, length)
-        page_number = (start // length) + 1
-        page_obj = paginator.get_page(page_number)
+        # Search, sort and paginate in one query
+        page_obj = paginate(
+            request, queryset,
+            sortable=PAYMENT_SORTABLE_COLUMNS,
+            search_fields=PAYMENT_SEARCH_FIELDS,
+            default_order=('-created_date',),
+        )
         
         # Prepare data
         data = []
@@ -138,14 +131,7 @@ def payment_report_list(request):
                 'created_date': report.created_date.strftime('%Y-%m-%d %H:%M:%S') if report.created_date else None,
             })
         
-        response = {
-            'draw': draw,
-            'recordsTotal': total_records,
-            'recordsFiltered': total_records,
-            'data': data,
-            'success': True
-        }
-        return JsonResponse(response)
+        return page_obj.response(data)
         
     except Exception as e:
         logger.error(f"Error in payment_report_list: {str(e)}")
@@ -571,16 +557,13 @@ def payment_report_delete(request, pk):
 
 # ============== DETAILED PAYMENT REPORT API VIEWS ==============
 
+DETAILED_PAYMENT_SEARCH_FIELDS = ('ra_name', 'po_name', 'farm_reference', 'group_code', 'month')
+
 @login_required
 @require_http_methods(["GET"])
 def detailed_payment_report_list(request):
     """Get paginated list of detailed payment reports"""
     try:
-        draw = int(request.GET.get('draw', 1))
-        start = int(request.GET.get('start', 0))
-        length = int(request.GET.get('length', 10))
-        search_value = request.GET.get('search[value]', '')
-        
         # Filter parameters
         report_id = request.GET.get('report_id')
         ra_id = request.GET.get('ra_id')
@@ -593,7 +576,7 @@ def detailed_payment_report_list(request):
         # Base queryset
         queryset = DetailedPaymentReport.objects.filter(delete_field='no').select_related(
             'ra', 'po', 'farm', 'activity', 'district', 'projectTbl_foreignkey'
-        ).order_by('-created_date')
+        )
         
         # Apply filters
         if report_id:
@@ -624,23 +607,12 @@ def detailed_payment_report_list(request):
         if district_id:
             queryset = queryset.filter(district_id=district_id)
         
-        # Apply search
-        if search_value:
-            queryset = queryset.filter(
-                Q(ra_name__icontains=search_value) |
-                Q(po_name__icontains=search_value) |
-                Q(farm_reference__icontains=search_value) |
-                Q(group_code__icontains=search_value) |
-                Q(month__icontains=search_value)
-            )
-        
-        # Get total counts
-        total_records = queryset.count()
-        
-        # Apply pagination
-        paginator = Paginator(queryset, length)
-        page_number = (start // length) + 1
-        page_obj = paginator.get_page(page_number)
+        # Search and paginate in one query
+        page_obj = paginate(
+            request, queryset,
+            search_fields=DETAILED_PAYMENT_SEARCH_FIELDS,
+            default_order=('-created_date',),
+        )
         
         # Prepare data
         data = []
@@ -677,14 +649,7 @@ def detailed_payment_report_list(request):
                 'created_date': d.created_date.strftime('%Y-%m-%d %H:%M:%S') if d.created_date else None,
             })
         
-        response = {
-            'draw': draw,
-            'recordsTotal': total_records,
-            'recordsFiltered': total_records,
-            'data': data,
-            'success': True
-        }
-        return JsonResponse(response)
+        return page_obj.response(data)
         
     except Exception as e:
         logger.error(f"Error in detailed_payment_report_list: {str(e)}")
@@ -836,11 +801,74 @@ def detailed_payment_report_create(request):
         })
 
 
+def summarize_payments(detailed_payments):
+    """One row per RA/month/year with the summed amount, computed in a single grouped query"""
+    return detailed_payments.values('ra_id', 'month', 'year').annotate(
+        ra_name=Min('ra_name'),
+        district_id=Min('district_id'),
+        project_id=Min('projectTbl_foreignkey_id'),
+        week=Min('week'),
+        total_amount=Coalesce(Sum('amount'), Value(Decimal('0')), output_field=DecimalField()),
+        payment_count=Count('id'),
+        po_numbers=StringAgg('po_number', Value(', '), distinct=True, order_by='po_number'),
+    ).order_by('ra_id', 'month', 'year')
+
+
+def save_payment_summaries(groups):
+    """Create or update the PaymentReport of each group with one bulk_create and
+    one bulk_update. Returns (created, updated) counts."""
+    keys = {(group['ra_id'], group['month'], group['year']) for group in groups}
+    existing = {}
+    summaries = PaymentReport.objects.filter(
+        month__in={month for _, month, _ in keys},
+        year__in={year for _, _, year in keys},
+        delete_field='no'
+    ).select_for_update().order_by('pk')
+    for summary in summaries:
+        existing.setdefault((summary.ra_id, summary.month, summary.year), summary)
+
+    now = timezone.now()
+    to_create = []
+    to_update = []
+    for group in groups:
+        summary = existing.get((group['ra_id'], group['month'], group['year']))
+        if summary:
+            summary.salary = group['total_amount']
+            if group['po_numbers']:
+                summary.po_number = group['po_numbers']
+            if group['week']:
+                summary.week = group['week']
+            # bulk_update skips auto_now
+            summary.created_date = now
+            to_update.append(summary)
+        else:
+            to_create.append(PaymentReport(
+                uid=str(uuid.uuid4()),
+                ra_id=group['ra_id'],
+                ra_name=group['ra_name'],
+                district_id=group['district_id'],
+                projectTbl_foreignkey_id=group['project_id'],
+                month=group['month'],
+                year=group['year'],
+                week=group['week'],
+                salary=group['total_amount'],
+                po_number=group['po_numbers'] or None,
+                payment_option='Bank Transfer',  # Default
+            ))
+
+    PaymentReport.objects.bulk_create(to_create, batch_size=500)
+    PaymentReport.objects.bulk_update(
+        to_update, ['salary', 'po_number', 'week', 'created_date'], batch_size=500
+    )
+    return len(to_create), len(to_update)
+
+
 @login_required
 @csrf_exempt
 @require_http_methods(["POST"])
 def generate_payment_report(request):
-    """Generate payment report for selected period"""
+    """Generate payment report for selected period.
+    With dry_run the summaries are computed and returned without being saved."""
     try:
         data = json.loads(request.body)
         
@@ -849,6 +877,7 @@ def generate_payment_report(request):
         week = data.get('week')
         district_id = data.get('district_id')
         project_id = data.get('project_id')
+        dry_run = bool(data.get('dry_run'))
         
         if not month or not year:
             return JsonResponse({
@@ -870,68 +899,30 @@ def generate_payment_report(request):
         if project_id:
             detailed_payments = detailed_payments.filter(projectTbl_foreignkey_id=project_id)
         
-        # Group by RA
-        ra_groups = {}
-        for payment in detailed_payments:
-            key = f"{payment.ra_id}_{payment.month}_{payment.year}"
-            if key not in ra_groups:
-                ra_groups[key] = {
-                    'ra_id': payment.ra_id,
-                    'ra_name': payment.ra_name,
-                    'district_id': payment.district_id,
-                    'project_id': payment.projectTbl_foreignkey_id,
-                    'month': payment.month,
-                    'year': payment.year,
-                    'week': payment.week,
-                    'total_amount': 0,
-                    'payment_count': 0,
-                    'po_numbers': set()
+        # Group by RA in the database
+        groups = list(summarize_payments(detailed_payments))
+        total_payments = sum(group['payment_count'] for group in groups)
+        total_amount = sum(group['total_amount'] for group in groups)
+        
+        if dry_run:
+            return JsonResponse({
+                'success': True,
+                'message': f'Preview: {len(groups)} summaries from {total_payments} payments',
+                'data': {
+                    'dry_run': True,
+                    'total_payments': total_payments,
+                    'total_summaries': len(groups),
+                    'total_amount': float(total_amount),
+                    'summaries': [
+                        {**group, 'total_amount': float(group['total_amount'])}
+                        for group in groups
+                    ],
                 }
-            
-            ra_groups[key]['total_amount'] += float(payment.amount or 0)
-            ra_groups[key]['payment_count'] += 1
-            if payment.po_number:
-                ra_groups[key]['po_numbers'].add(payment.po_number)
+            })
         
         # Create or update summary reports
-        created_count = 0
-        updated_count = 0
-        
-        for key, group in ra_groups.items():
-            # Find existing summary
-            summary = PaymentReport.objects.filter(
-                ra_id=group['ra_id'],
-                month=group['month'],
-                year=group['year'],
-                delete_field='no'
-            ).first()
-            
-            if summary:
-                # Update existing
-                summary.salary = group['total_amount']
-                if group['po_numbers']:
-                    summary.po_number = ', '.join(group['po_numbers'])
-                if group['week']:
-                    summary.week = group['week']
-                summary.save()
-                updated_count += 1
-            else:
-                # Create new
-                summary = PaymentReport()
-                summary.uid = str(uuid.uuid4())
-                summary.ra_id = group['ra_id']
-                summary.ra_name = group['ra_name']
-                summary.district_id = group['district_id']
-                summary.projectTbl_foreignkey_id = group['project_id']
-                summary.month = group['month']
-                summary.year = group['year']
-                summary.week = group['week']
-                summary.salary = group['total_amount']
-                if group['po_numbers']:
-                    summary.po_number = ', '.join(group['po_numbers'])
-                summary.payment_option = 'Bank Transfer'  # Default
-                summary.save()
-                created_count += 1
+        with transaction.atomic():
+            created_count, updated_count = save_payment_summaries(groups)
         
         return JsonResponse({
             'success': True,
@@ -939,8 +930,9 @@ def generate_payment_report(request):
             'data': {
                 'created': created_count,
                 'updated': updated_count,
-                'total_payments': len(detailed_payments),
-                'total_summaries': len(ra_groups)
+                'total_payments': total_payments,
+                'total_summaries': len(groups),
+                'total_amount': float(total_amount),
             }
         })
         
@@ -952,10 +944,55 @@ def generate_payment_report(request):
         })
 
 
+def _export_date(value):
+    return value.strftime('%Y-%m-%d') if value else ''
+
+
+def _blank(value):
+    return value or ''
+
+
+SUMMARY_EXPORT_COLUMNS = [
+    ('RA Name', 'ra_name', None),
+    ('District', 'district__name', None),
+    ('Month', 'month', None),
+    ('Year', 'year', None),
+    ('Week', 'week', _blank),
+    ('Salary', 'salary', None),
+    ('Payment Option', 'payment_option', _blank),
+    ('PO Number', 'po_number', _blank),
+    ('Bank Name', 'bank_name', _blank),
+    ('Bank Branch', 'bank_branch', _blank),
+    ('Momo Account', 'momo_acc', _blank),
+    ('Created Date', 'created_date', _export_date),
+]
+
+DETAILED_EXPORT_COLUMNS = [
+    ('Group Code', 'group_code', _blank),
+    ('RA Name', 'ra_name', None),
+    ('RA Account', 'ra_account', _blank),
+    ('PO Name', 'po_name', _blank),
+    ('District', 'district__name', None),
+    ('Farm Reference', 'farm_reference', _blank),
+    ('Activity', 'activity__sub_activity', None),
+    ('Farm Size (ha)', 'farmsize', None),
+    ('Achievement (ha)', 'achievement', None),
+    ('Amount', 'amount', None),
+    ('Month', 'month', None),
+    ('Year', 'year', None),
+    ('Week', 'week', _blank),
+    ('Number in Group', 'number_in_a_group', _blank),
+    ('Issue', 'issue', _blank),
+    ('Sector', 'sector', _blank),
+    ('Act Code', 'act_code', _blank),
+    ('Created Date', 'created_date', _export_date),
+]
+
+
 @login_required
 @require_http_methods(["GET"])
 def export_payment_report(request):
-    """Export payment report to CSV"""
+    """Export payment report to CSV (or XLSX with file_format=xlsx)"""
     try:
         # Get filter parameters
         year = request.GET.get('year')
@@ -963,99 +1000,29 @@ def export_payment_report(request):
         week = request.GET.get('week')
         district_id = request.GET.get('district_id')
         format_type = request.GET.get('format', 'summary')  # summary or detailed
-        
-        # Create CSV response
-        response = HttpResponse(content_type='text/csv')
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        response['Content-Disposition'] = f'attachment; filename="payment_report_{timestamp}.csv"'
-        
-        writer = csv.writer(response)
+        file_format = request.GET.get('file_format', 'csv')  # csv or xlsx
         
         if format_type == 'summary':
-            # Export summary reports
-            queryset = PaymentReport.objects.filter(delete_field='no').select_related('ra', 'district')
-            
-            if year:
-                queryset = queryset.filter(year=year)
-            if month:
-                queryset = queryset.filter(month=month)
-            if week:
-                queryset = queryset.filter(week=week)
-            if district_id:
-                queryset = queryset.filter(district_id=district_id)
-            
-            # Write headers
-            writer.writerow([
-                'RA Name', 'District', 'Month', 'Year', 'Week',
-                'Salary', 'Payment Option', 'PO Number', 'Bank Name',
-                'Bank Branch', 'Momo Account', 'Created Date'
-            ])
-            
-            # Write data
-            for report in queryset.order_by('-created_date'):
-                writer.writerow([
-                    report.ra_name,
-                    report.district.name if report.district else '',
-                    report.month,
-                    report.year,
-                    report.week or '',
-                    report.salary,
-                    report.payment_option or '',
-                    report.po_number or '',
-                    report.bank_name or '',
-                    report.bank_branch or '',
-                    report.momo_acc or '',
-                    report.created_date.strftime('%Y-%m-%d') if report.created_date else ''
-                ])
-        
+            queryset = PaymentReport.objects.filter(delete_field='no')
+            columns = SUMMARY_EXPORT_COLUMNS
         else:
-            # Export detailed reports
-            queryset = DetailedPaymentReport.objects.filter(delete_field='no').select_related(
-                'ra', 'po', 'farm', 'activity', 'district'
-            )
-            
-            if year:
-                queryset = queryset.filter(year=year)
-            if month:
-                queryset = queryset.filter(month=month)
-            if week:
-                queryset = queryset.filter(week=week)
-            if district_id:
-                queryset = queryset.filter(district_id=district_id)
-            
-            # Write headers
-            writer.writerow([
-                'Group Code', 'RA Name', 'RA Account', 'PO Name',
-                'District', 'Farm Reference', 'Activity', 'Farm Size (ha)',
-                'Achievement (ha)', 'Amount', 'Month', 'Year', 'Week',
-                'Number in Group', 'Issue', 'Sector', 'Act Code',
-                'Created Date'
-            ])
-            
-            # Write data
-            for d in queryset.order_by('-created_date'):
-                writer.writerow([
-                    d.group_code or '',
-                    d.ra_name,
-                    d.ra_account or '',
-                    d.po_name or '',
-                    d.district.name if d.district else '',
-                    d.farm_reference or '',
-                    d.activity.sub_activity if d.activity else '',
-                    d.farmsize,
-                    d.achievement,
-                    d.amount,
-                    d.month,
-                    d.year,
-                    d.week or '',
-                    d.number_in_a_group or '',
-                    d.issue or '',
-                    d.sector or '',
-                    d.act_code or '',
-                    d.created_date.strftime('%Y-%m-%d') if d.created_date else ''
-                ])
-        
-        return response
+            queryset = DetailedPaymentReport.objects.filter(delete_field='no')
+            columns = DETAILED_EXPORT_COLUMNS
+        
+        if year:
+            queryset = queryset.filter(year=year)
+        if month:
+            queryset = queryset.filter(month=month)
+        if week:
+            queryset = queryset.filter(week=week)
+        if district_id:
+            queryset = queryset.filter(district_id=district_id)
+        
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        return export_response(
+            request, queryset.order_by('-created_date'), columns,
+            f'payment_report_{timestamp}', file_format, sheet_title='Payment Report'
+        )
         
     except Exception as e:
         logger.error(f"Error in export_payment_report: {str(e)}")
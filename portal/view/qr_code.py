@@ -1,75 +1,48 @@
 import traceback
 import uuid
-import qrcode
-import io
 import base64
 import os
 import random
 import string
 from datetime import datetime
 from django.shortcuts import render
-from django.http import JsonResponse, FileResponse, HttpResponse
+from django.http import JsonResponse, FileResponse
 from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
-from django.db import transaction
 from django.utils import timezone
 from django.core.files.base import ContentFile
-from django.core.files.uploadedfile import SimpleUploadedFile, InMemoryUploadedFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import InMemoryUploadedFile
 from django.conf import settings
 
+from portal import id_allocation, qr_generation
 from portal.models import QR_CodeModel
+from utils.exports import file_response
+
+try:
+    from portal import qr_labels
+except ImportError:
+    # ReportLab is optional; download_bulk_qr_codes reports it missing
+    qr_labels = None
+
+# Larger jobs belong in `manage.py generate_qr_codes`
+QR_MAX_PER_REQUEST = getattr(settings, 'QR_MAX_PER_REQUEST', 2000)
+QR_PREVIEW_LIMIT = 100
 
 @login_required
 def qr_code_generator(request):
     """QR Code Generator page view"""
     context = {
         'page_title': 'QR Code Generator',
+        'max_quantity': QR_MAX_PER_REQUEST,
     }
     return render(request, 'portal/qr_code/qr_code_generator.html', context)
 
 def generate_plantation_uid():
     """Generate UID in format: ACL-PLT-YYYY-HHMM-00001"""
-    
-    # Fixed prefix and plantation indicator
-    prefix = "ACL"
-    plantation = "PLT"
-    
-    # Current year
-    year = timezone.now().strftime('%Y')
-    
-    # Current time (HHMM)
-    time_part = timezone.now().strftime('%H%M')
-    
-    # Get the last QR code with similar pattern
-    try:
-        last_qr = QR_CodeModel.default_objects.filter(
-            uid__startswith=f"{prefix}-{plantation}-{year}-{time_part}"
-        ).order_by('-id').first()
-    except AttributeError:
-        last_qr = QR_CodeModel.objects.filter(
-            uid__startswith=f"{prefix}-{plantation}-{year}-{time_part}"
-        ).order_by('-id').first()
-    
-    if last_qr and last_qr.uid:
-        try:
-            # Extract the sequential number
-            parts = last_qr.uid.split('-')
-            if len(parts) >= 5:
-                last_num = int(parts[4])
-                new_num = last_num + 1
-            else:
-                new_num = 1
-        except (ValueError, IndexError):
-            new_num = 1
-    else:
-        new_num = 1
-    
-    # Format with leading zeros (5 digits)
-    sequential = f"{new_num:05d}"
-    
-    uid = f"{prefix}-{plantation}-{year}-{time_part}-{sequential}"
-    
+    uid = id_allocation.qr_uids(1)[0]
+    prefix, plantation, year, time_part, sequential = uid.split('-')
     return {
         'uid': uid,
         'prefix': prefix,
@@ -85,88 +58,41 @@ def generate_plantation_uid():
 @login_required
 @require_http_methods(["POST"])
 def generate_qr_codes(request):
-    """Generate QR codes with unique identifiers"""
+    """Generate QR codes with unique identifiers (see portal.qr_generation)"""
     try:
         import json
         data = json.loads(request.body)
         quantity = int(data.get('quantity', 1))
         
-        if quantity < 1 or quantity > 100:
+        if quantity < 1 or quantity > QR_MAX_PER_REQUEST:
             return JsonResponse({
                 'success': False,
-                'message': 'Quantity must be between 1 and 100'
+                'message': f'Quantity must be between 1 and {QR_MAX_PER_REQUEST}'
             }, status=400)
         
         generated_codes = []
-        
-        with transaction.atomic():
-            for i in range(quantity):
-                # Generate unique ID using the plantation format
-                uid_data = generate_plantation_uid()
-                unique_id = uid_data['uid']
-                timestamp = timezone.now()
-                
-                print(f"Generating QR code {i+1}/{quantity}: {unique_id}")
-                
-                # Create QR code
-                qr = qrcode.QRCode(
-                    version=1,
-                    error_correction=qrcode.constants.ERROR_CORRECT_L,
-                    box_size=10,
-                    border=4,
-                )
-                
-                # Data to encode in QR code
-                qr_data = f"{unique_id}\nGenerated: {timestamp.strftime('%Y-%m-%d %H:%M:%S')}\nPlantation ID"
-                qr.add_data(qr_data)
-                qr.make(fit=True)
-                
-                # Create QR code image
-                qr_image = qr.make_image(fill_color="black", back_color="white")
-                
-                # Save to BytesIO
-                buffer = io.BytesIO()
-                qr_image.save(buffer, format='PNG')
-                buffer.seek(0)
-                
-                # Create base64 for preview
-                qr_base64 = base64.b64encode(buffer.getvalue()).decode()
-                
-                # Create filename
-                filename = f"{unique_id}_{timestamp.strftime('%Y%m%d_%H%M%S')}.png"
-                
-                # Create SimpleUploadedFile from buffer
-                image_file = SimpleUploadedFile(
-                    filename,
-                    buffer.getvalue(),
-                    content_type='image/png'
-                )
-                
-                # Create QR code model and assign the image
-                qr_model = QR_CodeModel(
-                    uid=unique_id,
-                    qr_code=image_file
-                )
-                qr_model.save()
-                
-                # Get the URL
-                qr_model.refresh_from_db()
-                qr_code_url = qr_model.qr_code.url if qr_model.qr_code else ''
-                print(f"Saved QR code with URL: {qr_code_url}")
-                
-                generated_codes.append({
+        # Base64 previews only for batches small enough to show
+        with_preview = quantity <= QR_PREVIEW_LIMIT
+        
+        for qr_models, images in qr_generation.generate(quantity):
+            for qr_model, image in zip(qr_models, images):
+                timestamp = qr_model.created_date
+                prefix, plantation, year, time_part, sequential = qr_model.uid.split('-')
+                code = {
                     'id': qr_model.id,
-                    'uid': unique_id,
-                    'qr_code_url': qr_code_url,
-                    'qr_code_base64': f"data:image/png;base64,{qr_base64}",
+                    'uid': qr_model.uid,
+                    'qr_code_url': qr_model.qr_code.url if qr_model.qr_code else '',
                     'created_date': timestamp.strftime('%Y-%m-%d %H:%M:%S'),
                     'created_date_formatted': timestamp.strftime('%b %d, %Y %H:%M'),
-                    'prefix': uid_data['prefix'],
-                    'plantation': uid_data['plantation'],
-                    'year': uid_data['year'],
-                    'time': uid_data['time'],
-                    'sequential': uid_data['sequential']
-                })
+                    'prefix': prefix,
+                    'plantation': plantation,
+                    'year': year,
+                    'time': time_part,
+                    'sequential': sequential
+                }
+                if with_preview:
+                    code['qr_code_base64'] = f"data:image/png;base64,{base64.b64encode(image).decode()}"
+                generated_codes.append(code)
         
         return JsonResponse({
             'success': True,
@@ -338,25 +264,10 @@ def bulk_delete_qr_codes(request):
                 'message': 'No QR codes selected'
             }, status=400)
         
-        deleted_count = 0
-        
-        with transaction.atomic():
-            # Get all QR codes to delete
-            qr_codes = QR_CodeModel.default_objects.filter(id__in=ids)
-            
-            # Delete image files first
-            for qr in qr_codes:
-                if qr.qr_code:
-                    try:
-                        qr.qr_code.delete(save=False)
-                        print(f"Deleted image for QR code {qr.uid}")
-                    except Exception as e:
-                        print(f"Error deleting image for {qr.uid}: {e}")
-            
-            # Method 1: Delete each object individually (works with custom delete method)
-            for qr in qr_codes:
-                qr.delete()
-                deleted_count += 1
+        # One UPDATE for the whole selection; the images stay until
+        # purge_soft_deleted removes the rows, so a restore keeps them
+        _, deleted = QR_CodeModel.objects.filter(id__in=ids).soft_delete()
+        deleted_count = deleted.get(QR_CodeModel._meta.label, 0)
         
         return JsonResponse({
             'success': True,
@@ -413,16 +324,15 @@ def download_qr_code(request, qr_id):
 @login_required
 @require_http_methods(["POST"])
 def download_bulk_qr_codes(request):
-    """Download multiple QR codes as a single PDF"""
+    """Download multiple QR codes as a single PDF of labels (see portal.qr_labels)"""
     try:
         import json
-        from reportlab.lib import colors
-        from reportlab.lib.pagesizes import A4
-        from reportlab.lib.units import mm
-        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, PageBreak
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.lib.enums import TA_CENTER
-        from io import BytesIO
+
+        if qr_labels is None:
+            return JsonResponse({
+                'success': False,
+                'message': 'ReportLab is required. Install it with: pip install reportlab',
+            }, status=500)
 
         data = json.loads(request.body)
         ids = data.get('ids', [])
@@ -430,162 +340,21 @@ def download_bulk_qr_codes(request):
         if not ids:
             return JsonResponse({'success': False, 'message': 'No QR codes selected'}, status=400)
 
-        # Fetch QR codes that actually have an image file set
-        qr_codes = QR_CodeModel.objects.filter(id__in=ids).exclude(qr_code='').order_by('id')
-
-        if not qr_codes.exists():
-            return JsonResponse({'success': False, 'message': 'No QR codes with images found'}, status=404)
-
-        # ── Grid settings ──────────────────────────────────────────────
-        COLS          = 3
-        ROWS_PER_PAGE = 3
-        QR_SIZE       = 55 * mm   # width & height of the QR image
-        LABEL_HEIGHT  = 12 * mm   # space below image for UID text
-        CELL_HEIGHT   = QR_SIZE + LABEL_HEIGHT
-        CELL_WIDTH    = QR_SIZE
-        PAGE_GAP      = COLS * ROWS_PER_PAGE   # QRs per page
-
-        # ── Styles ─────────────────────────────────────────────────────
-        styles = getSampleStyleSheet()
-
-        title_style = ParagraphStyle(
-            'BulkTitle',
-            parent=styles['Heading1'],
-            fontSize=14,
-            alignment=TA_CENTER,
-            spaceAfter=6,
-        )
-        sub_style = ParagraphStyle(
-            'BulkSub',
-            parent=styles['Normal'],
-            fontSize=9,
-            alignment=TA_CENTER,
-            textColor=colors.HexColor('#666666'),
-            spaceAfter=10,
+        # QR codes that actually have an image file set
+        qr_codes = list(
+            QR_CodeModel.objects.filter(id__in=ids).exclude(qr_code='').exclude(qr_code__isnull=True)
+            .order_by('id').values_list('id', 'uid', 'qr_code')
         )
-        label_style = ParagraphStyle(
-            'QRLabel',
-            parent=styles['Normal'],
-            fontWeight='bolder',
-            fontSize=10,
-            alignment=TA_CENTER,
-            textColor=colors.black,
-            leading=8,
-        )
-
-        # ── Build elements ─────────────────────────────────────────────
-        pdf_buffer = BytesIO()
-        doc = SimpleDocTemplate(
-            pdf_buffer,
-            pagesize=A4,
-            rightMargin=10 * mm,
-            leftMargin=10 * mm,
-            topMargin=10 * mm,
-            bottomMargin=10 * mm,
-        )
-
-        elements = []
-        elements.append(Paragraph("QR Codes Report", title_style))
-        elements.append(Paragraph(
-            f"Total: {qr_codes.count()} &nbsp;|&nbsp; Generated: {timezone.now().strftime('%d %b %Y %H:%M')}",
-            sub_style,
-        ))
-        elements.append(Spacer(1, 5 * mm))
-
-        qr_list = list(qr_codes)
 
-        def build_cell(qr):
-            """
-            Return a ReportLab flowable for one QR code cell, or None if the
-            file cannot be read (missing / permission error / bad path).
-            """
-            if not qr.qr_code:
-                return None
-            try:
-                # ★ KEY FIX: read the file through Django's storage backend
-                # into a BytesIO so ReportLab never touches the raw filesystem
-                # path (which breaks on external / mounted drives).
-                with qr.qr_code.open('rb') as fh:
-                    img_bytes = BytesIO(fh.read())
-
-                img = Image(img_bytes, width=QR_SIZE, height=QR_SIZE)
-
-                uid_text = qr.uid if qr.uid else f'ID-{qr.pk}'
-                label = Paragraph(uid_text, label_style)
-
-                # Stack image + label in a tiny inner table
-                inner = Table(
-                    [[img], [label]],
-                    colWidths=[CELL_WIDTH],
-                    rowHeights=[QR_SIZE, LABEL_HEIGHT],
-                )
-                inner.setStyle(TableStyle([
-                    ('ALIGN',         (0, 0), (-1, -1), 'CENTER'),
-                    ('VALIGN',        (0, 0), (-1, -1), 'MIDDLE'),
-                    ('LEFTPADDING',   (0, 0), (-1, -1), 0),
-                    ('RIGHTPADDING',  (0, 0), (-1, -1), 0),
-                    ('TOPPADDING',    (0, 0), (-1, -1), 0),
-                    ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
-                ]))
-                return inner
-
-            except (FileNotFoundError, OSError, Exception):
-                # Gracefully skip unreadable files instead of crashing
-                return None
-
-        # Chunk the full list into pages
-        for page_start in range(0, len(qr_list), PAGE_GAP):
-            page_qrs = qr_list[page_start: page_start + PAGE_GAP]
-
-            table_data = []
-            for row_idx in range(ROWS_PER_PAGE):
-                row = []
-                for col_idx in range(COLS):
-                    flat_idx = row_idx * COLS + col_idx
-                    if flat_idx < len(page_qrs):
-                        cell = build_cell(page_qrs[flat_idx])
-                        row.append(cell if cell is not None else '')
-                    else:
-                        row.append('')   # empty filler cell
-                table_data.append(row)
-
-            # Only add a table if at least one cell has content
-            if any(cell != '' for row in table_data for cell in row):
-                grid = Table(
-                    table_data,
-                    colWidths=[CELL_WIDTH] * COLS,
-                    rowHeights=[CELL_HEIGHT] * ROWS_PER_PAGE,
-                )
-                grid.setStyle(TableStyle([
-                    ('ALIGN',         (0, 0), (-1, -1), 'CENTER'),
-                    ('VALIGN',        (0, 0), (-1, -1), 'MIDDLE'),
-                    ('GRID',          (0, 0), (-1, -1), 0.5, colors.HexColor('#cccccc')),
-                    ('BACKGROUND',    (0, 0), (-1, -1), colors.HexColor('#fafafa')),
-                    ('TOPPADDING',    (0, 0), (-1, -1), 4),
-                    ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-                    ('LEFTPADDING',   (0, 0), (-1, -1), 4),
-                    ('RIGHTPADDING',  (0, 0), (-1, -1), 4),
-                ]))
-                elements.append(grid)
-
-            # Page break between pages, but not after the very last one
-            if page_start + PAGE_GAP < len(qr_list):
-                elements.append(PageBreak())
+        if not qr_codes:
+            return JsonResponse({'success': False, 'message': 'No QR codes with images found'}, status=404)
 
-        # ── Render PDF ─────────────────────────────────────────────────
-        doc.build(elements)
-        pdf_buffer.seek(0)
+        # Rendered once per selection, then streamed from storage
+        sheet = qr_labels.label_sheet(qr_codes)
 
         filename = f"qr_codes_{timezone.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        response = HttpResponse(pdf_buffer.read(), content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        return response
+        return file_response(default_storage.open(sheet, 'rb'), filename, 'application/pdf')
 
-    except ImportError:
-        return JsonResponse({
-            'success': False,
-            'message': 'ReportLab is required. Install it with: pip install reportlab',
-        }, status=500)
     except json.JSONDecodeError:
         return JsonResponse({'success': False, 'message': 'Invalid request body'}, status=400)
     except Exception as e:
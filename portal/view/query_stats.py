@@ -0,0 +1,16 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+from django.views.decorators.http import require_http_methods
+
+from utils.query_stats import reset, snapshot
+
+
+@staff_member_required
+@require_http_methods(["GET", "POST"])
+def query_stats(request):
+    """Per-view SQL figures recorded by QueryStatsMiddleware in this process.
+    POST clears them."""
+    if request.method == 'POST':
+        reset()
+        return JsonResponse({'success': True, 'message': 'Query stats cleared'})
+    return JsonResponse({'success': True, 'data': snapshot()})
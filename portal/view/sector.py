@@ -2,11 +2,11 @@ from django.shortcuts import render
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q
+from django.db.models import Q, BooleanField, ExpressionWrapper
 from portal.models import SectorModel, staffTbl
+from utils.exports import export_response
 import json
 from datetime import datetime
-import csv
 from django.http import HttpResponse
 from django.db import transaction
 from django.db import models
@@ -289,31 +289,30 @@ def delete_sector(request, sector_id):
     except Exception as e:
         return JsonResponse({'success': False, 'message': str(e)}, status=500)
 
+SECTOR_EXPORT_COLUMNS = [
+    ('Sector Name', 'sector', None),
+    ('Size (Ha)', 'size_Ha', None),
+    ('Mean pH', 'mean_pH', None),
+    ('Mean OC', 'mean_OC', None),
+    ('Texture', 'Texture_co', None),
+    ('Has Geometry', 'has_geometry', lambda has_geometry: 'Yes' if has_geometry else 'No'),
+    ('Created At', 'create_at', lambda value: value.strftime('%Y-%m-%d %H:%M') if value else ''),
+    ('Updated At', 'update_at', lambda value: value.strftime('%Y-%m-%d %H:%M') if value else ''),
+]
+
 @login_required
 def export_sectors_csv(request):
-    """Export sectors to CSV"""
+    """Export sectors to CSV (or XLSX with file_format=xlsx)"""
     try:
-        # Create CSV response
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="sectors_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow(['Sector Name', 'Size (Ha)', 'Mean pH', 'Mean OC', 'Texture', 'Has Geometry', 'Created At', 'Updated At'])
-        
-        sectors = SectorModel.objects.all()
-        for sector in sectors:
-            writer.writerow([
-                sector.sector,
-                sector.size_Ha,
-                sector.mean_pH,
-                sector.mean_OC,
-                sector.Texture_co,
-                'Yes' if sector.geom else 'No',
-                sector.create_at.strftime('%Y-%m-%d %H:%M') if sector.create_at else '',
-                sector.update_at.strftime('%Y-%m-%d %H:%M') if sector.update_at else ''
-            ])
-        
-        return response
+        # Geometries are never loaded, only whether one is present
+        sectors = SectorModel.objects.annotate(
+            has_geometry=ExpressionWrapper(Q(geom__isnull=False), output_field=BooleanField())
+        ).order_by('pk')
+        return export_response(
+            request, sectors, SECTOR_EXPORT_COLUMNS,
+            f'sectors_{datetime.now().strftime("%Y%m%d_%H%M%S")}',
+            request.GET.get('file_format', 'csv'), sheet_title='Sectors'
+        )
         
     except Exception as e:
         return JsonResponse({'success': False, 'message': str(e)}, status=500)
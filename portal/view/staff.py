@@ -5,11 +5,10 @@ from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q
-from django.core.paginator import Paginator
 from django.utils import timezone
 from datetime import date, datetime
 
+from utils.datatables import paginate
 from portal.models import (
     PersonnelModel, cocoaDistrict, Community, 
     projectTbl, Region  # Remove staffTbl from here - it's not needed for PersonnelModel
@@ -73,38 +72,24 @@ def staff_overview(request):
     }
     return render(request, 'portal/personnel/staff_overview.html', context)
 
+# DataTables column index -> sort field
+STAFF_SORTABLE_COLUMNS = {0: 'staff_id', 1: 'first_name', 7: 'date_joined'}
+STAFF_SEARCH_FIELDS = ('first_name', 'surname', 'staff_id', 'primary_phone_number', 'personnel_type')
+
 @require_http_methods(["GET"])
 def get_staff_list_api(request):
-    print("=== get_staff_list_api called ===")
     """Get paginated staff list for DataTable"""
     try:
-        draw = int(request.GET.get('draw', 1))
-        start = int(request.GET.get('start', 0))
-        length = int(request.GET.get('length', 10))
-        search_value = request.GET.get('search[value]', '')
-        
-        # Base queryset
-        queryset = PersonnelModel.objects.all()
-        print(f"SQL Query: {queryset.query}")
-        
-        # Apply search
-        if search_value:
-            queryset = queryset.filter(
-                Q(first_name__icontains=search_value) |
-                Q(surname__icontains=search_value) |
-                Q(staff_id__icontains=search_value) |
-                Q(primary_phone_number__icontains=search_value) |
-                Q(personnel_type__icontains=search_value)
-            )
-        
-        # Get total counts
-        total_records = PersonnelModel.objects.filter(delete_field='no').count()
-        filtered_records = queryset.count()
-        
-        # Apply pagination
-        page = (start // length) + 1
-        paginator = Paginator(queryset.order_by('-created_date'), length)
-        page_obj = paginator.get_page(page)
+        # Base queryset (alive rows only)
+        queryset = PersonnelModel.objects.select_related('district', 'community')
+        
+        # Search, sort and paginate in one query
+        page_obj = paginate(
+            request, queryset,
+            sortable=STAFF_SORTABLE_COLUMNS,
+            search_fields=STAFF_SEARCH_FIELDS,
+            default_order=('-created_date',),
+        )
         
         # Format data
         data = []
@@ -141,14 +126,7 @@ def get_staff_list_api(request):
                 'emergency_number': staff.emergency_contact_number
             })
         
-        response = {
-            'draw': draw,
-            'recordsTotal': total_records,
-            'recordsFiltered': filtered_records,
-            'data': data,
-            'success': True
-        }
-        return JsonResponse(response)
+        return page_obj.response(data)
         
     except Exception as e:
         print(f"Error in get_staff_list: {str(e)}")
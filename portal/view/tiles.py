@@ -0,0 +1,47 @@
+# views.py - Vector tile (MVT) endpoint for the map window
+import logging
+
+from django.http import JsonResponse, HttpResponse
+from django.views.decorators.http import require_http_methods
+from django.contrib.auth.decorators import login_required
+from django.utils.dateparse import parse_date
+
+from portal.tiles import TILE_LAYERS, get_tile, valid_tile
+
+logger = logging.getLogger(__name__)
+
+
+@login_required
+@require_http_methods(["GET"])
+def vector_tile(request, layer, z, x, y):
+    """Serve one Mapbox vector tile of sectors, farms or growth points.
+    The growth layer accepts ?district_id=, ?start_date= and ?end_date=."""
+    if layer not in TILE_LAYERS:
+        return JsonResponse({'error': f'Unknown tile layer: {layer}'}, status=404)
+    if not valid_tile(z, x, y):
+        return JsonResponse({'error': 'Invalid tile coordinates'}, status=400)
+
+    filters = None
+    if layer == 'growth':
+        district_id = request.GET.get('district_id') or None
+        if district_id is not None and not district_id.isdigit():
+            return JsonResponse({'error': 'Invalid district_id'}, status=400)
+        filters = {'district_id': district_id}
+        for name in ('start_date', 'end_date'):
+            value = request.GET.get(name) or None
+            try:
+                filters[name] = parse_date(value) if value else None
+            except ValueError:
+                filters[name] = None
+            if value and filters[name] is None:
+                return JsonResponse({'error': f'Invalid {name}, expected YYYY-MM-DD'}, status=400)
+
+    try:
+        tile = get_tile(layer, z, x, y, filters)
+    except Exception as e:
+        logger.exception('Error rendering %s tile %s/%s/%s', layer, z, x, y)
+        return JsonResponse({'error': str(e)}, status=500)
+
+    response = HttpResponse(tile, content_type='application/vnd.mapbox-vector-tile')
+    response['Cache-Control'] = 'private, max-age=60'
+    return response
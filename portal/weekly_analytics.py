@@ -0,0 +1,313 @@
+"""
+Weekly monitoring analytics over DailyReportingModel.
+
+Every weekly endpoint parses its filters with parse_filters() and starts
+from the same base_queryset(), so the summary, PO, activity and district
+figures always describe the same rows. The 12-week trend is one grouped
+TruncWeek query instead of one aggregate per week.
+
+Results for closed weeks (ending before today) are cached. A saved or
+deleted report bumps a version number (see portal/signals.py), which
+retires every cached result at once; WEEKLY_ANALYTICS_CACHE_TIMEOUT bounds
+staleness from bulk updates that send no signals.
+"""
+import hashlib
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, Q, Sum
+from django.db.models.functions import TruncWeek
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from portal.models import DailyReportingModel
+
+TREND_WEEKS = 12
+WEEKLY_CACHE_TIMEOUT = getattr(settings, 'WEEKLY_ANALYTICS_CACHE_TIMEOUT', 60 * 60 * 24)
+VERSION_KEY = 'weekly:version'
+
+STATUS_PENDING, STATUS_SUBMITTED, STATUS_APPROVED, STATUS_REJECTED = 0, 1, 2, 3
+
+
+# ============== FILTERS ==============
+
+def week_bounds(day):
+    """(Monday, Sunday) of the week containing `day`"""
+    start = day - timedelta(days=day.weekday())
+    return start, start + timedelta(days=6)
+
+
+def _param(params, *names):
+    """First non-empty of `names`; the dashboard sends camelCase, other callers snake_case"""
+    for name in names:
+        value = params.get(name)
+        if value:
+            return value
+    return None
+
+
+def parse_filters(params):
+    """Week range (defaulting to the current week) and optional district/PO/activity"""
+    week_start = parse_date(_param(params, 'week_start', 'weekStart') or '')
+    week_end = parse_date(_param(params, 'week_end', 'weekEnd') or '')
+    if not week_start or not week_end:
+        week_start, week_end = week_bounds(timezone.now().date())
+    return {
+        'week_start': week_start,
+        'week_end': week_end,
+        'district_id': _param(params, 'district_id', 'districtId'),
+        'po_id': _param(params, 'po_id', 'poId'),
+        'activity_id': _param(params, 'activity_id', 'activityId'),
+    }
+
+
+def base_queryset(filters, dated=True):
+    queryset = DailyReportingModel.objects.filter(delete_field='no')
+    if dated:
+        queryset = queryset.filter(reporting_date__range=[filters['week_start'], filters['week_end']])
+    if filters.get('district_id'):
+        queryset = queryset.filter(district_id=filters['district_id'])
+    if filters.get('po_id'):
+        queryset = queryset.filter(agent_id=filters['po_id'])
+    if filters.get('activity_id'):
+        queryset = queryset.filter(main_activity_id=filters['activity_id'])
+    return queryset
+
+
+# ============== CACHE ==============
+
+def _version():
+    return cache.get_or_set(VERSION_KEY, 1, None)
+
+
+def invalidate():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
+
+
+def _filter_signature(filters, dated=True):
+    parts = [
+        f'{name}={filters.get(name) or ""}'
+        for name in ('district_id', 'po_id', 'activity_id')
+    ]
+    if dated:
+        parts += [f"start={filters['week_start']}", f"end={filters['week_end']}"]
+    return hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+
+def _closed(week_end, today=None):
+    return week_end < (today or timezone.now().date())
+
+
+def cached(name, filters, compute):
+    """compute(), cached when the filtered range is entirely in the past"""
+    if not _closed(filters['week_end']):
+        return compute()
+    key = f'weekly:{_version()}:{name}:{_filter_signature(filters)}'
+    result = cache.get(key)
+    if result is None:
+        result = compute()
+        cache.set(key, result, WEEKLY_CACHE_TIMEOUT)
+    return result
+
+
+# ============== ANALYTICS ==============
+
+def summary(filters):
+    def compute():
+        queryset = base_queryset(filters)
+        totals = queryset.aggregate(
+            total_reports=Count('id'),
+            total_area=Sum('area_covered_ha'),
+            total_ras=Sum('no_rehab_assistants'),
+            avg_area_per_report=Avg('area_covered_ha'),
+            submitted_reports=Count('id', filter=Q(status=STATUS_SUBMITTED)),
+            approved_reports=Count('id', filter=Q(status=STATUS_APPROVED)),
+            pending_reports=Count('id', filter=Q(status=STATUS_PENDING)),
+            rejected_reports=Count('id', filter=Q(status=STATUS_REJECTED)),
+        )
+        for field in ('total_area', 'total_ras', 'avg_area_per_report'):
+            totals[field] = totals[field] or 0
+        totals['completion_rate'] = (
+            totals['approved_reports'] / totals['total_reports'] * 100
+        ) if totals['total_reports'] else 0
+
+        totals['top_activities'] = list(queryset.values(
+            'main_activity__main_activity'
+        ).annotate(
+            total_area=Sum('area_covered_ha'),
+            report_count=Count('id')
+        ).order_by('-total_area')[:5])
+
+        totals['district_performance'] = list(queryset.values(
+            'district__name'
+        ).annotate(
+            total_area=Sum('area_covered_ha'),
+            report_count=Count('id'),
+            total_ras=Sum('no_rehab_assistants')
+        ).order_by('-total_area')[:5])
+        return totals
+
+    return cached('summary', filters, compute)
+
+
+def _trend_point(week_start, row):
+    row = row or {}
+    return {
+        'week': f"W{week_start.isocalendar()[1]}",
+        'year': week_start.year,
+        'start_date': week_start.strftime('%Y-%m-%d'),
+        'end_date': (week_start + timedelta(days=6)).strftime('%Y-%m-%d'),
+        'total_area': float(row.get('total_area') or 0),
+        'report_count': row.get('report_count') or 0,
+        'total_ras': row.get('total_ras') or 0,
+    }
+
+
+def trends(filters, weeks=TREND_WEEKS, today=None):
+    """The last `weeks` weeks, oldest first. Closed weeks come from the cache;
+    the rest are computed in one grouped query."""
+    today = today or timezone.now().date()
+    current_start, _ = week_bounds(today)
+    starts = [current_start - timedelta(weeks=i) for i in range(weeks - 1, -1, -1)]
+
+    prefix = f'weekly:{_version()}:week:{_filter_signature(filters, dated=False)}'
+    keys = {start: f'{prefix}:{start.isoformat()}' for start in starts}
+    closed = [start for start in starts if _closed(start + timedelta(days=6), today)]
+    points = {}
+    found = cache.get_many([keys[start] for start in closed])
+    for start in closed:
+        if keys[start] in found:
+            points[start] = found[keys[start]]
+
+    missing = [start for start in starts if start not in points]
+    if missing:
+        rows = base_queryset(filters, dated=False).filter(
+            reporting_date__range=[missing[0], missing[-1] + timedelta(days=6)]
+        ).annotate(
+            week_start=TruncWeek('reporting_date')
+        ).values('week_start').annotate(
+            total_area=Sum('area_covered_ha'),
+            report_count=Count('id'),
+            total_ras=Sum('no_rehab_assistants')
+        ).order_by('week_start')
+        by_week = {}
+        for row in rows:
+            week_start = row['week_start']
+            if isinstance(week_start, datetime):
+                week_start = week_start.date()
+            by_week[week_start] = row
+
+        to_cache = {}
+        for start in missing:
+            points[start] = _trend_point(start, by_week.get(start))
+            if start in closed:
+                to_cache[keys[start]] = points[start]
+        if to_cache:
+            cache.set_many(to_cache, WEEKLY_CACHE_TIMEOUT)
+
+    return [points[start] for start in starts]
+
+
+def po_performance(filters, limit=10):
+    def compute():
+        rows = base_queryset(filters).values(
+            'agent_id',
+            'agent__first_name',
+            'agent__last_name',
+            'agent__staffid',
+            'district__name'
+        ).annotate(
+            total_reports=Count('id'),
+            total_area=Sum('area_covered_ha'),
+            total_ras=Sum('no_rehab_assistants'),
+            approved_reports=Count('id', filter=Q(status=STATUS_APPROVED)),
+            pending_reports=Count('id', filter=Q(status__in=[STATUS_PENDING, STATUS_SUBMITTED])),
+            avg_area_per_report=Avg('area_covered_ha')
+        ).order_by('-total_area')[:limit]
+
+        return [{
+            'po_id': po['agent_id'],
+            'po_name': f"{po['agent__first_name'] or ''} {po['agent__last_name'] or ''}".strip() or 'Unknown',
+            'staff_id': po['agent__staffid'] or 'N/A',
+            'district': po['district__name'] or 'N/A',
+            'total_reports': po['total_reports'],
+            'total_area': float(po['total_area'] or 0),
+            'total_ras': po['total_ras'] or 0,
+            'approved_reports': po['approved_reports'],
+            'pending_reports': po['pending_reports'],
+            'approval_rate': (po['approved_reports'] / po['total_reports'] * 100) if po['total_reports'] > 0 else 0,
+            'avg_area': float(po['avg_area_per_report'] or 0)
+        } for po in rows]
+
+    return cached(f'po:{limit}', filters, compute)
+
+
+def activity_breakdown(filters):
+    def compute():
+        rows = base_queryset(filters).values(
+            'main_activity__main_activity',
+            'activity__sub_activity'
+        ).annotate(
+            total_area=Sum('area_covered_ha'),
+            report_count=Count('id'),
+            total_ras=Sum('no_rehab_assistants')
+        ).order_by('-total_area')
+
+        # Group by main activity
+        main_activities = {}
+        for item in rows:
+            main_act = item['main_activity__main_activity'] or 'Other'
+            group = main_activities.setdefault(main_act, {
+                'name': main_act,
+                'total_area': 0,
+                'report_count': 0,
+                'total_ras': 0,
+                'sub_activities': []
+            })
+            group['total_area'] += float(item['total_area'] or 0)
+            group['report_count'] += item['report_count'] or 0
+            group['total_ras'] += item['total_ras'] or 0
+            group['sub_activities'].append({
+                'name': item['activity__sub_activity'] or 'Unknown',
+                'area': float(item['total_area'] or 0),
+                'reports': item['report_count'] or 0,
+                'ras': item['total_ras'] or 0
+            })
+        return list(main_activities.values())
+
+    return cached('activities', filters, compute)
+
+
+def district_summary(filters):
+    def compute():
+        rows = base_queryset(filters).filter(
+            district__isnull=False
+        ).values(
+            'district__id',
+            'district__name',
+            'district__region__region'
+        ).annotate(
+            total_reports=Count('id'),
+            total_area=Sum('area_covered_ha'),
+            total_ras=Sum('no_rehab_assistants'),
+            unique_pos=Count('agent_id', distinct=True),
+            approved_reports=Count('id', filter=Q(status=STATUS_APPROVED))
+        ).order_by('-total_area')
+
+        return [{
+            'id': district['district__id'],
+            'name': district['district__name'] or 'Unknown',
+            'region': district['district__region__region'] or 'Unknown',
+            'total_reports': district['total_reports'],
+            'total_area': float(district['total_area'] or 0),
+            'total_ras': district['total_ras'] or 0,
+            'unique_pos': district['unique_pos'] or 0,
+            'approved_reports': district['approved_reports'],
+            'approval_rate': (district['approved_reports'] / district['total_reports'] * 100) if district['total_reports'] > 0 else 0
+        } for district in rows]
+
+    return cached('districts', filters, compute)
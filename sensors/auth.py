@@ -0,0 +1,191 @@
+"""
+Device authentication and last_seen bookkeeping for the ingest endpoints.
+
+Credentials (api_key and device_name) are looked up in a small in-process
+LRU first, then in the Django cache (shared between workers when a Redis
+cache is configured), and only then in the database. The views that change
+a key or a device call invalidate_device(); other processes may keep an
+old entry for at most SENSOR_AUTH_LOCAL_TTL seconds.
+
+last_seen is not written per reading. touch() records the newest time per
+device in memory and flush_last_seen() writes them all with one UPDATE at
+most every SENSOR_LAST_SEEN_FLUSH_SECONDS. A background timer flushes what
+is pending when no further reading arrives to do it, and the rest is
+written at interpreter exit.
+"""
+import atexit
+import hmac
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Case, DateTimeField, Value, When
+
+from .models import Device
+
+logger = logging.getLogger(__name__)
+
+AUTH_CACHE_SIZE = getattr(settings, 'SENSOR_AUTH_CACHE_SIZE', 10000)
+AUTH_LOCAL_TTL = getattr(settings, 'SENSOR_AUTH_LOCAL_TTL', 60)
+AUTH_CACHE_TIMEOUT = getattr(settings, 'SENSOR_AUTH_CACHE_TIMEOUT', 60 * 60)
+LAST_SEEN_FLUSH_INTERVAL = getattr(settings, 'SENSOR_LAST_SEEN_FLUSH_SECONDS', 30)
+
+_lock = threading.Lock()
+_local = OrderedDict()  # device_id -> (expires_at, credentials)
+_pending_seen = {}  # device_id -> newest last_seen not yet written
+_last_flush = time.monotonic()
+_flush_timer = None
+
+
+def _cache_key(device_id):
+    return f'sensors:device_auth:{device_id}'
+
+
+# ============== CREDENTIALS ==============
+
+def _local_get(device_id, now):
+    entry = _local.get(device_id)
+    if entry is None:
+        return None
+    expires_at, credentials = entry
+    if expires_at < now:
+        del _local[device_id]
+        return None
+    _local.move_to_end(device_id)
+    return credentials
+
+
+def _local_set(device_id, credentials, now):
+    _local[device_id] = (now + AUTH_LOCAL_TTL, credentials)
+    _local.move_to_end(device_id)
+    while len(_local) > AUTH_CACHE_SIZE:
+        _local.popitem(last=False)
+
+
+def device_credentials(device_ids):
+    """{device_id: {'api_key', 'device_name'}} for the devices that exist"""
+    now = time.monotonic()
+    found = {}
+    with _lock:
+        for device_id in device_ids:
+            credentials = _local_get(device_id, now)
+            if credentials is not None:
+                found[device_id] = credentials
+
+    missing = [device_id for device_id in device_ids if device_id not in found]
+    if missing:
+        shared = cache.get_many([_cache_key(device_id) for device_id in missing])
+        for device_id in missing:
+            if _cache_key(device_id) in shared:
+                found[device_id] = shared[_cache_key(device_id)]
+
+        missing = [device_id for device_id in missing if device_id not in found]
+        if missing:
+            loaded = {
+                row['device_id']: {'api_key': str(row['api_key']), 'device_name': row['device_name']}
+                for row in Device.objects.filter(device_id__in=missing).values(
+                    'device_id', 'api_key', 'device_name'
+                )
+            }
+            if loaded:
+                cache.set_many(
+                    {_cache_key(device_id): credentials for device_id, credentials in loaded.items()},
+                    AUTH_CACHE_TIMEOUT,
+                )
+            found.update(loaded)
+
+        with _lock:
+            for device_id in device_ids:
+                if device_id in found:
+                    _local_set(device_id, found[device_id], now)
+    return found
+
+
+def authenticate(credentials):
+    """Map (device_id, api_key) -> Device for every pair that matches.
+    The Devices are built from cached fields, not loaded from the database."""
+    known = device_credentials({device_id for device_id, _ in credentials})
+    devices = {}
+    for device_id, api_key in credentials:
+        entry = known.get(device_id)
+        if entry and hmac.compare_digest(entry['api_key'], str(api_key)):
+            devices[device_id, api_key] = Device(device_id=device_id, device_name=entry['device_name'])
+    return devices
+
+
+def invalidate_device(device_id):
+    """Forget cached credentials after a device's key or name changes"""
+    with _lock:
+        _local.pop(device_id, None)
+    cache.delete(_cache_key(device_id))
+
+
+# ============== LAST SEEN ==============
+
+def flush_last_seen():
+    """Write every pending last_seen with one UPDATE"""
+    global _last_flush
+    with _lock:
+        pending = dict(_pending_seen)
+        _pending_seen.clear()
+        _last_flush = time.monotonic()
+    if not pending:
+        return 0
+    return Device.objects.filter(device_id__in=list(pending)).update(last_seen=Case(
+        *[When(device_id=device_id, then=Value(seen)) for device_id, seen in pending.items()],
+        output_field=DateTimeField(),
+    ))
+
+
+def _timed_flush():
+    global _flush_timer
+    with _lock:
+        _flush_timer = None
+    try:
+        flush_last_seen()
+    except Exception:
+        logger.exception('Could not flush device last_seen')
+    finally:
+        # The timer thread's own connection
+        connection.close()
+
+
+def _schedule_flush():
+    """Start the flush timer unless one is running; call with _lock held"""
+    global _flush_timer
+    if _flush_timer is None:
+        _flush_timer = threading.Timer(LAST_SEEN_FLUSH_INTERVAL, _timed_flush)
+        _flush_timer.daemon = True
+        _flush_timer.start()
+
+
+def touch(device_ids, when):
+    """Record that `device_ids` were seen at `when`; flush when the interval
+    has passed, otherwise leave it to the timer"""
+    with _lock:
+        for device_id in device_ids:
+            if _pending_seen.get(device_id) is None or _pending_seen[device_id] < when:
+                _pending_seen[device_id] = when
+        due = time.monotonic() - _last_flush >= LAST_SEEN_FLUSH_INTERVAL
+        if not due:
+            _schedule_flush()
+    if due:
+        flush_last_seen()
+
+
+def _flush_at_exit():
+    try:
+        flush_last_seen()
+    except Exception:
+        logger.exception('Could not flush device last_seen at exit')
+
+
+atexit.register(_flush_at_exit)
+
+aauthenticate = sync_to_async(authenticate)
+atouch = sync_to_async(touch)
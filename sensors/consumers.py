@@ -61,6 +61,13 @@ class SensorConsumer(AsyncWebsocketConsumer):
             'type': 'sensor_update',
             'data': event['data']
         }))
+    
+    async def sensor_batch(self, event):
+        """Handle batched sensor updates from channel layer"""
+        await self.send(text_data=json.dumps({
+            'type': 'sensor_batch',
+            'data': event['data']
+        }))
 
 
 class DashboardConsumer(AsyncWebsocketConsumer):
@@ -109,3 +116,10 @@ class DashboardConsumer(AsyncWebsocketConsumer):
             'type': 'sensor_update',
             'data': event['data']
         }))
+    
+    async def sensor_batch(self, event):
+        """Handle batched sensor updates"""
+        await self.send(text_data=json.dumps({
+            'type': 'sensor_batch',
+            'data': event['data']
+        }))
@@ -0,0 +1,137 @@
+"""
+Batched ingestion of sensor readings.
+
+A batch may hold readings from one or many devices. Devices are
+authenticated against cached credentials (sensors/auth.py), all accepted
+readings are written with a single bulk_create, last_seen is recorded for
+the next periodic flush, and the WebSocket fan-out sends one message per
+channel group for the whole batch.
+"""
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .auth import authenticate, touch
+from .models import SensorReading
+
+MAX_BATCH_READINGS = getattr(settings, 'SENSOR_MAX_BATCH_READINGS', 1000)
+BULK_CREATE_BATCH_SIZE = 500
+
+READING_FIELDS = {
+    'temperature': float,
+    'humidity': float,
+    'soil_moisture': float,
+    'soil_raw': int,
+    'battery_level': float,
+    'signal_strength': int,
+}
+
+
+class ReadingError(ValueError):
+    """A single reading in a batch could not be accepted"""
+
+
+def clean_reading(data, now):
+    """Field values of one reading, coerced to the model's types"""
+    values = {}
+    for field, cast in READING_FIELDS.items():
+        value = data.get(field)
+        if value is None or value == '':
+            values[field] = None
+            continue
+        try:
+            values[field] = cast(value)
+        except (TypeError, ValueError):
+            raise ReadingError(f'Invalid value for {field}')
+
+    timestamp = data.get('timestamp')
+    if timestamp:
+        parsed = parse_datetime(str(timestamp))
+        if parsed is None:
+            raise ReadingError('Invalid timestamp')
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        values['timestamp'] = parsed
+    else:
+        values['timestamp'] = now
+    return values
+
+
+def ingest_readings(entries, default_device_id=None, default_api_key=None):
+    """Store a batch of readings.
+
+    Each entry is a reading dict that may carry its own device_id/api_key,
+    falling back to the batch-level ones. Returns (readings, errors) where
+    readings are the created SensorReading objects in input order and errors
+    are {'index', 'error'} dicts for rejected entries.
+    """
+    now = timezone.now()
+    errors = []
+    pending = []
+
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            errors.append({'index': index, 'error': 'Reading must be an object'})
+            continue
+        device_id = entry.get('device_id') or default_device_id
+        api_key = entry.get('api_key') or default_api_key
+        if not device_id or not api_key:
+            errors.append({'index': index, 'error': 'device_id and api_key are required'})
+            continue
+        try:
+            values = clean_reading(entry, now)
+        except ReadingError as e:
+            errors.append({'index': index, 'error': str(e)})
+            continue
+        pending.append((index, str(device_id), str(api_key), values))
+
+    devices = authenticate({(device_id, api_key) for _, device_id, api_key, _ in pending})
+
+    readings = []
+    for index, device_id, api_key, values in pending:
+        device = devices.get((device_id, api_key))
+        if device is None:
+            errors.append({'index': index, 'error': 'Invalid device_id or api_key'})
+            continue
+        readings.append(SensorReading(device=device, **values))
+
+    if readings:
+        SensorReading.objects.bulk_create(readings, batch_size=BULK_CREATE_BATCH_SIZE)
+        touch({reading.device_id for reading in readings}, now)
+
+    errors.sort(key=lambda error: error['index'])
+    return readings, errors
+
+
+def broadcast_readings(readings):
+    """Send one `sensor_batch` message per device group and one to the dashboard"""
+    if not readings:
+        return
+
+    from channels.layers import get_channel_layer
+    from asgiref.sync import async_to_sync
+
+    channel_layer = get_channel_layer()
+    if not channel_layer:
+        return
+
+    payload = [reading.to_dict() for reading in readings]
+    by_device = {}
+    for data in payload:
+        by_device.setdefault(data['device_id'], []).append(data)
+
+    for device_id, device_payload in by_device.items():
+        async_to_sync(channel_layer.group_send)(
+            f"device_{device_id}",
+            {
+                "type": "sensor_batch",
+                "data": device_payload
+            }
+        )
+    async_to_sync(channel_layer.group_send)(
+        "dashboard",
+        {
+            "type": "sensor_batch",
+            "data": payload
+        }
+    )
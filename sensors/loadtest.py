@@ -0,0 +1,205 @@
+"""
+Load generation for the sensor ingest path (see the benchmark_ingest command).
+
+This is the ESP32 simulator (test_esp32_simulator.py) scaled up. Every
+virtual device is an asyncio task that posts a reading to the submit URL
+(sensors:api_submit_reading) every `interval` seconds through a shared
+httpx client, while WebSocket clients subscribed to ws/dashboard/ time how
+long each reading takes to come back out of the channels fan-out. Each reading carries its send time as
+`timestamp`, so the publish-to-socket delay is measured against the
+sender's own clock; run the server on the same machine.
+
+The results are one flat dict (throughput, latency and delay percentiles)
+that can be saved as a baseline JSON file and compared with later runs.
+
+httpx and websockets are only needed here and are imported lazily.
+"""
+import asyncio
+import json
+import math
+import random
+import time
+from datetime import datetime, timezone
+
+DEVICE_PREFIX = 'BENCH-'
+
+# Higher is better for these; lower is better for everything else compared
+HIGHER_IS_BETTER = ('throughput',)
+COMPARED_METRICS = (
+    'throughput',
+    'latency_p50_ms', 'latency_p95_ms', 'latency_p99_ms',
+    'delay_p50_ms', 'delay_p95_ms', 'delay_p99_ms',
+)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of `values`, None when empty"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def reading_payload(device_id, api_key):
+    """A random reading in the same ranges as the ESP32 simulator"""
+    soil_percent = random.randint(30, 80)
+    return {
+        'device_id': device_id,
+        'api_key': api_key,
+        'temperature': round(20 + random.uniform(-5, 15), 1),
+        'humidity': round(40 + random.uniform(0, 40), 1),
+        'soil_moisture': soil_percent,
+        'soil_raw': int(4095 - (soil_percent / 100) * 2595),
+        'battery_level': 100.0,
+        'signal_strength': random.randint(15, 31),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+    }
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = []
+        self.delays = []
+        self.statuses = {}
+        self.errors = 0
+        self.messages = 0
+
+    def record_response(self, status, seconds):
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if status == 200:
+            self.latencies.append(seconds * 1000)
+
+    def record_message(self, message, received_at):
+        """Delay of every benchmark reading in one dashboard message"""
+        try:
+            message = json.loads(message)
+        except ValueError:
+            return
+        if message.get('type') == 'sensor_update':
+            readings = [message.get('data') or {}]
+        elif message.get('type') == 'sensor_batch':
+            readings = message.get('data') or []
+        else:
+            return
+        for reading in readings:
+            if not str(reading.get('device_id', '')).startswith(DEVICE_PREFIX):
+                continue
+            try:
+                sent_at = datetime.fromisoformat(reading['timestamp'])
+            except (KeyError, TypeError, ValueError):
+                continue
+            self.messages += 1
+            self.delays.append((received_at - sent_at).total_seconds() * 1000)
+
+
+async def run_device(client, url, device_id, api_key, interval, deadline, stats):
+    # Spread the first readings over one interval so devices don't fire in lockstep
+    await asyncio.sleep(random.uniform(0, interval))
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            response = await client.post(url, json=reading_payload(device_id, api_key))
+            stats.record_response(response.status_code, time.perf_counter() - started)
+        except Exception:
+            stats.errors += 1
+        await asyncio.sleep(max(interval - (time.perf_counter() - started), 0))
+
+
+async def run_subscriber(ws_url, stats, ready):
+    import websockets
+
+    async with websockets.connect(ws_url, max_queue=None) as socket:
+        ready.set()
+        async for message in socket:
+            stats.record_message(message, datetime.now(timezone.utc))
+
+
+async def run_load(submit_url, ws_url, devices, duration=60, interval=1.0,
+                   subscribers=1, max_connections=500, timeout=30, drain=2):
+    """Drive `devices` [(device_id, api_key)] against `submit_url` for `duration` seconds"""
+    import httpx
+
+    stats = Stats()
+    listeners = []
+    for _ in range(subscribers):
+        ready = asyncio.Event()
+        listeners.append(asyncio.create_task(run_subscriber(ws_url, stats, ready)))
+        await asyncio.wait_for(ready.wait(), timeout)
+
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    started = time.monotonic()
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+        deadline = started + duration
+        await asyncio.gather(*[
+            run_device(client, submit_url, device_id, api_key, interval, deadline, stats)
+            for device_id, api_key in devices
+        ])
+    elapsed = time.monotonic() - started
+
+    # Give the fan-out a moment to deliver the last readings
+    await asyncio.sleep(drain)
+    for listener in listeners:
+        listener.cancel()
+    await asyncio.gather(*listeners, return_exceptions=True)
+
+    return summarize(stats, elapsed, len(devices), subscribers)
+
+
+def summarize(stats, elapsed, devices, subscribers):
+    requests = sum(stats.statuses.values()) + stats.errors
+    ok = stats.statuses.get(200, 0)
+
+    def ms(values, pct):
+        value = percentile(values, pct)
+        return round(value, 2) if value is not None else None
+
+    return {
+        'devices': devices,
+        'subscribers': subscribers,
+        'duration_s': round(elapsed, 2),
+        'requests': requests,
+        'ok': ok,
+        'failed': requests - ok,
+        'statuses': {str(status): count for status, count in sorted(stats.statuses.items())},
+        'throughput': round(ok / elapsed, 2) if elapsed else 0,
+        'latency_p50_ms': ms(stats.latencies, 50),
+        'latency_p95_ms': ms(stats.latencies, 95),
+        'latency_p99_ms': ms(stats.latencies, 99),
+        'latency_max_ms': round(max(stats.latencies), 2) if stats.latencies else None,
+        # Every subscriber receives every reading
+        'delivered': round(stats.messages / (ok * subscribers), 4) if ok and subscribers else None,
+        'delay_p50_ms': ms(stats.delays, 50),
+        'delay_p95_ms': ms(stats.delays, 95),
+        'delay_p99_ms': ms(stats.delays, 99),
+    }
+
+
+# ============== BASELINES ==============
+
+def load_baseline(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+def save_baseline(path, results, settings):
+    with open(path, 'w') as file:
+        json.dump({'settings': settings, 'results': results}, file, indent=2, sort_keys=True)
+        file.write('\n')
+
+
+def compare(results, baseline, tolerance=0.1):
+    """[(metric, baseline value, current value)] for every metric that got worse
+    by more than `tolerance` (a fraction)"""
+    regressions = []
+    for metric in COMPARED_METRICS:
+        before, after = baseline.get(metric), results.get(metric)
+        if before is None or after is None:
+            continue
+        if metric in HIGHER_IS_BETTER:
+            worse = after < before * (1 - tolerance)
+        else:
+            worse = after > before * (1 + tolerance)
+        if worse:
+            regressions.append((metric, before, after))
+    return regressions
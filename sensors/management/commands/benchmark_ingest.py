@@ -0,0 +1,110 @@
+import asyncio
+import importlib.util
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from sensors import loadtest
+from sensors.models import Device, SensorReading
+
+
+class Command(BaseCommand):
+    help = (
+        'Simulate thousands of sensors posting to sensors:api_submit_reading while WebSocket '
+        'clients listen on ws/dashboard/, and report throughput, request latency '
+        'and publish-to-socket delay. Run against a local ASGI server that uses '
+        'this database; needs httpx and websockets.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Server base URL')
+        parser.add_argument('--ws-url', help='Dashboard socket URL (default: derived from --url)')
+        parser.add_argument('--devices', type=int, default=1000, help='Virtual devices')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds between readings per device')
+        parser.add_argument('--duration', type=float, default=60, help='Seconds to run')
+        parser.add_argument('--subscribers', type=int, default=1, help='Dashboard WebSocket clients')
+        parser.add_argument('--max-connections', type=int, default=500, help='HTTP connection pool size')
+        parser.add_argument('--baseline', help='Compare with this baseline JSON file')
+        parser.add_argument('--save-baseline', help='Write the results to this baseline JSON file')
+        parser.add_argument(
+            '--tolerance', type=float, default=0.1,
+            help='Allowed regression against --baseline, as a fraction (default 0.1)',
+        )
+        parser.add_argument(
+            '--cleanup', action='store_true',
+            help='Delete the benchmark devices and their readings afterwards',
+        )
+
+    def seed_devices(self, count):
+        """(device_id, api_key) of `count` benchmark devices, creating missing ones"""
+        device_ids = [f'{loadtest.DEVICE_PREFIX}{i:06d}' for i in range(count)]
+        Device.objects.bulk_create([
+            Device(device_id=device_id, device_name=f'Benchmark sensor {device_id}', location='Benchmark')
+            for device_id in device_ids
+        ], batch_size=1000, ignore_conflicts=True)
+        return list(Device.objects.filter(device_id__in=device_ids).values_list('device_id', 'api_key'))
+
+    def cleanup(self):
+        devices = Device.objects.filter(device_id__startswith=loadtest.DEVICE_PREFIX)
+        readings, _ = SensorReading.objects.filter(device__in=devices).delete()
+        removed, _ = devices.delete()
+        self.stdout.write(f'Removed {removed} benchmark devices and {readings} readings')
+
+    def handle(self, *args, **options):
+        if options['devices'] <= 0 or options['duration'] <= 0 or options['interval'] <= 0:
+            raise CommandError('--devices, --duration and --interval must be positive')
+        missing = [name for name in ('httpx', 'websockets') if importlib.util.find_spec(name) is None]
+        if missing:
+            raise CommandError(f"benchmark_ingest needs {', '.join(missing)} (pip install {' '.join(missing)})")
+
+        submit_url = options['url'].rstrip('/') + reverse('sensors:api_submit_reading')
+        ws_url = options['ws_url']
+        if not ws_url:
+            ws_url = options['url'].rstrip('/').replace('http', 'ws', 1) + '/ws/dashboard/'
+
+        baseline = None
+        if options['baseline']:
+            try:
+                baseline = loadtest.load_baseline(options['baseline'])
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Could not read baseline {options['baseline']}: {e}")
+
+        devices = self.seed_devices(options['devices'])
+        self.stdout.write(
+            f"{len(devices)} devices, one reading every {options['interval']}s each, "
+            f"for {options['duration']}s against {submit_url}"
+        )
+        try:
+            results = asyncio.run(loadtest.run_load(
+                submit_url, ws_url, devices,
+                duration=options['duration'],
+                interval=options['interval'],
+                subscribers=options['subscribers'],
+                max_connections=options['max_connections'],
+            ))
+        finally:
+            if options['cleanup']:
+                self.cleanup()
+
+        for metric, value in results.items():
+            self.stdout.write(f'{metric}: {value}')
+
+        settings = {
+            name: options[name]
+            for name in ('devices', 'interval', 'duration', 'subscribers', 'max_connections')
+        }
+        if options['save_baseline']:
+            loadtest.save_baseline(options['save_baseline'], results, settings)
+            self.stdout.write(f"Baseline saved to {options['save_baseline']}")
+
+        if baseline is not None:
+            if baseline.get('settings') != settings:
+                self.stdout.write(self.style.WARNING(
+                    f"Baseline was recorded with different settings: {baseline.get('settings')}"
+                ))
+            regressions = loadtest.compare(results, baseline.get('results', {}), options['tolerance'])
+            if regressions:
+                for metric, before, after in regressions:
+                    self.stdout.write(self.style.ERROR(f'{metric}: {before} -> {after}'))
+                raise CommandError(f'{len(regressions)} metrics regressed beyond {options["tolerance"]:.0%}')
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
@@ -0,0 +1,51 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from sensors.rollups import RETENTION_DAYS, prune, run_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        'Roll raw sensor readings into 1-minute, 1-hour and 1-day tiers and '
+        'prune rows past their retention horizon. Run every few minutes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            help='Recompute buckets from this date or ISO datetime instead of the last run',
+        )
+        parser.add_argument(
+            '--skip-prune',
+            action='store_true',
+            help='Only build rollups, do not delete anything',
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            since = parse_datetime(options['since'])
+            if since is None:
+                day = parse_date(options['since'])
+                if day is None:
+                    raise CommandError(f"Invalid --since value: {options['since']}")
+                since = datetime(day.year, day.month, day.day)
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+
+        written = run_rollups(since)
+        for resolution, count in written.items():
+            self.stdout.write(f'{resolution}: {count} rollup rows written')
+
+        if options['skip_prune']:
+            return
+
+        deleted = prune()
+        for tier, count in deleted.items():
+            days = RETENTION_DAYS.get(tier)
+            kept = f'{days} days' if days is not None else 'forever'
+            self.stdout.write(f'{tier}: {count} rows pruned (kept {kept})')
+        self.stdout.write(self.style.SUCCESS('Sensor rollups are up to date'))
@@ -0,0 +1,43 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sensors', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SensorReadingRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.CharField(choices=[('minute', '1 minute'), ('hour', '1 hour'), ('day', '1 day')], max_length=10)),
+                ('bucket', models.DateTimeField(help_text='Start of the bucket')),
+                ('count', models.IntegerField(default=0, help_text='Raw readings in the bucket')),
+                ('temperature_min', models.FloatField(blank=True, null=True)),
+                ('temperature_max', models.FloatField(blank=True, null=True)),
+                ('temperature_avg', models.FloatField(blank=True, null=True)),
+                ('temperature_count', models.IntegerField(default=0)),
+                ('humidity_min', models.FloatField(blank=True, null=True)),
+                ('humidity_max', models.FloatField(blank=True, null=True)),
+                ('humidity_avg', models.FloatField(blank=True, null=True)),
+                ('humidity_count', models.IntegerField(default=0)),
+                ('soil_moisture_min', models.FloatField(blank=True, null=True)),
+                ('soil_moisture_max', models.FloatField(blank=True, null=True)),
+                ('soil_moisture_avg', models.FloatField(blank=True, null=True)),
+                ('soil_moisture_count', models.IntegerField(default=0)),
+                ('battery_level_min', models.FloatField(blank=True, null=True)),
+                ('battery_level_max', models.FloatField(blank=True, null=True)),
+                ('battery_level_avg', models.FloatField(blank=True, null=True)),
+                ('battery_level_count', models.IntegerField(default=0)),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='sensors.device')),
+            ],
+            options={
+                'ordering': ['-bucket'],
+                'indexes': [models.Index(fields=['resolution', 'bucket'], name='sensors_rollup_res_bucket_idx')],
+                'constraints': [models.UniqueConstraint(fields=('device', 'resolution', 'bucket'), name='sensors_rollup_unique_bucket')],
+            },
+        ),
+    ]
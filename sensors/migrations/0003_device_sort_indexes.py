@@ -0,0 +1,29 @@
+# Generated by Django 6.0 on 2026-10-18 12:00
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+# Sortable columns of the devices list (api_devices_list)
+SORT_INDEXES = {
+    'last_seen': 'sensors_device_seen_idx',
+    'location': 'sensors_device_location_idx',
+    'status': 'sensors_device_status_idx',
+}
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run in a transaction
+    atomic = False
+
+    dependencies = [
+        ('sensors', '0002_sensorreadingrollup'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='device',
+            index=models.Index(fields=[field, 'device_id'], name=name),
+        )
+        for field, name in SORT_INDEXES.items()
+    ]
@@ -29,6 +29,12 @@ class Device(models.Model):
     
     class Meta:
         ordering = ['-last_seen']
+        # Sortable columns of the devices list, with the pk as tie-breaker
+        indexes = [
+            models.Index(fields=['last_seen', 'device_id'], name='sensors_device_seen_idx'),
+            models.Index(fields=['location', 'device_id'], name='sensors_device_location_idx'),
+            models.Index(fields=['status', 'device_id'], name='sensors_device_status_idx'),
+        ]
     
     def __str__(self):
         return f"{self.device_name} ({self.device_id})"
@@ -73,3 +79,50 @@ class SensorReading(models.Model):
             'battery_level': self.battery_level,
             'signal_strength': self.signal_strength,
         }
+
+
+class SensorReadingRollup(models.Model):
+    """Per-device min/max/avg of SensorReading over 1-minute, 1-hour or 1-day buckets.
+    Maintained by the rollup_sensor_readings command (see sensors/rollups.py)."""
+    RESOLUTIONS = [
+        ('minute', '1 minute'),
+        ('hour', '1 hour'),
+        ('day', '1 day'),
+    ]
+    
+    device = models.ForeignKey(Device, on_delete=models.CASCADE, related_name='rollups')
+    resolution = models.CharField(max_length=10, choices=RESOLUTIONS)
+    bucket = models.DateTimeField(help_text="Start of the bucket")
+    count = models.IntegerField(default=0, help_text="Raw readings in the bucket")
+    
+    temperature_min = models.FloatField(null=True, blank=True)
+    temperature_max = models.FloatField(null=True, blank=True)
+    temperature_avg = models.FloatField(null=True, blank=True)
+    temperature_count = models.IntegerField(default=0)
+    
+    humidity_min = models.FloatField(null=True, blank=True)
+    humidity_max = models.FloatField(null=True, blank=True)
+    humidity_avg = models.FloatField(null=True, blank=True)
+    humidity_count = models.IntegerField(default=0)
+    
+    soil_moisture_min = models.FloatField(null=True, blank=True)
+    soil_moisture_max = models.FloatField(null=True, blank=True)
+    soil_moisture_avg = models.FloatField(null=True, blank=True)
+    soil_moisture_count = models.IntegerField(default=0)
+    
+    battery_level_min = models.FloatField(null=True, blank=True)
+    battery_level_max = models.FloatField(null=True, blank=True)
+    battery_level_avg = models.FloatField(null=True, blank=True)
+    battery_level_count = models.IntegerField(default=0)
+    
+    class Meta:
+        ordering = ['-bucket']
+        constraints = [
+            models.UniqueConstraint(fields=['device', 'resolution', 'bucket'], name='sensors_rollup_unique_bucket'),
+        ]
+        indexes = [
+            models.Index(fields=['resolution', 'bucket'], name='sensors_rollup_res_bucket_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.device_id} - {self.resolution} - {self.bucket.strftime('%Y-%m-%d %H:%M')}"
@@ -0,0 +1,298 @@
+"""
+Downsampling and retention tiers for SensorReading.
+
+Raw readings are rolled into per-device 1-minute buckets, minute buckets
+into hours and hours into days (SensorReadingRollup). Every tier stores
+min/max/avg and a reading count per metric, so coarser tiers and readers
+can re-aggregate them exactly. Each tier, raw readings included, is kept
+for its own horizon (settings.SENSOR_RETENTION_DAYS) and is only pruned
+once the next tier covers it.
+
+Readers call select_resolution() to pick the coarsest tier that still
+gives enough points for the requested range, then series()/window_stats()
+combine that tier with raw readings newer than its last bucket, so charts
+stay current between rollup runs.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Max, Min, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from .models import SensorReading, SensorReadingRollup
+
+METRICS = ('temperature', 'humidity', 'soil_moisture', 'battery_level')
+
+RESOLUTION_STEPS = {
+    'minute': timedelta(minutes=1),
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+}
+# Each tier is built from the next finer one; None is the raw readings table
+RESOLUTION_SOURCES = {'minute': None, 'hour': 'minute', 'day': 'hour'}
+COARSEST_FIRST = ('day', 'hour', 'minute')
+
+# Days to keep each tier; None keeps it forever
+DEFAULT_RETENTION_DAYS = {'raw': 7, 'minute': 30, 'hour': 365, 'day': None}
+RETENTION_DAYS = {**DEFAULT_RETENTION_DAYS, **getattr(settings, 'SENSOR_RETENTION_DAYS', {})}
+
+# Minute buckets before the newest one that are recomputed on every run, to
+# pick up readings that arrive late (batched uploads carry their own timestamps)
+ROLLUP_LOOKBACK = timedelta(minutes=getattr(settings, 'SENSOR_ROLLUP_LOOKBACK_MINUTES', 60))
+
+# A tier is used for a range only if the range spans at least this many buckets
+MIN_POINTS = 24
+
+UPSERT_BATCH_SIZE = 1000
+
+ROLLUP_VALUE_FIELDS = ['count'] + [
+    f'{metric}_{stat}' for metric in METRICS for stat in ('min', 'max', 'avg', 'count')
+]
+
+
+def retention(tier):
+    days = RETENTION_DAYS.get(tier)
+    return timedelta(days=days) if days is not None else None
+
+
+def bucket_start(value, resolution):
+    """Start of the bucket containing `value`, in the current time zone"""
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    value = value.replace(second=0, microsecond=0)
+    if resolution in ('hour', 'day'):
+        value = value.replace(minute=0)
+    if resolution == 'day':
+        value = value.replace(hour=0)
+    return value
+
+
+def latest_bucket(resolution):
+    return SensorReadingRollup.objects.filter(resolution=resolution).aggregate(
+        latest=Max('bucket')
+    )['latest']
+
+
+# ============== AGGREGATES ==============
+
+def _raw_aggregates(metrics):
+    aggregates = {'count': Count('id')}
+    for metric in metrics:
+        aggregates[f'{metric}_min'] = Min(metric)
+        aggregates[f'{metric}_max'] = Max(metric)
+        aggregates[f'{metric}_sum'] = Sum(metric)
+        aggregates[f'{metric}_count'] = Count(metric)
+    return aggregates
+
+
+def _tier_aggregates(metrics):
+    aggregates = {'count': Sum('count')}
+    for metric in metrics:
+        aggregates[f'{metric}_min'] = Min(f'{metric}_min')
+        aggregates[f'{metric}_max'] = Max(f'{metric}_max')
+        aggregates[f'{metric}_sum'] = Sum(ExpressionWrapper(
+            F(f'{metric}_avg') * F(f'{metric}_count'), output_field=FloatField()
+        ))
+        aggregates[f'{metric}_count'] = Sum(f'{metric}_count')
+    return aggregates
+
+
+def _finish(row, metrics):
+    """Turn the sum/count of each metric into an average"""
+    result = {key: value for key, value in row.items() if not key.endswith('_sum')}
+    result['count'] = row.get('count') or 0
+    for metric in metrics:
+        count = row.get(f'{metric}_count') or 0
+        total = row.get(f'{metric}_sum')
+        result[f'{metric}_count'] = count
+        result[f'{metric}_avg'] = total / count if count and total is not None else None
+    return result
+
+
+def _combine(rows, metrics):
+    """Merge finished partial aggregates (tier part + raw tail) into one"""
+    combined = {'count': sum(row['count'] for row in rows)}
+    for metric in metrics:
+        parts = [row for row in rows if row[f'{metric}_count']]
+        count = sum(row[f'{metric}_count'] for row in parts)
+        mins = [row[f'{metric}_min'] for row in parts if row[f'{metric}_min'] is not None]
+        maxes = [row[f'{metric}_max'] for row in parts if row[f'{metric}_max'] is not None]
+        combined[f'{metric}_count'] = count
+        combined[f'{metric}_min'] = min(mins) if mins else None
+        combined[f'{metric}_max'] = max(maxes) if maxes else None
+        combined[f'{metric}_avg'] = (
+            sum(row[f'{metric}_avg'] * row[f'{metric}_count'] for row in parts) / count if count else None
+        )
+    return combined
+
+
+# ============== BUILDING TIERS ==============
+
+def _source(resolution):
+    source = RESOLUTION_SOURCES[resolution]
+    if source is None:
+        return SensorReading.objects.all(), 'timestamp', _raw_aggregates
+    return SensorReadingRollup.objects.filter(resolution=source), 'bucket', _tier_aggregates
+
+
+def _earliest_complete_bucket(resolution, now):
+    """First bucket whose source rows have not been pruned"""
+    horizon = retention(RESOLUTION_SOURCES[resolution] or 'raw')
+    if horizon is None:
+        return None
+    return bucket_start(now - horizon, resolution) + RESOLUTION_STEPS[resolution]
+
+
+def _upsert(rollups):
+    SensorReadingRollup.objects.bulk_create(
+        rollups,
+        update_conflicts=True,
+        unique_fields=['device', 'resolution', 'bucket'],
+        update_fields=ROLLUP_VALUE_FIELDS,
+    )
+
+
+def rollup(resolution, start=None, now=None):
+    """(Re)compute the `resolution` tier for every bucket from `start` on; returns rows written"""
+    now = now or timezone.now()
+    queryset, time_field, aggregates = _source(resolution)
+
+    if start is not None:
+        # Never recompute a bucket whose source rows may already be pruned
+        start = bucket_start(start, resolution)
+        earliest = _earliest_complete_bucket(resolution, now)
+        if earliest is not None and start < earliest:
+            start = earliest
+        queryset = queryset.filter(**{f'{time_field}__gte': start})
+
+    rows = queryset.annotate(
+        rollup_bucket=Trunc(time_field, resolution)
+    ).values('device_id', 'rollup_bucket').annotate(**aggregates(METRICS)).order_by()
+
+    written = 0
+    batch = []
+    for row in rows.iterator(chunk_size=UPSERT_BATCH_SIZE):
+        row = _finish(row, METRICS)
+        batch.append(SensorReadingRollup(
+            device_id=row['device_id'],
+            resolution=resolution,
+            bucket=row['rollup_bucket'],
+            **{field: row[field] for field in ROLLUP_VALUE_FIELDS},
+        ))
+        if len(batch) >= UPSERT_BATCH_SIZE:
+            _upsert(batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        _upsert(batch)
+        written += len(batch)
+    return written
+
+
+def run_rollups(since=None, now=None):
+    """Bring every tier up to date. Without `since`, only buckets from shortly
+    before the newest minute bucket are recomputed."""
+    now = now or timezone.now()
+    if since is None:
+        latest = latest_bucket('minute')
+        since = latest - ROLLUP_LOOKBACK if latest else None
+    return {resolution: rollup(resolution, since, now) for resolution in RESOLUTION_STEPS}
+
+
+def prune(now=None):
+    """Delete rows past their tier's horizon, but never rows the next tier does not cover yet"""
+    now = now or timezone.now()
+    deleted = {}
+    for tier, next_tier in (('raw', 'minute'), ('minute', 'hour'), ('hour', 'day'), ('day', None)):
+        deleted[tier] = 0
+        horizon = retention(tier)
+        if horizon is None:
+            continue
+        cutoff = now - horizon
+        if next_tier is not None:
+            covered_until = latest_bucket(next_tier)
+            if covered_until is None:
+                continue
+            cutoff = min(cutoff, covered_until)
+        if tier == 'raw':
+            queryset = SensorReading.objects.filter(timestamp__lt=cutoff)
+        else:
+            queryset = SensorReadingRollup.objects.filter(resolution=tier, bucket__lt=cutoff)
+        deleted[tier] = queryset.delete()[0]
+    return deleted
+
+
+# ============== READING ==============
+
+def _retained(tier, start, now):
+    horizon = retention(tier)
+    return horizon is None or start >= now - horizon
+
+
+def select_resolution(start, end=None, min_points=MIN_POINTS, now=None):
+    """Coarsest tier that gives at least `min_points` buckets over [start, end]
+    and still holds data from `start`; None means raw readings are needed."""
+    now = now or timezone.now()
+    span = (end or now) - start
+    covering = [resolution for resolution in COARSEST_FIRST if _retained(resolution, start, now)]
+    for resolution in covering:
+        if span / RESOLUTION_STEPS[resolution] >= min_points:
+            return resolution
+    if _retained('raw', start, now) or not covering:
+        return None
+    # Raw rows are gone: fall back to the finest tier that still has them
+    return covering[-1]
+
+
+def _filtered(queryset, time_field, start, end, device_id):
+    queryset = queryset.filter(**{f'{time_field}__gte': start})
+    if end is not None:
+        queryset = queryset.filter(**{f'{time_field}__lt': end})
+    if device_id is not None:
+        queryset = queryset.filter(device_id=device_id)
+    return queryset
+
+
+def series(resolution, start, end=None, metrics=METRICS, device_id=None):
+    """Per-bucket aggregates over [start, end) as dicts with `bucket`, `count`
+    and <metric>_min/_max/_avg/_count, ordered by bucket"""
+    watermark = latest_bucket(resolution)
+    rows = []
+    raw_start = start
+    if watermark is not None and watermark > start:
+        tier = _filtered(
+            SensorReadingRollup.objects.filter(resolution=resolution, bucket__lt=watermark),
+            'bucket', bucket_start(start, resolution), end, device_id,
+        )
+        rows.extend(tier.values('bucket').annotate(**_tier_aggregates(metrics)).order_by('bucket'))
+        raw_start = watermark
+
+    raw = _filtered(SensorReading.objects.all(), 'timestamp', raw_start, end, device_id)
+    rows.extend(
+        raw.annotate(bucket=Trunc('timestamp', resolution))
+        .values('bucket').annotate(**_raw_aggregates(metrics)).order_by('bucket')
+    )
+    return [_finish(row, metrics) for row in rows]
+
+
+def window_stats(start, end=None, metrics=METRICS, device_id=None):
+    """Aggregates over [start, end) read from the coarsest suitable tier.
+    Returns (resolution, stats); resolution is None when raw readings were used."""
+    resolution = select_resolution(start, end)
+    parts = []
+    raw_start = start
+    watermark = latest_bucket(resolution) if resolution else None
+    if watermark is not None and watermark > start:
+        # Only buckets that start inside the window; with at least MIN_POINTS
+        # buckets the partial one at the start is a small share of the range
+        tier = _filtered(
+            SensorReadingRollup.objects.filter(resolution=resolution, bucket__lt=watermark),
+            'bucket', start, end, device_id,
+        )
+        parts.append(_finish(tier.aggregate(**_tier_aggregates(metrics)), metrics))
+        raw_start = watermark
+
+    raw = _filtered(SensorReading.objects.all(), 'timestamp', raw_start, end, device_id)
+    parts.append(_finish(raw.aggregate(**_raw_aggregates(metrics)), metrics))
+    return resolution, _combine(parts, metrics)
@@ -1,3 +1,31 @@
 from django.test import TestCase
 
-# Create your tests here.
+from .auth import invalidate_device
+from .ingest import ingest_readings
+from .models import Device, SensorReading
+
+
+class BatchAuthenticationTests(TestCase):
+    """Each reading in a batch is checked against its own (device_id, api_key) pair"""
+
+    def setUp(self):
+        self.device = Device.objects.create(device_id='dev-1', device_name='Field 1')
+        invalidate_device(self.device.device_id)
+
+    def test_wrong_key_rejected_next_to_right_key_for_same_device(self):
+        readings, errors = ingest_readings([
+            {'device_id': 'dev-1', 'api_key': str(self.device.api_key), 'temperature': 20},
+            {'device_id': 'dev-1', 'api_key': 'not-the-key', 'temperature': 99},
+        ])
+        self.assertEqual(len(readings), 1)
+        self.assertEqual(errors, [{'index': 1, 'error': 'Invalid device_id or api_key'}])
+        self.assertEqual(list(SensorReading.objects.values_list('temperature', flat=True)), [20])
+
+    def test_batch_key_does_not_cover_reading_with_wrong_key(self):
+        readings, errors = ingest_readings(
+            [{'temperature': 20}, {'api_key': 'not-the-key', 'temperature': 99}],
+            default_device_id='dev-1',
+            default_api_key=str(self.device.api_key),
+        )
+        self.assertEqual([reading.temperature for reading in readings], [20])
+        self.assertEqual([error['index'] for error in errors], [1])
@@ -14,6 +14,7 @@ urlpatterns = [
     # API endpoints
     path('api/register/', views.register_device, name='api_register_device'),
     path('api/submit/', views.submit_reading, name='api_submit_reading'),
+    path('api/submit/batch/', views.submit_readings_batch, name='api_submit_readings_batch'),
     path('api/devices/', views.api_all_devices, name='api_all_devices'),
     path('api/device/<str:device_id>/readings/', views.api_device_readings, name='api_device_readings'),
     path('api/device/<str:device_id>/stats/', views.api_device_stats, name='api_device_stats'),
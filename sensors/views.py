@@ -4,12 +4,31 @@ from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.utils import timezone
-from django.db.models import Avg, Count
+from django.db.models import OuterRef, Subquery
 from django.db.models.functions import TruncHour, TruncDay
 import json
 from datetime import timedelta
 
+from utils.datatables import paginate
+
 from .models import Device, SensorReading
+from .auth import aauthenticate, atouch, invalidate_device
+from .ingest import MAX_BATCH_READINGS, ReadingError, broadcast_readings, clean_reading, ingest_readings
+from .rollups import select_resolution, series, window_stats
+
+
+def with_latest_reading_id(devices):
+    """Annotate latest_reading_id, the pk of each device's newest reading,
+    with a (device, -timestamp) index probe per row in the same query"""
+    latest = SensorReading.objects.filter(device=OuterRef('pk')).order_by('-timestamp').values('pk')[:1]
+    return devices.annotate(latest_reading_id=Subquery(latest))
+
+
+def latest_readings(devices):
+    """{reading pk: SensorReading} for devices from with_latest_reading_id(), in one query"""
+    return SensorReading.objects.select_related('device').in_bulk(
+        [device.latest_reading_id for device in devices if device.latest_reading_id]
+    )
 
 
 # ==================== Web Views ====================
@@ -28,7 +47,6 @@ from .models import Device, SensorReading
 #     return render(request, 'sensors/dashboard.html', context)
 
 from datetime import datetime, timedelta
-from django.db.models import Max, Min
 
 # Enhanced dashboard view
 def dashboard(request):
@@ -58,11 +76,12 @@ def dashboard(request):
     
     # Get devices with latest readings
     devices_with_data = []
+    devices = with_latest_reading_id(devices)
+    readings = latest_readings(devices)
     for device in devices:
-        latest = device.readings.first()
         devices_with_data.append({
             'device': device,
-            'latest_reading': latest,
+            'latest_reading': readings.get(device.latest_reading_id),
         })
     
     context = {
@@ -80,31 +99,27 @@ def dashboard(request):
 
 # Add new API endpoint for chart data
 def api_dashboard_stats(request):
-    """Get dashboard statistics for charts"""
-    # Last 24 hours data grouped by hour
-    hours_24 = timezone.now() - timedelta(hours=24)
+    """Get dashboard statistics for charts.
+    ?hours= sets the range (default 24); buckets come from the coarsest rollup tier that fits it."""
+    hours = int(request.GET.get('hours', 24))
+    since = timezone.now() - timedelta(hours=hours)
+    resolution = select_resolution(since) or 'minute'
+    
+    buckets = series(resolution, since, metrics=('temperature', 'humidity'))
     
     # Temperature trends
-    temp_readings = SensorReading.objects.filter(
-        timestamp__gte=hours_24,
-        temperature__isnull=False
-    ).extra({
-        'hour': "date_trunc('hour', timestamp)"
-    }).values('hour').annotate(
-        avg_temp=Avg('temperature'),
-        max_temp=Max('temperature'),
-        min_temp=Min('temperature')
-    ).order_by('hour')
+    temp_readings = [{
+        'hour': bucket['bucket'],
+        'avg_temp': bucket['temperature_avg'],
+        'max_temp': bucket['temperature_max'],
+        'min_temp': bucket['temperature_min'],
+    } for bucket in buckets if bucket['temperature_count']]
     
     # Humidity trends
-    hum_readings = SensorReading.objects.filter(
-        timestamp__gte=hours_24,
-        humidity__isnull=False
-    ).extra({
-        'hour': "date_trunc('hour', timestamp)"
-    }).values('hour').annotate(
-        avg_hum=Avg('humidity'),
-    ).order_by('hour')
+    hum_readings = [{
+        'hour': bucket['bucket'],
+        'avg_hum': bucket['humidity_avg'],
+    } for bucket in buckets if bucket['humidity_count']]
     
     # Device activity
     active_devices = Device.objects.filter(
@@ -115,8 +130,9 @@ def api_dashboard_stats(request):
     alerts = []
     
     return JsonResponse({
-        'temperature_trends': list(temp_readings),
-        'humidity_trends': list(hum_readings),
+        'temperature_trends': temp_readings,
+        'humidity_trends': hum_readings,
+        'resolution': resolution,
         'active_devices': active_devices,
         'alerts': alerts,
         'last_updated': timezone.now().isoformat(),
@@ -200,8 +216,11 @@ def register_device(request):
 
 @csrf_exempt
 @require_http_methods(["POST"])
-def submit_reading(request):
-    """API endpoint for sensors to submit readings"""
+async def submit_reading(request):
+    """API endpoint for sensors to submit readings.
+
+    Runs natively under ASGI: credentials come from the device auth cache
+    and last_seen is written by the periodic flush in sensors/auth.py."""
     try:
         data = json.loads(request.body)
         device_id = data.get('device_id')
@@ -214,48 +233,47 @@ def submit_reading(request):
             }, status=400)
         
         # Authenticate device
-        try:
-            device = Device.objects.get(device_id=device_id, api_key=api_key)
-        except Device.DoesNotExist:
+        credentials = (str(device_id), str(api_key))
+        device = (await aauthenticate({credentials})).get(credentials)
+        if device is None:
             return JsonResponse({
                 'success': False,
                 'error': 'Invalid device_id or api_key'
             }, status=401)
         
-        # Update device last seen
-        device.last_seen = timezone.now()
-        device.save()
+        now = timezone.now()
+        try:
+            values = clean_reading(data, now)
+        except ReadingError as e:
+            return JsonResponse({
+                'success': False,
+                'error': str(e)
+            }, status=400)
         
         # Create sensor reading
-        reading = SensorReading.objects.create(
-            device=device,
-            temperature=data.get('temperature'),
-            humidity=data.get('humidity'),
-            soil_moisture=data.get('soil_moisture'),
-            soil_raw=data.get('soil_raw'),
-            battery_level=data.get('battery_level'),
-            signal_strength=data.get('signal_strength'),
-        )
+        reading = SensorReading(device=device, **values)
+        await reading.asave()
+        await atouch([device.device_id], now)
         
         # Broadcast to WebSocket (will be handled by channels)
         from channels.layers import get_channel_layer
-        from asgiref.sync import async_to_sync
         
         channel_layer = get_channel_layer()
         if channel_layer:
-            async_to_sync(channel_layer.group_send)(
-                f"device_{device_id}",
+            payload = reading.to_dict()
+            await channel_layer.group_send(
+                f"device_{device.device_id}",
                 {
                     "type": "sensor_update",
-                    "data": reading.to_dict()
+                    "data": payload
                 }
             )
             # Also send to general dashboard group
-            async_to_sync(channel_layer.group_send)(
+            await channel_layer.group_send(
                 "dashboard",
                 {
                     "type": "sensor_update",
-                    "data": reading.to_dict()
+                    "data": payload
                 }
             )
         
@@ -277,6 +295,63 @@ def submit_reading(request):
         }, status=500)
 
 
+@csrf_exempt
+@require_http_methods(["POST"])
+def submit_readings_batch(request):
+    """API endpoint for sensors to submit many readings in one request.
+
+    Accepts {"device_id", "api_key", "readings": [...]} for one device, or
+    a "readings" list (or bare list) whose items carry their own device_id
+    and api_key. Readings may include an ISO "timestamp".
+    """
+    try:
+        data = json.loads(request.body)
+        if isinstance(data, list):
+            data = {'readings': data}
+        entries = data.get('readings') if isinstance(data, dict) else None
+        
+        if not isinstance(entries, list) or not entries:
+            return JsonResponse({
+                'success': False,
+                'error': 'readings must be a non-empty list'
+            }, status=400)
+        if len(entries) > MAX_BATCH_READINGS:
+            return JsonResponse({
+                'success': False,
+                'error': f'At most {MAX_BATCH_READINGS} readings per batch'
+            }, status=400)
+        
+        readings, errors = ingest_readings(entries, data.get('device_id'), data.get('api_key'))
+        
+        # Broadcast to WebSocket, one message per group for the whole batch
+        broadcast_readings(readings)
+        
+        status = 200
+        if not readings:
+            # Nothing stored: 401 when every reading failed authentication
+            unauthorized = all(error['error'] == 'Invalid device_id or api_key' for error in errors)
+            status = 401 if unauthorized else 400
+        
+        return JsonResponse({
+            'success': bool(readings),
+            'accepted': len(readings),
+            'rejected': len(errors),
+            'reading_ids': [reading.id for reading in readings],
+            'errors': errors
+        }, status=status)
+    
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'success': False,
+            'error': 'Invalid JSON'
+        }, status=400)
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
 def api_device_readings(request, device_id):
     """Get recent readings for a device"""
     device = get_object_or_404(Device, device_id=device_id)
@@ -300,30 +375,34 @@ def api_device_stats(request, device_id):
     hours = int(request.GET.get('hours', 24))
     since = timezone.now() - timedelta(hours=hours)
     
-    readings = device.readings.filter(timestamp__gte=since)
-    
-    stats = readings.aggregate(
-        avg_temperature=Avg('temperature'),
-        avg_humidity=Avg('humidity'),
-        avg_soil_moisture=Avg('soil_moisture'),
-        count=Count('id')
+    resolution, totals = window_stats(
+        since, metrics=('temperature', 'humidity', 'soil_moisture'), device_id=device.device_id
     )
     
+    stats = {
+        'avg_temperature': totals['temperature_avg'],
+        'avg_humidity': totals['humidity_avg'],
+        'avg_soil_moisture': totals['soil_moisture_avg'],
+        'count': totals['count']
+    }
+    
     return JsonResponse({
         'device_id': device_id,
         'device_name': device.device_name,
         'time_range_hours': hours,
+        'resolution': resolution or 'raw',
         'statistics': stats
     })
 
 
 def api_all_devices(request):
     """Get list of all devices with their latest reading"""
-    devices = Device.objects.all()
+    devices = with_latest_reading_id(Device.objects.all())
+    readings = latest_readings(devices)
     data = []
     
     for device in devices:
-        latest = device.readings.first()
+        latest = readings.get(device.latest_reading_id)
         device_data = {
             'device_id': device.device_id,
             'device_name': device.device_name,
@@ -355,7 +434,6 @@ from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.utils import timezone
-from django.db.models import Avg, Count, Q
 from django.db.models.functions import TruncHour, TruncDay
 import json
 from datetime import timedelta
@@ -366,48 +444,25 @@ def devices_management(request):
     return render(request, 'sensors/devices_management.html')
 
 
+DEVICE_SORTABLE_COLUMNS = dict(enumerate(
+    ['device_id', 'device_name', 'device_type', 'location', 'status', 'last_seen']
+))
+
+
 def api_devices_list(request):
     """API endpoint for devices list (DataTables server-side)"""
-    # Get DataTables parameters
-    draw = int(request.GET.get('draw', 1))
-    start = int(request.GET.get('start', 0))
-    length = int(request.GET.get('length', 10))
-    search_value = request.GET.get('search[value]', '')
-    
-    # Build query
-    devices = Device.objects.all()
-    
-    # Apply search
-    if search_value:
-        devices = devices.filter(
-            Q(device_id__icontains=search_value) |
-            Q(device_name__icontains=search_value) |
-            Q(location__icontains=search_value) |
-            Q(device_type__icontains=search_value) |
-            Q(status__icontains=search_value)
-        )
-    
-    # Get total count
-    total_records = devices.count()
-    
-    # Apply ordering
-    order_column = int(request.GET.get('order[0][column]', 0))
-    order_dir = request.GET.get('order[0][dir]', 'asc')
-    order_fields = ['device_id', 'device_name', 'device_type', 'location', 'status', 'last_seen']
-    
-    if order_column < len(order_fields):
-        order_field = order_fields[order_column]
-        if order_dir == 'desc':
-            order_field = '-' + order_field
-        devices = devices.order_by(order_field)
-    
-    # Paginate
-    devices = devices[start:start + length]
+    devices = paginate(
+        request, with_latest_reading_id(Device.objects.all()),
+        sortable=DEVICE_SORTABLE_COLUMNS,
+        search_fields=('device_id', 'device_name', 'location', 'device_type', 'status'),
+        default_order=('-last_seen',),
+    )
     
     # Prepare response data
+    readings = latest_readings(devices)
     data = []
     for device in devices:
-        latest_reading = device.readings.first()
+        latest_reading = readings.get(device.latest_reading_id)
         data.append({
             'id': device.device_id,
             'device_id': device.device_id,
@@ -422,12 +477,7 @@ def api_devices_list(request):
             'soil_moisture': latest_reading.soil_moisture if latest_reading else '--',
         })
     
-    return JsonResponse({
-        'draw': draw,
-        'recordsTotal': total_records,
-        'recordsFiltered': total_records,
-        'data': data
-    })
+    return devices.response(data)
 
 
 def api_device_detail(request, device_id):
@@ -544,6 +594,7 @@ def api_device_update(request, device_id):
                 device.status = data['status']
             
             device.save()
+            invalidate_device(device.device_id)
             
             return JsonResponse({
                 'success': True,
@@ -584,6 +635,7 @@ def api_device_delete(request, device_id):
             
             # Delete device
             device.delete()
+            invalidate_device(device_id)
             
             return JsonResponse({
                 'success': True,
@@ -614,6 +666,7 @@ def api_device_generate_key(request, device_id):
             device = Device.objects.get(device_id=device_id)
             device.api_key = uuid.uuid4()
             device.save()
+            invalidate_device(device.device_id)
             
             return JsonResponse({
                 'success': True,
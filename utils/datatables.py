@@ -0,0 +1,218 @@
+"""
+Server-side DataTables engine shared by the list APIs.
+
+A list endpoint passes its base queryset (already narrowed by its own
+filters), the DataTables column indexes it allows sorting on, and the
+fields the search box matches. `paginate()` turns the draw/start/length/
+search/order/columns parameters into one filtered, ordered and sliced
+query:
+
+* Only declared sortable columns are honoured, with the primary key as a
+  tie-breaker so pages are stable.
+* When a page directly follows one that was just served (the usual "next"
+  click), it starts from the last row seen (keyset: WHERE (sort, pk) after
+  the boundary) instead of OFFSET, so deep pages cost the same as the first.
+* Counts are exact up to DATATABLES_COUNT_CAP rows. Beyond that, and for
+  big unfiltered tables, PostgreSQL's own row estimates are reported.
+"""
+import hashlib
+import json
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import connection
+from django.db.models import Model, Q
+from django.db.models.lookups import Exact
+from django.db.models.sql.where import AND
+from django.http import JsonResponse
+
+COUNT_CAP = getattr(settings, 'DATATABLES_COUNT_CAP', 100000)
+MAX_PAGE_LENGTH = getattr(settings, 'DATATABLES_MAX_PAGE_LENGTH', 1000)
+KEYSET_CACHE_TIMEOUT = 15 * 60
+
+
+def _int(value, default):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+# ============== COUNTS ==============
+
+def table_estimate(model):
+    """Row count PostgreSQL keeps in pg_class (updated by VACUUM/ANALYZE)"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [connection.ops.quote_name(model._meta.db_table)],
+        )
+        row = cursor.fetchone()
+    return max(row[0], 0) if row else 0
+
+
+def planner_estimate(queryset):
+    """Rows the query planner expects `queryset` to return"""
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def _alive_only(where):
+    """True when `where` holds nothing but delete_field = 'no', the filter
+    timeStamp's manager (and often the view again) puts on every list"""
+    return where.connector == AND and not where.negated and all(
+        isinstance(child, Exact)
+        and getattr(getattr(child.lhs, 'target', None), 'name', None) == 'delete_field'
+        and child.rhs == 'no'
+        for child in where.children
+    )
+
+
+def count_rows(queryset):
+    """Exact count up to COUNT_CAP, an estimate above it"""
+    where = queryset.query.where
+    if not where:
+        estimate = table_estimate(queryset.model)
+        if estimate > COUNT_CAP:
+            return estimate
+    elif _alive_only(where):
+        # Live rows of a soft-delete table: the planner's estimate from the
+        # delete_field statistics, as pg_class also counts deleted rows
+        estimate = planner_estimate(queryset)
+        if estimate > COUNT_CAP:
+            return estimate
+    capped = queryset.order_by()[:COUNT_CAP + 1].count()
+    if capped <= COUNT_CAP:
+        return capped
+    return max(capped, planner_estimate(queryset))
+
+
+# ============== ORDERING & KEYSET ==============
+
+def _lookup_value(obj, path):
+    for attr in path.split('__'):
+        if obj is None:
+            return None
+        obj = getattr(obj, attr)
+    # Foreign keys sort (and compare) by primary key
+    return obj.pk if isinstance(obj, Model) else obj
+
+
+def _after(orders, boundary):
+    """Q for rows that sort after `boundary` under `orders`.
+    PostgreSQL puts NULLs last ascending and first descending."""
+    clauses = []
+    equal = Q()
+    for (field, descending), value in zip(orders, boundary):
+        if value is None:
+            after = Q(**{f'{field}__isnull': False}) if descending else None
+            same = Q(**{f'{field}__isnull': True})
+        else:
+            after = Q(**{f'{field}__{"lt" if descending else "gt"}': value})
+            if not descending:
+                after |= Q(**{f'{field}__isnull': True})
+            same = Q(**{field: value})
+        if after is not None:
+            clauses.append(equal & after)
+        equal &= same
+    return reduce(or_, clauses) if clauses else Q(pk__in=[])
+
+
+class DataTablesPage:
+    def __init__(self, draw, records_total, records_filtered, rows):
+        self.draw = draw
+        self.records_total = records_total
+        self.records_filtered = records_filtered
+        self.rows = rows
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def response(self, data, **extra):
+        return JsonResponse({
+            'draw': self.draw,
+            'recordsTotal': self.records_total,
+            'recordsFiltered': self.records_filtered,
+            'data': data,
+            'success': True,
+            **extra,
+        })
+
+
+def paginate(request, queryset, sortable=None, search_fields=(), column_search=None,
+             default_order=('-pk',)):
+    """Run one DataTables request against `queryset`.
+
+    sortable: {column index: field path} of columns that may be sorted on;
+        back them with an index.
+    search_fields: field paths matched (icontains) by the global search box.
+    column_search: {column index: lookup} applied with columns[i][search][value].
+    default_order: used when the request sorts on no declared column.
+    """
+    params = request.GET
+    draw = _int(params.get('draw'), 1)
+    start = max(_int(params.get('start'), 0), 0)
+    length = _int(params.get('length'), 10)
+    if length <= 0 or length > MAX_PAGE_LENGTH:
+        length = MAX_PAGE_LENGTH
+
+    filtered = queryset
+    search_value = params.get('search[value]', '').strip()
+    if search_value and search_fields:
+        filtered = filtered.filter(reduce(or_, (
+            Q(**{f'{field}__icontains': search_value}) for field in search_fields
+        )))
+    for index, lookup in (column_search or {}).items():
+        value = params.get(f'columns[{index}][search][value]', '').strip()
+        if value:
+            filtered = filtered.filter(**{lookup: value})
+
+    records_total = count_rows(queryset)
+    records_filtered = count_rows(filtered) if filtered is not queryset else records_total
+
+    orders = []
+    sortable = sortable or {}
+    i = 0
+    while f'order[{i}][column]' in params:
+        field = sortable.get(_int(params.get(f'order[{i}][column]'), -1))
+        if field:
+            orders.append((field, params.get(f'order[{i}][dir]') == 'desc'))
+        i += 1
+    if not orders:
+        orders = [(field.lstrip('-'), field.startswith('-')) for field in default_order]
+    if not any(field in ('pk', 'id') for field, _ in orders):
+        orders.append(('pk', orders[0][1]))
+
+    ordered = filtered.order_by(*[f'-{field}' if descending else field for field, descending in orders])
+
+    try:
+        signature = hashlib.md5(
+            f'{queryset.model._meta.label}|{ordered.query}'.encode()
+        ).hexdigest()
+    except EmptyResultSet:
+        signature = None
+
+    boundary = None
+    if signature and start > 0:
+        boundary = cache.get(f'datatables:{signature}:{start}')
+    if boundary is not None:
+        rows = list(ordered.filter(_after(orders, boundary))[:length])
+    else:
+        rows = list(ordered[start:start + length])
+
+    if signature and len(rows) == length:
+        cache.set(
+            f'datatables:{signature}:{start + length}',
+            [_lookup_value(rows[-1], field) for field, _ in orders],
+            KEYSET_CACHE_TIMEOUT,
+        )
+
+    return DataTablesPage(draw, records_total, records_filtered, rows)
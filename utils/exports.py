@@ -0,0 +1,287 @@
+"""
+Streaming CSV/XLSX exports shared by the export views.
+
+An export is a queryset plus a list of columns. Each column is
+(header, field, format), where `field` is a values_list() path (or a tuple
+of paths whose values are passed together to `format`) and `format` is an
+optional callable that turns the raw value(s) into the cell value. Rows are
+read with values_list().iterator(), so neither model instances nor the
+whole result set are ever held in memory:
+
+* CSV is streamed to the client as it is produced (StreamingHttpResponse).
+* XLSX is written with openpyxl's write-only workbook into a temporary
+  file, which is then streamed back.
+* HTTP is served through ASGI, where Django reads a synchronous streaming
+  iterator into a list before sending it. Responses are therefore fed
+  from async iterators: rows come from QuerySet.aiterator() and files are
+  read a block at a time with sync_to_async.
+* With `?background=1` the file is written to MEDIA_ROOT/exports/ by a
+  worker thread instead, and the client gets a job id to poll
+  (portal/view/exports.py). Job state is kept in the Django cache, so
+  this is only offered when that cache is shared between workers (see
+  portal/checks.py); otherwise the file is streamed. Job directories are
+  removed once the job itself has expired (purge_expired_exports, the
+  purge_exports command).
+"""
+import csv
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, connections
+from django.http import JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+
+from portal.checks import cache_is_shared
+
+EXPORT_CHUNK_SIZE = getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+FILE_BLOCK_SIZE = 64 * 1024
+EXPORT_DIR = 'exports'
+EXPORT_JOB_TIMEOUT = 60 * 60 * 24
+# Starting a job also purges expired files, at most this often
+EXPORT_PURGE_INTERVAL = 60 * 60
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'EXPORT_WORKERS', 2), thread_name_prefix='export'
+)
+
+
+class ExportFormatError(ValueError):
+    pass
+
+
+# ============== ROWS ==============
+
+def _fields(field):
+    return field if isinstance(field, tuple) else (field,)
+
+
+def _row_plan(columns):
+    """values_list() paths, and (positions, format) per column"""
+    paths = []
+    for _, field, _ in columns:
+        for path in _fields(field):
+            if path not in paths:
+                paths.append(path)
+    index = {path: i for i, path in enumerate(paths)}
+    getters = [
+        ([index[path] for path in _fields(field)], fmt)
+        for _, field, fmt in columns
+    ]
+    return paths, getters
+
+
+def _format_row(values, getters):
+    row = []
+    for positions, fmt in getters:
+        args = [values[i] for i in positions]
+        if fmt is not None:
+            row.append(fmt(*args))
+        else:
+            row.append('' if args[0] is None else args[0])
+    return row
+
+
+def export_rows(queryset, columns):
+    """Header row, then one list of cell values per row of `queryset`"""
+    paths, getters = _row_plan(columns)
+    yield [header for header, _, _ in columns]
+    for values in queryset.values_list(*paths).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield _format_row(values, getters)
+
+
+async def aexport_rows(queryset, columns):
+    """export_rows() as an async iterator, fetching EXPORT_CHUNK_SIZE rows at a time"""
+    paths, getters = _row_plan(columns)
+    yield [header for header, _, _ in columns]
+    async for values in queryset.values_list(*paths).aiterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield _format_row(values, getters)
+
+
+# ============== WRITERS ==============
+
+class _Echo:
+    """File-like object whose write() hands the line back to the csv writer"""
+    def write(self, value):
+        return value
+
+
+async def acsv_lines(rows):
+    writer = csv.writer(_Echo())
+    async for row in rows:
+        yield writer.writerow(row)
+
+
+async def file_blocks(file):
+    """Read `file` a block at a time off the event loop, then close it"""
+    try:
+        while True:
+            block = await sync_to_async(file.read)(FILE_BLOCK_SIZE)
+            if not block:
+                break
+            yield block
+    finally:
+        await sync_to_async(file.close)()
+
+
+def file_response(file, filename, content_type):
+    """Attachment response streamed from an open binary file"""
+    response = StreamingHttpResponse(file_blocks(file), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def write_csv(rows, file):
+    writer = csv.writer(file)
+    for row in rows:
+        writer.writerow(row)
+
+
+def write_xlsx(rows, file, sheet_title='Export'):
+    """Write rows to `file` with openpyxl's constant-memory write-only mode"""
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Font, PatternFill
+    from openpyxl.utils import get_column_letter
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(title=sheet_title[:31])
+    rows = iter(rows)
+    header = next(rows, [])
+
+    # Widths must be set before the first row in write-only mode
+    for col, title in enumerate(header, 1):
+        ws.column_dimensions[get_column_letter(col)].width = min(max(len(str(title)) + 4, 12), 50)
+
+    header_cells = []
+    for title in header:
+        cell = WriteOnlyCell(ws, value=title)
+        cell.font = Font(bold=True, color="FFFFFF")
+        cell.fill = PatternFill(start_color="3b5e7e", end_color="3b5e7e", fill_type="solid")
+        cell.alignment = Alignment(horizontal="center", vertical="center")
+        header_cells.append(cell)
+    ws.append(header_cells)
+
+    for row in rows:
+        ws.append(row)
+    wb.save(file)
+
+
+def write_export(rows, file, file_format, sheet_title='Export'):
+    if file_format == 'csv':
+        write_csv(rows, file)
+    elif file_format == 'xlsx':
+        write_xlsx(rows, file, sheet_title)
+    else:
+        raise ExportFormatError(f'Unsupported export format: {file_format}')
+
+
+# ============== RESPONSES ==============
+
+def export_response(request, queryset, columns, filename, file_format='csv', sheet_title='Export'):
+    """Stream `queryset` as `filename`.{csv,xlsx}, or hand it to a background job
+    when the request asks for one with ?background=1"""
+    if file_format not in ('csv', 'xlsx'):
+        raise ExportFormatError(f'Unsupported export format: {file_format}')
+    filename = f'{filename}.{file_format}'
+
+    if request.GET.get('background') in ('1', 'true', 'yes') and cache_is_shared():
+        job_id = start_export_job(request.user, queryset, columns, filename, file_format, sheet_title)
+        return JsonResponse({
+            'success': True,
+            'job_id': job_id,
+            'status_url': reverse('export_job_status', args=[job_id]),
+        }, status=202)
+
+    if file_format == 'csv':
+        response = StreamingHttpResponse(acsv_lines(aexport_rows(queryset, columns)), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    # Deleted on close, once file_blocks() has streamed it
+    tmp = tempfile.TemporaryFile()
+    write_xlsx(export_rows(queryset, columns), tmp, sheet_title)
+    tmp.seek(0)
+    return file_response(tmp, filename, XLSX_CONTENT_TYPE)
+
+
+# ============== BACKGROUND JOBS ==============
+
+def _job_key(job_id):
+    return f'export:job:{job_id}'
+
+
+def get_export_job(job_id):
+    return cache.get(_job_key(job_id))
+
+
+def _set_job(job_id, **fields):
+    job = get_export_job(job_id) or {}
+    job.update(fields)
+    cache.set(_job_key(job_id), job, EXPORT_JOB_TIMEOUT)
+    return job
+
+
+def export_path(job_id, filename):
+    return os.path.join(settings.MEDIA_ROOT, EXPORT_DIR, job_id, filename)
+
+
+def _run_export_job(job_id, queryset, columns, filename, file_format, sheet_title):
+    close_old_connections()
+    path = export_path(job_id, filename)
+    tmp_path = f'{path}.part'
+    try:
+        _set_job(job_id, status='running')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        newline = '' if file_format == 'csv' else None
+        mode = 'w' if file_format == 'csv' else 'wb'
+        with open(tmp_path, mode, newline=newline) as file:
+            write_export(export_rows(queryset, columns), file, file_format, sheet_title)
+        os.replace(tmp_path, path)
+        _set_job(job_id, status='done', path=path)
+    except Exception as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        _set_job(job_id, status='failed', message=str(e))
+    finally:
+        # Worker threads keep their own connections; don't leave them open
+        connections.close_all()
+
+
+def start_export_job(user, queryset, columns, filename, file_format, sheet_title='Export'):
+    job_id = uuid.uuid4().hex
+    _set_job(
+        job_id, status='pending', user_id=user.pk, filename=filename, file_format=file_format
+    )
+    _executor.submit(_run_export_job, job_id, queryset, columns, filename, file_format, sheet_title)
+    if cache.add('export:purged', True, EXPORT_PURGE_INTERVAL):
+        _executor.submit(purge_expired_exports)
+    return job_id
+
+
+def purge_expired_exports(max_age=EXPORT_JOB_TIMEOUT):
+    """Remove job directories under MEDIA_ROOT/exports/ last written more
+    than `max_age` seconds ago; their jobs have left the cache, so the
+    files can no longer be downloaded. Returns the number removed."""
+    root = os.path.join(settings.MEDIA_ROOT, EXPORT_DIR)
+    try:
+        entries = list(os.scandir(root))
+    except FileNotFoundError:
+        return 0
+    cutoff = time.time() - max_age
+    removed = 0
+    for entry in entries:
+        try:
+            if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path)
+                removed += 1
+        except OSError:
+            continue
+    return removed
@@ -0,0 +1,195 @@
+"""
+Per-request SQL instrumentation.
+
+QueryStatsMiddleware wraps every database call made while a request is
+handled (connection.execute_wrapper, so it works with DEBUG off) and
+records the query count, total DB time, duplicated statements (the same
+SQL run more than once, usually an N+1) and the slowest statements. The
+figures are:
+
+* sent back as X-DB-* response headers (SQL_INSTRUMENTATION_HEADERS),
+* kept per resolved view name for the last SQL_STATS_WINDOW requests in
+  this process, served by the query_stats view,
+* checked against SQL_QUERY_BUDGETS, e.g.
+  {'dashboard_stats': 30, 'API:farms': {'queries': 10, 'db_ms': 250}};
+  a request over its budget logs a warning.
+
+Queries run while a streaming response is consumed happen after the
+middleware returns and are not counted.
+"""
+import heapq
+import logging
+import threading
+import time
+from collections import Counter, deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+SLOWEST_STATEMENTS = getattr(settings, 'SQL_SLOWEST_STATEMENTS', 5)
+STATS_WINDOW = getattr(settings, 'SQL_STATS_WINDOW', 500)
+MAX_SQL_LENGTH = 1000
+
+_lock = threading.Lock()
+_stats = {}  # view name -> deque of request records
+
+
+class QueryRecorder:
+    """execute_wrapper that tallies every statement of one request"""
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+        self.slowest = []  # min-heap of (seconds, sql)
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.seconds += elapsed
+            self.statements[sql] += 1
+            entry = (elapsed, sql[:MAX_SQL_LENGTH])
+            if len(self.slowest) < SLOWEST_STATEMENTS:
+                heapq.heappush(self.slowest, entry)
+            elif entry > self.slowest[0]:
+                heapq.heapreplace(self.slowest, entry)
+
+    @property
+    def duplicates(self):
+        """Statements beyond the first run of each distinct SQL text"""
+        return sum(count - 1 for count in self.statements.values() if count > 1)
+
+    def record(self, total_seconds):
+        return {
+            'queries': self.count,
+            'db_ms': round(self.seconds * 1000, 2),
+            'duplicates': self.duplicates,
+            'total_ms': round(total_seconds * 1000, 2),
+            'slowest': [
+                {'ms': round(seconds * 1000, 2), 'sql': sql}
+                for seconds, sql in sorted(self.slowest, reverse=True)
+            ],
+            'repeated': [
+                {'count': count, 'sql': sql[:MAX_SQL_LENGTH]}
+                for sql, count in self.statements.most_common(3) if count > 1
+            ],
+        }
+
+
+# ============== BUDGETS ==============
+
+def budget_for(view_name):
+    """{'queries': n, 'db_ms': ms} for `view_name`, either key optional"""
+    budget = getattr(settings, 'SQL_QUERY_BUDGETS', {}).get(view_name)
+    if budget is None:
+        return {}
+    if isinstance(budget, int):
+        return {'queries': budget}
+    return budget
+
+
+def over_budget(record, budget):
+    """[(metric, value, limit)] of `record` over `budget`"""
+    return [
+        (metric, record[metric], limit)
+        for metric, limit in budget.items()
+        if limit is not None and record.get(metric, 0) > limit
+    ]
+
+
+# ============== STATS ==============
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+
+def add(view_name, record):
+    with _lock:
+        window = _stats.get(view_name)
+        if window is None:
+            window = _stats[view_name] = deque(maxlen=STATS_WINDOW)
+        window.append(record)
+
+
+def snapshot():
+    """Per-view summary of the requests in the rolling window, busiest first"""
+    with _lock:
+        windows = {view_name: list(window) for view_name, window in _stats.items()}
+
+    summary = []
+    for view_name, records in windows.items():
+        queries = [record['queries'] for record in records]
+        db_ms = [record['db_ms'] for record in records]
+        slowest = sorted(
+            (statement for record in records for statement in record['slowest']),
+            key=lambda statement: statement['ms'], reverse=True,
+        )[:SLOWEST_STATEMENTS]
+        summary.append({
+            'view': view_name,
+            'requests': len(records),
+            'queries_avg': round(sum(queries) / len(queries), 2),
+            'queries_p95': _percentile(queries, 95),
+            'queries_max': max(queries),
+            'db_ms_avg': round(sum(db_ms) / len(db_ms), 2),
+            'db_ms_p95': _percentile(db_ms, 95),
+            'duplicates_avg': round(sum(record['duplicates'] for record in records) / len(records), 2),
+            'over_budget': sum(1 for record in records if record['over_budget']),
+            'budget': budget_for(view_name),
+            'slowest': slowest,
+            'repeated': records[-1]['repeated'],
+        })
+    summary.sort(key=lambda row: row['queries_avg'] * row['requests'], reverse=True)
+    return summary
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+# ============== MIDDLEWARE ==============
+
+class QueryStatsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'SQL_INSTRUMENTATION', True)
+        self.headers = getattr(settings, 'SQL_INSTRUMENTATION_HEADERS', settings.DEBUG)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        record = recorder.record(time.perf_counter() - started)
+
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else '<unresolved>'
+        exceeded = over_budget(record, budget_for(view_name))
+        record['over_budget'] = bool(exceeded)
+        add(view_name, record)
+
+        if exceeded:
+            logger.warning(
+                'Query budget exceeded for %s (%s %s): %s',
+                view_name, request.method, request.path,
+                ', '.join(f'{metric} {value} > {limit}' for metric, value, limit in exceeded),
+            )
+        if self.headers:
+            response['X-DB-Queries'] = str(record['queries'])
+            response['X-DB-Time-Ms'] = str(record['db_ms'])
+            response['X-DB-Duplicates'] = str(record['duplicates'])
+            if exceeded:
+                response['X-DB-Over-Budget'] = ','.join(metric for metric, _, _ in exceeded)
+        return response